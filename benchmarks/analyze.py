@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Analysis CLI: text summaries, incremental figures and the regression gate.
+
+    summary  Per-point table (median over trials), the xPyD scaling table
+             and best P:D layout per input/output mix,
+             whole-run vs steady-state numbers of traced runs
+             (steady_state.py), the prefix-cache table of shared-prefix
+             runs (prefix_cache.py), the decode interference table
+             (interference.py) and the points of server_args sweeps by
+             server settings (server_knobs.py). Never imports matplotlib.
+    plot     Renders the figures of plot_benchmarks.py, plot_max_config.py,
+             plot_1pxd_scaling.py, prefix_cache.py, interference.py and
+             server_knobs.py in a
+             process pool on the Agg backend. A figure is only redrawn
+             when the hash of its inputs (the result rows it reads, the
+             trace metadata of those runs and the plotting code) changed
+             since the last render or the last attempt that had too little
+             data to draw; hashes live in results/.figure_hashes.json.
+    compare  Passes its arguments to regression_gate.py.
+
+Usage:
+    python3 benchmarks/analyze.py summary
+    python3 benchmarks/analyze.py plot
+    python3 benchmarks/analyze.py plot --only scaling,heatmap --force
+    python3 benchmarks/analyze.py compare --baseline-dir results_old/ --threshold 3
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+HASHES_FILENAME = ".figure_hashes.json"
+# Stored before the digest of inputs a figure was not drawn from (too little
+# data), so that they are not rendered again until they change
+SKIPPED = "skipped:"
+
+PLOT_MODES = ['agg', 'pd_intra', 'pd_inter']
+
+# figure -> (plotting module, output file, modes read, extra source files)
+FIGURES = {
+    'comparison': ('plot_benchmarks', 'benchmark_comparison.png', PLOT_MODES, []),
+    'ttft_breakdown': ('plot_benchmarks', 'ttft_breakdown.png', PLOT_MODES,
+                       ['latency_analysis.py', 'request_traces.py']),
+    'sweep': ('plot_benchmarks', 'sweep_results.png', PLOT_MODES, []),
+    'max_config': ('plot_max_config', 'max_config_comparison.png', PLOT_MODES,
+                   ['results_index.py']),
+    # The simulator overlay calibrates from pd_inter runs when no
+    # calibration.json was saved
+    'scaling': ('plot_1pxd_scaling', '1pxd_scaling_analysis.png',
+                ['pd_1pxd', 'pd_inter'], ['pd_simulator.py']),
+    'heatmap': ('plot_1pxd_scaling', '1pxd_throughput_heatmap.png', ['pd_1pxd'], []),
+    'surfaces': ('plot_1pxd_scaling', 'xpyd_surfaces.png', ['pd_1pxd'], []),
+    'prefix_cache': ('prefix_cache', 'prefix_cache.png', PLOT_MODES, ['plot_benchmarks.py']),
+    'interference': ('interference', 'interference.png', PLOT_MODES, ['plot_benchmarks.py']),
+    'server_knobs': ('server_knobs', 'server_knobs.png', PLOT_MODES + ['pd_1pxd'],
+                     ['plot_benchmarks.py']),
+}
+
+# Figures drawn from per-request traces when available
+TRACE_FIGURES = {'ttft_breakdown'}
+
+
+# ===== Input hashes =====
+
+def input_hash(name, table, results_dir):
+    """Hash of everything a figure reads, or None if it has no input rows."""
+    import pandas as pd
+    from request_traces import trace_dir
+    from pd_simulator import model_path
+
+    module, _, modes, sources = FIGURES[name]
+    if name == 'interference':
+        # Interference runs are kept in their own directory
+        from interference import runs_dir
+        from results_store import load_table
+        if not runs_dir(results_dir).is_dir():
+            return None
+        table = load_table(results_dir=runs_dir(results_dir))
+    rows = table[table['mode'].isin(modes)]
+    if not rows['mode'].isin(modes[:1] if name == 'scaling' else modes).any():
+        return None
+    h = hashlib.sha1()
+    for source in [f"{module}.py", "results_store.py"] + sources:
+        h.update((ROOT / "benchmarks" / source).read_bytes())
+    h.update(pd.util.hash_pandas_object(rows.astype(str), index=False).to_numpy().tobytes())
+    if name in TRACE_FIGURES:
+        for tag in rows['tag']:
+            meta = trace_dir(tag, results_dir) / "meta.json"
+            h.update(meta.read_bytes() if meta.exists() else b"-")
+    if name == 'scaling':
+        calibration = model_path(results_dir)
+        h.update(calibration.read_bytes() if calibration.exists() else b"-")
+    return h.hexdigest()
+
+
+def load_hashes(results_dir):
+    path = pathlib.Path(results_dir) / HASHES_FILENAME
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_hashes(results_dir, hashes):
+    path = pathlib.Path(results_dir) / HASHES_FILENAME
+    path.write_text(json.dumps(hashes, indent=2, sort_keys=True) + "\n")
+
+
+# ===== Rendering =====
+
+def render(name, results_dir):
+    """Draw one figure (runs in a worker process).
+
+    Returns (name, seconds).
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    start = time.monotonic()
+    results_dir = pathlib.Path(results_dir)
+    if FIGURES[name][0] == 'plot_benchmarks':
+        import plot_benchmarks
+        plot_benchmarks.RESULTS_DIR = results_dir
+        df = plot_benchmarks.load_results()
+        draw = {'comparison': plot_benchmarks.plot_comparison,
+                'ttft_breakdown': plot_benchmarks.plot_ttft_breakdown,
+                'sweep': plot_benchmarks.plot_sweep_results}[name]
+        draw(df)
+    elif name == 'max_config':
+        import plot_max_config
+        from results_index import load_index
+        rows = plot_max_config.select_rows(load_index(results_dir))
+        config = plot_max_config.MAX_CONFIG
+        plot_max_config.plot_max_config(
+            rows, 'SGLang PD Disaggregation Benchmark\nMax Config: '
+            f"input={config['input_len']}, output={config['output_len']}, "
+            f"concurrency={config['concurrency']}, n={config['num_prompts']}",
+            results_dir / FIGURES[name][1])
+    elif name == 'prefix_cache':
+        import prefix_cache
+        points = prefix_cache.prefix_table(results_dir)
+        if not points.empty:
+            prefix_cache.plot_prefix_cache(points, results_dir / FIGURES[name][1])
+    elif name == 'interference':
+        import interference
+        runs = interference.load_runs(results_dir)
+        if not runs.empty:
+            interference.plot_summary(interference.summary_table(runs),
+                                      results_dir / FIGURES[name][1])
+    elif name == 'server_knobs':
+        import server_knobs
+        points = server_knobs.knob_table(results_dir)
+        if not points.empty:
+            server_knobs.plot_knobs(points, results_dir / FIGURES[name][1])
+    elif name == 'surfaces':
+        import plot_1pxd_scaling
+        plot_1pxd_scaling.RESULTS_DIR = plot_1pxd_scaling.OUTPUT_DIR = results_dir
+        plot_1pxd_scaling.plot_layout_surfaces(
+            plot_1pxd_scaling.layout_table(plot_1pxd_scaling.load_runs()))
+    else:
+        import plot_1pxd_scaling
+        plot_1pxd_scaling.RESULTS_DIR = plot_1pxd_scaling.OUTPUT_DIR = results_dir
+        results = plot_1pxd_scaling.load_benchmark_results()
+        if name == 'scaling':
+            try:
+                from pd_simulator import scaling_projection
+                projections = scaling_projection(results_dir)
+            except Exception as e:
+                print(f"Note: no simulator projection ({e})")
+                projections = None
+            plot_1pxd_scaling.plot_scaling_by_decoders(results, projections=projections)
+        else:
+            plot_1pxd_scaling.plot_heatmap_throughput(results)
+    plt.close('all')
+    return name, time.monotonic() - start
+
+
+def plot_figures(results_dir, names, jobs, force=False):
+    """Render the figures whose inputs changed.
+
+    Returns {name: status}.
+    """
+    from results_store import load_table
+
+    table = load_table(results_dir=results_dir)
+    hashes = load_hashes(results_dir)
+    status, todo = {}, {}
+    for name in names:
+        digest = input_hash(name, table, results_dir)
+        output = pathlib.Path(results_dir) / FIGURES[name][1]
+        if digest is None:
+            status[name] = 'no data'
+        elif not force and hashes.get(name) == digest and output.exists():
+            status[name] = 'unchanged'
+        elif not force and hashes.get(name) == SKIPPED + digest:
+            status[name] = 'unchanged (not drawn, not enough data)'
+        else:
+            todo[name] = digest
+
+    if todo:
+        # Workers must never pick up an interactive backend
+        os.environ['MPLBACKEND'] = 'Agg'
+        workers = max(1, min(jobs, len(todo)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render, name, str(results_dir)): name for name in todo}
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    _, seconds = future.result()
+                # The plotting scripts exit with a message when data is missing
+                except (Exception, SystemExit) as e:
+                    status[name] = f'failed: {e}'
+                    continue
+                output = pathlib.Path(results_dir) / FIGURES[name][1]
+                if output.exists():
+                    hashes[name] = todo[name]
+                    status[name] = f'rendered in {seconds:.1f}s'
+                else:
+                    hashes[name] = SKIPPED + todo[name]
+                    status[name] = 'not drawn (not enough data)'
+        save_hashes(results_dir, hashes)
+    return status
+
+
+# ===== Summary =====
+
+def print_summary(results_dir):
+    """Text tables only; the plotting modules import matplotlib lazily."""
+    import plot_1pxd_scaling
+    import interference
+    import plot_benchmarks
+    import prefix_cache
+    import server_knobs
+    import steady_state
+    from results_store import load_table
+
+    plot_benchmarks.RESULTS_DIR = plot_1pxd_scaling.RESULTS_DIR = results_dir
+    table = load_table(results_dir=results_dir)
+    runs = table[table['mode'].isin(PLOT_MODES)]
+    if not runs.empty:
+        runs = runs.assign(mode=runs['mode'].astype(str)).rename(columns={
+            'mean_e2e_latency_ms': 'mean_e2e_ms'})
+        plot_benchmarks.print_summary(runs)
+    scaling = table[table['mode'] == 'pd_1pxd'].reset_index(drop=True)
+    if not scaling.empty:
+        plot_1pxd_scaling.print_summary_table(scaling)
+        print("\nBest layout per mix (tok/s per GPU)")
+        print(plot_1pxd_scaling.format_layout_table(plot_1pxd_scaling.layout_table(scaling)))
+    if runs.empty and scaling.empty:
+        print(f"No results in {results_dir}")
+        return
+    steady = steady_state.steady_table(table, results_dir)
+    if not steady.empty:
+        print("\nWhole run vs steady state (traced runs; ttft/tpot in ms)")
+        print(steady_state.format_table(steady))
+    prefixes = prefix_cache.prefix_table(results_dir)
+    if not prefixes.empty:
+        print("\nShared-prefix runs (median over trials; ttft in ms)")
+        print(prefix_cache.format_table(prefixes))
+    bursts = interference.load_runs(results_dir)
+    if not bursts.empty:
+        print("\nBackground decode stream between vs during prefill bursts "
+              "(median over trials; ms, x = during / between)")
+        print(interference.format_table(interference.summary_table(bursts)))
+    knobs = server_knobs.knob_table(results_dir)
+    if not knobs.empty:
+        print("\nPoints by server settings (median over trials; ms, % vs baseline settings)")
+        print(server_knobs.format_table(knobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analysis")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("summary", help="Print result tables (no matplotlib)")
+
+    p_plot = sub.add_parser("plot", help="Render changed figures in parallel")
+    p_plot.add_argument("--only", help=f"Comma-separated subset of {','.join(FIGURES)}")
+    p_plot.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    p_plot.add_argument("--force", action="store_true", help="Ignore the input hashes")
+
+    # Everything after 'compare' goes to regression_gate.py
+    sub.add_parser("compare", help="Run regression_gate.py", add_help=False)
+    args, rest = parser.parse_known_args()
+    if rest and args.command != "compare":
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    results_dir = pathlib.Path(args.results_dir)
+    if args.command == "summary":
+        print_summary(results_dir)
+    elif args.command == "plot":
+        names = args.only.split(",") if args.only else list(FIGURES)
+        unknown = [n for n in names if n not in FIGURES]
+        if unknown:
+            parser.error(f"unknown figure(s): {', '.join(unknown)}")
+        start = time.monotonic()
+        status = plot_figures(results_dir, names, args.jobs, args.force)
+        print()
+        for name in names:
+            print(f"  {name:<16} {FIGURES[name][1]:<30} {status[name]}")
+        print(f"Done in {time.monotonic() - start:.1f}s ({results_dir})")
+    else:
+        import regression_gate
+        regression_gate.main(rest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+KV capacity planner: token capacity, safe concurrency and decoder counts.
+
+Each server's KV pool holds max_total_num_tokens tokens. When the running
+requests need more, SGLang retracts (preempts) requests and recomputes them
+later, and throughput collapses. This turns the recorded server_info into
+the limits that matter for a sweep:
+
+    token capacity   max_total_num_tokens (or max_total_tokens) from
+                     server_info, else estimated as
+                     gpu_mem_gb x mem_fraction_static - weights, divided by
+                     the KV bytes per token (see kv_transfer.py)
+    footprint/req    mean prompt + output tokens at completion, padded to
+                     whole pages. A PD prefill server only holds the prompt
+                     until the KV has been sent.
+    max concurrency  capacity / footprint, capped by max_running_requests.
+                     Below this, the running batch fits even when every
+                     request reaches its full length.
+
+Concurrency is recommended in powers of two up to that limit. Steps above
+cuda_graph_max_bs are flagged because decode leaves CUDA graphs there.
+Decoders are recommended as the decode servers needed to hold a target
+concurrency.
+
+`validate` checks the model against the results. It finds where throughput
+stops growing with concurrency and reports whether memory can explain that
+plateau.
+
+Usage:
+    python3 benchmarks/capacity_planner.py plan --input-len 4096 --output-len 1024
+    python3 benchmarks/capacity_planner.py plan --mode pd_inter --target-concurrency 1024 \\
+        --concurrency 32,64,128,256,512
+    python3 benchmarks/capacity_planner.py estimate --gpu-mem-gb 80 --mem-fraction 0.9 \\
+        --weights-gb 6 --seq-len 2048
+    python3 benchmarks/capacity_planner.py validate
+"""
+
+import argparse
+import math
+import pathlib
+import sys
+
+import pandas as pd
+
+from kv_transfer import kv_bytes_per_token, read_server_info, role_server_info
+from results_store import MODES, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+DEFAULT_MODEL = "Qwen/Qwen2.5-3B-Instruct"
+
+# bench_serving's default --random-range-ratio: lengths uniform in [1, len]
+DEFAULT_RANGE_RATIO = 0.0
+
+# Doubling concurrency must add at least this much throughput to count as
+# still scaling
+PLATEAU_GAIN = 0.10
+
+# A plateau this close to the predicted limit is attributed to memory
+MEMORY_BOUND_FRACTION = 0.8
+
+
+# ===== Capacity model =====
+
+def mean_length(length, range_ratio):
+    """Mean of bench_serving's uniform lengths in [max(len * ratio, 1), len]."""
+    if length <= 0:
+        return 0.0
+    return (max(int(length * range_ratio), 1) + length) / 2
+
+
+def request_footprint(input_len, output_len, role='agg', range_ratio=DEFAULT_RANGE_RATIO,
+                      page_size=1):
+    """Mean KV tokens one request holds at its peak on a server of `role`."""
+    tokens = mean_length(input_len, range_ratio)
+    if role != 'prefill':
+        tokens += mean_length(output_len, range_ratio)
+    return tokens + (max(int(page_size or 1), 1) - 1) / 2
+
+
+def estimate_kv_tokens(server, gpu_mem_gb, weights_gb=None):
+    """Estimate the KV pool size of a server that has not been launched.
+
+    SGLang gives mem_fraction_static of the GPU to weights plus KV cache, so
+    KV gets gpu_mem_gb x mem_fraction_static - weights.
+    """
+    per_token, _ = kv_bytes_per_token(server)
+    if not per_token:
+        raise ValueError(f"Unknown KV size for model {server.get('model_path')!r}")
+    if weights_gb is None:
+        weights_gb = (server.get('memory_usage') or {}).get('weight')
+    if weights_gb is None:
+        raise ValueError("Weights size unknown; pass weights_gb")
+    kv_gb = gpu_mem_gb * server.get('mem_fraction_static', 0.9) - weights_gb
+    return max(int(kv_gb * 2**30 / per_token), 0)
+
+
+def token_capacity(server, gpu_mem_gb=None, weights_gb=None):
+    """KV tokens a server can hold, recorded if available, else estimated."""
+    recorded = server.get('max_total_num_tokens')
+    if recorded:
+        return int(recorded)
+    estimate = (estimate_kv_tokens(server, gpu_mem_gb, weights_gb)
+                if gpu_mem_gb else None)
+    if server.get('max_total_tokens'):
+        return min(int(server['max_total_tokens']), estimate or math.inf)
+    if estimate is None:
+        raise ValueError("No recorded token capacity; pass gpu_mem_gb to estimate it")
+    return estimate
+
+
+def max_concurrency(server, input_len, output_len, role='agg',
+                    range_ratio=DEFAULT_RANGE_RATIO, capacity=None):
+    """Largest concurrency whose running batch fits in the KV pool."""
+    if capacity is None:
+        capacity = token_capacity(server)
+    footprint = request_footprint(input_len, output_len, role, range_ratio,
+                                  server.get('page_size'))
+    limit = int(capacity // footprint)
+    if server.get('max_running_requests'):
+        limit = min(limit, int(server['max_running_requests']))
+    return limit
+
+
+def concurrency_ladder(limit, start=8):
+    """Powers of two from `start` up to `limit`."""
+    ladder = []
+    c = start
+    while c <= limit:
+        ladder.append(c)
+        c *= 2
+    return ladder
+
+
+def classify_concurrency(concurrency, limit, graph_bs=None):
+    if concurrency > limit:
+        return "retracts"
+    if graph_bs and concurrency > graph_bs:
+        return "above cuda graph bs"
+    return "ok"
+
+
+def plan(roles, input_len, output_len, range_ratio=DEFAULT_RANGE_RATIO,
+         target_concurrency=None, num_decoders=1):
+    """Capacity figures per role.
+
+    Args:
+        roles: {role: server dict} from recorded_roles
+        num_decoders: Decode servers sharing the load (pd roles only)
+    Returns:
+        {role: dict(capacity, footprint, max_concurrency, graph_bs,
+                    decoders_needed)}
+    """
+    out = {}
+    for role, server in roles.items():
+        capacity = token_capacity(server)
+        limit = max_concurrency(server, input_len, output_len, role, range_ratio, capacity)
+        entry = {
+            'capacity': capacity,
+            'footprint': request_footprint(input_len, output_len, role, range_ratio,
+                                           server.get('page_size')),
+            'max_concurrency': limit,
+            'graph_bs': server.get('cuda_graph_max_bs'),
+            'servers': num_decoders if role == 'decode' else 1,
+            'decoders_needed': None,
+        }
+        if target_concurrency and role in ('decode', 'agg') and limit:
+            entry['decoders_needed'] = math.ceil(target_concurrency / limit)
+        out[role] = entry
+    return out
+
+
+# ===== Recorded configs =====
+
+def record_roles(server_info):
+    """{role: server dict} for a record: 'agg', or 'prefill' and 'decode'."""
+    if server_info and (server_info.get('prefill') or server_info.get('decode')):
+        return {role: role_server_info(server_info, role) for role in ('prefill', 'decode')
+                if server_info.get(role)}
+    return {'agg': role_server_info(server_info)} if server_info else {}
+
+
+def recorded_roles(results_dir=RESULTS_DIR, mode='pd_inter', tag=None):
+    """Server configs of the latest run of `mode` (or of run `tag`)."""
+    df = load_table(results_dir=results_dir)
+    df = df[df['tag'] == tag] if tag else df[df['mode'].astype(str) == mode]
+    if df.empty:
+        raise SystemExit(f"No recorded run for {'tag ' + tag if tag else 'mode ' + mode}")
+    row = df.iloc[-1]
+    return row['tag'], record_roles(read_server_info(row, results_dir))
+
+
+def run_limit(row, roles, range_ratio=None):
+    """Predicted max concurrency of a measured run (decode side, all decoders)."""
+    role = 'decode' if 'decode' in roles else 'agg'
+    if range_ratio is None:
+        mean_in = row['total_input_tokens'] / row['completed']
+        range_ratio = min(max(2 * mean_in / row['input_len'] - 1, 0.0), 1.0)
+    limit = max_concurrency(roles[role], int(row['input_len']), int(row['output_len']),
+                            role, range_ratio)
+    return limit * max(int(row['num_decoders']), 1)
+
+
+def find_plateaus(df):
+    """Per workload, the concurrency after which throughput stops growing.
+
+    Returns rows with the measured concurrency levels, throughputs and the
+    plateau concurrency (None if throughput kept scaling).
+    """
+    keys = ['mode', 'num_prefills', 'num_decoders', 'num_prompts', 'input_len', 'output_len']
+    series = []
+    for key, group in df.groupby(keys, observed=True):
+        curve = group.groupby('concurrency')['output_throughput'].median().sort_index()
+        if len(curve) < 2:
+            continue
+        plateau = None
+        for (c0, t0), (c1, t1) in zip(curve.items(), list(curve.items())[1:]):
+            if t1 < t0 * (1 + PLATEAU_GAIN * math.log2(c1 / c0)):
+                plateau = c0
+                break
+        series.append({**dict(zip(keys, key)), 'curve': curve, 'plateau': plateau,
+                       'last': group.iloc[-1]})
+    return series
+
+
+def validate(results_dir=RESULTS_DIR):
+    """Compare observed throughput plateaus with the predicted memory limits."""
+    df = load_table(results_dir=results_dir)
+    df = df[df['completed'] > 0]
+    rows = []
+    for s in find_plateaus(df):
+        roles = record_roles(read_server_info(s['last'], results_dir))
+        if not roles:
+            continue
+        limit = run_limit(s['last'], roles)
+        top = int(s['curve'].index.max())
+        if s['plateau'] is None:
+            verdict = ("consistent: still scaling below the limit" if top <= limit
+                       else "MISMATCH: scales past the predicted limit")
+        elif s['plateau'] >= MEMORY_BOUND_FRACTION * limit:
+            verdict = "memory-bound plateau"
+        else:
+            verdict = "plateau below the memory limit: compute/transfer-bound"
+        rows.append({
+            'workload': (f"{s['mode']} {s['num_prefills']}p{s['num_decoders']}d "
+                         f"n{s['num_prompts']} in{s['input_len']} out{s['output_len']}"),
+            'concurrency': ",".join(str(int(c)) for c in s['curve'].index),
+            'tok/s': ",".join(f"{t:.0f}" for t in s['curve'].values),
+            'plateau_at': s['plateau'] if s['plateau'] is not None else '-',
+            'predicted_limit': limit,
+            'verdict': verdict,
+        })
+    return rows
+
+
+# ===== Reports =====
+
+def print_plan(tag, roles, figures, input_len, output_len, range_ratio, check=()):
+    print(f"Server config from: {tag}")
+    print(f"Workload: input {input_len}, output {output_len}, range ratio {range_ratio:g}")
+    for role, fig in figures.items():
+        server = roles[role]
+        print(f"\n[{role}] mem_fraction_static={server.get('mem_fraction_static')} "
+              f"page_size={server.get('page_size')} "
+              f"kv_cache_dtype={server.get('kv_cache_dtype')}")
+        print(f"  token capacity       {fig['capacity']:>10,}")
+        print(f"  tokens per request   {fig['footprint']:>10,.0f}")
+        print(f"  max concurrency      {fig['max_concurrency']:>10,}  per server"
+              + (f" ({fig['max_concurrency'] * fig['servers']:,} over "
+                 f"{fig['servers']} decoders)" if fig['servers'] > 1 else ""))
+        if role != 'prefill':
+            ladder = concurrency_ladder(fig['max_concurrency'] * fig['servers'])
+            graph = fig['graph_bs'] * fig['servers'] if fig['graph_bs'] else None
+            print(f"  recommended          {' '.join(map(str, ladder)) or '-'}"
+                  + (f"  (CUDA graphs up to {graph})" if graph else ""))
+            if fig['decoders_needed']:
+                print(f"  decoders needed      {fig['decoders_needed']:>10}")
+            for c in check:
+                status = classify_concurrency(c, fig['max_concurrency'] * fig['servers'], graph)
+                print(f"  concurrency {c:<8} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KV capacity and concurrency planner")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def workload_args(p):
+        p.add_argument("--input-len", type=int, default=2048)
+        p.add_argument("--output-len", type=int, default=512)
+        p.add_argument("--range-ratio", type=float, default=DEFAULT_RANGE_RATIO,
+                       help="bench_serving --random-range-ratio (1 = fixed lengths)")
+
+    p_plan = sub.add_parser("plan", help="Limits from a recorded server config")
+    workload_args(p_plan)
+    p_plan.add_argument("--mode", default="pd_inter", choices=MODES)
+    p_plan.add_argument("--tag", help="Use this run's server_info instead of the latest")
+    p_plan.add_argument("--num-decoders", type=int, default=1)
+    p_plan.add_argument("--target-concurrency", type=int)
+    p_plan.add_argument("--concurrency", default="",
+                        help="Comma-separated sweep levels to check")
+
+    p_est = sub.add_parser("estimate", help="Limits for a server that has not been run")
+    workload_args(p_est)
+    p_est.add_argument("--model", default=DEFAULT_MODEL)
+    p_est.add_argument("--gpu-mem-gb", type=float, default=80)
+    p_est.add_argument("--mem-fraction", type=float, default=0.9)
+    p_est.add_argument("--weights-gb", type=float, required=True)
+    p_est.add_argument("--page-size", type=int, default=1)
+    p_est.add_argument("--kv-cache-dtype", default="auto")
+    p_est.add_argument("--seq-len", type=int,
+                       help="Fixed total tokens per request (overrides input/output)")
+    p_est.add_argument("--quiet", action="store_true", help="Print only the max concurrency")
+
+    sub.add_parser("validate", help="Check predictions against throughput plateaus")
+    args = parser.parse_args()
+    results_dir = pathlib.Path(args.results_dir)
+
+    if args.command == "plan":
+        tag, roles = recorded_roles(results_dir, args.mode, args.tag)
+        figures = plan(roles, args.input_len, args.output_len, args.range_ratio,
+                       args.target_concurrency, args.num_decoders)
+        check = [int(c) for c in args.concurrency.split(",") if c]
+        print_plan(tag, roles, figures, args.input_len, args.output_len, args.range_ratio,
+                   check)
+    elif args.command == "estimate":
+        server = {'model_path': args.model, 'mem_fraction_static': args.mem_fraction,
+                  'page_size': args.page_size, 'kv_cache_dtype': args.kv_cache_dtype}
+        capacity = estimate_kv_tokens(server, args.gpu_mem_gb, args.weights_gb)
+        if args.seq_len:
+            input_len, output_len, ratio = args.seq_len, 0, 1.0
+        else:
+            input_len, output_len, ratio = args.input_len, args.output_len, args.range_ratio
+        limit = max_concurrency(server, input_len, output_len, 'agg', ratio, capacity)
+        if not capacity:
+            print(f"No room for KV cache: weights ({args.weights_gb:g} GB) fill the "
+                  f"{args.gpu_mem_gb:g} GB x {args.mem_fraction:g} static memory",
+                  file=sys.stderr)
+        if args.quiet:
+            print(limit)
+            return
+        per_token, _ = kv_bytes_per_token(server)
+        print(f"{args.model}: {per_token / 1024:.1f} KiB KV per token")
+        print(f"  KV memory            {capacity * per_token / 2**30:>10.1f} GiB")
+        print(f"  token capacity       {capacity:>10,}")
+        print(f"  max concurrency      {limit:>10,}")
+    else:
+        rows = validate(results_dir)
+        if not rows:
+            print("No workload was measured at two or more concurrency levels")
+            return
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
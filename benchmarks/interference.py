@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Prefill/decode interference benchmark.
+
+Homogeneous sweeps never show the effect PD disaggregation exists for:
+on an aggregated server, a long prompt's prefill chunks run between decode
+steps, so every running decode stalls. This benchmark mixes two streams
+against one endpoint (server or router):
+
+    background  --bg-concurrency closed-loop users sending decode-heavy
+                requests (short prompt, long output) for --duration seconds
+    bursts      every --burst-period seconds after --warmup, --burst-size
+                long-prompt requests (--burst-input-len, --burst-output-len)
+                sent at once
+
+A burst window runs from the first burst send to the last burst first
+token, i.e. while the burst is being prefilled. Every background ITL sample
+is "during" if the gap starts or ends inside a window and "between"
+otherwise; background requests are likewise split by whether their decode
+overlapped a window (short burst periods leave no "between" requests).
+inflation = during / between, so 1.0 means the decode stream did not
+notice the bursts.
+
+Outputs (in results/interference/, so that the mixed streams never pass for
+sweep points in results_store):
+    <tag>.jsonl               background summary (bench_serving fields) plus
+                              "interference": burst windows, during/between
+                              ITL and TPOT stats
+    traces/<tag>/             background per-request trace (request_traces.py)
+
+Tags are <mode>_burst_c<C>_in<I>_out<O>_b<B>x<L>_every<P>s, where
+<mode> is agg, pd_intra or pd_inter.
+
+Usage:
+    python3 benchmarks/interference.py run --mode agg --base-url http://127.0.0.1:30000
+    python3 benchmarks/interference.py run --mode pd_inter --base-url http://127.0.0.1:8000 \\
+        --duration 120 --burst-size 8 --burst-input-len 8192
+    python3 benchmarks/interference.py report
+    python3 benchmarks/interference.py report --plot      # -> results/interference.png
+    python3 benchmarks/interference.py plot agg_burst_c32_in128_out1024_b8x8192_every10s
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import time
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from load_generator import (VOCAB_HIGH, VOCAB_LOW, build_payload, fetch_server_info,
+                            send_request, summarize)
+from request_traces import from_request_results, load_trace, write_trace
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+RUNS_DIRNAME = "interference"
+
+MODES = ['agg', 'pd_intra', 'pd_inter']
+# Tag family marker; avoids words results_store.classify_mode reads as a mode
+FAMILY = "burst"
+
+# (stat key, label) pairs of the report
+STATS = [
+    ('itl_between_p50_ms', 'itl p50 between'), ('itl_during_p50_ms', 'itl p50 during'),
+    ('itl_between_p99_ms', 'itl p99 between'), ('itl_during_p99_ms', 'itl p99 during'),
+    ('tpot_between_ms', 'tpot between'), ('tpot_during_ms', 'tpot during'),
+]
+
+
+def runs_dir(results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / RUNS_DIRNAME
+
+
+def run_tag(args):
+    return (f"{args.mode}_{FAMILY}_c{args.bg_concurrency}_in{args.bg_input_len}"
+            f"_out{args.bg_output_len}_b{args.burst_size}x{args.burst_input_len}"
+            f"_every{args.burst_period:g}s")
+
+
+# ===== Load =====
+
+async def drive(args):
+    """Run both streams. Returns (background results, burst results per burst)."""
+    rng = np.random.default_rng(args.seed)
+    connector = aiohttp.TCPConnector(limit=0, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    background, bursts = [], []
+
+    def request(input_len, output_len):
+        result = {"input_len": input_len, "max_output_len": output_len,
+                  "success": False, "output_len": 0}
+        input_ids = rng.integers(VOCAB_LOW, VOCAB_HIGH, input_len).tolist()
+        path, payload = build_payload(args.backend, args.model, input_ids, output_len)
+        return args.base_url + path, payload, result
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        t0 = time.perf_counter()
+
+        async def user():
+            while time.perf_counter() - t0 < args.duration:
+                url, payload, result = request(args.bg_input_len, args.bg_output_len)
+                background.append(result)
+                await send_request(session, url, args.backend, payload, t0, result)
+
+        async def injector():
+            start = args.warmup
+            while start < args.duration:
+                await asyncio.sleep(max(0.0, start - (time.perf_counter() - t0)))
+                calls = [request(args.burst_input_len, args.burst_output_len)
+                         for _ in range(args.burst_size)]
+                bursts.append([result for _, _, result in calls])
+                await asyncio.gather(*(send_request(session, url, args.backend, payload,
+                                                    t0, result)
+                                       for url, payload, result in calls))
+                start += args.burst_period
+
+        await asyncio.gather(*(user() for _ in range(args.bg_concurrency)), injector())
+    return background, bursts
+
+
+# ===== Analysis =====
+
+def burst_windows(bursts):
+    """Merged [start, end] prefill windows (seconds from the run start)."""
+    windows = []
+    for results in bursts:
+        sent = [r["send_time"] for r in results if "send_time" in r]
+        firsts = [r["first_token_time"] for r in results if "first_token_time" in r]
+        if sent and firsts:
+            windows.append([min(sent), max(firsts)])
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def in_windows(times, windows):
+    """Boolean mask: which times fall inside a (merged, sorted) window."""
+    if not windows:
+        return np.zeros(len(times), dtype=bool)
+    starts, ends = np.asarray(windows, dtype=np.float64).T
+    idx = np.searchsorted(starts, times, side='right') - 1
+    return (idx >= 0) & (times <= ends[np.maximum(idx, 0)])
+
+
+def itl_samples(trace):
+    """(arrival time, ITL ms) of every inter-token gap in a trace."""
+    t = np.asarray(trace["token_s"], dtype=np.float64)
+    offsets = np.asarray(trace["token_offsets"])
+    valid = np.ones(len(t), dtype=bool)
+    # The first token of each request starts no gap
+    valid[offsets[:-1][offsets[:-1] < offsets[1:]]] = False
+    gaps = np.empty_like(t)
+    gaps[1:] = np.diff(t)
+    return t[valid], gaps[valid] * 1000
+
+
+def interference_stats(trace, windows, lo, hi):
+    """During/between ITL and TPOT of the background in [lo, hi] seconds."""
+    at, itl = itl_samples(trace)
+    keep = (at >= lo) & (at <= hi)
+    at, itl = at[keep], itl[keep]
+    # A stall that straddles a window edge still belongs to the burst
+    during = in_windows(at, windows) | in_windows(at - itl / 1000, windows)
+
+    t = np.asarray(trace["token_s"], dtype=np.float64)
+    offsets = np.asarray(trace["token_offsets"])
+    multi = (offsets[1:] - offsets[:-1]) > 1
+    first, finish = t[offsets[:-1][multi]], t[offsets[1:][multi] - 1]
+    tpot = (finish - first) / (offsets[1:][multi] - offsets[:-1][multi] - 1) * 1000
+    span = (first >= lo) & (finish <= hi)
+    overlaps = np.zeros(len(first), dtype=bool)
+    for start, end in windows:
+        overlaps |= (first < end) & (finish > start)
+
+    def pct(values, q):
+        return float(np.percentile(values, q)) if len(values) else None
+
+    stats = {
+        'itl_between_p50_ms': pct(itl[~during], 50),
+        'itl_during_p50_ms': pct(itl[during], 50),
+        'itl_between_p99_ms': pct(itl[~during], 99),
+        'itl_during_p99_ms': pct(itl[during], 99),
+        'itl_during_max_ms': float(itl[during].max()) if during.any() else None,
+        'tpot_between_ms': pct(tpot[span & ~overlaps], 50),
+        'tpot_during_ms': pct(tpot[span & overlaps], 50),
+        'itl_samples_during': int(during.sum()),
+        'itl_samples_between': int((~during).sum()),
+        'window_fraction': float(sum(min(e, hi) - max(s, lo) for s, e in windows
+                                     if e > lo and s < hi) / (hi - lo)),
+    }
+    for name, between, during_v in [
+            ('itl_p50', stats['itl_between_p50_ms'], stats['itl_during_p50_ms']),
+            ('itl_p99', stats['itl_between_p99_ms'], stats['itl_during_p99_ms']),
+            ('tpot', stats['tpot_between_ms'], stats['tpot_during_ms'])]:
+        stats[f'{name}_inflation'] = (during_v / between
+                                      if during_v is not None and between else None)
+    return stats
+
+
+# ===== Run =====
+
+def run(args):
+    tag = args.tag or run_tag(args)
+    output_file = pathlib.Path(args.output_file or runs_dir() / f"{tag}.jsonl")
+    print(f"Interference run {tag}: {args.bg_concurrency} background users "
+          f"({args.bg_input_len} in / {args.bg_output_len} out), bursts of "
+          f"{args.burst_size} x {args.burst_input_len} tokens every {args.burst_period:g}s "
+          f"for {args.duration:g}s")
+
+    start_time = time.time()
+    background, bursts = asyncio.run(drive(args))
+    windows = burst_windows(bursts)
+    trace = from_request_results(background)
+    stats = interference_stats(trace, windows, args.warmup, args.duration)
+    burst_ttft = [(r["first_token_time"] - r["send_time"]) * 1000
+                  for results in bursts for r in results if r["success"]]
+
+    record = {
+        "tag": tag,
+        "backend": args.backend,
+        "dataset_name": "random",
+        "workload": "interference",
+        "load_generator": "interference",
+        "start_time": start_time,
+        "max_concurrency": args.bg_concurrency,
+        "num_prompts": len(background),
+        "random_input_len": args.bg_input_len,
+        "random_output_len": args.bg_output_len,
+        **summarize(background),
+        "interference": {
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "burst_size": args.burst_size,
+            "burst_input_len": args.burst_input_len,
+            "burst_output_len": args.burst_output_len,
+            "burst_period_s": args.burst_period,
+            "bursts": len(bursts),
+            "burst_mean_ttft_ms": float(np.mean(burst_ttft)) if burst_ttft else None,
+            "windows": windows,
+            **stats,
+        },
+        "trace": f"traces/{tag}",
+        "server_info": asyncio.run(fetch_server_info(args.base_url)),
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with output_file.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+    write_trace(tag, trace, output_file.parent, source="interference")
+
+    def fmt(value, spec, unit=""):
+        # Missing stats print as '-', like the report table
+        return "-" if value is None else format(value, spec) + unit
+
+    print(f"Background: {record.get('completed', 0)}/{len(background)} requests, "
+          f"{len(bursts)} bursts (mean burst TTFT "
+          f"{fmt(record['interference']['burst_mean_ttft_ms'], '.0f', ' ms')})")
+    for key, label in STATS:
+        value = stats[key]
+        print(f"  {label:<16} {value:8.2f} ms" if value is not None else f"  {label:<16}        -")
+    print(f"  ITL p99 inflation: {fmt(stats['itl_p99_inflation'], '.2f', 'x')}, "
+          f"TPOT inflation: {fmt(stats['tpot_inflation'], '.2f', 'x')}")
+    print(f"Summary:  {output_file}")
+    return record
+
+
+# ===== Report =====
+
+def load_runs(results_dir=RESULTS_DIR, modes=MODES):
+    """One row per interference run: mode, point, trial and its stats."""
+    from results_store import load_table
+
+    results_dir = runs_dir(results_dir)
+    if not results_dir.is_dir():
+        return pd.DataFrame()
+    table = load_table(f"*_{FAMILY}_*.jsonl", results_dir=results_dir)
+    rows = []
+    if table.empty:
+        return pd.DataFrame(rows)
+    table = table[table['mode'].isin(modes)]
+    for file, group in table.groupby('file', sort=True):
+        wanted = dict(zip(group['line'], group.index))
+        with (pathlib.Path(results_dir) / file).open() as f:
+            for lineno, line in enumerate(f):
+                if lineno not in wanted:
+                    continue
+                rec = json.loads(line)
+                if "interference" not in rec:
+                    continue
+                row = table.loc[wanted[lineno]]
+                # None (no samples on one side) must stay a numeric column
+                stats = {k: np.nan if v is None else v
+                         for k, v in rec["interference"].items() if k != "windows"}
+                rows.append({'tag': row['tag'], 'point': row['point'],
+                             'mode': str(row['mode']), **stats})
+    return pd.DataFrame(rows)
+
+
+def summary_table(runs):
+    """Median over trials; one row per (setup, mode)."""
+    runs = runs.assign(setup=runs['point'].str.split(f"_{FAMILY}_").str[1])
+    numeric = runs.select_dtypes('number').columns
+    out = runs.groupby(['setup', 'mode'], sort=True)[list(numeric)].median()
+    out['trials'] = runs.groupby(['setup', 'mode'], sort=True).size()
+    return out.reset_index()
+
+
+def format_table(summary):
+    cols = ['setup', 'mode', 'trials'] + [k for k, _ in STATS] + [
+        'itl_p50_inflation', 'itl_p99_inflation', 'tpot_inflation', 'burst_mean_ttft_ms']
+    names = {k: label.replace(' ', '_') for k, label in STATS}
+    names.update(itl_p50_inflation='x_p50', itl_p99_inflation='x_p99', tpot_inflation='x_tpot',
+                 burst_mean_ttft_ms='burst_ttft')
+    table = summary.reindex(columns=cols).rename(columns=names)
+    return table.to_string(index=False, float_format=lambda v: f"{v:.2f}", na_rep='-')
+
+
+def plot_summary(summary, out_path):
+    """Background ITL p50/p99 and TPOT between vs during bursts, per mode."""
+    import matplotlib.pyplot as plt
+    from plot_benchmarks import COLORS, get_mode_label
+
+    setups = list(summary['setup'].unique())
+    fig, axes = plt.subplots(len(setups), 3, figsize=(16, 4.5 * len(setups)), squeeze=False)
+    fig.suptitle('Decode Interference: Background Stream Between vs During Prefill Bursts',
+                 fontsize=14, fontweight='bold')
+    for row, setup in zip(axes, setups):
+        rows = summary[summary['setup'] == setup].set_index('mode')
+        modes = [m for m in MODES if m in rows.index]
+        x = np.arange(len(modes))
+        for ax, stat, label in zip(row, ['itl_{}_p50_ms', 'itl_{}_p99_ms', 'tpot_{}_ms'],
+                                   ['ITL p50 (ms)', 'ITL p99 (ms)', 'TPOT median (ms)']):
+            between = rows.loc[modes, stat.format('between')].astype(float)
+            during = rows.loc[modes, stat.format('during')].astype(float)
+            colors = [COLORS.get(m) for m in modes]
+            ax.bar(x - 0.2, between, 0.4, color=colors, alpha=0.45, label='between bursts')
+            ax.bar(x + 0.2, during, 0.4, color=colors, edgecolor='black', label='during bursts')
+            for xi, b, d in zip(x, between, during):
+                if b > 0 and d > 0:
+                    ax.text(xi + 0.2, d, f"{d / b:.2f}x", ha='center', va='bottom', fontsize=9)
+            ax.set_xticks(x)
+            ax.set_xticklabels([get_mode_label(m) for m in modes])
+            ax.set_ylabel(label)
+            ax.set_title(setup, fontsize=10)
+            ax.grid(axis='y', alpha=0.3, linestyle='--')
+        row[0].legend(fontsize=9)
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved interference plot: {out_path}")
+    return out_path
+
+
+def plot_timeline(tag, results_dir=RESULTS_DIR):
+    """Background ITL samples over time with the burst windows shaded."""
+    import matplotlib.pyplot as plt
+    from metrics_sampler import client_record
+
+    rec = client_record(tag, runs_dir(results_dir))
+    trace = load_trace(tag, runs_dir(results_dir))
+    if rec is None or trace is None or "interference" not in rec:
+        raise SystemExit(f"No interference run with a trace tagged {tag}")
+    at, itl = itl_samples(trace)
+    windows = rec["interference"]["windows"]
+    during = in_windows(at, windows) | in_windows(at - itl / 1000, windows)
+
+    fig, ax = plt.subplots(figsize=(14, 5))
+    for start, end in windows:
+        ax.axvspan(start, end, color='#F18F01', alpha=0.2, linewidth=0)
+    ax.scatter(at[~during], itl[~during], s=2, color='#2E86AB', label='between bursts')
+    ax.scatter(at[during], itl[during], s=2, color='#C73E1D', label='during bursts')
+    ax.set_yscale('log')
+    ax.set_xlabel('Time since start (s)')
+    ax.set_ylabel('Background ITL (ms)')
+    ax.set_title(f'{tag}: background ITL (shaded: burst prefill windows)',
+                 fontsize=12, fontweight='bold')
+    ax.grid(alpha=0.3, linestyle='--')
+    ax.legend(markerscale=5)
+    out_path = pathlib.Path(results_dir) / f"interference_{tag}.png"
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved timeline: {out_path}")
+    return out_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Prefill/decode interference benchmark")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run background + bursts against one endpoint")
+    p_run.add_argument("--mode", required=True, help=f"Tag prefix ({', '.join(MODES)})")
+    p_run.add_argument("--base-url", default="http://127.0.0.1:30000")
+    p_run.add_argument("--backend", default="sglang", choices=["sglang", "openai"])
+    p_run.add_argument("--model", default="Qwen/Qwen2.5-3B-Instruct")
+    p_run.add_argument("--duration", type=float, default=60.0,
+                       help="Seconds the background stream runs")
+    p_run.add_argument("--warmup", type=float, default=5.0,
+                       help="Seconds before the first burst (excluded from the stats)")
+    p_run.add_argument("--bg-concurrency", type=int, default=32)
+    p_run.add_argument("--bg-input-len", type=int, default=128)
+    p_run.add_argument("--bg-output-len", type=int, default=1024)
+    p_run.add_argument("--burst-size", type=int, default=8)
+    p_run.add_argument("--burst-input-len", type=int, default=8192)
+    p_run.add_argument("--burst-output-len", type=int, default=1)
+    p_run.add_argument("--burst-period", type=float, default=10.0)
+    p_run.add_argument("--timeout", type=float, default=3600)
+    p_run.add_argument("--seed", type=int, default=1)
+    p_run.add_argument("--tag", help="Default: derived from the settings")
+    p_run.add_argument("--output-file",
+                       help="Summary JSONL (default: results/interference/<tag>.jsonl)")
+
+    p_report = sub.add_parser("report", help="During/between table per mode")
+    p_report.add_argument("--modes", default=",".join(MODES))
+    p_report.add_argument("--plot", action="store_true", help="Also write interference.png")
+
+    p_plot = sub.add_parser("plot", help="ITL timeline of one run")
+    p_plot.add_argument("tag")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    results_dir = pathlib.Path(args.results_dir)
+    if args.command == "run":
+        if args.output_file is None:
+            args.output_file = str(runs_dir(results_dir) / f"{args.tag or run_tag(args)}.jsonl")
+        run(args)
+    elif args.command == "report":
+        runs = load_runs(results_dir, args.modes.split(","))
+        if runs.empty:
+            raise SystemExit(f"No interference runs in {results_dir}")
+        summary = summary_table(runs)
+        print("Background decode stream between vs during prefill bursts "
+              "(median over trials; ms, x = during / between)")
+        print(format_table(summary))
+        if args.plot:
+            plot_summary(summary, results_dir / "interference.png")
+    else:
+        plot_timeline(args.tag, results_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+KV-cache transfer cost model for PD runs.
+
+Every PD request ships its prompt's KV cache from the prefill to the decode
+server before the first token can be produced. This script computes how many
+bytes that is and checks how much of the PD TTFT the transfer explains:
+
+    kv bytes/token = 2 (K and V) x layers x kv_heads x head_dim x dtype bytes
+                     (MLA models: layers x (kv_lora_rank + qk_rope_head_dim))
+    kv bytes/req   = mean prompt tokens, rounded up to whole pages, x bytes/token
+
+The model comes from the prefill server's server_info. The architecture is
+read from its config.json: a local path, the Hugging Face cache, or the
+built-in KNOWN_MODELS table. kv_cache_dtype overrides the model dtype
+(fp8_* = 1 byte). If the architecture is unknown, memory_usage.kvcache /
+token_capacity from server_info is used instead.
+
+Each PD run is matched to the aggregated run with the same num_prompts,
+input/output length and concurrency. extra_ms = PD TTFT - agg TTFT is what
+disaggregation adds. Per mode, extra_ms at the lowest concurrency of each
+input length is fitted as
+
+    extra_ms = overhead_ms + kv_bytes / bandwidth
+
+The fitted bandwidth is the effective transfer rate. The overhead (bootstrap
+handshake, scheduling) and the remaining queueing make up the rest of TTFT.
+kv_gbps is the KV rate a run actually sustained (request_throughput x
+bytes). If it is flat across concurrency while TTFT grows, a serial
+transfer stage is saturated.
+
+Usage:
+    python3 benchmarks/kv_transfer.py                      # all PD runs
+    python3 benchmarks/kv_transfer.py --modes pd_inter --stat mean
+    python3 benchmarks/kv_transfer.py --link-gbps 100 --plot
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from results_store import load_table
+from server_configs import resolve_server_info
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+OUTPUT_SUBDIR = "kv_transfer"
+
+PD_MODES = ['pd_intra', 'pd_inter', 'pd_1pxd']
+MATCH_KEYS = ['num_prompts', 'input_len', 'output_len', 'concurrency']
+
+# A KV rate that grows less than this from the lowest to the highest
+# concurrency counts as saturated
+SATURATION_GROWTH = 1.5
+
+# config.json fields of models used with these scripts, for hosts without
+# the Hugging Face cache
+KNOWN_MODELS = {
+    'Qwen/Qwen2.5-0.5B-Instruct': {'num_hidden_layers': 24, 'num_attention_heads': 14,
+                                   'num_key_value_heads': 2, 'hidden_size': 896,
+                                   'torch_dtype': 'bfloat16'},
+    'Qwen/Qwen2.5-1.5B-Instruct': {'num_hidden_layers': 28, 'num_attention_heads': 12,
+                                   'num_key_value_heads': 2, 'hidden_size': 1536,
+                                   'torch_dtype': 'bfloat16'},
+    'Qwen/Qwen2.5-3B-Instruct': {'num_hidden_layers': 36, 'num_attention_heads': 16,
+                                 'num_key_value_heads': 2, 'hidden_size': 2048,
+                                 'torch_dtype': 'bfloat16'},
+    'Qwen/Qwen2.5-7B-Instruct': {'num_hidden_layers': 28, 'num_attention_heads': 28,
+                                 'num_key_value_heads': 4, 'hidden_size': 3584,
+                                 'torch_dtype': 'bfloat16'},
+    'meta-llama/Llama-3.1-8B-Instruct': {'num_hidden_layers': 32, 'num_attention_heads': 32,
+                                         'num_key_value_heads': 8, 'hidden_size': 4096,
+                                         'torch_dtype': 'bfloat16'},
+}
+
+DTYPE_BYTES = {'float32': 4, 'float16': 2, 'bfloat16': 2, 'half': 2, 'float': 4}
+
+
+# ===== KV size =====
+
+def model_config(model_path):
+    """Return the config.json dict of a model, or None if unavailable."""
+    candidates = [pathlib.Path(model_path) / "config.json"]
+    hf_home = os.environ.get("HF_HOME", os.path.expanduser("~/.cache/huggingface"))
+    repo = "models--" + model_path.replace("/", "--")
+    candidates += [pathlib.Path(p) for p in
+                   sorted(glob.glob(os.path.join(hf_home, "hub", repo, "snapshots", "*",
+                                                 "config.json")))]
+    for path in candidates:
+        if path.is_file():
+            with path.open() as f:
+                return json.load(f)
+    return KNOWN_MODELS.get(model_path)
+
+
+def dtype_bytes(config, server):
+    """Bytes per KV element given kv_cache_dtype / dtype / the model dtype."""
+    kv_dtype = server.get('kv_cache_dtype') or 'auto'
+    if kv_dtype.startswith('fp8'):
+        return 1
+    if kv_dtype != 'auto':
+        return DTYPE_BYTES.get(kv_dtype, 2)
+    dtype = server.get('dtype') or 'auto'
+    if dtype == 'auto':
+        dtype = config.get('torch_dtype') or 'bfloat16'
+    return DTYPE_BYTES.get(dtype, 2)
+
+
+def kv_bytes_per_token(server):
+    """KV bytes one token occupies on the prefill server.
+
+    Args:
+        server: server_info of the prefill (or aggregated) server
+    Returns:
+        (bytes, source) where source is 'config' or 'memory_usage', or
+        (None, None) if neither is available
+    """
+    config = model_config(server.get('model_path') or '')
+    if config:
+        layers = config['num_hidden_layers']
+        if config.get('kv_lora_rank'):
+            per_layer = config['kv_lora_rank'] + config.get('qk_rope_head_dim', 0)
+        else:
+            heads = config.get('num_key_value_heads') or config['num_attention_heads']
+            head_dim = config.get('head_dim') or config['hidden_size'] // config['num_attention_heads']
+            per_layer = 2 * heads * head_dim
+        return layers * per_layer * dtype_bytes(config, server), 'config'
+    usage = server.get('memory_usage') or {}
+    if usage.get('kvcache') and usage.get('token_capacity'):
+        return usage['kvcache'] * 2**30 / usage['token_capacity'], 'memory_usage'
+    return None, None
+
+
+def request_tokens(mean_tokens, page_size):
+    """Mean tokens transferred per request: KV moves in whole pages."""
+    page_size = max(int(page_size or 1), 1)
+    # Prompt lengths are spread over many pages, so on average half a page
+    # is padding
+    return mean_tokens + (page_size - 1) / 2
+
+
+def role_server_info(server_info, role='prefill'):
+    """One server's section of a record's server_info.
+
+    Router records hold {'prefill': [...], 'decode': [...]}; direct records
+    are the server's own dict. memory_usage (from internal_states) is
+    attached to the server whose token pool it describes.
+
+    Args:
+        role: 'prefill' or 'decode'; ignored for direct records
+    """
+    if not server_info:
+        return {}
+    states = server_info.get('internal_states') or [{}]
+    if server_info.get(role):
+        server = dict(server_info[role][0])
+        for state in states:
+            usage = state.get('memory_usage') or {}
+            if usage.get('token_capacity') == server.get('max_total_num_tokens'):
+                server['memory_usage'] = usage
+        return server
+    if 'prefill' in server_info or 'decode' in server_info:
+        return {}
+    return {**server_info, **states[0]}
+
+
+def read_server_info(row, results_dir=RESULTS_DIR):
+    path = pathlib.Path(results_dir) / row['file']
+    with path.open() as f:
+        for lineno, line in enumerate(f):
+            if lineno == row['line']:
+                return resolve_server_info(json.loads(line), results_dir)
+    return None
+
+
+# ===== Analysis =====
+
+def kv_table(results_dir=RESULTS_DIR, modes=PD_MODES, stat='median'):
+    """One row per PD run with KV size, matched agg TTFT and derived rates.
+
+    Args:
+        stat: 'median' or 'mean' TTFT
+    """
+    ttft = f'{stat}_ttft_ms'
+    df = load_table(results_dir=results_dir)
+    df = df[df['completed'] > 0].copy()
+    df['mode'] = df['mode'].astype(str)
+    agg = (df[df['mode'] == 'agg'].groupby(MATCH_KEYS)[ttft].median()
+           .rename('agg_ttft_ms').reset_index())
+    pd_runs = df[df['mode'].isin(modes)]
+
+    rows = []
+    for _, run in pd_runs.iterrows():
+        server = role_server_info(read_server_info(run, results_dir))
+        per_token, source = kv_bytes_per_token(server)
+        tokens = request_tokens(run['total_input_tokens'] / run['completed'],
+                                server.get('page_size'))
+        kv_bytes = per_token * tokens if per_token else math.nan
+        rows.append({
+            'tag': run['tag'], 'mode': run['mode'],
+            **{k: int(run[k]) for k in MATCH_KEYS},
+            'backend': server.get('disaggregation_transfer_backend'),
+            'kv_cache_dtype': server.get('kv_cache_dtype'),
+            'page_size': server.get('page_size'),
+            'kv_kb_per_token': per_token / 1024 if per_token else math.nan,
+            'kv_source': source,
+            'kv_mb': kv_bytes / 1e6,
+            'ttft_ms': run[ttft],
+            'request_throughput': run['request_throughput'],
+        })
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table.merge(agg, on=MATCH_KEYS, how='left')
+    table['extra_ms'] = table['ttft_ms'] - table['agg_ttft_ms']
+    # Upper bound on the per-request transfer time, so a lower bound on bandwidth
+    table['min_gbps'] = table['kv_mb'] * 8 / table['extra_ms'].where(table['extra_ms'] > 0)
+    table['kv_gbps'] = table['kv_mb'] * 8 * table['request_throughput'] / 1000
+    return table
+
+
+def fit_transfer(table):
+    """Fit extra_ms = overhead_ms + kv_bytes / bandwidth per mode.
+
+    Uses the lowest-concurrency run of each input length, where queueing
+    adds least. Returns {mode: {'overhead_ms', 'gbps', 'points'}}; gbps is
+    inf when extra_ms does not grow with KV size.
+    """
+    fits = {}
+    matched = table.dropna(subset=['extra_ms', 'kv_mb'])
+    for mode, group in matched.groupby('mode'):
+        low = group[group['concurrency'] == group.groupby('input_len')['concurrency']
+                    .transform('min')]
+        points = low.groupby('input_len')[['kv_mb', 'extra_ms']].median()
+        if len(points) >= 2:
+            slope, intercept = np.polyfit(points['kv_mb'], points['extra_ms'], 1)
+        else:
+            slope, intercept = points['extra_ms'].iloc[0] / points['kv_mb'].iloc[0], 0.0
+        if slope <= 0:
+            slope, intercept = 0.0, float(points['extra_ms'].median())
+        fits[mode] = {
+            'overhead_ms': max(float(intercept), 0.0),
+            'gbps': 8 / slope if slope > 0 else math.inf,
+            'points': len(points),
+        }
+    return fits
+
+
+def attribute(table, fits):
+    """Split each run's TTFT into agg baseline, transfer, overhead and queueing."""
+    table = table.copy()
+    gbps = table['mode'].map({m: f['gbps'] for m, f in fits.items()})
+    overhead = table['mode'].map({m: f['overhead_ms'] for m, f in fits.items()})
+    table['overhead_ms'] = np.minimum(overhead, table['extra_ms'].clip(lower=0))
+    # The fitted line can overshoot a single run; it cannot explain more
+    # than that run's measured extra time
+    table['transfer_ms'] = np.minimum(table['kv_mb'] * 8 / gbps,
+                                      (table['extra_ms'] - table['overhead_ms']).clip(lower=0))
+    table['queue_ms'] = (table['extra_ms'] - table['transfer_ms']
+                         - table['overhead_ms']).clip(lower=0)
+    table['transfer_share'] = table['transfer_ms'] / table['ttft_ms']
+    return table
+
+
+def verdict(table, fits, link_gbps=None):
+    """One line per mode: is the link or the queueing the bottleneck?
+
+    The transfer share is judged at the lowest concurrency, where queueing
+    adds least. A KV rate that barely grows with concurrency means a stage is
+    saturated. If transfer dominates, the queueing is waiting on the link.
+    """
+    lines = []
+    for mode, fit in fits.items():
+        group = table[(table['mode'] == mode) & table['transfer_share'].notna()]
+        by_len = group.groupby('input_len')
+        low = group[group['concurrency'] == by_len['concurrency'].transform('min')]
+        high = group[group['concurrency'] == by_len['concurrency'].transform('max')]
+        growth = (high.groupby('input_len')['kv_gbps'].median()
+                  / low.groupby('input_len')['kv_gbps'].median())
+        share = low['transfer_share'].median()
+        bw = f"{fit['gbps']:.2f} Gbps" if math.isfinite(fit['gbps']) else "not visible"
+        line = (f"  {mode:<9} effective bandwidth {bw}, overhead {fit['overhead_ms']:.0f} ms, "
+                f"transfer share of TTFT {share:.0%} at low concurrency")
+        if link_gbps:
+            line += (f", peak KV rate {group['kv_gbps'].max() / link_gbps:.1%} "
+                     f"of the {link_gbps:g} Gbps link")
+        if share >= 0.5:
+            line += " -> transfer-bound"
+            if growth.min() < SATURATION_GROWTH:
+                line += (f" (KV rate flat at {high['kv_gbps'].median():.2f} Gbps as "
+                         f"concurrency grows: queueing is behind the transfer)")
+        else:
+            line += " -> queueing/overhead-bound"
+        lines.append(line)
+    return lines
+
+
+# ===== Reports =====
+
+def print_report(table, fits, link_gbps=None):
+    if table.empty:
+        print("No PD results found")
+        return
+    first = table.iloc[0]
+    print(f"KV per token: {first['kv_kb_per_token']:.1f} KiB ({first['kv_source']}, "
+          f"kv_cache_dtype={first['kv_cache_dtype']}, page_size={first['page_size']})")
+    cols = ['tag', 'backend', 'kv_mb', 'ttft_ms', 'agg_ttft_ms', 'extra_ms', 'min_gbps',
+            'kv_gbps', 'transfer_ms', 'queue_ms', 'transfer_share']
+    shown = table[cols].sort_values('tag').copy()
+    shown['transfer_share'] = (shown['transfer_share'] * 100).round(1)
+    print(shown.rename(columns={'transfer_share': 'transfer_%'})
+          .to_string(index=False, float_format=lambda v: f"{v:.2f}", na_rep='-'))
+    unmatched = table['agg_ttft_ms'].isna().sum()
+    if unmatched:
+        print(f"\n{unmatched} run(s) have no aggregated run with the same "
+              f"{'/'.join(MATCH_KEYS)}; only their KV size and rate are shown")
+    print("\nPer mode (fit over the lowest concurrency of each input length):")
+    for line in verdict(table, fits, link_gbps):
+        print(line)
+
+
+def plot_breakdown(table, out_path):
+    """Stacked TTFT bars: agg baseline, transfer, overhead, queueing."""
+    import matplotlib.pyplot as plt
+
+    data = table.dropna(subset=['agg_ttft_ms']).sort_values(['mode', 'input_len',
+                                                              'concurrency'])
+    if data.empty:
+        return None
+    parts = [('agg_ttft_ms', 'Aggregated TTFT', '#2E86AB'),
+             ('transfer_ms', 'KV transfer', '#F18F01'),
+             ('overhead_ms', 'Fixed overhead', '#A23B72'),
+             ('queue_ms', 'Queueing', '#999999')]
+    fig, ax = plt.subplots(figsize=(max(8, 0.5 * len(data)), 6))
+    x = np.arange(len(data))
+    bottom = np.zeros(len(data))
+    for col, label, color in parts:
+        values = data[col].fillna(0).clip(lower=0).to_numpy()
+        ax.bar(x, values, bottom=bottom, label=label, color=color)
+        bottom += values
+    ax.plot(x, data['ttft_ms'], 'k_', markersize=14, label='Measured PD TTFT')
+    ax.set_xticks(x)
+    ax.set_xticklabels(data['tag'], rotation=60, ha='right', fontsize=8)
+    ax.set_ylabel('TTFT (ms)')
+    ax.set_yscale('log')
+    ax.set_ylim(bottom=10)
+    ax.set_title('PD TTFT attribution: KV transfer vs queueing')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KV transfer cost and effective bandwidth per PD run")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--modes", default=",".join(PD_MODES))
+    parser.add_argument("--stat", choices=['median', 'mean'], default='median',
+                        help="TTFT statistic compared between PD and agg")
+    parser.add_argument("--link-gbps", type=float,
+                        help="Nominal link rate to compare the achieved KV rate against")
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    table = kv_table(results_dir, args.modes.split(","), args.stat)
+    if table.empty:
+        print("No PD results found")
+        return
+    fits = fit_transfer(table)
+    table = attribute(table, fits)
+    print_report(table, fits, args.link_gbps)
+
+    out_dir = results_dir / OUTPUT_SUBDIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(out_dir / "kv_transfer.csv", index=False)
+    print(f"\nSaved: {out_dir / 'kv_transfer.csv'}")
+    if args.plot:
+        path = plot_breakdown(table, out_dir / "kv_transfer.png")
+        if path:
+            print(f"Saved: {path}")
+
+
+if __name__ == "__main__":
+    main()
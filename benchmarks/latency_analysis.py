@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Latency distributions and SLO goodput from per-request traces.
+
+Averaging per-run means (or p99s) across runs says nothing about the tail,
+so everything here pools the per-request samples of every run in a group
+(see request_traces.py) and computes percentiles, CDFs and goodput over the
+pooled arrays with NumPy.
+
+Goodput counts only requests that meet both SLOs:
+    slo_attainment   fraction of requests with TTFT <= ttft_slo and
+                     TPOT <= tpot_slo
+    goodput_req_s    such requests per second of benchmark time
+    goodput_tok_s    their output tokens per second
+
+Runs without a trace fall back to their summary fields where one exists
+(median -> p50, p99 -> p99, p95 ITL -> p95) and get no goodput.
+
+Usage:
+    python3 benchmarks/latency_analysis.py                       # per mode
+    python3 benchmarks/latency_analysis.py --by config --modes pd_1pxd
+    python3 benchmarks/latency_analysis.py --ttft-slo 200 --tpot-slo 30 \\
+        --percentiles 50,90,99,99.9 --plot
+"""
+
+import argparse
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from request_traces import load_trace
+from results_store import KNOB_COLUMNS, MODES, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+PERCENTILES = [50, 90, 99, 99.9]
+FIELDS = ['ttft_ms', 'tpot_ms', 'itl_ms', 'e2e_ms']
+
+# Default SLOs (ms)
+TTFT_SLO_MS = 200.0
+TPOT_SLO_MS = 50.0
+
+# A config is everything that shapes the request population and the servers:
+# runs of different workloads, prefix sharing or server knobs are never pooled
+GROUPINGS = {
+    'mode': ['mode'],
+    'config': ['mode', 'num_prefills', 'num_decoders', 'input_len', 'output_len', 'concurrency',
+               'workload', 'prefix_ratio', 'prefix_len', 'num_prefixes'] + KNOB_COLUMNS,
+}
+
+# (field, percentile) -> bench_serving summary column, for runs without traces
+SUMMARY_FIELDS = {
+    ('ttft_ms', 50): 'median_ttft_ms',
+    ('ttft_ms', 99): 'p99_ttft_ms',
+    ('tpot_ms', 50): 'median_tpot_ms',
+    ('tpot_ms', 99): 'p99_tpot_ms',
+    ('itl_ms', 50): 'median_itl_ms',
+    ('itl_ms', 95): 'p95_itl_ms',
+    ('itl_ms', 99): 'p99_itl_ms',
+    ('e2e_ms', 50): 'median_e2e_latency_ms',
+    ('e2e_ms', 99): 'p99_e2e_latency_ms',
+}
+
+
+def percentile_column(field, q):
+    """Column name for a percentile, e.g. ('ttft_ms', 99.9) -> 'p99.9_ttft_ms'."""
+    return f"p{q:g}_{field}"
+
+
+def request_tpot_ms(trace):
+    """Per-request TPOT; NaN for requests with fewer than two output tokens."""
+    out = trace['output_len'].astype(np.float64)
+    decode_ms = trace['e2e_ms'].astype(np.float64) - trace['ttft_ms']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(out > 1, decode_ms / (out - 1), np.nan)
+
+
+def request_samples(trace, field):
+    """Samples of one field: per successful request, or every ITL sample."""
+    if field == 'itl_ms':
+        return np.asarray(trace['itl_ms'], dtype=np.float64)
+    values = request_tpot_ms(trace) if field == 'tpot_ms' else trace[field]
+    values = np.asarray(values, dtype=np.float64)[trace['success']]
+    return values[~np.isnan(values)]
+
+
+def pooled_samples(traces, field):
+    """Concatenate samples of `field` over several traces."""
+    parts = [request_samples(t, field) for t in traces]
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def cdf(values):
+    """Empirical CDF as (sorted values, cumulative probabilities)."""
+    x = np.sort(np.asarray(values, dtype=np.float64))
+    return x, np.arange(1, len(x) + 1) / max(len(x), 1)
+
+
+def slo_mask(trace, ttft_slo_ms, tpot_slo_ms):
+    """Boolean mask of requests meeting both SLOs.
+
+    A request with a single output token has no TPOT and only needs TTFT.
+    """
+    tpot = request_tpot_ms(trace)
+    return (trace['success']
+            & (trace['ttft_ms'] <= ttft_slo_ms)
+            & (np.isnan(tpot) | (tpot <= tpot_slo_ms)))
+
+
+def goodput(traces, durations, ttft_slo_ms, tpot_slo_ms):
+    """SLO attainment and goodput over runs executed one after another.
+
+    Args:
+        traces: Trace dicts from load_trace
+        durations: Benchmark duration (s) of each run
+    Returns:
+        dict with slo_attainment, goodput_req_s, goodput_tok_s
+    """
+    total = good = good_tokens = 0
+    for trace in traces:
+        mask = slo_mask(trace, ttft_slo_ms, tpot_slo_ms)
+        total += len(mask)
+        good += int(mask.sum())
+        good_tokens += int(trace['output_len'][mask].sum())
+    duration = float(np.sum(durations))
+    return {
+        'slo_attainment': good / total if total else np.nan,
+        'goodput_req_s': good / duration if duration else np.nan,
+        'goodput_tok_s': good_tokens / duration if duration else np.nan,
+    }
+
+
+def group_stats(runs, keys, percentiles=PERCENTILES, ttft_slo_ms=TTFT_SLO_MS,
+                tpot_slo_ms=TPOT_SLO_MS, results_dir=RESULTS_DIR):
+    """Percentiles and goodput per group of runs.
+
+    Args:
+        runs: DataFrame from results_store.load_table
+        keys: Columns to group by (see GROUPINGS)
+    Returns:
+        DataFrame with one row per group: keys, runs, traced_runs,
+        requests, output_throughput (median over runs), p<q>_<field> for
+        every field and percentile, and the goodput columns.
+    """
+    rows = []
+    # Missing keys (no workload, prefix or server_info) form their own group
+    for key, group in runs.groupby(keys, observed=True, sort=True, dropna=False):
+        key = key if isinstance(key, tuple) else (key,)
+        traces = [load_trace(tag, results_dir) for tag in group['tag']]
+        traced = [t for t in traces if t is not None]
+        row = dict(zip(keys, key))
+        row.update(runs=len(group), traced_runs=len(traced),
+                   output_throughput=group['output_throughput'].median())
+
+        if traced and len(traced) == len(group):
+            row['requests'] = int(sum(len(t['success']) for t in traced))
+            for field in FIELDS:
+                samples = pooled_samples(traced, field)
+                values = (np.percentile(samples, percentiles) if len(samples)
+                          else [np.nan] * len(percentiles))
+                for q, v in zip(percentiles, values):
+                    row[percentile_column(field, q)] = v
+            row.update(goodput(traced, group['duration'].to_numpy(), ttft_slo_ms, tpot_slo_ms))
+        else:
+            # Summary percentiles are only exact for a single run
+            row['requests'] = int(group['completed'].sum())
+            for field in FIELDS:
+                for q in percentiles:
+                    col = SUMMARY_FIELDS.get((field, q))
+                    exact = col is not None and len(group) == 1
+                    row[percentile_column(field, q)] = group[col].iloc[0] if exact else np.nan
+            row.update(slo_attainment=np.nan, goodput_req_s=np.nan, goodput_tok_s=np.nan)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def plot_cdfs(runs, keys, out_path, results_dir=RESULTS_DIR, ttft_slo_ms=None, tpot_slo_ms=None):
+    """Plot pooled TTFT / TPOT / ITL CDFs, one line per group with traces."""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5.5))
+    fig.suptitle('Latency CDFs (pooled per-request samples)', fontsize=14, fontweight='bold')
+    plotted = 0
+    varied = varied_keys(runs, keys)
+    for key, group in runs.groupby(keys, observed=True, sort=True, dropna=False):
+        key = key if isinstance(key, tuple) else (key,)
+        traces = [load_trace(tag, results_dir) for tag in group['tag']]
+        traces = [t for t in traces if t is not None]
+        if not traces:
+            continue
+        label = " ".join(str(v) for k, v in zip(keys, key) if k in varied)
+        for ax, field in zip(axes, ['ttft_ms', 'tpot_ms', 'itl_ms']):
+            x, y = cdf(pooled_samples(traces, field))
+            ax.plot(x, y, label=label, linewidth=1.8)
+        plotted += 1
+    if not plotted:
+        print("No traces found; run with --output-details or load_generator.py")
+        plt.close(fig)
+        return None
+
+    for ax, field, slo in zip(axes, ['ttft_ms', 'tpot_ms', 'itl_ms'],
+                              [ttft_slo_ms, tpot_slo_ms, None]):
+        if slo:
+            ax.axvline(slo, color='red', linestyle='--', linewidth=1.5, label='SLO')
+        ax.set_xscale('log')
+        ax.set_xlabel(f"{field.replace('_ms', '').upper()} (ms)")
+        ax.set_ylabel('Fraction of requests' if field != 'itl_ms' else 'Fraction of tokens')
+        ax.grid(alpha=0.3, linestyle='--')
+        ax.legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved CDF plot: {out_path}")
+    return out_path
+
+
+def varied_keys(table, keys):
+    """Keys that differ between rows (the first key if none does)."""
+    varied = [k for k in keys if table[k].nunique(dropna=False) > 1]
+    return varied or keys[:1]
+
+
+def format_table(stats, keys, percentiles):
+    """Render group_stats output as a fixed-width text table.
+
+    Key columns equal in every row are left out.
+    """
+    cols = varied_keys(stats, keys) + ['runs', 'traced_runs', 'output_throughput']
+    cols += [percentile_column('ttft_ms', q) for q in percentiles]
+    cols += [percentile_column('tpot_ms', q) for q in percentiles]
+    cols += ['slo_attainment', 'goodput_tok_s']
+    table = stats[cols].copy()
+    table['slo_attainment'] = table['slo_attainment'] * 100
+    table = table.rename(columns={'output_throughput': 'out_tok_s',
+                                  'slo_attainment': 'slo_%',
+                                  'traced_runs': 'traced'})
+    return table.to_string(index=False, float_format=lambda v: f"{v:.1f}", na_rep='-')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency distributions and SLO goodput")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--by", choices=sorted(GROUPINGS), default="mode")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help="Comma-separated modes to include")
+    parser.add_argument("--percentiles", default=",".join(f"{q:g}" for q in PERCENTILES))
+    parser.add_argument("--ttft-slo", type=float, default=TTFT_SLO_MS, help="TTFT SLO (ms)")
+    parser.add_argument("--tpot-slo", type=float, default=TPOT_SLO_MS, help="TPOT SLO (ms)")
+    parser.add_argument("--plot", action="store_true", help="Also write latency_cdfs.png")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    keys = GROUPINGS[args.by]
+    percentiles = [float(q) for q in args.percentiles.split(",")]
+    runs = load_table(results_dir=results_dir, modes=args.modes.split(","))
+    if runs.empty:
+        raise SystemExit(f"No results found in {results_dir}")
+
+    stats = group_stats(runs, keys, percentiles, args.ttft_slo, args.tpot_slo, results_dir)
+    print(f"SLO: TTFT <= {args.ttft_slo:g} ms, TPOT <= {args.tpot_slo:g} ms")
+    print(format_table(stats, keys, percentiles))
+    untraced = int((stats['traced_runs'] < stats['runs']).sum())
+    if untraced:
+        print(f"\n{untraced} group(s) without traces use summary fields "
+              f"(p50/p99 only, single runs only, no goodput)")
+
+    if args.plot:
+        plot_cdfs(runs, keys, results_dir / "latency_cdfs.png", results_dir,
+                  args.ttft_slo, args.tpot_slo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for SGLang servers and routers.
+
+Unlike `sglang.bench_serving --request-rate inf --max-concurrency C`, which
+is closed-loop, requests are sent on an arrival schedule that does not wait
+for earlier requests to finish, so queueing delay shows up in TTFT the way
+it does under production traffic.
+
+Arrival processes:
+    poisson    exponential inter-arrival times at --request-rate
+    gamma      gamma inter-arrival times; --burstiness < 1 is burstier
+    constant   fixed 1 / --request-rate spacing
+    trace      timestamps (and lengths) replayed from --trace (JSONL with
+               "timestamp", "input_len", "output_len" per line)
+    workload   timestamps and lengths streamed from --workload NAME
+               (results/workloads/<name>, see workloads.py); --speedup
+               replays it faster, --num-prompts caps it (default: all)
+
+Prompts are random token ids sent as input_ids, so input lengths are exact
+without a tokenizer. All requests share one pooled keep-alive connector.
+With --prefix-ratio R, a fraction R of the requests start with one of
+--num-prefixes shared prefixes of --prefix-len tokens (e.g. system prompts),
+which the server's radix cache can reuse. The record then carries
+prefix_hit_ratio, the share of prompt tokens that repeat an already sent
+prefix (the hit ratio an unbounded cache would reach), next to
+cache_hit_ratio, the share the server reported as cached_tokens. Requests
+are consumed lazily from the schedule, so a workload is read from disk as it
+is sent rather than loaded up front.
+
+Outputs:
+    <output-file>                   one bench_serving-compatible summary
+                                    line (read by results_store.py)
+    results/traces/<tag>/           per-request send time, TTFT, E2E and
+                                    every token arrival time (see
+                                    request_traces.py)
+
+Usage:
+    python3 benchmarks/load_generator.py --base-url http://127.0.0.1:8000 \\
+        --request-rate 8 --arrival poisson --num-prompts 200 \\
+        --random-input-len 512 --random-output-len 128 --tag pd_intra_rate8
+    python3 benchmarks/load_generator.py --arrival trace --trace trace.jsonl ...
+    python3 benchmarks/load_generator.py --workload chat --speedup 2 \
+        --tag agg_wl-chat
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import time
+
+import aiohttp
+import numpy as np
+
+import workloads
+from request_traces import from_request_results, write_trace
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+ARRIVALS = ["poisson", "gamma", "constant", "trace", "workload"]
+
+DEFAULT_NUM_PROMPTS = 200
+
+# Token ids drawn for random prompts (clear of special tokens)
+VOCAB_LOW, VOCAB_HIGH = 1000, 30000
+
+
+def request_lengths(num_prompts, input_len, output_len, range_ratio, rng):
+    """Per-request (input_len, output_len) like bench_serving's random dataset."""
+    inputs = rng.integers(max(1, int(input_len * range_ratio)), input_len + 1, num_prompts)
+    outputs = rng.integers(max(1, int(output_len * range_ratio)), output_len + 1, num_prompts)
+    return inputs, outputs
+
+
+def arrival_times(arrival, num_prompts, request_rate, burstiness, rng):
+    """Send offsets in seconds from the start of the run."""
+    if request_rate == float("inf"):
+        return np.zeros(num_prompts)
+    if arrival == "poisson":
+        gaps = rng.exponential(1.0 / request_rate, num_prompts)
+    elif arrival == "gamma":
+        gaps = rng.gamma(burstiness, 1.0 / (request_rate * burstiness), num_prompts)
+    elif arrival == "constant":
+        gaps = np.full(num_prompts, 1.0 / request_rate)
+    else:
+        raise ValueError(f"Unknown arrival process: {arrival}")
+    # First request goes out immediately
+    gaps[0] = 0.0
+    return np.cumsum(gaps)
+
+
+def read_arrival_trace(path, num_prompts=None):
+    """Read (timestamps, input_lens, output_lens) from a JSONL trace.
+
+    Timestamps are shifted so the first request is sent at t=0.
+    """
+    times, inputs, outputs = [], [], []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            times.append(float(rec["timestamp"]))
+            inputs.append(int(rec["input_len"]))
+            outputs.append(int(rec["output_len"]))
+            if num_prompts and len(times) >= num_prompts:
+                break
+    times = np.asarray(times)
+    return times - times.min(), np.asarray(inputs), np.asarray(outputs)
+
+
+def build_payload(backend, model, input_ids, output_len):
+    if backend == "sglang":
+        return "/generate", {
+            "input_ids": input_ids,
+            "sampling_params": {
+                "max_new_tokens": output_len,
+                "temperature": 0.0,
+                "ignore_eos": True,
+            },
+            "stream": True,
+        }
+    return "/v1/completions", {
+        "model": model,
+        "prompt": input_ids,
+        "max_tokens": output_len,
+        "temperature": 0.0,
+        "ignore_eos": True,
+        "stream": True,
+        "stream_options": {"include_usage": True, "continuous_usage_stats": True},
+    }
+
+
+def prefix_pool(num_prefixes, prefix_len, seed):
+    """Token ids of the shared prefixes, one row each."""
+    rng = np.random.default_rng(seed + 2)
+    return rng.integers(VOCAB_LOW, VOCAB_HIGH, (num_prefixes, prefix_len))
+
+
+def chunk_cached(backend, data):
+    """Cached prompt tokens reported in a streamed chunk, or None."""
+    if backend == "sglang":
+        return data.get("meta_info", {}).get("cached_tokens")
+    details = (data.get("usage") or {}).get("prompt_tokens_details") or {}
+    return details.get("cached_tokens")
+
+
+def chunk_tokens(backend, data, seen):
+    """Return the completion token count after a streamed chunk."""
+    if backend == "sglang":
+        return data.get("meta_info", {}).get("completion_tokens", seen + 1)
+    usage = data.get("usage")
+    if usage and usage.get("completion_tokens") is not None:
+        return usage["completion_tokens"]
+    choices = data.get("choices") or []
+    return seen + 1 if choices and choices[0].get("text") else seen
+
+
+async def send_request(session, url, backend, payload, t0, result):
+    """Send one streaming request and fill in its timestamps."""
+    result["send_time"] = time.perf_counter() - t0
+    token_times = []
+    try:
+        async with session.post(url, json=payload) as resp:
+            if resp.status != 200:
+                result["error"] = f"HTTP {resp.status}: {await resp.text()}"
+                return
+            async for line in resp.content:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                line = line[5:].strip()
+                if line == b"[DONE]":
+                    break
+                now = time.perf_counter() - t0
+                data = json.loads(line)
+                seen = chunk_tokens(backend, data, len(token_times))
+                cached = chunk_cached(backend, data)
+                if cached is not None:
+                    result["cached_tokens"] = cached
+                # Tokens coalesced into one chunk share its arrival time
+                token_times.extend([now] * (seen - len(token_times)))
+    except Exception as e:
+        result["error"] = repr(e)
+        return
+    finally:
+        result["token_times"] = token_times
+    if token_times:
+        result["first_token_time"] = token_times[0]
+        result["finish_time"] = token_times[-1]
+        result["output_len"] = len(token_times)
+        result["success"] = True
+    else:
+        result["error"] = "No tokens received"
+
+
+async def run_load(args, requests):
+    """Send each (offset, input_len, output_len) at its offset.
+
+    `requests` may be a lazy iterator; it is consumed as the schedule
+    advances. Returns per-request results.
+    """
+    rng = np.random.default_rng(args.seed + 1)
+    connector = aiohttp.TCPConnector(limit=args.max_connections, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    results = []
+    if args.prefix_ratio:
+        prefixes = prefix_pool(args.num_prefixes, args.prefix_len, args.seed)
+        prefix_rng = np.random.default_rng(args.seed + 3)
+        sent_prefixes = set()
+    semaphore = asyncio.Semaphore(args.max_concurrency) if args.max_concurrency else None
+
+    async def limited(*a):
+        async with semaphore:
+            await send_request(*a)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Finished tasks drop out so a long stream keeps only in-flight ones
+        tasks = set()
+        t0 = time.perf_counter()
+        for i, (offset, input_len, output_len) in enumerate(requests):
+            delay = offset - (time.perf_counter() - t0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Behind schedule: still let earlier sends start
+                await asyncio.sleep(0)
+            result = {"index": i, "input_len": int(input_len), "max_output_len": int(output_len),
+                      "scheduled_time": float(offset), "success": False, "output_len": 0}
+            results.append(result)
+            shared = []
+            if args.prefix_ratio and prefix_rng.random() < args.prefix_ratio:
+                k = int(prefix_rng.integers(args.num_prefixes))
+                # At least one token of every prompt is unique
+                shared = prefixes[k, :max(0, min(args.prefix_len, int(input_len) - 1))].tolist()
+                result["prefix"] = k
+                result["prefix_hit"] = len(shared) if k in sent_prefixes else 0
+                sent_prefixes.add(k)
+            input_ids = shared + rng.integers(VOCAB_LOW, VOCAB_HIGH,
+                                              int(input_len) - len(shared)).tolist()
+            path, payload = build_payload(args.backend, args.model, input_ids, int(output_len))
+            call = (session, args.base_url + path, args.backend, payload, t0, result)
+            task = asyncio.ensure_future(limited(*call) if semaphore else send_request(*call))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(results):
+    """bench_serving-style summary metrics from per-request results."""
+    ok = [r for r in results if r["success"]]
+    if not ok:
+        return {"completed": 0}
+    send = np.array([r["send_time"] for r in ok])
+    first = np.array([r["first_token_time"] for r in ok])
+    finish = np.array([r["finish_time"] for r in ok])
+    out_lens = np.array([r["output_len"] for r in ok])
+    in_lens = np.array([r["input_len"] for r in ok])
+
+    ttft = (first - send) * 1000
+    e2e = (finish - send) * 1000
+    multi = out_lens > 1
+    tpot = (finish - first)[multi] / (out_lens[multi] - 1) * 1000
+    itl = np.concatenate([np.diff(r["token_times"]) for r in ok]) * 1000
+
+    duration = finish.max() - min(r["send_time"] for r in results if "send_time" in r)
+    summary = {
+        "duration": float(duration),
+        "completed": len(ok),
+        "total_input_tokens": int(in_lens.sum()),
+        "total_output_tokens": int(out_lens.sum()),
+        "request_throughput": len(ok) / duration,
+        "input_throughput": in_lens.sum() / duration,
+        "output_throughput": out_lens.sum() / duration,
+        "total_throughput": (in_lens.sum() + out_lens.sum()) / duration,
+    }
+    for name, values in (("e2e_latency_ms", e2e), ("ttft_ms", ttft),
+                         ("tpot_ms", tpot), ("itl_ms", itl)):
+        if len(values) == 0:
+            continue
+        summary[f"mean_{name}"] = float(values.mean())
+        summary[f"median_{name}"] = float(np.median(values))
+        summary[f"std_{name}"] = float(values.std())
+        summary[f"p99_{name}"] = float(np.percentile(values, 99))
+    if len(itl):
+        summary["p95_itl_ms"] = float(np.percentile(itl, 95))
+    summary["prefix_hit_ratio"] = sum(r.get("prefix_hit", 0) for r in ok) / in_lens.sum()
+    if any("cached_tokens" in r for r in ok):
+        summary["total_cached_tokens"] = sum(r.get("cached_tokens", 0) for r in ok)
+        summary["cache_hit_ratio"] = summary["total_cached_tokens"] / in_lens.sum()
+    # Average number of requests in flight, as bench_serving reports it
+    summary["concurrency"] = float(e2e.sum() / 1000 / duration)
+    return summary
+
+
+async def fetch_server_info(base_url):
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            async with session.get(base_url + "/get_server_info") as resp:
+                if resp.status == 200:
+                    return await resp.json()
+    except Exception as e:
+        print(f"Warning: could not fetch server info: {e}")
+    return None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Open-loop load generator")
+    parser.add_argument("--base-url", default="http://127.0.0.1:30000")
+    parser.add_argument("--backend", default="sglang", choices=["sglang", "openai"])
+    parser.add_argument("--model", default="Qwen/Qwen2.5-3B-Instruct")
+    parser.add_argument("--num-prompts", type=int, default=None,
+                        help=f"Requests to send (default: {DEFAULT_NUM_PROMPTS}, "
+                             "or the whole --workload)")
+    parser.add_argument("--random-input-len", type=int, default=512)
+    parser.add_argument("--random-output-len", type=int, default=128)
+    parser.add_argument("--random-range-ratio", type=float, default=1.0,
+                        help="Lengths drawn from [len * ratio, len] (1.0 = fixed)")
+    parser.add_argument("--request-rate", type=float, default=float("inf"),
+                        help="Requests per second (inf sends everything at once)")
+    parser.add_argument("--arrival", default="poisson", choices=ARRIVALS)
+    parser.add_argument("--burstiness", type=float, default=1.0,
+                        help="Gamma shape for --arrival gamma (1.0 = Poisson)")
+    parser.add_argument("--trace", help="JSONL trace for --arrival trace")
+    parser.add_argument("--workload", help="Workload name (implies --arrival workload)")
+    parser.add_argument("--workload-start", type=int, default=0,
+                        help="Index of the first workload request to send")
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="Replay workload arrivals this many times faster")
+    parser.add_argument("--prefix-ratio", type=float, default=None,
+                        help="Fraction of requests starting with a shared prefix "
+                             "(0 = no sharing, but recorded as a shared-prefix baseline)")
+    parser.add_argument("--prefix-len", type=int, default=1024,
+                        help="Shared prefix length in tokens (capped below input_len)")
+    parser.add_argument("--num-prefixes", type=int, default=1,
+                        help="Distinct shared prefixes, chosen uniformly")
+    parser.add_argument("--max-concurrency", type=int, default=None,
+                        help="Optional cap on in-flight requests (closed-loop)")
+    parser.add_argument("--max-connections", type=int, default=0,
+                        help="Connection pool size (0 = unlimited)")
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tag", default="open_loop")
+    parser.add_argument("--output-file", default=None,
+                        help="Summary JSONL (default: results/<tag>.jsonl)")
+    parser.add_argument("--pd-separated", action="store_true",
+                        help="Accepted for bench_serving compatibility")
+    return parser
+
+
+def run(args):
+    """Run one benchmark; write its summary line and trace.
+
+    Returns (record, per-request results, trace arrays).
+    """
+    rng = np.random.default_rng(args.seed)
+    output_file = pathlib.Path(args.output_file or RESULTS_DIR / f"{args.tag}.jsonl")
+    workload = {}
+    if args.workload:
+        args.arrival = "workload"
+        meta, records = workloads.open_workload(args.workload, output_file.parent)
+        count = min(args.num_prompts or len(records), len(records) - args.workload_start)
+        requests = workloads.stream(records, args.workload_start, count, args.speedup)
+        workload = {"workload": args.workload, "workload_hash": meta["hash"],
+                    "workload_start": args.workload_start, "speedup": args.speedup}
+    else:
+        if args.arrival == "workload":
+            raise ValueError("--arrival workload requires --workload")
+        num_prompts = args.num_prompts or DEFAULT_NUM_PROMPTS
+        if args.arrival == "trace":
+            if not args.trace:
+                raise ValueError("--arrival trace requires --trace")
+            offsets, inputs, outputs = read_arrival_trace(args.trace, num_prompts)
+        else:
+            inputs, outputs = request_lengths(num_prompts, args.random_input_len,
+                                              args.random_output_len, args.random_range_ratio, rng)
+            offsets = arrival_times(args.arrival, num_prompts, args.request_rate,
+                                    args.burstiness, rng)
+        count = len(offsets)
+        requests = zip(offsets, inputs, outputs)
+        if args.prefix_ratio is not None:
+            workload = {"workload": "shared-prefix"}
+
+    pacing = (f"workload {args.workload}, speedup={args.speedup}" if args.workload
+              else f"{args.arrival}, rate={args.request_rate}")
+    print(f"Sending {count} requests to {args.base_url} ({pacing}, tag={args.tag})")
+
+    # Wall clock of the run start, to align traces with server metrics
+    start_time = time.time()
+    results = asyncio.run(run_load(args, requests))
+    summary = summarize(results)
+    failed = len(results) - summary["completed"]
+    if args.workload:
+        # Mean lengths stand in for the fixed ones of random runs
+        args.random_input_len = round(np.mean([r["input_len"] for r in results]))
+        args.random_output_len = round(np.mean([r["max_output_len"] for r in results]))
+
+    record = {
+        "tag": args.tag,
+        "backend": args.backend,
+        "dataset_name": args.arrival if args.arrival in ("trace", "workload") else "random",
+        **workload,
+        "load_generator": "open_loop",
+        "arrival": args.arrival,
+        "request_rate": args.request_rate,
+        "burstiness": args.burstiness,
+        "start_time": start_time,
+        "max_concurrency": args.max_concurrency,
+        "num_prompts": len(results),
+        "random_input_len": args.random_input_len,
+        "random_output_len": args.random_output_len,
+        "random_range_ratio": args.random_range_ratio,
+        "prefix_ratio": args.prefix_ratio,
+        "prefix_len": args.prefix_len if args.prefix_ratio is not None else 0,
+        "num_prefixes": args.num_prefixes if args.prefix_ratio is not None else 0,
+        **summary,
+        "trace": f"traces/{args.tag}",
+        "server_info": asyncio.run(fetch_server_info(args.base_url)),
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with output_file.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    trace = from_request_results(results)
+    trace_path = write_trace(args.tag, trace, output_file.parent, source="load_generator")
+
+    print(f"Completed {summary['completed']}/{len(results)} requests ({failed} failed)")
+    if summary["completed"]:
+        print(f"  Output throughput: {summary['output_throughput']:.1f} tok/s")
+        print(f"  Mean TTFT: {summary['mean_ttft_ms']:.1f} ms, "
+              f"P99 TTFT: {summary['p99_ttft_ms']:.1f} ms")
+        print(f"  Mean TPOT: {summary.get('mean_tpot_ms', 0):.2f} ms")
+        if args.prefix_ratio is not None:
+            print(f"  Prefix hit ratio: {summary['prefix_hit_ratio']:.1%} offered, "
+                  f"{summary.get('cache_hit_ratio', float('nan')):.1%} cached by the server")
+    print(f"Summary:  {output_file}")
+    print(f"Trace:    {trace_path}")
+    return record, results, trace
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.arrival == "trace" and not args.trace:
+        parser.error("--arrival trace requires --trace")
+    if args.arrival == "workload" and not args.workload:
+        parser.error("--arrival workload requires --workload")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
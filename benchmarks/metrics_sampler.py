@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Server-side metrics time series captured alongside a benchmark.
+
+Client summaries only say that 1P8D delivers less than 8x one decoder, not
+why. This scrapes the Prometheus /metrics endpoints of the prefill server,
+every decoder and the router at a fixed interval while a benchmark runs, so
+the plots can show whether decoders sat idle waiting for KV (prefill queue
+saturated) or the prefill idled while decoders were full:
+
+    results/metrics/<tag>/
+        meta.json      tag, targets, interval, series names, command window
+        t.npy          float64 [samples]            wall-clock epoch seconds
+        values.npy     float32 [samples, series]    NaN where a scrape failed
+
+Series are named <role>/<metric>, e.g. prefill/sglang:num_queue_reqs or
+decode3/sglang:num_running_reqs. Label sets are summed, except the router's
+per-worker label, which is kept in the name.
+
+Servers only expose /metrics with --enable-metrics (scripts/00_common.sh
+adds it through METRICS_ARGS; the stand-in server supports it too). The
+sgl-router serves its metrics on a separate Prometheus port (29000).
+
+`record` samples until SIGINT/SIGTERM. A caller running its client in
+another process passes --ready-file and starts the client once that file
+exists (the first scrape is in), so the signal cannot arrive before
+sampling started.
+
+Usage:
+    python3 benchmarks/metrics_sampler.py run --tag pd_1p8d_n100_in512_out128_c64 \\
+        --target prefill=http://172.16.40.79:30000 \\
+        --target decode0=http://127.0.0.1:30000 --target router=http://127.0.0.1:29000 \\
+        -- python3 -m sglang.bench_serving ...
+    python3 benchmarks/metrics_sampler.py record --tag idle --target agg=http://127.0.0.1:30000
+    python3 benchmarks/metrics_sampler.py record --tag t --target ... --ready-file /tmp/t.ready
+    python3 benchmarks/metrics_sampler.py show <tag>
+    python3 benchmarks/metrics_sampler.py plot <tag>
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import re
+import signal
+import sys
+import time
+
+import aiohttp
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+METRICS_DIRNAME = "metrics"
+
+DEFAULT_INTERVAL_S = 0.5
+# Metric families kept from each scrape
+PREFIXES = ("sglang:", "sgl_router")
+# Labels that stay part of the series name instead of being summed over
+KEPT_LABELS = ("worker",)
+
+SAMPLE_RE = re.compile(r'^(?P<name>[A-Za-z_:][\w:]*)(?:\{(?P<labels>.*)\})?\s+(?P<value>\S+)')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def log(msg):
+    print(f"[metrics_sampler] {msg}", file=sys.stderr, flush=True)
+
+
+def metrics_dir(tag, results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / METRICS_DIRNAME / tag
+
+
+# ===== Scraping =====
+
+def parse_metrics(text, prefixes=PREFIXES):
+    """Prometheus text exposition -> {series name: value}.
+
+    Histogram buckets are dropped (their _sum and _count are kept).
+    """
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name = match.group("name")
+        if not name.startswith(prefixes) or name.endswith(("_bucket", "_created")):
+            continue
+        try:
+            value = float(match.group("value"))
+        except ValueError:
+            continue
+        labels = dict(LABEL_RE.findall(match.group("labels") or ""))
+        kept = [f'{k}="{labels[k]}"' for k in KEPT_LABELS if k in labels]
+        key = name + ("{" + ",".join(kept) + "}" if kept else "")
+        values[key] = values.get(key, 0.0) + value
+    return values
+
+
+def metrics_url(url):
+    """Base URL (http://host:port) or full /metrics URL."""
+    url = url.rstrip("/")
+    return url if url.endswith("/metrics") else url + "/metrics"
+
+
+def parse_target(text):
+    """role=url."""
+    role, sep, url = text.partition("=")
+    if not sep or not role or not url:
+        raise argparse.ArgumentTypeError(f"expected role=url, got {text!r}")
+    return role, metrics_url(url)
+
+
+async def scrape(session, url):
+    """Parsed metrics of one endpoint, or None if it did not answer."""
+    try:
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                return None
+            return parse_metrics(await resp.text())
+    except (aiohttp.ClientError, OSError, asyncio.TimeoutError):
+        return None
+
+
+async def sample(targets, interval, stop, times=None, rows=None, ready=None):
+    """Scrape every target each `interval` seconds until `stop` is set.
+
+    Samples are appended to `times`/`rows` as they are taken, so a caller
+    can keep them if the loop is interrupted. `ready` is called after the
+    first scrape.
+
+    Returns (epoch times, [{series: value}] rows).
+    """
+    times = [] if times is None else times
+    rows = [] if rows is None else rows
+    failing = set()
+    timeout = aiohttp.ClientTimeout(total=max(interval, 1.0))
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        next_at = time.monotonic()
+        while not stop.is_set():
+            now = time.time()
+            scraped = await asyncio.gather(*(scrape(session, url) for url in targets.values()))
+            row = {}
+            for role, values in zip(targets, scraped):
+                if values is None:
+                    if role not in failing:
+                        log(f"{role}: no metrics from {targets[role]}")
+                        failing.add(role)
+                    continue
+                failing.discard(role)
+                row.update({f"{role}/{name}": v for name, v in values.items()})
+            times.append(now)
+            rows.append(row)
+            if ready and len(rows) == 1:
+                ready()
+            # A slow scrape shifts the schedule instead of bunching samples
+            next_at = max(next_at + interval, time.monotonic())
+            try:
+                await asyncio.wait_for(stop.wait(), next_at - time.monotonic())
+            except asyncio.TimeoutError:
+                pass
+    return times, rows
+
+
+# ===== Storage =====
+
+def write_series(tag, times, rows, meta, results_dir=RESULTS_DIR):
+    """Write sampled rows as a time series, replacing any previous one."""
+    series = sorted({name for row in rows for name in row})
+    column = {name: i for i, name in enumerate(series)}
+    values = np.full((len(rows), len(series)), np.nan, dtype=np.float32)
+    for i, row in enumerate(rows):
+        for name, value in row.items():
+            values[i, column[name]] = value
+
+    out = metrics_dir(tag, results_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for name, array in (("t", np.asarray(times, dtype=np.float64)), ("values", values)):
+        tmp_path = out / f".{name}.tmp.npy"
+        np.save(tmp_path, array)
+        os.replace(tmp_path, out / f"{name}.npy")
+    meta = {"tag": tag, "num_samples": len(rows), **meta, "series": series}
+    (out / "meta.json").write_text(json.dumps(meta, indent=2) + "\n")
+    return out
+
+
+def load_series(tag, results_dir=RESULTS_DIR):
+    """(meta, DataFrame indexed by epoch seconds), or None if not sampled."""
+    import pandas as pd
+
+    path = metrics_dir(tag, results_dir)
+    if not (path / "meta.json").exists():
+        return None
+    meta = json.loads((path / "meta.json").read_text())
+    frame = pd.DataFrame(np.load(path / "values.npy"), index=np.load(path / "t.npy"),
+                         columns=meta["series"])
+    return meta, frame
+
+
+def list_series(results_dir=RESULTS_DIR):
+    root = pathlib.Path(results_dir) / METRICS_DIRNAME
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if (p / "meta.json").exists())
+
+
+def columns(frame, metric, roles=None):
+    """Columns of `metric` (name without the sglang: prefix), by role."""
+    found = {}
+    for name in frame.columns:
+        role, _, full = name.partition("/")
+        if full.split("{")[0] in (metric, f"sglang:{metric}"):
+            if roles is None or role.startswith(roles):
+                found[name] = role
+    return found
+
+
+def counter_rate(frame, name):
+    """Per-second rate of a counter column (resets count from zero)."""
+    series = frame[name].astype(np.float64)
+    delta = series.diff()
+    delta[delta < 0] = series[delta < 0]
+    return delta / np.diff(frame.index.to_numpy(), prepend=np.nan)
+
+
+# ===== Recording =====
+
+def _stop_on_signals(loop, handler):
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, handler, sig)
+
+
+async def run_command(targets, interval, cmd):
+    """Sample while `cmd` runs. Returns (times, rows, meta, exit code)."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    start = time.time()
+    proc = await asyncio.create_subprocess_exec(*cmd)
+    # Ctrl-C goes to the benchmark; sampling ends when it exits
+    _stop_on_signals(loop, lambda sig: proc.returncode is None and proc.send_signal(sig))
+    sampler = asyncio.ensure_future(sample(targets, interval, stop))
+    returncode = await proc.wait()
+    end = time.time()
+    stop.set()
+    times, rows = await sampler
+    meta = {"command": cmd, "returncode": returncode, "command_start": start,
+            "command_end": end}
+    return times, rows, meta, returncode
+
+
+async def record(targets, interval, duration, times, rows, ready_file=None):
+    """Sample into `times`/`rows` for `duration` seconds (None: until
+    SIGINT/SIGTERM).
+
+    `ready_file` is created once signals are handled and the first scrape
+    is in, so a caller can start its client without losing the start.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    _stop_on_signals(loop, lambda sig: stop.set())
+    if duration:
+        loop.call_later(duration, stop.set)
+    ready = (lambda: pathlib.Path(ready_file).touch()) if ready_file else None
+    await sample(targets, interval, stop, times, rows, ready)
+
+
+# ===== Client alignment =====
+
+def client_record(tag, results_dir=RESULTS_DIR):
+    """Raw summary record of the run tagged `tag`, or None."""
+    from results_store import load_table
+
+    table = load_table(results_dir=results_dir, warmup=True)
+    rows = table[table['tag'] == tag]
+    if rows.empty:
+        return None
+    row = rows.iloc[-1]
+    with (pathlib.Path(results_dir) / row['file']).open() as f:
+        for lineno, line in enumerate(f):
+            if lineno == row['line']:
+                return json.loads(line)
+    return None
+
+
+def client_throughput(tag, meta, edges, results_dir=RESULTS_DIR):
+    """Client output tok/s between consecutive epoch `edges`.
+
+    Uses token arrival times from the trace of load_generator runs; for
+    bench_serving runs, the run's mean throughput over its duration, ending
+    when the command exited. Returns (rates, source) or (None, None).
+    """
+    from request_traces import load_trace
+
+    rec = client_record(tag, results_dir)
+    if rec is None:
+        return None, None
+    trace = load_trace(tag, results_dir)
+    if trace is not None and "token_s" in trace and rec.get("start_time"):
+        counts, _ = np.histogram(rec["start_time"] + np.asarray(trace["token_s"]), edges)
+        return counts / np.diff(edges), "token arrivals"
+    if rec.get("output_throughput") and rec.get("duration") and meta.get("command_end"):
+        end = meta["command_end"]
+        start = end - rec["duration"]
+        centers = (edges[:-1] + edges[1:]) / 2
+        rates = np.where((centers >= start) & (centers <= end), rec["output_throughput"], 0.0)
+        return rates, "run mean"
+    return None, None
+
+
+# ===== Analysis =====
+
+def diagnose(frame):
+    """One-line reading of a PD run: which side was the bottleneck.
+
+    Returns None without both prefill and decode series.
+    """
+    busy = frame.dropna(how="all")
+    queue = columns(busy, "num_queue_reqs", roles="prefill")
+    running = columns(busy, "num_running_reqs", roles="decode")
+    transfer = columns(busy, "num_decode_transfer_queue_reqs", roles="decode")
+    if busy.empty or not queue or not running:
+        return None
+    prefill_queued = (busy[list(queue)].sum(axis=1) > 0).mean()
+    per_decoder = busy[list(running)].mean()
+    spread = per_decoder.min() / per_decoder.max() if per_decoder.max() > 0 else 1.0
+    waiting_kv = busy[list(transfer)].sum(axis=1).mean() if transfer else 0.0
+    text = (f"prefill queue non-empty {prefill_queued:.0%} of the time; "
+            f"running reqs per decoder {per_decoder.mean():.1f} "
+            f"(min/max {spread:.2f}); {waiting_kv:.1f} reqs waiting for KV")
+    if prefill_queued > 0.5:
+        return text + " -> prefill saturated, decoders starved"
+    if spread < 0.5:
+        return text + " -> uneven decoder load"
+    return text + " -> decode-bound"
+
+
+def print_show(tag, meta, frame):
+    duration = frame.index[-1] - frame.index[0] if len(frame) > 1 else 0.0
+    print(f"{tag}: {meta['num_samples']} samples every {meta['interval']}s over "
+          f"{duration:.1f}s, {len(frame.columns)} series")
+    for role, url in meta["targets"].items():
+        print(f"  {role:<10} {url}")
+    if "returncode" in meta:
+        print(f"  command exited with {meta['returncode']}")
+    print(f"\n{'series':<64} {'mean':>10} {'max':>10} {'missing':>8}")
+    for name in frame.columns:
+        values = frame[name]
+        print(f"{name:<64} {values.mean():>10.2f} {values.max():>10.2f} "
+              f"{values.isna().mean():>7.0%}")
+    print(f"\n{diagnose(frame) or 'Not a PD run: no prefill/decode bottleneck reading'}")
+
+
+def plot_series(tag, meta, frame, results_dir=RESULTS_DIR):
+    """Server gauges per role stacked over the client throughput."""
+    import matplotlib.pyplot as plt
+
+    t0 = meta.get("command_start") or frame.index[0]
+    x = frame.index.to_numpy() - t0
+    fig, axes = plt.subplots(4, 1, figsize=(12, 12), sharex=True)
+    fig.suptitle(f"Server metrics: {tag}", fontsize=13, fontweight="bold")
+
+    # Throughput: client tokens received vs tokens generated by the servers,
+    # both over the interval ending at each sample
+    ax = axes[0]
+    rates, source = client_throughput(tag, meta, frame.index.to_numpy(), results_dir)
+    if rates is not None:
+        ax.step(x[1:], rates, where="pre", color="black", linewidth=2,
+                label=f"client ({source})")
+    generated = columns(frame, "generation_tokens_total")
+    for name, role in generated.items():
+        if not role.startswith("prefill"):
+            ax.step(x, counter_rate(frame, name), where="pre", label=f"{role} generated",
+                    alpha=0.8)
+    if not generated:
+        for name, role in columns(frame, "gen_throughput").items():
+            ax.plot(x, frame[name], label=f"{role} gen_throughput", alpha=0.8)
+    ax.set_ylabel("Output tok/s")
+    ax.set_title("Client vs server throughput")
+
+    panels = [
+        (axes[1], "num_running_reqs", "Running requests", "Batch size per server"),
+        (axes[2], "num_queue_reqs", "Queued requests",
+         "Waiting for prefill (prefill) / admission (decode)"),
+        (axes[3], "token_usage", "KV usage", "KV cache usage"),
+    ]
+    for ax, metric, ylabel, title in panels:
+        for name, role in columns(frame, metric).items():
+            ax.plot(x, frame[name], label=role)
+        if metric == "num_queue_reqs":
+            for name, role in columns(frame, "num_decode_transfer_queue_reqs",
+                                      roles="decode").items():
+                ax.plot(x, frame[name], linestyle="--", label=f"{role} waiting for KV")
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+
+    for ax in axes:
+        ax.grid(alpha=0.3, linestyle="--")
+        if ax.get_legend_handles_labels()[0]:
+            ax.legend(fontsize=8, ncol=4, loc="upper right")
+    axes[-1].set_xlabel("Seconds since benchmark start")
+    reading = diagnose(frame)
+    if reading:
+        fig.text(0.5, 0.005, reading, ha="center", fontsize=9)
+
+    plt.tight_layout(rect=[0, 0.02, 1, 0.97])
+    out_path = pathlib.Path(results_dir) / f"metrics_{tag}.png"
+    plt.savefig(out_path, dpi=150, bbox_inches="tight", facecolor="white")
+    print(f"Saved: {out_path}")
+    plt.close(fig)
+    return out_path
+
+
+# ===== CLI =====
+
+def save(tag, times, rows, meta, results_dir):
+    if not rows:
+        log("no samples taken")
+        return None
+    out = write_series(tag, times, rows, meta, results_dir)
+    log(f"{len(rows)} samples -> {out}")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample server /metrics during a benchmark")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_sampling(p):
+        p.add_argument("--tag", required=True, help="Run tag the series belongs to")
+        p.add_argument("--target", action="append", type=parse_target, required=True,
+                       metavar="ROLE=URL", help="e.g. prefill=http://127.0.0.1:30000")
+        p.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_S)
+
+    p_run = sub.add_parser("run", help="Sample while a command runs (after --)")
+    add_sampling(p_run)
+    p_run.add_argument("cmd", nargs=argparse.REMAINDER)
+
+    p_record = sub.add_parser("record", help="Sample until interrupted")
+    add_sampling(p_record)
+    p_record.add_argument("--duration", type=float, help="Seconds (default: until Ctrl-C)")
+    p_record.add_argument("--ready-file", help="Create this file once the first scrape is in")
+
+    sub.add_parser("list", help="List sampled runs")
+    p_show = sub.add_parser("show", help="Per-series summary and bottleneck reading")
+    p_show.add_argument("tag")
+    p_plot = sub.add_parser("plot", help="Plot a run's series against client throughput")
+    p_plot.add_argument("tag")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    if args.command in ("run", "record"):
+        targets = dict(args.target)
+        meta = {"targets": targets, "interval": args.interval}
+        if args.command == "run":
+            cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+            if not cmd:
+                parser.error("run needs a command after --")
+            times, rows, extra, returncode = asyncio.run(run_command(targets, args.interval, cmd))
+            save(args.tag, times, rows, {**meta, **extra}, results_dir)
+            sys.exit(returncode)
+        times, rows = [], []
+        start = time.time()
+        try:
+            asyncio.run(record(targets, args.interval, args.duration, times, rows,
+                               args.ready_file))
+        except KeyboardInterrupt:
+            # Interrupted before the signal handlers were installed
+            log("interrupted; keeping the samples taken so far")
+        save(args.tag, times, rows, {**meta, "command_start": start,
+                                     "command_end": time.time()}, results_dir)
+        return
+
+    if args.command == "list":
+        for tag in list_series(results_dir):
+            print(tag)
+        return
+    loaded = load_series(args.tag, results_dir)
+    if loaded is None:
+        raise SystemExit(f"No metrics for {args.tag} in {results_dir / METRICS_DIRNAME}")
+    meta, frame = loaded
+    if args.command == "show":
+        print_show(args.tag, meta, frame)
+    else:
+        plot_series(args.tag, meta, frame, results_dir)
+
+
+if __name__ == "__main__":
+    main()
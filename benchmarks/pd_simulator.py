@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Discrete-event simulator for xPyD prefill/decode layouts.
+
+Calibrated from existing result files (no traces needed), then used to
+project layouts we have not measured (1P16D, 1P32D, 2P16D, ...) and to show
+when the prefill server becomes the bottleneck.
+
+Model (all times in ms):
+    prefill     FCFS per prefill server, a + b * input_len per request
+    KV transfer k * input_len after prefill, no link contention
+    decode      continuous batching per decoder; one step emits one token
+                for every running request and takes
+                c0 + c1 * batch + c2 * (context tokens in batch / 1000)
+    router      picks prefill and decoder per request: round_robin, random,
+                least_loaded (fewest outstanding requests) or power_of_two
+
+The client is closed-loop like bench_serving with --request-rate inf and
+--max-concurrency C: C requests in flight, a new one as soon as one ends.
+
+Calibration (default: GH200 -> A100 runs, modes pd_inter + pd_1pxd):
+    prefill   lower envelope of 1 / request_throughput per input length
+              (the highest rate seen), fitted linearly in the mean input
+              tokens per request (lengths are random in [ratio * len, len])
+    decode    mean TPOT against the per-decoder batch size from Little's
+              law (request_throughput * decode time / decoders) and context
+    KV        mean TTFT left over after simulating the lowest-concurrency
+              runs without KV transfer, per input token (median over runs,
+              so one badly modeled workload does not dominate)
+
+Usage:
+    python3 benchmarks/pd_simulator.py calibrate
+    python3 benchmarks/pd_simulator.py validate
+    python3 benchmarks/pd_simulator.py project --layouts 1p1d,1p8d,1p16d,1p32d,2p16d,2p32d \\
+        --policies round_robin,least_loaded --input-len 512 --output-len 128 \\
+        --concurrency-per-decoder 16
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import pathlib
+import re
+
+import numpy as np
+import pandas as pd
+
+from results_store import load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SIM_DIRNAME = "simulator"
+
+CALIBRATION_MODES = ['pd_inter', 'pd_1pxd']
+POLICIES = ['round_robin', 'random', 'least_loaded', 'power_of_two']
+DEFAULT_LAYOUTS = ['1p1d', '1p2d', '1p4d', '1p8d', '1p16d', '1p32d', '2p16d', '2p32d', '4p32d']
+
+# Per-decoder cap on running requests (sglang --max-running-requests)
+MAX_RUNNING = 256
+
+# A resource above this utilization is reported as the bottleneck
+BOTTLENECK_UTIL = 0.8
+
+LAYOUT = re.compile(r"(\d+)p(\d+)d$")
+
+
+def parse_layout(layout):
+    """'2p16d' -> (2, 16)."""
+    m = LAYOUT.match(layout.lower())
+    if not m:
+        raise ValueError(f"Bad layout {layout!r}, expected e.g. 1p16d")
+    return int(m.group(1)), int(m.group(2))
+
+
+# ===== Simulation =====
+
+def simulate(model, num_prefills, num_decoders, input_len, output_len, concurrency,
+             num_prompts, policy='round_robin', range_ratio=1.0, seed=0,
+             max_running=MAX_RUNNING):
+    """Simulate one closed-loop benchmark run.
+
+    Args:
+        model: Calibration dict (see calibrate)
+        range_ratio: Request lengths are drawn from [len * ratio, len] like
+            bench_serving's --random-range-ratio (1.0 = fixed lengths)
+    Returns:
+        dict with output_throughput, request_throughput, mean/p99 TTFT,
+        mean TPOT, mean E2E, prefill_util, decode_util
+    """
+    rng = np.random.default_rng(seed)
+    in_lens = rng.integers(max(int(input_len * range_ratio), 1), input_len + 1, num_prompts)
+    out_lens = rng.integers(max(int(output_len * range_ratio), 1), output_len + 1, num_prompts)
+    prefill_ms = model['prefill_base_ms'] + model['prefill_ms_per_token'] * in_lens
+    kv_ms = model['kv_base_ms'] + model['kv_ms_per_token'] * in_lens
+
+    events = []
+    counter = itertools.count()
+
+    def push(t, kind, data):
+        heapq.heappush(events, (t, next(counter), kind, data))
+
+    prefill_queue = [[] for _ in range(num_prefills)]
+    prefill_busy = [False] * num_prefills
+    prefill_time = 0.0
+    outstanding = [0] * num_decoders       # requests assigned to each decoder
+    pending = [[] for _ in range(num_decoders)]
+    running = [[] for _ in range(num_decoders)]
+    stepping = [False] * num_decoders
+    decode_time = 0.0
+    rr = itertools.count()
+
+    arrival, first, finish = {}, {}, {}
+    generated = {}
+    assigned = {}
+    issued = 0
+
+    def pick(loads):
+        n = len(loads)
+        if n == 1:
+            return 0
+        if policy == 'round_robin':
+            return next(rr) % n
+        if policy == 'random':
+            return int(rng.integers(n))
+        if policy == 'least_loaded':
+            return int(np.argmin(loads))
+        a, b = rng.choice(n, 2, replace=False)
+        return int(a if loads[a] <= loads[b] else b)
+
+    def start_prefill(p, t):
+        nonlocal prefill_time
+        if prefill_busy[p] or not prefill_queue[p]:
+            return
+        rid = prefill_queue[p].pop(0)
+        prefill_busy[p] = True
+        prefill_time += prefill_ms[rid]
+        push(t + prefill_ms[rid], 'prefill_done', (p, rid))
+
+    def start_step(d, t):
+        nonlocal decode_time
+        if stepping[d]:
+            return
+        while pending[d] and len(running[d]) < max_running:
+            running[d].append(pending[d].pop(0))
+        if not running[d]:
+            return
+        batch = len(running[d])
+        context = sum(int(in_lens[r]) + generated[r] for r in running[d])
+        step = (model['decode_base_ms'] + model['decode_ms_per_seq'] * batch
+                + model['decode_ms_per_ktok'] * context / 1000)
+        stepping[d] = True
+        decode_time += step
+        push(t + step, 'step_done', (d, list(running[d])))
+
+    def issue(t):
+        nonlocal issued
+        rid = issued
+        issued += 1
+        arrival[rid] = t
+        d = pick(outstanding)
+        assigned[rid] = d
+        outstanding[d] += 1
+        p = pick([len(q) + busy for q, busy in zip(prefill_queue, prefill_busy)]) \
+            if policy != 'round_robin' else rid % num_prefills
+        prefill_queue[p].append(rid)
+        start_prefill(p, t)
+
+    def complete(rid, t):
+        finish[rid] = t
+        outstanding[assigned[rid]] -= 1
+        if issued < num_prompts:
+            issue(t)
+
+    for _ in range(min(concurrency, num_prompts)):
+        issue(0.0)
+
+    while events:
+        t, _, kind, data = heapq.heappop(events)
+        if kind == 'prefill_done':
+            p, rid = data
+            prefill_busy[p] = False
+            start_prefill(p, t)
+            push(t + kv_ms[rid], 'kv_done', rid)
+        elif kind == 'kv_done':
+            rid = data
+            # Prefill produced the first token; it reaches the client with the KV
+            first[rid] = t
+            generated[rid] = 1
+            if out_lens[rid] <= 1:
+                complete(rid, t)
+                continue
+            d = assigned[rid]
+            pending[d].append(rid)
+            start_step(d, t)
+        else:
+            d, batch = data
+            stepping[d] = False
+            for rid in batch:
+                generated[rid] += 1
+                if generated[rid] >= out_lens[rid]:
+                    running[d].remove(rid)
+                    complete(rid, t)
+            start_step(d, t)
+
+    makespan = max(finish.values())
+    rids = sorted(finish)
+    ttft = np.array([first[r] - arrival[r] for r in rids])
+    e2e = np.array([finish[r] - arrival[r] for r in rids])
+    outs = out_lens[rids]
+    multi = outs > 1
+    tpot = (e2e - ttft)[multi] / (outs[multi] - 1)
+    return {
+        'output_throughput': outs.sum() / makespan * 1000,
+        'request_throughput': len(rids) / makespan * 1000,
+        'mean_ttft_ms': float(ttft.mean()),
+        'p99_ttft_ms': float(np.percentile(ttft, 99)),
+        'mean_tpot_ms': float(tpot.mean()) if len(tpot) else 0.0,
+        'mean_e2e_latency_ms': float(e2e.mean()),
+        'prefill_util': prefill_time / (makespan * num_prefills),
+        'decode_util': decode_time / (makespan * num_decoders),
+    }
+
+
+def bottleneck(sim):
+    if sim['prefill_util'] >= BOTTLENECK_UTIL:
+        return 'prefill'
+    if sim['decode_util'] >= BOTTLENECK_UTIL:
+        return 'decode'
+    return 'client'
+
+
+# ===== Calibration =====
+
+def nonneg_lstsq(X, y):
+    """Least squares with coefficients clipped at zero by dropping columns."""
+    active = list(range(X.shape[1]))
+    coef = np.zeros(X.shape[1])
+    while active:
+        sol, *_ = np.linalg.lstsq(X[:, active], y, rcond=None)
+        if (sol >= 0).all():
+            coef[active] = sol
+            break
+        active = [a for a, s in zip(active, sol) if s > 0]
+    return coef
+
+
+def with_lengths(runs):
+    """Add mean_input_len, mean_output_len and the implied range_ratio.
+
+    bench_serving's random dataset draws lengths from [len * ratio, len]
+    (ratio 0 by default), so the nominal lengths overstate the real ones.
+    """
+    runs = runs.copy()
+    runs['mean_input_len'] = runs['total_input_tokens'] / runs['completed']
+    runs['mean_output_len'] = runs['total_output_tokens'] / runs['completed']
+    runs['range_ratio'] = (2 * runs['mean_input_len'] / runs['input_len'] - 1).clip(0, 1)
+    return runs
+
+
+def calibration_runs(results_dir=RESULTS_DIR, modes=CALIBRATION_MODES):
+    runs = load_table(results_dir=results_dir, modes=modes)
+    runs = runs.dropna(subset=['request_throughput', 'mean_ttft_ms', 'mean_tpot_ms',
+                               'mean_e2e_latency_ms', 'total_input_tokens', 'completed'])
+    return with_lengths(runs[runs['completed'] > 0])
+
+
+def fit_prefill(runs):
+    best = runs.loc[runs.groupby('input_len')['request_throughput'].idxmax()]
+    tokens = best['mean_input_len'].to_numpy(dtype=np.float64)
+    ms = 1000 / best['request_throughput'].to_numpy()
+    if len(tokens) == 1:
+        return 0.0, float(ms[0] / tokens[0])
+    base, per_token = nonneg_lstsq(np.column_stack([np.ones_like(tokens), tokens]), ms)
+    return float(base), float(per_token)
+
+
+def fit_decode(runs):
+    decode_s = (runs['mean_e2e_latency_ms'] - runs['mean_ttft_ms']) / 1000
+    batch = (runs['request_throughput'] * decode_s / runs['num_decoders']).clip(lower=1)
+    context = batch * (runs['mean_input_len'] + runs['mean_output_len'] / 2) / 1000
+    X = np.column_stack([np.ones(len(runs)), batch, context])
+    return [float(c) for c in nonneg_lstsq(X, runs['mean_tpot_ms'].to_numpy())]
+
+
+def calibrate(runs):
+    """Fit the simulator model to summary results. Returns the model dict."""
+    if runs.empty:
+        raise ValueError("No calibration runs")
+    model = {'kv_base_ms': 0.0, 'kv_ms_per_token': 0.0}
+    model['prefill_base_ms'], model['prefill_ms_per_token'] = fit_prefill(runs)
+    (model['decode_base_ms'], model['decode_ms_per_seq'],
+     model['decode_ms_per_ktok']) = fit_decode(runs)
+
+    # Whatever TTFT the queueing model does not explain is attributed to KV
+    # transfer; only the lowest-concurrency runs per input length are used,
+    # where queueing (which the model may get wrong) matters least
+    low = runs[runs['concurrency'] == runs.groupby('input_len')['concurrency'].transform('min')]
+    residual = []
+    for row in low.to_dict('records'):
+        sim = simulate_run(model, row)
+        residual.append(row['mean_ttft_ms'] - sim['mean_ttft_ms'])
+    per_token = np.array(residual) / low['mean_input_len'].to_numpy(dtype=np.float64)
+    model['kv_ms_per_token'] = max(float(np.median(per_token)), 0.0)
+    model['calibration_runs'] = int(len(runs))
+    return model
+
+
+def simulate_run(model, row, policy='round_robin'):
+    """Simulate the layout and workload of a measured result row."""
+    return simulate(model, int(row['num_prefills']), int(row['num_decoders']),
+                    int(row['input_len']), int(row['output_len']), int(row['concurrency']),
+                    int(row['num_prompts']), policy, row.get('range_ratio', 1.0))
+
+
+def model_path(results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / SIM_DIRNAME / "calibration.json"
+
+
+def load_model(results_dir=RESULTS_DIR, modes=CALIBRATION_MODES):
+    """Saved calibration if present, else calibrate from the result files."""
+    path = model_path(results_dir)
+    if path.exists():
+        return json.loads(path.read_text())
+    return calibrate(calibration_runs(results_dir, modes))
+
+
+# ===== Projection =====
+
+def project(model, layouts, policies, workloads, concurrency_per_decoder=None):
+    """Simulate every layout x policy x workload.
+
+    Args:
+        workloads: dicts with input_len, output_len, concurrency, num_prompts
+        concurrency_per_decoder: If set, concurrency = this * decoders and
+            num_prompts is raised to at least 4x the concurrency
+    Returns:
+        DataFrame, one row per simulation, with efficiency against
+        decoders x the simulated 1P1D throughput of the same workload/policy
+    """
+    rows = []
+    for wl in workloads:
+        for policy in policies:
+            base = None
+            for layout in ['1p1d'] + [l for l in layouts if l != '1p1d']:
+                p, d = parse_layout(layout)
+                concurrency, prompts = wl['concurrency'], wl['num_prompts']
+                if concurrency_per_decoder:
+                    concurrency = concurrency_per_decoder * d
+                    prompts = max(prompts, 4 * concurrency)
+                sim = simulate(model, p, d, wl['input_len'], wl['output_len'],
+                               concurrency, prompts, policy, wl.get('range_ratio', 1.0))
+                if layout == '1p1d':
+                    base = sim['output_throughput']
+                    if '1p1d' not in layouts:
+                        continue
+                rows.append({'layout': layout, 'num_prefills': p, 'num_decoders': d,
+                             'policy': policy, 'input_len': wl['input_len'],
+                             'output_len': wl['output_len'], 'concurrency': concurrency,
+                             'num_prompts': prompts, **sim,
+                             'efficiency': sim['output_throughput'] / (base * d) * 100,
+                             'bottleneck': bottleneck(sim)})
+    return pd.DataFrame(rows)
+
+
+def measured_workloads(runs):
+    """Distinct (input_len, output_len, concurrency, num_prompts) of measured runs."""
+    cols = ['input_len', 'output_len', 'concurrency', 'num_prompts']
+    runs = with_lengths(runs)
+    workloads = runs.groupby(cols, as_index=False)['range_ratio'].median()
+    return [{**{c: int(row[c]) for c in cols}, 'range_ratio': float(row['range_ratio'])}
+            for row in workloads.to_dict('records')]
+
+
+def scaling_projection(results_dir=RESULTS_DIR, decoder_counts=(1, 2, 4, 8, 16, 32),
+                       num_prefills=(1, 2), policy='round_robin'):
+    """Projected 1PxD/2PxD metrics averaged over the measured 1PxD workloads.
+
+    Used by plot_1pxd_scaling.py to overlay projections on the measured bars.
+    Returns {num_prefills: DataFrame indexed by num_decoders} or None.
+    """
+    runs = load_table(results_dir=results_dir, modes=['pd_1pxd'])
+    if runs.empty:
+        return None
+    model = load_model(results_dir)
+    layouts = [f"{p}p{d}d" for p in num_prefills for d in decoder_counts]
+    proj = project(model, layouts, [policy], measured_workloads(runs))
+    metrics = ['output_throughput', 'mean_ttft_ms', 'mean_tpot_ms', 'mean_e2e_latency_ms',
+               'efficiency']
+    return {p: group.groupby('num_decoders')[metrics].mean()
+            for p, group in proj.groupby('num_prefills')}
+
+
+# ===== Reports =====
+
+def print_model(model):
+    print(f"Calibrated from {model.get('calibration_runs', '?')} run(s):")
+    print(f"  prefill   {model['prefill_base_ms']:.2f} + {model['prefill_ms_per_token']:.4f} "
+          f"ms/token  (~{1000 / model['prefill_ms_per_token']:.0f} tok/s per prefill server)"
+          if model['prefill_ms_per_token'] else
+          f"  prefill   {model['prefill_base_ms']:.2f} ms/request")
+    print(f"  KV        {model['kv_base_ms']:.2f} + {model['kv_ms_per_token']:.4f} ms/token")
+    print(f"  decode    {model['decode_base_ms']:.2f} + {model['decode_ms_per_seq']:.4f} ms/seq "
+          f"+ {model['decode_ms_per_ktok']:.4f} ms/kilotoken of context per step")
+
+
+def validation_table(model, runs):
+    rows = []
+    for row in runs.to_dict('records'):
+        sim = simulate_run(model, row)
+        rows.append({
+            'tag': row['tag'],
+            'tput': row['output_throughput'], 'sim_tput': sim['output_throughput'],
+            'ttft': row['mean_ttft_ms'], 'sim_ttft': sim['mean_ttft_ms'],
+            'tpot': row['mean_tpot_ms'], 'sim_tpot': sim['mean_tpot_ms'],
+        })
+    table = pd.DataFrame(rows)
+    for col in ['tput', 'ttft', 'tpot']:
+        table[f'{col}_err_%'] = (table[f'sim_{col}'] / table[col] - 1) * 100
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="xPyD discrete-event simulator")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--modes", default=",".join(CALIBRATION_MODES),
+                        help="Modes whose runs calibrate the model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("calibrate", help="Fit and save the model")
+    sub.add_parser("validate", help="Simulated vs measured for every calibration run")
+
+    p_proj = sub.add_parser("project", help="Project unmeasured layouts")
+    p_proj.add_argument("--layouts", default=",".join(DEFAULT_LAYOUTS))
+    p_proj.add_argument("--policies", default="round_robin")
+    p_proj.add_argument("--input-len", type=int, help="Default: measured 1PxD workloads")
+    p_proj.add_argument("--output-len", type=int, default=128)
+    p_proj.add_argument("--concurrency", type=int, default=128)
+    p_proj.add_argument("--num-prompts", type=int, default=200)
+    p_proj.add_argument("--range-ratio", type=float, default=0.0,
+                        help="bench_serving --random-range-ratio (0 = its default)")
+    p_proj.add_argument("--concurrency-per-decoder", type=int,
+                        help="Scale the client with the number of decoders")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    modes = args.modes.split(",")
+    runs = calibration_runs(results_dir, modes)
+
+    if args.command == "calibrate":
+        model = calibrate(runs)
+        path = model_path(results_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(model, indent=2) + "\n")
+        print_model(model)
+        print(f"\nSaved: {path}")
+        return
+
+    model = load_model(results_dir, modes)
+    if args.command == "validate":
+        print_model(model)
+        table = validation_table(model, runs)
+        print()
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+        for col in ['tput', 'ttft', 'tpot']:
+            print(f"Median |error| {col}: {table[f'{col}_err_%'].abs().median():.1f}%")
+        return
+
+    if args.input_len:
+        workloads = [{'input_len': args.input_len, 'output_len': args.output_len,
+                      'concurrency': args.concurrency, 'num_prompts': args.num_prompts,
+                      'range_ratio': args.range_ratio}]
+    else:
+        workloads = measured_workloads(load_table(results_dir=results_dir, modes=['pd_1pxd']))
+    proj = project(model, args.layouts.split(","), args.policies.split(","), workloads,
+                   args.concurrency_per_decoder)
+    cols = ['layout', 'policy', 'input_len', 'output_len', 'concurrency', 'output_throughput',
+            'mean_ttft_ms', 'p99_ttft_ms', 'mean_tpot_ms', 'efficiency', 'prefill_util',
+            'decode_util', 'bottleneck']
+    print_model(model)
+    print()
+    print(proj[cols].to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    path = results_dir / SIM_DIRNAME / "projections.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    proj.to_csv(path, index=False)
+    print(f"\nSaved: {path}")
+
+
+if __name__ == "__main__":
+    main()
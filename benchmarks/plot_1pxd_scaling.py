@@ -1,92 +1,126 @@
 #!/usr/bin/env python3
 """
-Plot 1PxD Scaling Analysis: Performance vs Number of Decoders
+Plot xPyD Scaling Analysis: Performance vs Number of Prefills and Decoders
 
 Analyzes how throughput, latency, and efficiency scale as we add
-more decode servers (1P1D → 1P2D → 1P4D → 1P8D).
+more decode servers (1P1D → 1P2D → 1P4D → 1P8D) and, with several prefill
+counts (2P4D, 2P8D, ...), which P:D ratio gets the most out of each GPU.
+
+Repeated trials of a point are reduced to their median; error bars span the
+trial min/max and '*' marks a CV above results_store.CV_THRESHOLD.
+
+Layouts are compared per input/output length mix on the best point of each
+layout (highest median throughput over concurrency levels). Throughput is
+normalized by GPU cost: prefill GPUs weigh --prefill-gpu-cost and decode
+GPUs --decode-gpu-cost (both 1 by default, i.e. tok/s per GPU); set them
+to relative prices when the prefill and decode GPUs differ (GH200 vs A100).
+
+Usage:
+    python3 benchmarks/plot_1pxd_scaling.py
+    python3 benchmarks/plot_1pxd_scaling.py --prefill-gpu-cost 1.6 --decode-gpu-cost 1
 """
 
-import json
-import glob
-import os
-import re
+import argparse
 from pathlib import Path
 from collections import defaultdict
-import matplotlib.pyplot as plt
 import numpy as np
 
+from latency_analysis import GROUPINGS, TPOT_SLO_MS, TTFT_SLO_MS, group_stats
+from results_store import CV_THRESHOLD, aggregate_trials, load_table
+
 # Results directory
 RESULTS_DIR = Path(__file__).parent / "results"
 OUTPUT_DIR = RESULTS_DIR
 
-def load_benchmark_results(pattern="pd_*1p*d_*.jsonl"):
-    """Load all 1PxD benchmark results."""
-    results = []
+# Relative cost of one prefill / decode GPU (1 and 1: throughput per GPU)
+PREFILL_GPU_COST = 1.0
+DECODE_GPU_COST = 1.0
+
+# Input/output mixes drawn by plot_layout_surfaces (most layouts first)
+MAX_SURFACE_MIXES = 4
+
+
+def layout_label(num_prefills, num_decoders):
+    return f"{num_prefills}P{num_decoders}D"
+
+
+def load_runs(pattern="pd_*p*d_*.jsonl"):
+    """Load all xPyD runs as a results_store table."""
+    return load_table(pattern, results_dir=RESULTS_DIR, modes=['pd_1pxd'])
+
+
+def load_benchmark_results(pattern="pd_*p*d_*.jsonl", df=None):
+    """Load all xPyD benchmark results."""
+    if df is None:
+        df = load_runs(pattern)
     
-    for filepath in glob.glob(str(RESULTS_DIR / pattern)):
-        try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-                
-            # Extract configuration from tag
-            tag = data.get('tag', os.path.basename(filepath))
-            
-            # Parse tag: pd_inter_1pXd_nN_inI_outO_cC or pd_1pXd_...
-            match = re.match(
-                r'pd_(?:inter_)?1p(\d+)d_n(\d+)_in(\d+)_out(\d+)_c(\d+)',
-                tag
-            )
-            
-            if match:
-                num_decoders = int(match.group(1))
-                num_prompts = int(match.group(2))
-                input_len = int(match.group(3))
-                output_len = int(match.group(4))
-                concurrency = int(match.group(5))
-            else:
-                # Try simpler pattern
-                match = re.search(r'1p(\d+)d', tag)
-                if match:
-                    num_decoders = int(match.group(1))
-                else:
-                    continue
-                num_prompts = data.get('num_prompts', 0)
-                input_len = data.get('random_input_len', 0)
-                output_len = data.get('random_output_len', 0)
-                concurrency = data.get('max_concurrency', 0)
-            
-            results.append({
-                'file': filepath,
-                'tag': tag,
-                'num_decoders': num_decoders,
-                'num_prompts': num_prompts,
-                'input_len': input_len,
-                'output_len': output_len,
-                'concurrency': concurrency,
-                'throughput': data.get('output_throughput', 0),
-                'total_throughput': data.get('total_throughput', 0),
-                'mean_ttft': data.get('mean_ttft_ms', 0),
-                'mean_e2e': data.get('mean_e2e_latency_ms', 0),
-                'p99_e2e': data.get('p99_e2e_latency_ms', 0),
-                'mean_tpot': data.get('mean_tpot_ms', 0),
-                'mean_itl': data.get('mean_itl_ms', 0),
-            })
-            
-        except Exception as e:
-            print(f"Warning: Could not parse {filepath}: {e}")
-            continue
+    results = []
+    for row in df.to_dict('records'):
+        results.append({
+            'file': str(RESULTS_DIR / row['file']),
+            'tag': row['tag'],
+            'point': row['point'],
+            'server_config': row['server_config'],
+            'num_prefills': row['num_prefills'],
+            'num_decoders': row['num_decoders'],
+            'num_prompts': row['num_prompts'],
+            'input_len': row['input_len'],
+            'output_len': row['output_len'],
+            'concurrency': row['concurrency'],
+            'throughput': row['output_throughput'],
+            'total_throughput': row['total_throughput'],
+            'mean_ttft': row['mean_ttft_ms'],
+            'mean_e2e': row['mean_e2e_latency_ms'],
+            'p99_e2e': row['p99_e2e_latency_ms'],
+            'mean_tpot': row['mean_tpot_ms'],
+            'mean_itl': row['mean_itl_ms'],
+        })
     
     return results
 
 
-def plot_scaling_by_decoders(results, config_filter=None):
+def trial_medians(runs, key):
+    """Median over the trials of each point, averaged over points.
+
+    Returns:
+        (median, low, high, cv): low/high average the trial min/max and cv is
+        the largest coefficient of variation of any point
+    """
+    by_point = defaultdict(list)
+    for r in runs:
+        by_point[r['point']].append(r[key])
+    values = [np.asarray(v, dtype=float) for v in by_point.values()]
+    cvs = [v.std(ddof=1) / v.mean() for v in values if len(v) > 1 and v.mean() > 0]
+    return (np.mean([np.median(v) for v in values]), np.mean([v.min() for v in values]),
+            np.mean([v.max() for v in values]), max(cvs, default=np.nan))
+
+
+def error_bars(stats):
+    """Asymmetric error bars from trial_medians() results."""
+    return np.array([[m - lo for m, lo, _, _ in stats], [hi - m for m, _, hi, _ in stats]])
+
+
+def plot_projection(ax, projections, pos, column):
+    """Overlay simulated xPyD curves (see pd_simulator.scaling_projection)."""
+    for (p, proj), style in zip(sorted(projections.items()), ['k:', 'm-.', 'c:']):
+        counts = [d for d in proj.index if d in pos]
+        ax.plot([pos[d] for d in counts], proj.loc[counts, column], style, marker='x',
+                linewidth=1.5, label=f'Simulated {p}PxD')
+
+
+def plot_scaling_by_decoders(results, config_filter=None, projections=None):
     """
     Plot scaling curves: performance metrics vs number of decoders.
     
     Args:
         results: List of benchmark results
-        config_filter: Optional dict to filter by config (e.g., {'input_len': 1024})
+        config_filter: Optional dict to filter by config (e.g., {'input_len': 1024});
+            without 'num_prefills', the smallest prefill count measured is used
+        projections: Optional {num_prefills: DataFrame by num_decoders} from
+            pd_simulator.scaling_projection, drawn as lines over the bars
     """
+    import matplotlib.pyplot as plt
+    
     # Filter results if needed
     if config_filter:
         results = [r for r in results if all(
@@ -97,6 +131,10 @@ def plot_scaling_by_decoders(results, config_filter=None):
         print("No matching results found")
         return
     
+    # Decoder scaling is read at one prefill count
+    num_prefills = min(r['num_prefills'] for r in results)
+    results = [r for r in results if r['num_prefills'] == num_prefills]
+    
     # Group by number of decoders
     by_decoders = defaultdict(list)
     for r in results:
@@ -109,27 +147,29 @@ def plot_scaling_by_decoders(results, config_filter=None):
         print("Need at least 2 different decoder counts for scaling analysis")
         return
     
-    # Aggregate metrics (mean across configs)
-    throughputs = []
-    ttfts = []
-    e2es = []
-    tpots = []
-    
-    for d in decoder_counts:
-        runs = by_decoders[d]
-        throughputs.append(np.mean([r['throughput'] for r in runs]))
-        ttfts.append(np.mean([r['mean_ttft'] for r in runs]))
-        e2es.append(np.mean([r['mean_e2e'] for r in runs]))
-        tpots.append(np.mean([r['mean_tpot'] for r in runs]))
+    # Aggregate metrics (median over trials, mean across configs)
+    stats = {key: [trial_medians(by_decoders[d], key) for d in decoder_counts]
+             for key in ['throughput', 'mean_ttft', 'mean_e2e', 'mean_tpot']}
+    throughputs, ttfts, e2es, tpots = (
+        [s[0] for s in stats[key]] for key in ['throughput', 'mean_ttft', 'mean_e2e', 'mean_tpot'])
+    noisy = ['*' if s[3] > CV_THRESHOLD else '' for s in stats['throughput']]
     
     # Calculate scaling efficiency
-    base_throughput = throughputs[0]  # 1P1D baseline
+    base_throughput = throughputs[0]  # smallest layout (1P1D) baseline
+    base_label = layout_label(num_prefills, decoder_counts[0])
     ideal_scaling = [base_throughput * d / decoder_counts[0] for d in decoder_counts]
     efficiency = [t / i * 100 if i > 0 else 0 for t, i in zip(throughputs, ideal_scaling)]
     
+    # Bars sit at evenly spaced positions so projected 16/32-decoder layouts fit
+    projections = projections or {}
+    all_counts = sorted(set(decoder_counts).union(*(proj.index for proj in projections.values())))
+    pos = {d: i for i, d in enumerate(all_counts)}
+    xs = [pos[d] for d in decoder_counts]
+    
     # Create figure
     fig, axes = plt.subplots(2, 3, figsize=(16, 10))
-    fig.suptitle('1PxD Scaling Analysis: GH200 (Prefill) → A100 x[1-8] (Decode)\n'
+    fig.suptitle(f'{num_prefills}PxD Scaling Analysis: GH200 x{num_prefills} (Prefill) → '
+                 f'A100 x[{decoder_counts[0]}-{decoder_counts[-1]}] (Decode)\n'
                  f'Model: Qwen2.5-3B | Transfer: NIXL',
                  fontsize=14, fontweight='bold', y=0.98)
     
@@ -137,86 +177,105 @@ def plot_scaling_by_decoders(results, config_filter=None):
     
     # 1. Throughput vs Decoders
     ax1 = axes[0, 0]
-    ax1.bar(decoder_counts, throughputs, color='#3498db', edgecolor='black', linewidth=1.2)
-    ax1.plot(decoder_counts, ideal_scaling, 'r--', linewidth=2, marker='o', 
+    ax1.bar(xs, throughputs, color='#3498db', edgecolor='black', linewidth=1.2,
+            yerr=error_bars(stats['throughput']), capsize=4)
+    ax1.plot(xs, ideal_scaling, 'r--', linewidth=2, marker='o', 
              label='Ideal Linear Scaling', markersize=8)
     ax1.set_xlabel('Number of Decode GPUs', fontsize=11)
     ax1.set_ylabel('Output Throughput (tok/s)', fontsize=11)
     ax1.set_title('Throughput Scaling', fontsize=12, fontweight='bold')
-    ax1.set_xticks(decoder_counts)
+    ax1.set_xticks(range(len(all_counts)), all_counts)
+    plot_projection(ax1, projections, pos, 'output_throughput')
     ax1.legend(loc='upper left')
     ax1.grid(axis='y', alpha=0.3, linestyle='--')
-    for i, (d, t) in enumerate(zip(decoder_counts, throughputs)):
-        ax1.annotate(f'{t:.0f}', xy=(d, t), ha='center', va='bottom', 
+    for d, t, flag in zip(decoder_counts, throughputs, noisy):
+        ax1.annotate(f'{t:.0f}{flag}', xy=(pos[d], t), ha='center', va='bottom', 
                      fontsize=10, fontweight='bold')
     
     # 2. Scaling Efficiency
     ax2 = axes[0, 1]
-    bars = ax2.bar(decoder_counts, efficiency, color='#2ecc71', edgecolor='black', linewidth=1.2)
+    bars = ax2.bar(xs, efficiency, color='#2ecc71', edgecolor='black', linewidth=1.2)
     ax2.axhline(y=100, color='r', linestyle='--', linewidth=2, label='100% Efficiency')
     ax2.set_xlabel('Number of Decode GPUs', fontsize=11)
     ax2.set_ylabel('Scaling Efficiency (%)', fontsize=11)
     ax2.set_title('Scaling Efficiency vs Ideal', fontsize=12, fontweight='bold')
-    ax2.set_xticks(decoder_counts)
+    ax2.set_xticks(range(len(all_counts)), all_counts)
     ax2.set_ylim(0, 120)
+    plot_projection(ax2, projections, pos, 'efficiency')
     ax2.legend()
     ax2.grid(axis='y', alpha=0.3, linestyle='--')
     for d, e in zip(decoder_counts, efficiency):
-        ax2.annotate(f'{e:.1f}%', xy=(d, e), ha='center', va='bottom', 
+        ax2.annotate(f'{e:.1f}%', xy=(pos[d], e), ha='center', va='bottom', 
                      fontsize=10, fontweight='bold')
     
     # 3. TTFT vs Decoders
     ax3 = axes[0, 2]
-    ax3.bar(decoder_counts, ttfts, color='#e74c3c', edgecolor='black', linewidth=1.2)
+    ax3.bar(xs, ttfts, color='#e74c3c', edgecolor='black', linewidth=1.2,
+            yerr=error_bars(stats['mean_ttft']), capsize=4)
     ax3.set_xlabel('Number of Decode GPUs', fontsize=11)
     ax3.set_ylabel('Mean TTFT (ms)', fontsize=11)
     ax3.set_title('Time To First Token', fontsize=12, fontweight='bold')
-    ax3.set_xticks(decoder_counts)
+    ax3.set_xticks(range(len(all_counts)), all_counts)
     ax3.grid(axis='y', alpha=0.3, linestyle='--')
+    if projections:
+        plot_projection(ax3, projections, pos, 'mean_ttft_ms')
+        ax3.legend()
     for d, t in zip(decoder_counts, ttfts):
-        ax3.annotate(f'{t:.0f}', xy=(d, t), ha='center', va='bottom', 
+        ax3.annotate(f'{t:.0f}', xy=(pos[d], t), ha='center', va='bottom', 
                      fontsize=10, fontweight='bold')
     
     # 4. E2E Latency vs Decoders
     ax4 = axes[1, 0]
-    ax4.bar(decoder_counts, e2es, color='#9b59b6', edgecolor='black', linewidth=1.2)
+    ax4.bar(xs, e2es, color='#9b59b6', edgecolor='black', linewidth=1.2,
+            yerr=error_bars(stats['mean_e2e']), capsize=4)
     ax4.set_xlabel('Number of Decode GPUs', fontsize=11)
     ax4.set_ylabel('Mean E2E Latency (ms)', fontsize=11)
     ax4.set_title('End-to-End Latency', fontsize=12, fontweight='bold')
-    ax4.set_xticks(decoder_counts)
+    ax4.set_xticks(range(len(all_counts)), all_counts)
     ax4.grid(axis='y', alpha=0.3, linestyle='--')
+    if projections:
+        plot_projection(ax4, projections, pos, 'mean_e2e_latency_ms')
+        ax4.legend()
     for d, e in zip(decoder_counts, e2es):
-        ax4.annotate(f'{e:.0f}', xy=(d, e), ha='center', va='bottom', 
+        ax4.annotate(f'{e:.0f}', xy=(pos[d], e), ha='center', va='bottom', 
                      fontsize=10, fontweight='bold')
     
     # 5. Time Per Output Token vs Decoders
     ax5 = axes[1, 1]
-    ax5.bar(decoder_counts, tpots, color='#f39c12', edgecolor='black', linewidth=1.2)
+    ax5.bar(xs, tpots, color='#f39c12', edgecolor='black', linewidth=1.2,
+            yerr=error_bars(stats['mean_tpot']), capsize=4)
     ax5.set_xlabel('Number of Decode GPUs', fontsize=11)
     ax5.set_ylabel('Mean TPOT (ms)', fontsize=11)
     ax5.set_title('Time Per Output Token', fontsize=12, fontweight='bold')
-    ax5.set_xticks(decoder_counts)
+    ax5.set_xticks(range(len(all_counts)), all_counts)
     ax5.grid(axis='y', alpha=0.3, linestyle='--')
+    if projections:
+        plot_projection(ax5, projections, pos, 'mean_tpot_ms')
+        ax5.legend()
     for d, t in zip(decoder_counts, tpots):
-        ax5.annotate(f'{t:.2f}', xy=(d, t), ha='center', va='bottom', 
+        ax5.annotate(f'{t:.2f}', xy=(pos[d], t), ha='center', va='bottom', 
                      fontsize=10, fontweight='bold')
     
     # 6. Throughput per GPU (efficiency metric)
     throughput_per_gpu = [t / d for t, d in zip(throughputs, decoder_counts)]
     ax6 = axes[1, 2]
-    ax6.bar(decoder_counts, throughput_per_gpu, color='#1abc9c', edgecolor='black', linewidth=1.2)
+    ax6.bar(xs, throughput_per_gpu, color='#1abc9c', edgecolor='black', linewidth=1.2)
     ax6.axhline(y=throughputs[0], color='r', linestyle='--', linewidth=2, 
-                label=f'1P1D baseline ({throughputs[0]:.0f})')
+                label=f'{base_label} baseline ({throughputs[0]:.0f})')
     ax6.set_xlabel('Number of Decode GPUs', fontsize=11)
     ax6.set_ylabel('Throughput per GPU (tok/s)', fontsize=11)
     ax6.set_title('Per-GPU Efficiency', fontsize=12, fontweight='bold')
-    ax6.set_xticks(decoder_counts)
+    ax6.set_xticks(range(len(all_counts)), all_counts)
     ax6.legend()
     ax6.grid(axis='y', alpha=0.3, linestyle='--')
     for d, t in zip(decoder_counts, throughput_per_gpu):
-        ax6.annotate(f'{t:.0f}', xy=(d, t), ha='center', va='bottom', 
+        ax6.annotate(f'{t:.0f}', xy=(pos[d], t), ha='center', va='bottom', 
                      fontsize=10, fontweight='bold')
     
+    if any(noisy):
+        fig.text(0.01, 0.01, f'* throughput CV above {CV_THRESHOLD:.0%} across trials',
+                 fontsize=9, color='#C0392B')
+    
     plt.tight_layout(rect=[0, 0, 1, 0.95])
     
     # Save plot
@@ -230,25 +289,30 @@ def plot_scaling_by_decoders(results, config_filter=None):
 def plot_heatmap_throughput(results):
     """
     Create heatmap of throughput across different configurations.
-    X-axis: input_len, Y-axis: num_decoders, Color: throughput
+    X-axis: input_len, Y-axis: layout (PxD), Color: throughput
     """
+    import matplotlib.pyplot as plt
+    
     # Get unique values
-    decoder_counts = sorted(set(r['num_decoders'] for r in results))
+    layouts = sorted(set((r['num_prefills'], r['num_decoders']) for r in results))
     input_lens = sorted(set(r['input_len'] for r in results))
     
-    if len(decoder_counts) < 2 or len(input_lens) < 2:
+    if len(layouts) < 2 or len(input_lens) < 2:
         print("Not enough data for heatmap")
         return
     
-    # Build heatmap matrix
-    throughput_matrix = np.zeros((len(decoder_counts), len(input_lens)))
+    # Build heatmap matrix (best point per cell, median over its trials)
+    throughput_matrix = np.zeros((len(layouts), len(input_lens)))
     
+    by_point = defaultdict(list)
     for r in results:
-        d_idx = decoder_counts.index(r['num_decoders'])
-        i_idx = input_lens.index(r['input_len'])
+        by_point[r['point']].append(r)
+    for runs in by_point.values():
+        d_idx = layouts.index((runs[0]['num_prefills'], runs[0]['num_decoders']))
+        i_idx = input_lens.index(runs[0]['input_len'])
         throughput_matrix[d_idx, i_idx] = max(
             throughput_matrix[d_idx, i_idx],
-            r['throughput']
+            np.median([r['throughput'] for r in runs])
         )
     
     # Create heatmap
@@ -259,12 +323,12 @@ def plot_heatmap_throughput(results):
     # Labels
     ax.set_xticks(range(len(input_lens)))
     ax.set_xticklabels(input_lens)
-    ax.set_yticks(range(len(decoder_counts)))
-    ax.set_yticklabels([f'1P{d}D' for d in decoder_counts])
+    ax.set_yticks(range(len(layouts)))
+    ax.set_yticklabels([layout_label(p, d) for p, d in layouts])
     
     ax.set_xlabel('Input Length (tokens)', fontsize=12)
     ax.set_ylabel('Configuration', fontsize=12)
-    ax.set_title('Throughput Heatmap: 1PxD Scaling × Input Length\n'
+    ax.set_title('Throughput Heatmap: xPyD Layout × Input Length\n'
                  'GH200 (Prefill) → A100 (Decode)', fontsize=14, fontweight='bold')
     
     # Add colorbar
@@ -272,7 +336,7 @@ def plot_heatmap_throughput(results):
     cbar.set_label('Output Throughput (tok/s)', fontsize=11)
     
     # Add text annotations
-    for i in range(len(decoder_counts)):
+    for i in range(len(layouts)):
         for j in range(len(input_lens)):
             value = throughput_matrix[i, j]
             if value > 0:
@@ -289,59 +353,187 @@ def plot_heatmap_throughput(results):
     return fig
 
 
-def print_summary_table(results):
-    """Print summary table of results."""
-    print("\n" + "=" * 100)
-    print("1PxD SCALING BENCHMARK RESULTS")
-    print("=" * 100)
+def layout_table(runs, prefill_gpu_cost=PREFILL_GPU_COST, decode_gpu_cost=DECODE_GPU_COST):
+    """One row per (input/output mix, layout): its best point, cost-normalized.
+
+    The best point of a layout is the concurrency/prompt count with the
+    highest median throughput over trials. Adds:
+        gpus             num_prefills + num_decoders
+        tput_per_gpu     throughput / cost, cost = P * prefill_gpu_cost +
+                         D * decode_gpu_cost (tok/s per GPU at unit costs)
+        efficiency       tput_per_gpu relative to the cheapest layout of the mix
+        best             the layout with the highest tput_per_gpu in its mix
+    """
+    points = aggregate_trials(runs, ['output_throughput', 'mean_ttft_ms', 'mean_tpot_ms'])
+    keys = ['input_len', 'output_len', 'num_prefills', 'num_decoders']
+    table = points.loc[points.groupby(keys)['output_throughput'].idxmax()]
+    table = table.sort_values(keys).reset_index(drop=True)
+    table['gpus'] = table['num_prefills'] + table['num_decoders']
+    cost = table['num_prefills'] * prefill_gpu_cost + table['num_decoders'] * decode_gpu_cost
+    table['tput_per_gpu'] = table['output_throughput'] / cost
+
+    mix = table.assign(cost=cost).groupby(['input_len', 'output_len'])
+    cheapest = mix['cost'].transform('min') == cost
+    base = table['tput_per_gpu'].where(cheapest).groupby(
+        [table['input_len'], table['output_len']]).transform('max')
+    table['efficiency'] = table['tput_per_gpu'] / base * 100
+    table['best'] = table['tput_per_gpu'] == mix['tput_per_gpu'].transform('max')
+    return table
+
+
+def format_layout_table(table):
+    """P x D grids of tok/s per GPU, one block per mix, with the best ratio."""
+    blocks = []
+    for (input_len, output_len), rows in table.groupby(['input_len', 'output_len']):
+        grid = rows.pivot(index='num_prefills', columns='num_decoders', values='tput_per_gpu')
+        grid.index = [f"{p}P" for p in grid.index]
+        grid.columns = [f"{d}D" for d in grid.columns]
+        best = rows[rows['best']].iloc[0]
+        p, d = int(best['num_prefills']), int(best['num_decoders'])
+        ratio = np.gcd(p, d)
+        blocks.append(
+            f"Mix: in={input_len} out={output_len} (tok/s per GPU)\n"
+            + grid.to_string(float_format=lambda v: f"{v:.0f}", na_rep='-')
+            + f"\nBest: {layout_label(p, d)} (P:D = {p // ratio}:{d // ratio}), "
+              f"{best['tput_per_gpu']:.0f} tok/s per GPU, "
+              f"{best['output_throughput']:.0f} tok/s at c={best['concurrency']}")
+    return "\n\n".join(blocks)
+
+
+def plot_layout_surfaces(table):
+    """Throughput, throughput per GPU and efficiency over the P x D grid,
+    one row per input/output mix; the best layout per mix is outlined."""
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+    
+    sizes = table.groupby(['input_len', 'output_len']).size()
+    mixes = list(sizes[sizes >= 2].sort_values(ascending=False).index[:MAX_SURFACE_MIXES])
+    if not mixes:
+        print("Need at least 2 layouts of one input/output mix for layout surfaces")
+        return
     
-    # Group by decoder count
-    by_decoders = defaultdict(list)
-    for r in results:
-        by_decoders[r['num_decoders']].append(r)
+    panels = [('output_throughput', 'Output Throughput (tok/s)', 'YlOrRd', '{:.0f}'),
+              ('tput_per_gpu', 'Throughput per GPU (cost-normalized)', 'YlGn', '{:.0f}'),
+              ('efficiency', 'Per-GPU Efficiency vs Cheapest Layout (%)', 'RdYlGn', '{:.0f}%')]
+    fig, axes = plt.subplots(len(mixes), 3, figsize=(18, 4.5 * len(mixes)), squeeze=False)
+    fig.suptitle('xPyD Layout Surfaces: GH200 (Prefill) x P → A100 (Decode) x D',
+                 fontsize=14, fontweight='bold')
+    for row, (input_len, output_len) in zip(axes, mixes):
+        rows = table[(table['input_len'] == input_len) & (table['output_len'] == output_len)]
+        prefills = sorted(rows['num_prefills'].unique())
+        decoders = sorted(rows['num_decoders'].unique())
+        best = rows[rows['best']].iloc[0]
+        for ax, (column, title, cmap, fmt) in zip(row, panels):
+            grid = rows.pivot(index='num_prefills', columns='num_decoders', values=column)
+            grid = grid.reindex(index=prefills, columns=decoders).to_numpy(dtype=float)
+            im = ax.imshow(np.ma.masked_invalid(grid), cmap=cmap, aspect='auto', origin='lower')
+            for i in range(len(prefills)):
+                for j in range(len(decoders)):
+                    if not np.isnan(grid[i, j]):
+                        ax.text(j, i, fmt.format(grid[i, j]), ha='center', va='center',
+                                fontsize=9, fontweight='bold')
+            bi = prefills.index(best['num_prefills'])
+            bj = decoders.index(best['num_decoders'])
+            ax.add_patch(Rectangle((bj - 0.5, bi - 0.5), 1, 1, fill=False,
+                                   edgecolor='black', linewidth=3))
+            ax.set_xticks(range(len(decoders)), decoders)
+            ax.set_yticks(range(len(prefills)), prefills)
+            ax.set_xlabel('Decode GPUs (D)', fontsize=10)
+            ax.set_ylabel('Prefill GPUs (P)', fontsize=10)
+            ax.set_title(f'{title}\nin={input_len} out={output_len}', fontsize=11)
+            plt.colorbar(im, ax=ax)
     
-    print(f"\n{'Config':<12} {'Throughput':>12} {'Mean TTFT':>12} {'Mean E2E':>12} "
-          f"{'P99 E2E':>12} {'TPOT':>10} {'Runs':>6}")
-    print(f"{'':12} {'(tok/s)':>12} {'(ms)':>12} {'(ms)':>12} "
-          f"{'(ms)':>12} {'(ms)':>10} {'':>6}")
-    print("-" * 100)
-    
-    for d in sorted(by_decoders.keys()):
-        runs = by_decoders[d]
-        avg_tp = np.mean([r['throughput'] for r in runs])
-        avg_ttft = np.mean([r['mean_ttft'] for r in runs])
-        avg_e2e = np.mean([r['mean_e2e'] for r in runs])
-        avg_p99 = np.mean([r['p99_e2e'] for r in runs])
-        avg_tpot = np.mean([r['mean_tpot'] for r in runs])
-        
-        print(f"1P{d}D{'':<8} {avg_tp:>12.2f} {avg_ttft:>12.2f} {avg_e2e:>12.2f} "
-              f"{avg_p99:>12.2f} {avg_tpot:>10.2f} {len(runs):>6}")
+    plt.tight_layout()
+    
+    output_file = OUTPUT_DIR / "xpyd_surfaces.png"
+    plt.savefig(output_file, dpi=150, bbox_inches='tight', facecolor='white')
+    print(f"Layout surfaces saved to: {output_file}")
+    
+    return fig
+
+
+def print_summary_table(runs, ttft_slo_ms=TTFT_SLO_MS, tpot_slo_ms=TPOT_SLO_MS):
+    """Print summary table of results, one block per workload.
     
+    Percentiles are computed over the pooled per-request samples of all runs
+    of a config (see latency_analysis.py); throughput is the median run.
+    """
+    print("\n" + "=" * 100)
+    print("xPyD SCALING BENCHMARK RESULTS")
     print("=" * 100)
     
-    # Calculate speedup from 1P1D
-    if 1 in by_decoders:
-        base_tp = np.mean([r['throughput'] for r in by_decoders[1]])
-        print("\nSpeedup vs 1P1D:")
-        for d in sorted(by_decoders.keys()):
-            if d == 1:
+    stats = group_stats(runs, GROUPINGS['config'], [50, 99], ttft_slo_ms, tpot_slo_ms,
+                        RESULTS_DIR)
+    spread = aggregate_trials(runs, ['output_throughput'], GROUPINGS['config'])
+    stats = stats.merge(spread[GROUPINGS['config'] + ['output_throughput_cv']],
+                        on=GROUPINGS['config'], how='left')
+    
+    def fmt(value, width, digits=2):
+        return f"{value:>{width}.{digits}f}" if value == value else f"{'-':>{width}}"
+    
+    # One block per config apart from the layout; workload, prefix and knob
+    # keys are named only where blocks differ
+    block_keys = [k for k in GROUPINGS['config']
+                  if k not in ('mode', 'num_prefills', 'num_decoders')]
+    shown = [k for k in block_keys[3:] if stats[k].nunique(dropna=False) > 1]
+    for key, workload in stats.groupby(block_keys, sort=True, dropna=False):
+        block = dict(zip(block_keys, key))
+        extra = "".join(f" {k}={block[k]}" for k in shown)
+        print(f"\nWorkload: in={block['input_len']} out={block['output_len']} "
+              f"concurrency={block['concurrency']}{extra}")
+        print(f"{'Config':<12} {'Throughput':>12} {'P50 TTFT':>10} {'P99 TTFT':>10} "
+              f"{'P99 E2E':>10} {'P50 TPOT':>10} {'Goodput':>10} {'Runs':>6} {'CV':>7}")
+        print(f"{'':12} {'(tok/s)':>12} {'(ms)':>10} {'(ms)':>10} "
+              f"{'(ms)':>10} {'(ms)':>10} {'(tok/s)':>10} {'':>6} {'(%)':>7}")
+        print("-" * 100)
+        
+        workload = workload.sort_values(['num_prefills', 'num_decoders'])
+        for row in workload.to_dict('records'):
+            label = layout_label(row['num_prefills'], row['num_decoders'])
+            print(f"{label:<12} {fmt(row['output_throughput'], 12)} "
+                  f"{fmt(row['p50_ttft_ms'], 10)} {fmt(row['p99_ttft_ms'], 10)} "
+                  f"{fmt(row['p99_e2e_ms'], 10)} {fmt(row['p50_tpot_ms'], 10)} "
+                  f"{fmt(row['goodput_tok_s'], 10)} {row['runs']:>6} "
+                  f"{fmt(row['output_throughput_cv'] * 100, 6, 1)}"
+                  f"{'*' if row['output_throughput_cv'] > CV_THRESHOLD else ''}")
+        
+        # Speedup from the fewest decoders at the same prefill count (1P1D)
+        for num_prefills, layouts in workload.groupby('num_prefills'):
+            base = layouts.iloc[0]
+            if len(layouts) < 2:
                 continue
-            runs = by_decoders[d]
-            avg_tp = np.mean([r['throughput'] for r in runs])
-            speedup = avg_tp / base_tp if base_tp > 0 else 0
-            efficiency = speedup / d * 100
-            print(f"  1P{d}D: {speedup:.2f}x speedup ({efficiency:.1f}% efficiency)")
+            base_tp = base['output_throughput']
+            print(f"Speedup vs {layout_label(num_prefills, base['num_decoders'])}:")
+            for row in layouts.iloc[1:].to_dict('records'):
+                d = row['num_decoders']
+                speedup = row['output_throughput'] / base_tp if base_tp > 0 else 0
+                efficiency = speedup / (d / base['num_decoders']) * 100
+                print(f"  {layout_label(num_prefills, d)}: {speedup:.2f}x speedup "
+                      f"({efficiency:.1f}% efficiency)")
+    
+    print("=" * 100)
+    print(f"Goodput: output tok/s of requests with TTFT <= {ttft_slo_ms:g} ms and "
+          f"TPOT <= {tpot_slo_ms:g} ms (needs per-request traces)")
+    print(f"CV: run-to-run throughput variation; * above {CV_THRESHOLD:.0%}")
 
 
 def main():
     """Main entry point."""
-    print("Loading 1PxD benchmark results...")
+    parser = argparse.ArgumentParser(description="xPyD scaling analysis")
+    parser.add_argument("--prefill-gpu-cost", type=float, default=PREFILL_GPU_COST,
+                        help="Relative cost of one prefill GPU (default: 1)")
+    parser.add_argument("--decode-gpu-cost", type=float, default=DECODE_GPU_COST,
+                        help="Relative cost of one decode GPU (default: 1)")
+    args = parser.parse_args()
+    
+    print("Loading xPyD benchmark results...")
     
     # Load results
-    results = load_benchmark_results()
+    runs = load_runs()
+    results = load_benchmark_results(df=runs)
     
     if not results:
-        print("\nNo 1PxD benchmark results found.")
+        print("\nNo xPyD benchmark results found.")
         print("Run benchmarks first:")
         print("  bash experiment/run_1pxd_sweep.sh")
         return
@@ -349,13 +541,24 @@ def main():
     print(f"Found {len(results)} benchmark result(s)")
     
     # Print summary
-    print_summary_table(results)
+    print_summary_table(runs)
+    layouts = layout_table(runs, args.prefill_gpu_cost, args.decode_gpu_cost)
+    print(f"\nBest layout per mix (GPU cost: prefill {args.prefill_gpu_cost:g}, "
+          f"decode {args.decode_gpu_cost:g})")
+    print(format_layout_table(layouts))
     
     # Generate plots
     print("\nGenerating plots...")
     
     try:
-        plot_scaling_by_decoders(results)
+        from pd_simulator import scaling_projection
+        projections = scaling_projection(RESULTS_DIR)
+    except Exception as e:
+        print(f"Note: no simulator projection ({e}); run pd_simulator.py calibrate")
+        projections = None
+    
+    try:
+        plot_scaling_by_decoders(results, projections=projections)
     except Exception as e:
         print(f"Warning: Could not generate scaling plot: {e}")
     
@@ -364,6 +567,11 @@ def main():
     except Exception as e:
         print(f"Warning: Could not generate heatmap: {e}")
     
+    try:
+        plot_layout_surfaces(layouts)
+    except Exception as e:
+        print(f"Warning: Could not generate layout surfaces: {e}")
+    
     print("\nDone!")
 
 
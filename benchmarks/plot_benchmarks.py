@@ -2,15 +2,18 @@
 """
 Plot benchmark comparison: Aggregated vs PD Disaggregation
 Supports both single results and parameter sweep results.
+
+Repeated trials of a point are reduced to their median; error bars span the
+trial min/max and points whose CV exceeds results_store.CV_THRESHOLD are
+marked with '*'.
 """
-import json
 import pathlib
-import re
-from collections import defaultdict
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
+
+from latency_analysis import pooled_samples
+from request_traces import load_trace
+from results_store import CV_THRESHOLD, aggregate_trials, load_table
 
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 RESULTS_DIR = ROOT / "benchmarks" / "results"
@@ -23,8 +26,10 @@ COLORS = {
     'highlight': '#28A745',     # Green for highlights
 }
 
-plt.style.use('seaborn-v0_8-whitegrid')
-plt.rcParams.update({
+# Metrics aggregated over the trials of each point
+POINT_METRICS = ['total_throughput', 'mean_ttft_ms', 'mean_e2e_ms', 'request_throughput']
+
+STYLE = {
     'font.family': 'sans-serif',
     'font.size': 11,
     'axes.titlesize': 14,
@@ -32,70 +37,53 @@ plt.rcParams.update({
     'figure.facecolor': 'white',
     'axes.facecolor': '#FAFAFA',
     'grid.alpha': 0.3,
-})
-
-
-def load_results():
-    """Load all JSONL results from the results directory."""
-    rows = []
-    for path in RESULTS_DIR.glob("*.jsonl"):
-        with path.open() as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                rec = json.loads(line)
-                tag = rec.get("tag") or path.stem
-                
-                # Parse sweep parameters from tag if present
-                # Format: mode_nX_inY_outZ_cW
-                match = re.match(r'(\w+)_n(\d+)_in(\d+)_out(\d+)_c(\d+)', tag)
-                if match:
-                    mode = match.group(1)
-                    sweep_params = {
-                        'num_prompts': int(match.group(2)),
-                        'input_len': int(match.group(3)),
-                        'output_len': int(match.group(4)),
-                        'concurrency': int(match.group(5)),
-                    }
-                else:
-                    # Determine mode from tag
-                    if 'inter' in tag.lower():
-                        mode = 'pd_inter'
-                    elif 'pd' in tag.lower() or 'disagg' in tag.lower():
-                        mode = 'pd_intra'
-                    else:
-                        mode = 'agg'
-                    sweep_params = {
-                        'num_prompts': rec.get("num_prompts", 0),
-                        'input_len': rec.get("random_input_len", 0),
-                        'output_len': rec.get("random_output_len", 0),
-                        'concurrency': rec.get("max_concurrency", 0),
-                    }
-                
-                rows.append({
-                    "tag": tag,
-                    "mode": mode,
-                    "file": path.name,
-                    "backend": rec.get("backend"),
-                    "dataset_name": rec.get("dataset_name"),
-                    **sweep_params,
-                    "duration_s": rec.get("duration"),
-                    "request_throughput": rec.get("request_throughput"),
-                    "input_throughput": rec.get("input_throughput"),
-                    "output_throughput": rec.get("output_throughput"),
-                    "total_throughput": rec.get("total_throughput"),
-                    "mean_e2e_ms": rec.get("mean_e2e_latency_ms"),
-                    "median_e2e_ms": rec.get("median_e2e_latency_ms"),
-                    "mean_ttft_ms": rec.get("mean_ttft_ms"),
-                    "median_ttft_ms": rec.get("median_ttft_ms"),
-                    "p99_ttft_ms": rec.get("p99_ttft_ms"),
-                    "mean_tpot_ms": rec.get("mean_tpot_ms"),
-                    "mean_itl_ms": rec.get("mean_itl_ms"),
-                })
-    if not rows:
-        raise SystemExit(f"No JSONL results found in {RESULTS_DIR}")
-    return pd.DataFrame(rows)
+}
+
+
+def pyplot():
+    """Import pyplot with the plot style applied.
+
+    Deferred to the plot functions so text summaries never import matplotlib.
+    """
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
+    plt.rcParams.update(STYLE)
+    return plt
+
+
+def load_results(workload='random'):
+    """Load agg / intra-node / inter-node results from the results directory.
+
+    1PxD runs are left to plot_1pxd_scaling.py. `workload` keeps only the runs
+    of one workload (results_store's 'workload' column); the default keeps the
+    random-length runs the plots are laid out for, None keeps every workload.
+    """
+    df = load_table(results_dir=RESULTS_DIR, modes=['agg', 'pd_intra', 'pd_inter'])
+    if workload is not None:
+        # Records predating the column are random-length runs
+        df = df[df['workload'].fillna('random') == workload]
+    if df.empty:
+        raise SystemExit(f"No JSONL results found in {RESULTS_DIR}"
+                         + (f" for workload {workload}" if workload is not None else ""))
+    df['mode'] = df['mode'].astype(str)
+    return df.rename(columns={
+        'duration': 'duration_s',
+        'mean_e2e_latency_ms': 'mean_e2e_ms',
+        'median_e2e_latency_ms': 'median_e2e_ms',
+    })
+
+
+def load_points(df):
+    """Median over trials per point (see results_store.aggregate_trials)."""
+    points = aggregate_trials(df, POINT_METRICS)
+    points['mode'] = points['mode'].astype(str)
+    return points
+
+
+def trial_errors(frame, metric):
+    """Asymmetric error bars from the median to the trial min/max."""
+    return np.vstack([frame[metric] - frame[f'{metric}_min'],
+                      frame[f'{metric}_max'] - frame[metric]])
 
 
 def get_mode_label(mode):
@@ -110,8 +98,11 @@ def get_mode_label(mode):
 
 def plot_comparison(df):
     """Create a comprehensive comparison plot."""
-    # Get latest result per mode (for simple comparison)
-    df_by_mode = df.groupby("mode").last().reset_index()
+    plt = pyplot()
+    # Latest point per mode (for simple comparison), median over its trials
+    latest = df.groupby("mode")["point"].last()
+    points = load_points(df)
+    df_by_mode = points[points['point'].isin(latest)].reset_index(drop=True)
     
     if len(df_by_mode) < 2:
         print("Need at least 2 modes for comparison")
@@ -122,7 +113,8 @@ def plot_comparison(df):
                  fontsize=16, fontweight='bold', y=0.98)
     
     modes = df_by_mode['mode'].tolist()
-    labels = [get_mode_label(m) for m in modes]
+    labels = [get_mode_label(m) + ('*' if noisy else '')
+              for m, noisy in zip(modes, df_by_mode['noisy'])]
     colors = [COLORS.get(m, '#999999') for m in modes]
     x = np.arange(len(labels))
     width = 0.6
@@ -130,7 +122,8 @@ def plot_comparison(df):
     # 1. Throughput comparison
     ax1 = axes[0, 0]
     throughputs = df_by_mode['total_throughput'].tolist()
-    bars1 = ax1.bar(x, throughputs, width, color=colors)
+    bars1 = ax1.bar(x, throughputs, width, color=colors,
+                   yerr=trial_errors(df_by_mode, 'total_throughput'), capsize=4)
     ax1.set_ylabel('Tokens/sec')
     ax1.set_title('Total Throughput')
     ax1.set_xticks(x)
@@ -141,7 +134,8 @@ def plot_comparison(df):
     # 2. TTFT comparison
     ax2 = axes[0, 1]
     ttfts = df_by_mode['mean_ttft_ms'].tolist()
-    bars2 = ax2.bar(x, ttfts, width, color=colors)
+    bars2 = ax2.bar(x, ttfts, width, color=colors,
+                   yerr=trial_errors(df_by_mode, 'mean_ttft_ms'), capsize=4)
     ax2.set_ylabel('Milliseconds')
     ax2.set_title('Mean Time to First Token (TTFT)')
     ax2.set_xticks(x)
@@ -152,7 +146,8 @@ def plot_comparison(df):
     # 3. E2E Latency comparison
     ax3 = axes[1, 0]
     e2e = df_by_mode['mean_e2e_ms'].tolist()
-    bars3 = ax3.bar(x, e2e, width, color=colors)
+    bars3 = ax3.bar(x, e2e, width, color=colors,
+                   yerr=trial_errors(df_by_mode, 'mean_e2e_ms'), capsize=4)
     ax3.set_ylabel('Milliseconds')
     ax3.set_title('Mean End-to-End Latency')
     ax3.set_xticks(x)
@@ -177,6 +172,9 @@ def plot_comparison(df):
     table_data.append(['Mean TTFT (ms)'] + [f'{t:.0f}' for t in ttfts])
     table_data.append(['Mean E2E (ms)'] + [f'{t:.0f}' for t in e2e])
     table_data.append(['Req Throughput'] + [f'{r:.1f}' for r in df_by_mode['request_throughput'].tolist()])
+    table_data.append(['Trials'] + [str(n) for n in df_by_mode['trials']])
+    table_data.append(['Throughput CV'] + ['-' if np.isnan(cv) else f'{cv:.1%}'
+                                            for cv in df_by_mode['total_throughput_cv']])
     
     table = ax4.table(cellText=table_data, loc='center', cellLoc='center',
                       colWidths=[0.25] + [0.22] * len(labels))
@@ -190,6 +188,9 @@ def plot_comparison(df):
         table[(0, j)].set_text_props(color='white', fontweight='bold')
     
     ax4.set_title('Performance Summary', pad=20)
+    if df_by_mode['noisy'].any():
+        ax4.text(0.5, 0.02, f'* CV above {CV_THRESHOLD:.0%} across trials',
+                 transform=ax4.transAxes, ha='center', fontsize=9, color='#C0392B')
     
     plt.tight_layout()
     out_path = RESULTS_DIR / "benchmark_comparison.png"
@@ -200,28 +201,47 @@ def plot_comparison(df):
 
 
 def plot_ttft_breakdown(df):
-    """Create detailed TTFT breakdown plot."""
-    df_by_mode = df.groupby("mode").last().reset_index()
+    """Create detailed TTFT breakdown plot.
+
+    Takes the latest point per mode, as plot_comparison does. Uses the pooled
+    per-request traces of all its trials (P50/P90/P99/P99.9) when every trial
+    has one, otherwise the median over trials of the Mean/Median/P99 summary
+    fields.
+    """
+    plt = pyplot()
+    latest = df.groupby("mode")["point"].last()
+    runs = df[df['point'].isin(latest)]
+    df_by_mode = aggregate_trials(runs, ['mean_ttft_ms', 'median_ttft_ms', 'p99_ttft_ms'])
     
     if len(df_by_mode) < 2:
         return
     
-    modes = df_by_mode['mode'].tolist()
+    modes = df_by_mode['mode'].astype(str).tolist()
     labels = [get_mode_label(m) for m in modes]
+    traces = [[load_trace(tag, RESULTS_DIR) for tag in runs.loc[runs['point'] == point, 'tag']]
+              for point in df_by_mode['point']]
     
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    metrics = ['Mean', 'Median', 'P99']
+    use_traces = all(t is not None for point_traces in traces for t in point_traces)
+    if use_traces:
+        percentiles = [50, 90, 99, 99.9]
+        metrics = [f'P{p:g}' for p in percentiles]
+    else:
+        metrics = ['Mean', 'Median', 'P99']
     x = np.arange(len(metrics))
     width = 0.25
     
     for i, (mode, label) in enumerate(zip(modes, labels)):
         row = df_by_mode[df_by_mode['mode'] == mode].iloc[0]
-        values = [
-            row.get('mean_ttft_ms', 0) or 0,
-            row.get('median_ttft_ms', 0) or 0,
-            row.get('p99_ttft_ms', 0) or 0,
-        ]
+        if use_traces:
+            values = np.percentile(pooled_samples(traces[i], 'ttft_ms'), percentiles)
+        else:
+            values = [
+                row.get('mean_ttft_ms', 0) or 0,
+                row.get('median_ttft_ms', 0) or 0,
+                row.get('p99_ttft_ms', 0) or 0,
+            ]
         offset = (i - len(modes)/2 + 0.5) * width
         bars = ax.bar(x + offset, values, width, label=label, color=COLORS.get(mode, '#999999'))
         ax.bar_label(bars, fmt='%.0f', padding=3, fontsize=8)
@@ -238,6 +258,16 @@ def plot_ttft_breakdown(df):
     print(f"Saved TTFT breakdown: {out_path}")
 
 
+def plot_sweep_line(ax, points, mode, x, metric):
+    """Mean over the other sweep dimensions of the per-point medians, with
+    error bars spanning the mean trial min/max."""
+    grouped = points[points['mode'] == mode].groupby(x)[
+        [metric, f'{metric}_min', f'{metric}_max']].mean()
+    ax.errorbar(grouped.index, grouped[metric], yerr=trial_errors(grouped, metric),
+                fmt='o-', capsize=3, label=get_mode_label(mode),
+                color=COLORS.get(mode, '#999999'), linewidth=2)
+
+
 def plot_sweep_results(df):
     """Plot sweep results if multiple parameter combinations exist."""
     # Check if we have sweep results
@@ -245,19 +275,19 @@ def plot_sweep_results(df):
     if len(unique_params) <= 1:
         return  # No sweep data
     
+    points = load_points(df)
+    plt = pyplot()
+    
     # Plot throughput vs input length
     fig, axes = plt.subplots(2, 2, figsize=(14, 11))
-    fig.suptitle('Parameter Sweep Results', fontsize=16, fontweight='bold', y=0.98)
+    fig.suptitle('Parameter Sweep Results (median over trials)', fontsize=16, fontweight='bold', y=0.98)
     
-    modes = df['mode'].unique()
+    modes = points['mode'].unique()
     
     # 1. Throughput vs Input Length
     ax1 = axes[0, 0]
     for mode in modes:
-        mode_df = df[df['mode'] == mode]
-        grouped = mode_df.groupby('input_len')['total_throughput'].mean()
-        ax1.plot(grouped.index, grouped.values, 'o-', 
-                label=get_mode_label(mode), color=COLORS.get(mode, '#999999'), linewidth=2)
+        plot_sweep_line(ax1, points, mode, 'input_len', 'total_throughput')
     ax1.set_xlabel('Input Length (tokens)')
     ax1.set_ylabel('Throughput (tok/s)')
     ax1.set_title('Throughput vs Input Length')
@@ -267,10 +297,7 @@ def plot_sweep_results(df):
     # 2. TTFT vs Input Length
     ax2 = axes[0, 1]
     for mode in modes:
-        mode_df = df[df['mode'] == mode]
-        grouped = mode_df.groupby('input_len')['mean_ttft_ms'].mean()
-        ax2.plot(grouped.index, grouped.values, 'o-', 
-                label=get_mode_label(mode), color=COLORS.get(mode, '#999999'), linewidth=2)
+        plot_sweep_line(ax2, points, mode, 'input_len', 'mean_ttft_ms')
     ax2.set_xlabel('Input Length (tokens)')
     ax2.set_ylabel('TTFT (ms)')
     ax2.set_title('TTFT vs Input Length')
@@ -280,10 +307,7 @@ def plot_sweep_results(df):
     # 3. Throughput vs Concurrency
     ax3 = axes[1, 0]
     for mode in modes:
-        mode_df = df[df['mode'] == mode]
-        grouped = mode_df.groupby('concurrency')['total_throughput'].mean()
-        ax3.plot(grouped.index, grouped.values, 'o-', 
-                label=get_mode_label(mode), color=COLORS.get(mode, '#999999'), linewidth=2)
+        plot_sweep_line(ax3, points, mode, 'concurrency', 'total_throughput')
     ax3.set_xlabel('Concurrency')
     ax3.set_ylabel('Throughput (tok/s)')
     ax3.set_title('Throughput vs Concurrency')
@@ -292,10 +316,7 @@ def plot_sweep_results(df):
     # 4. E2E Latency vs Concurrency
     ax4 = axes[1, 1]
     for mode in modes:
-        mode_df = df[df['mode'] == mode]
-        grouped = mode_df.groupby('concurrency')['mean_e2e_ms'].mean()
-        ax4.plot(grouped.index, grouped.values, 'o-', 
-                label=get_mode_label(mode), color=COLORS.get(mode, '#999999'), linewidth=2)
+        plot_sweep_line(ax4, points, mode, 'concurrency', 'mean_e2e_ms')
     ax4.set_xlabel('Concurrency')
     ax4.set_ylabel('E2E Latency (ms)')
     ax4.set_title('E2E Latency vs Concurrency')
@@ -307,17 +328,24 @@ def plot_sweep_results(df):
     print(f"Saved sweep plot: {out_path}")
 
 
-def main():
-    df = load_results()
-    
+def print_summary(df):
+    """Print one line per point, median over its trials."""
     print("\n" + "="*60)
     print("BENCHMARK RESULTS SUMMARY")
     print("="*60)
     
-    cols = ["tag", "total_throughput", "mean_ttft_ms", "mean_e2e_ms", "request_throughput"]
-    available_cols = [c for c in cols if c in df.columns]
-    print(df[available_cols].to_string(index=False))
+    points = load_points(df)
+    points['noisy'] = np.where(points['noisy'], '*', '')
+    cols = ["point", "workload", "trials", "total_throughput", "total_throughput_cv", "mean_ttft_ms",
+            "mean_ttft_ms_cv", "mean_e2e_ms", "request_throughput", "noisy"]
+    print(points[cols].to_string(index=False, float_format=lambda v: f"{v:.2f}", na_rep='-'))
+    print(f"(median over trials; * = CV above {CV_THRESHOLD:.0%})")
     print("="*60 + "\n")
+
+
+def main():
+    df = load_results()
+    print_summary(df)
     
     # Generate plots
     plot_comparison(df)
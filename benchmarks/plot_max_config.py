@@ -2,100 +2,153 @@
 """
 Plot benchmark comparison for maximum configuration:
 n=100, input=512, output=128, concurrency=32
+
+Values are looked up in the results index (results_index.py) on every run:
+per mode, the median over the trials of the matching point. --best instead
+picks, per mode, the highest-throughput point whose p99 TTFT meets
+--max-p99-ttft.
+
+Usage:
+    python3 benchmarks/plot_max_config.py
+    python3 benchmarks/plot_max_config.py --input-len 128 --output-len 64 --concurrency 8
+    python3 benchmarks/plot_max_config.py --best --max-p99-ttft 200
 """
 
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+import pathlib
+
+from results_index import best, load_index, query
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Max configuration: n100_in512_out128_c32
+MAX_CONFIG = {'num_prompts': 100, 'input_len': 512, 'output_len': 128, 'concurrency': 32}
+MODES = ['agg', 'pd_intra', 'pd_inter']
 
-# Data for max configuration: n100_in512_out128_c32
-configs = ['Aggregated\n(GH200)', 'Intra-Node PD\n(GH200)', 'Inter-Node PD\n(GH200→A100)']
 short_configs = ['Aggregated', 'Intra-Node PD', 'Inter-Node PD']
 
-# Metrics extracted from jsonl files
-throughput = [3151.44, 4211.80, 662.85]  # output tok/s
-mean_ttft = [42.45, 80.06, 2345.04]  # ms
-mean_e2e = [557.91, 388.63, 2732.99]  # ms
-p99_e2e = [1181.29, 738.49, 3694.76]  # ms
+# (column, y label, title, value format)
+PANELS = [
+    ('output_throughput', 'Output Throughput (tok/s)', 'Throughput Comparison', '{:.0f}'),
+    ('mean_ttft_ms', 'Mean TTFT (ms)', 'Time To First Token (TTFT)', '{:.1f}'),
+    ('mean_e2e_latency_ms', 'Mean E2E Latency (ms)', 'End-to-End Latency (Mean)', '{:.0f}'),
+    ('p99_e2e_latency_ms', 'P99 E2E Latency (ms)', 'End-to-End Latency (P99)', '{:.0f}'),
+]
 
 # Colors - distinctive palette
 colors = ['#2ecc71', '#3498db', '#e74c3c']  # green, blue, red
 
-# Create figure with 2x2 subplots
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-fig.suptitle('SGLang PD Disaggregation Benchmark\nMax Config: input=512, output=128, concurrency=32, n=100', 
-             fontsize=14, fontweight='bold', y=0.98)
-
-# 1. Throughput (top-left)
-ax1 = axes[0, 0]
-bars1 = ax1.bar(short_configs, throughput, color=colors, edgecolor='black', linewidth=1.2)
-ax1.set_ylabel('Output Throughput (tok/s)', fontsize=11)
-ax1.set_title('Throughput Comparison', fontsize=12, fontweight='bold')
-ax1.set_ylim(0, max(throughput) * 1.2)
-for bar, val in zip(bars1, throughput):
-    ax1.annotate(f'{val:.0f}', 
-                 xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-                 ha='center', va='bottom', fontsize=11, fontweight='bold')
-ax1.grid(axis='y', alpha=0.3, linestyle='--')
-
-# 2. Mean TTFT (top-right)
-ax2 = axes[0, 1]
-bars2 = ax2.bar(short_configs, mean_ttft, color=colors, edgecolor='black', linewidth=1.2)
-ax2.set_ylabel('Mean TTFT (ms)', fontsize=11)
-ax2.set_title('Time To First Token (TTFT)', fontsize=12, fontweight='bold')
-ax2.set_ylim(0, max(mean_ttft) * 1.2)
-for bar, val in zip(bars2, mean_ttft):
-    ax2.annotate(f'{val:.1f}', 
-                 xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-                 ha='center', va='bottom', fontsize=11, fontweight='bold')
-ax2.grid(axis='y', alpha=0.3, linestyle='--')
-
-# 3. Mean E2E Latency (bottom-left)
-ax3 = axes[1, 0]
-bars3 = ax3.bar(short_configs, mean_e2e, color=colors, edgecolor='black', linewidth=1.2)
-ax3.set_ylabel('Mean E2E Latency (ms)', fontsize=11)
-ax3.set_title('End-to-End Latency (Mean)', fontsize=12, fontweight='bold')
-ax3.set_ylim(0, max(mean_e2e) * 1.2)
-for bar, val in zip(bars3, mean_e2e):
-    ax3.annotate(f'{val:.0f}', 
-                 xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-                 ha='center', va='bottom', fontsize=11, fontweight='bold')
-ax3.grid(axis='y', alpha=0.3, linestyle='--')
-
-# 4. P99 E2E Latency (bottom-right)
-ax4 = axes[1, 1]
-bars4 = ax4.bar(short_configs, p99_e2e, color=colors, edgecolor='black', linewidth=1.2)
-ax4.set_ylabel('P99 E2E Latency (ms)', fontsize=11)
-ax4.set_title('End-to-End Latency (P99)', fontsize=12, fontweight='bold')
-ax4.set_ylim(0, max(p99_e2e) * 1.2)
-for bar, val in zip(bars4, p99_e2e):
-    ax4.annotate(f'{val:.0f}', 
-                 xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-                 ha='center', va='bottom', fontsize=11, fontweight='bold')
-ax4.grid(axis='y', alpha=0.3, linestyle='--')
-
-# Add configuration details as text box
-config_text = (
-    "Configuration:\n"
-    "• Aggregated: GH200 single node (cg1n1)\n"
-    "• Intra-Node PD: 2 containers on GH200 (Mooncake)\n"
-    "• Inter-Node PD: GH200 prefill → A100 decode (NIXL)"
-)
-fig.text(0.5, 0.02, config_text, ha='center', fontsize=9, 
-         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-
-plt.tight_layout(rect=[0, 0.08, 1, 0.95])
-plt.savefig('/home/ubuntu/sglang-benchmark/benchmarks/results/max_config_comparison.png', 
-            dpi=150, bbox_inches='tight', facecolor='white')
-print("Plot saved to: /home/ubuntu/sglang-benchmark/benchmarks/results/max_config_comparison.png")
-
-# Also create a summary table
-print("\n" + "="*80)
-print("BENCHMARK RESULTS: Max Configuration (input=512, output=128, concurrency=32, n=100)")
-print("="*80)
-print(f"{'Configuration':<25} {'Throughput':>15} {'Mean TTFT':>12} {'Mean E2E':>12} {'P99 E2E':>12}")
-print(f"{'':25} {'(tok/s)':>15} {'(ms)':>12} {'(ms)':>12} {'(ms)':>12}")
-print("-"*80)
-for i, cfg in enumerate(short_configs):
-    print(f"{cfg:<25} {throughput[i]:>15.2f} {mean_ttft[i]:>12.2f} {mean_e2e[i]:>12.2f} {p99_e2e[i]:>12.2f}")
-print("="*80)
 
+def select_rows(index, config=MAX_CONFIG, max_p99_ttft=None, image=None):
+    """One row per mode (in MODES order), median over trials.
+
+    Args:
+        config: Key values of the point, or None to search all points
+        max_p99_ttft: With config=None, only points under this p99 TTFT (ms)
+        image: Optional image key (see results_store.server_image)
+    """
+    keys = dict(config or {})
+    if image:
+        keys['image'] = image
+    where = f"p99_ttft_ms < {max_p99_ttft}" if max_p99_ttft is not None else None
+    rows = best(query(index, where, points=True, mode=MODES, **keys), by=['mode'])
+    missing = [m for m in MODES if m not in set(rows['mode'])]
+    if missing:
+        raise SystemExit(f"No matching results for: {', '.join(missing)}")
+    return rows.set_index('mode').loc[MODES].reset_index()
+
+
+def plot_max_config(rows, title, out_path, show_points=False):
+    """2x2 bars per mode; show_points adds each mode's point tag to its label."""
+    import matplotlib.pyplot as plt
+
+    # Create figure with 2x2 subplots
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    fig.suptitle(title, fontsize=14, fontweight='bold', y=0.98)
+
+    labels = [f"{name}\n{tag}" if show_points else name
+              for name, tag in zip(short_configs, rows['tag'])]
+    for ax, (column, ylabel, panel_title, fmt) in zip(axes.flat, PANELS):
+        values = rows[column]
+        errors = [values - rows[f'{column}_min'], rows[f'{column}_max'] - values]
+        bars = ax.bar(labels, values, color=colors, edgecolor='black', linewidth=1.2,
+                      yerr=errors, capsize=4)
+        ax.set_ylabel(ylabel, fontsize=11)
+        ax.set_title(panel_title, fontsize=12, fontweight='bold')
+        ax.set_ylim(0, rows[f'{column}_max'].max() * 1.2)
+        for bar, val, noisy in zip(bars, values, rows['noisy']):
+            ax.annotate(fmt.format(val) + ('*' if noisy else ''),
+                        xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
+                        ha='center', va='bottom', fontsize=11, fontweight='bold')
+        ax.grid(axis='y', alpha=0.3, linestyle='--')
+
+    # Add configuration details as text box
+    config_text = (
+        "Configuration:\n"
+        "• Aggregated: GH200 single node (cg1n1)\n"
+        "• Intra-Node PD: 2 containers on GH200 (Mooncake)\n"
+        "• Inter-Node PD: GH200 prefill → A100 decode (NIXL)"
+    )
+    fig.text(0.5, 0.02, config_text, ha='center', fontsize=9,
+             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+
+    plt.tight_layout(rect=[0, 0.08, 1, 0.95])
+    plt.savefig(out_path, dpi=150, bbox_inches='tight', facecolor='white')
+    print(f"Plot saved to: {out_path}")
+    return fig
+
+
+def print_table(rows, heading):
+    print("\n" + "="*96)
+    print(heading)
+    print("="*96)
+    print(f"{'Configuration':<16} {'Point':<32} {'Throughput':>11} {'Mean TTFT':>10} "
+          f"{'Mean E2E':>10} {'P99 E2E':>10} {'Trials':>6}")
+    print(f"{'':16} {'':32} {'(tok/s)':>11} {'(ms)':>10} {'(ms)':>10} {'(ms)':>10}")
+    print("-"*96)
+    for cfg, row in zip(short_configs, rows.to_dict('records')):
+        print(f"{cfg:<16} {row['tag']:<32} {row['output_throughput']:>11.2f} "
+              f"{row['mean_ttft_ms']:>10.2f} {row['mean_e2e_latency_ms']:>10.2f} "
+              f"{row['p99_e2e_latency_ms']:>10.2f} {row['trials']:>5}{'*' if row['noisy'] else ' '}")
+    print("="*96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Max-config comparison across modes")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--num-prompts", type=int, default=MAX_CONFIG['num_prompts'])
+    parser.add_argument("--input-len", type=int, default=MAX_CONFIG['input_len'])
+    parser.add_argument("--output-len", type=int, default=MAX_CONFIG['output_len'])
+    parser.add_argument("--concurrency", type=int, default=MAX_CONFIG['concurrency'])
+    parser.add_argument("--image", help="Only runs of this image (e.g. 0.5.5.post3)")
+    parser.add_argument("--best", action="store_true",
+                        help="Per mode, the max-throughput point under --max-p99-ttft")
+    parser.add_argument("--max-p99-ttft", type=float, default=200.0)
+    parser.add_argument("--no-plot", action="store_true", help="Only print the table")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    index = load_index(results_dir)
+    if args.best:
+        rows = select_rows(index, None, args.max_p99_ttft, args.image)
+        title = f"Best config per mode with p99 TTFT < {args.max_p99_ttft:g} ms"
+        out_path = results_dir / "max_config_best.png"
+    else:
+        config = {'num_prompts': args.num_prompts, 'input_len': args.input_len,
+                  'output_len': args.output_len, 'concurrency': args.concurrency}
+        rows = select_rows(index, config, image=args.image)
+        title = (f"input={args.input_len}, output={args.output_len}, "
+                 f"concurrency={args.concurrency}, n={args.num_prompts}")
+        out_path = results_dir / "max_config_comparison.png"
+
+    if not args.no_plot:
+        suptitle = ('SGLang PD Disaggregation Benchmark\n'
+                    + ('Best' if args.best else 'Max Config') + ': ' + title)
+        plot_max_config(rows, suptitle, out_path, show_points=args.best)
+    # Also create a summary table
+    print_table(rows, f"BENCHMARK RESULTS: {title} (median over trials, * = noisy)")
+
+
+if __name__ == "__main__":
+    main()
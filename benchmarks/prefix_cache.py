@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Prefix-cache benefit per mode, from shared-prefix runs.
+
+Random prompts never share a prefix, so the radix cache never hits. Runs
+sent with load_generator.py --prefix-ratio R --prefix-len P --num-prefixes G
+start a fraction R of their prompts with one of G shared prefixes. Each such
+run records two hit ratios:
+
+    prefix_hit_ratio   share of prompt tokens that repeat a prefix already
+                       sent (what an unbounded cache could reuse)
+    cache_hit_ratio    share the server reported as cached_tokens
+
+Points are grouped by everything but the sharing ratio (mode, lengths,
+concurrency, P, G). Within a group, the run with the lowest ratio is the
+baseline:
+
+    ttft_gain   1 - mean TTFT / baseline mean TTFT
+    tput_gain   output throughput / baseline output throughput - 1
+
+For PD modes, 'retained' = PD ttft_gain / agg ttft_gain at the same point.
+Near 1, disaggregation keeps the cache locality the aggregated server
+gets; well below 1, it loses it. Prefill hits do not shrink the KV transfer,
+which still carries the whole prompt.
+
+Usage:
+    python3 benchmarks/prefix_cache.py                  # report
+    python3 benchmarks/prefix_cache.py --plot           # + results/prefix_cache.png
+    python3 benchmarks/prefix_cache.py --modes agg,pd_inter --csv prefix.csv
+"""
+
+import argparse
+import pathlib
+
+import numpy as np
+
+from results_store import aggregate_trials, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+MODES = ['agg', 'pd_intra', 'pd_inter']
+METRICS = ['mean_ttft_ms', 'p99_ttft_ms', 'output_throughput', 'mean_tpot_ms',
+           'prefix_hit_ratio', 'cache_hit_ratio']
+# A point is everything but the sharing ratio
+GROUP_KEYS = ['workload', 'num_prompts', 'input_len', 'output_len', 'concurrency',
+              'prefix_len', 'num_prefixes']
+
+# Agg TTFT gains below this are noise; 'retained' is not computed for them
+MIN_GAIN = 0.05
+
+# Groups drawn by --plot (most runs first)
+MAX_PLOT_GROUPS = 4
+
+
+def prefix_table(results_dir=RESULTS_DIR, modes=MODES):
+    """One row per shared-prefix point (median over trials) with gains."""
+    runs = load_table(results_dir=results_dir, modes=modes)
+    # Runs without load_generator's prefix fields cannot be placed
+    runs = runs[runs['prefix_ratio'].notna()]
+    if runs.empty:
+        return runs
+    keys = ['point', 'prefix_ratio'] + [k for k in GROUP_KEYS if k not in ('workload',)]
+    points = aggregate_trials(runs, METRICS, keys)
+    points['mode'] = points['mode'].astype(str)
+    # Keyed on the shared columns below; an empty workload would drop rows
+    points['workload'] = points['workload'].fillna('-')
+
+    group = ['mode'] + GROUP_KEYS
+    points = points.sort_values(group + ['prefix_ratio']).reset_index(drop=True)
+    base = points.groupby(group, sort=False)
+    points['ttft_gain'] = 1 - points['mean_ttft_ms'] / base['mean_ttft_ms'].transform('first')
+    points['tput_gain'] = (points['output_throughput']
+                           / base['output_throughput'].transform('first') - 1)
+
+    agg = points[points['mode'] == 'agg'].set_index(GROUP_KEYS + ['prefix_ratio'])['ttft_gain']
+    keyed = points.set_index(GROUP_KEYS + ['prefix_ratio']).index
+    agg_gain = agg.reindex(keyed).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retained = points['ttft_gain'].to_numpy() / agg_gain
+    points['retained'] = np.where((points['mode'] != 'agg') & (agg_gain >= MIN_GAIN),
+                                  retained, np.nan)
+    return points
+
+
+def format_table(points):
+    """Fixed-width report, one block per group."""
+    cols = ['mode', 'prefix_ratio', 'prefix_hit_ratio', 'cache_hit_ratio', 'mean_ttft_ms',
+            'p99_ttft_ms', 'output_throughput', 'ttft_gain', 'tput_gain', 'retained', 'trials']
+    names = {'prefix_ratio': 'shared', 'prefix_hit_ratio': 'offered_hit',
+             'cache_hit_ratio': 'cached_hit', 'mean_ttft_ms': 'ttft', 'p99_ttft_ms': 'p99_ttft',
+             'output_throughput': 'tok_s'}
+    percent = ['prefix_ratio', 'prefix_hit_ratio', 'cache_hit_ratio', 'ttft_gain',
+               'tput_gain', 'retained']
+    blocks = []
+    for key, rows in points.groupby(GROUP_KEYS, sort=True):
+        fields = dict(zip(GROUP_KEYS, key))
+        header = (f"n={fields['num_prompts']} in={fields['input_len']} "
+                  f"out={fields['output_len']} c={fields['concurrency']} "
+                  f"prefix={fields['prefix_len']} x{fields['num_prefixes']}")
+        if fields['workload'] not in ('-', 'random', 'shared-prefix'):
+            header += f" workload={fields['workload']}"
+        table = rows.sort_values(['mode', 'prefix_ratio'])[cols].copy()
+        for col in percent:
+            table[col] = table[col] * 100
+        table = table.rename(columns={c: f"{names.get(c, c)}_%" if c in percent else
+                                      names.get(c, c) for c in cols})
+        blocks.append(header + "\n" + table.to_string(
+            index=False, float_format=lambda v: f"{v:.1f}", na_rep='-'))
+    return "\n\n".join(blocks)
+
+
+def plot_prefix_cache(points, out_path):
+    """TTFT and throughput against offered hit ratio, one line per mode."""
+    import matplotlib.pyplot as plt
+    from plot_benchmarks import COLORS, get_mode_label
+
+    sizes = points.groupby(GROUP_KEYS, sort=False).size().sort_values(ascending=False)
+    groups = list(sizes.index[:MAX_PLOT_GROUPS])
+    fig, axes = plt.subplots(len(groups), 2, figsize=(14, 4.5 * len(groups)), squeeze=False)
+    fig.suptitle('Prefix Cache Benefit: TTFT and Throughput vs Cache-Hit Ratio',
+                 fontsize=14, fontweight='bold')
+    for row, key in zip(axes, groups):
+        fields = dict(zip(GROUP_KEYS, key))
+        rows = points.set_index(GROUP_KEYS).loc[key].reset_index()
+        for mode, series in rows.groupby('mode', sort=False):
+            series = series.sort_values('prefix_hit_ratio')
+            for ax, metric in zip(row, ['mean_ttft_ms', 'output_throughput']):
+                ax.plot(series['prefix_hit_ratio'] * 100, series[metric], 'o-',
+                        color=COLORS.get(mode), label=get_mode_label(mode), linewidth=2)
+        title = (f"in={fields['input_len']} out={fields['output_len']} "
+                 f"c={fields['concurrency']}, prefix {fields['prefix_len']} x"
+                 f"{fields['num_prefixes']}")
+        for ax, label in zip(row, ['Mean TTFT (ms)', 'Output Throughput (tok/s)']):
+            ax.set_title(title, fontsize=11)
+            ax.set_xlabel('Offered cache-hit ratio (% of prompt tokens)')
+            ax.set_ylabel(label)
+            ax.grid(alpha=0.3, linestyle='--')
+            ax.legend(fontsize=9)
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved prefix cache plot: {out_path}")
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefix-cache benefit per mode")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--csv", help="Also write the table to this CSV file")
+    parser.add_argument("--plot", action="store_true", help="Also write prefix_cache.png")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    points = prefix_table(results_dir, args.modes.split(","))
+    if points.empty:
+        raise SystemExit(f"No shared-prefix runs in {results_dir} "
+                         "(load_generator.py --prefix-ratio, sweep.py --prefix-ratios)")
+    print("Shared-prefix runs (median over trials; ttft in ms)")
+    print(format_table(points))
+    if args.csv:
+        points.to_csv(args.csv, index=False)
+        print(f"\nWrote {args.csv}")
+    if args.plot:
+        plot_prefix_cache(points, results_dir / "prefix_cache.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Adaptive search for the maximum sustainable load under TTFT/TPOT SLOs.
+
+Instead of walking a fixed concurrency grid, each (mode, input_len,
+output_len) is probed with load_generator.py:
+
+    1. Start at --start and multiply the load by --growth until a probe
+       misses the SLO (or --max-load is reached).
+    2. Bisect between the highest passing and lowest failing load until
+       they are within --tolerance of each other (or one concurrency step),
+       then stop.
+
+A probe passes when at least --attainment of its requests meet both
+TTFT <= --ttft-slo and TPOT <= --tpot-slo (see latency_analysis.py).
+
+Load is either the open-loop request rate (--search rate, req/s) or the
+closed-loop concurrency (--search concurrency). Every probe is a normal run
+(summary line + trace) tagged <mode>_search_n..._in..._out..._{rate,c}...,
+written to results/rate_search/probes/<search id>/ so the probes never pass
+for sweep points in results_store and repeated searches do not overwrite each
+other; the search itself is saved to results/rate_search/.
+
+Usage:
+    python3 benchmarks/rate_search.py run --mode pd_intra \\
+        --base-url http://127.0.0.1:8000 --input-len 512 --output-len 128 \\
+        --search rate --ttft-slo 200 --tpot-slo 50
+    python3 benchmarks/rate_search.py report
+"""
+
+import argparse
+import json
+import math
+import pathlib
+import time
+
+import numpy as np
+
+import load_generator
+from latency_analysis import TPOT_SLO_MS, TTFT_SLO_MS, request_tpot_ms, slo_mask
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SEARCH_DIRNAME = "rate_search"
+# Probe runs, kept out of the results dir that results_store reads
+PROBES_DIRNAME = "probes"
+
+
+def probe_tag(mode, search, load, num_prompts, input_len, output_len):
+    suffix = f"rate{load:g}" if search == "rate" else f"c{int(load)}"
+    return f"{mode}_search_n{num_prompts}_in{input_len}_out{output_len}_{suffix}"
+
+
+def probe_size(args, load):
+    """Number of requests for a probe at `load`."""
+    if args.search == "rate":
+        n = load * args.probe_seconds
+    else:
+        n = load * args.prompts_per_slot
+    return int(min(max(n, args.min_prompts), args.max_prompts))
+
+
+def search_id(args):
+    """Name of one search run, also the subdirectory holding its probes."""
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    return f"{args.mode}_in{args.input_len}_out{args.output_len}_{args.search}_{stamp}"
+
+
+def run_probe(args, load, out_dir):
+    """Run one probe into out_dir and judge it against the SLOs."""
+    num_prompts = probe_size(args, load)
+    tag = probe_tag(args.mode, args.search, load, num_prompts, args.input_len, args.output_len)
+    lg_args = load_generator.build_parser().parse_args([
+        "--base-url", args.base_url,
+        "--backend", args.backend,
+        "--num-prompts", str(num_prompts),
+        "--random-input-len", str(args.input_len),
+        "--random-output-len", str(args.output_len),
+        "--tag", tag,
+        "--output-file", str(pathlib.Path(out_dir) / f"{tag}.jsonl"),
+        "--seed", str(args.seed),
+    ])
+    if args.search == "rate":
+        lg_args.request_rate = load
+        lg_args.arrival = args.arrival
+    else:
+        lg_args.max_concurrency = int(load)
+
+    record, _, trace = load_generator.run(lg_args)
+    mask = slo_mask(trace, args.ttft_slo, args.tpot_slo)
+    attainment = float(mask.mean()) if len(mask) else 0.0
+    duration = record.get("duration") or float("nan")
+    ok = trace["success"]
+    tpot = request_tpot_ms(trace)[ok]
+    tpot = tpot[~np.isnan(tpot)]
+    return {
+        "load": load,
+        "tag": tag,
+        "num_prompts": num_prompts,
+        "attainment": attainment,
+        "passed": attainment >= args.attainment,
+        "output_throughput": record.get("output_throughput", 0.0),
+        "goodput_tok_s": float(trace["output_len"][mask].sum() / duration),
+        "p99_ttft_ms": float(np.percentile(trace["ttft_ms"][ok], 99)) if ok.any() else None,
+        "p99_tpot_ms": float(np.percentile(tpot, 99)) if len(tpot) else None,
+    }
+
+
+def bracketed(args, lo, hi):
+    if args.search == "concurrency":
+        return hi - lo <= 1 or hi <= lo * (1 + args.tolerance)
+    return hi <= lo * (1 + args.tolerance)
+
+
+def search(args, results_dir=RESULTS_DIR):
+    """Find the highest passing load. Returns the search summary dict."""
+    sid = search_id(args)
+    out_dir = probes_dir(results_dir) / sid
+    probes = []
+
+    def probe(load):
+        result = run_probe(args, load, out_dir)
+        probes.append(result)
+        verdict = "PASS" if result["passed"] else "FAIL"
+        print(f"[search] load={load:g}: {verdict} "
+              f"(attainment {result['attainment'] * 100:.1f}%, "
+              f"{result['output_throughput']:.0f} tok/s)")
+        return result["passed"]
+
+    lo = hi = None
+    load = args.start
+    # Grow until the first failure brackets the knee
+    while len(probes) < args.max_probes:
+        if probe(load):
+            lo = load
+            if load >= args.max_load:
+                break
+            load = min(load * args.growth, args.max_load)
+            if args.search == "concurrency":
+                load = max(int(load), int(lo) + 1)
+        else:
+            hi = load
+            break
+
+    # Bisect until the bracket is tight
+    while lo is not None and hi is not None and len(probes) < args.max_probes \
+            and not bracketed(args, lo, hi):
+        if args.search == "concurrency":
+            mid = (lo + hi) // 2
+        else:
+            mid = round(math.sqrt(lo * hi), 3)
+        if probe(mid):
+            lo = mid
+        else:
+            hi = mid
+
+    if lo is None:
+        status = "below_start"
+    elif hi is None:
+        status = "not_saturated"
+    else:
+        status = "bracketed" if bracketed(args, lo, hi) else "max_probes"
+    best = max((p for p in probes if p["passed"]), key=lambda p: p["load"], default=None)
+    return {
+        "search_id": sid,
+        "mode": args.mode,
+        "input_len": args.input_len,
+        "output_len": args.output_len,
+        "search": args.search,
+        "slo": {"ttft_ms": args.ttft_slo, "tpot_ms": args.tpot_slo,
+                "attainment": args.attainment},
+        "status": status,
+        "max_sustainable_load": lo,
+        "first_failing_load": hi,
+        "goodput_tok_s": best["goodput_tok_s"] if best else None,
+        "probes": probes,
+    }
+
+
+def probes_dir(results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / SEARCH_DIRNAME / PROBES_DIRNAME
+
+
+def search_path(results_dir, mode, input_len, output_len, kind):
+    return (pathlib.Path(results_dir) / SEARCH_DIRNAME /
+            f"{mode}_in{input_len}_out{output_len}_{kind}.json")
+
+
+def load_searches(results_dir=RESULTS_DIR):
+    root = pathlib.Path(results_dir) / SEARCH_DIRNAME
+    if not root.exists():
+        return []
+    return [json.loads(p.read_text()) for p in sorted(root.glob("*.json"))]
+
+
+def _fmt(value, spec="g"):
+    return f"{value:>10{spec}}" if value is not None else f"{'-':>10}"
+
+
+def print_report(searches):
+    print(f"{'Mode':<18} {'In':>6} {'Out':>6} {'Search':<12} {'Max load':>10} "
+          f"{'Fails at':>10} {'Goodput':>10} {'Probes':>7}  Status")
+    print("-" * 96)
+    for s in searches:
+        print(f"{s['mode']:<18} {s['input_len']:>6} {s['output_len']:>6} {s['search']:<12} "
+              f"{_fmt(s['max_sustainable_load'])} {_fmt(s['first_failing_load'])} "
+              f"{_fmt(s['goodput_tok_s'], '.0f')} {len(s['probes']):>7}  {s['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Max sustainable load under SLOs")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Search one (mode, input_len, output_len)")
+    p_run.add_argument("--mode", required=True,
+                       help="Tag prefix identifying the setup (agg, pd_intra, pd_1p4d, ...)")
+    p_run.add_argument("--base-url", default="http://127.0.0.1:30000")
+    p_run.add_argument("--backend", default="sglang", choices=["sglang", "openai"])
+    p_run.add_argument("--input-len", type=int, default=512)
+    p_run.add_argument("--output-len", type=int, default=128)
+    p_run.add_argument("--search", choices=["rate", "concurrency"], default="rate")
+    p_run.add_argument("--arrival", default="poisson", choices=["poisson", "constant"],
+                       help="Arrival process for rate probes")
+    p_run.add_argument("--ttft-slo", type=float, default=TTFT_SLO_MS, help="ms")
+    p_run.add_argument("--tpot-slo", type=float, default=TPOT_SLO_MS, help="ms")
+    p_run.add_argument("--attainment", type=float, default=0.9,
+                       help="Fraction of requests that must meet the SLOs")
+    p_run.add_argument("--start", type=float, default=1.0)
+    p_run.add_argument("--max-load", type=float, default=1024.0)
+    p_run.add_argument("--growth", type=float, default=2.0)
+    p_run.add_argument("--tolerance", type=float, default=0.1,
+                       help="Stop once failing/passing load <= 1 + tolerance")
+    p_run.add_argument("--max-probes", type=int, default=12)
+    p_run.add_argument("--probe-seconds", type=float, default=30.0,
+                       help="Rate probes send about rate * probe_seconds requests")
+    p_run.add_argument("--prompts-per-slot", type=int, default=4,
+                       help="Concurrency probes send concurrency * this many requests")
+    p_run.add_argument("--min-prompts", type=int, default=50)
+    p_run.add_argument("--max-prompts", type=int, default=2000)
+    p_run.add_argument("--seed", type=int, default=1)
+
+    sub.add_parser("report", help="Summarize saved searches")
+    args = parser.parse_args()
+    results_dir = pathlib.Path(args.results_dir)
+
+    if args.command == "report":
+        searches = load_searches(results_dir)
+        if not searches:
+            raise SystemExit(f"No searches in {results_dir / SEARCH_DIRNAME}")
+        print_report(searches)
+        return
+
+    if args.search == "concurrency":
+        args.start = max(1, int(args.start))
+    summary = search(args, results_dir)
+    path = search_path(results_dir, args.mode, args.input_len, args.output_len, args.search)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, indent=2) + "\n")
+    print()
+    print_report([summary])
+    print(f"\nSaved search: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Concurrent readiness probing for SGLang servers and routers.
+
+Replaces the `curl /health` every 5 s loops: all endpoints are probed at
+once, each with its own exponential backoff that starts at 50 ms and is
+capped below one second, so a server is noticed within a fraction of a
+second of becoming healthy.
+
+Usage:
+    from readiness import wait_ready
+    ready_s = wait_ready(["http://127.0.0.1:30000", "http://127.0.0.1:30001"])
+
+    python3 benchmarks/readiness.py http://127.0.0.1:30000 http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+INITIAL_DELAY_S = 0.05
+MAX_DELAY_S = 0.5
+BACKOFF = 1.5
+PROBE_TIMEOUT_S = 2.0
+
+
+async def _probe(session, url, path, deadline, start):
+    delay = INITIAL_DELAY_S
+    while True:
+        try:
+            async with session.get(url + path) as resp:
+                if resp.status == 200:
+                    return time.monotonic() - start
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            pass
+        if time.monotonic() + delay > deadline:
+            return None
+        await asyncio.sleep(delay)
+        delay = min(delay * BACKOFF, MAX_DELAY_S)
+
+
+async def wait_ready_async(urls, timeout=600, path="/health"):
+    """Probe every URL concurrently until healthy or `timeout` seconds pass.
+
+    Returns {url: seconds until healthy, or None if it never became ready}.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    client_timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT_S)
+    async with aiohttp.ClientSession(timeout=client_timeout) as session:
+        times = await asyncio.gather(*(_probe(session, url, path, deadline, start)
+                                       for url in urls))
+    return dict(zip(urls, times))
+
+
+def wait_ready(urls, timeout=600, path="/health"):
+    """Blocking wrapper around wait_ready_async."""
+    return asyncio.run(wait_ready_async(list(urls), timeout, path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait until servers are healthy")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    ready = wait_ready(args.urls, args.timeout, args.path)
+    for url, seconds in ready.items():
+        status = f"ready after {seconds:.2f}s" if seconds is not None else "NOT READY"
+        print(f"{url}: {status}")
+    if any(seconds is None for seconds in ready.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Statistical regression gate: candidate results vs a baseline.
+
+Single-run means move by several percent between identical runs, so eyeing
+two tables cannot tell an image upgrade's real effect from noise. This
+compares two result sets per (mode, config) with bootstrap confidence
+intervals and exits non-zero if any metric regressed significantly.
+
+For each config the per-request samples of all its runs are pooled (see
+request_traces.py) and resampled with replacement, independently for the
+baseline and the candidate:
+
+    output_throughput  sum(output tokens) / sum(E2E) over the resample,
+                       which scales the measured throughput
+    mean_ttft_ms       mean TTFT
+    p99_ttft_ms        99th percentile TTFT
+    mean_tpot_ms       mean per-request TPOT
+
+Configs without traces on both sides fall back to resampling the per-run
+summary values. That needs at least MIN_RUNS runs of the config on each
+side: the bootstrap of a handful of runs has only a few distinct resamples
+and its interval is far too narrow.
+
+A metric regresses when the whole confidence interval of the relative
+change lies on the bad side and the point change exceeds --threshold.
+p99 is only judged with at least MIN_TAIL_SAMPLES requests beyond it on
+each side. Below that its bootstrap interval is far too narrow.
+
+The gate does not pass on missing evidence: it exits with
+EXIT_UNJUDGED if no metric got a verdict, or if a config present on both
+sides could not be judged (too few runs, requests or samples), unless
+--allow-unjudged is given. A significant regression exits with 1.
+
+Usage:
+    python3 benchmarks/regression_gate.py --baseline-dir results_v0.5 \\
+        --candidate-dir benchmarks/results
+    python3 benchmarks/regression_gate.py --baseline-pattern 'agg_*' \\
+        --candidate-pattern 'agg_newimg_*' --threshold 3 --confidence 0.99
+"""
+
+import argparse
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from latency_analysis import GROUPINGS, request_tpot_ms
+from request_traces import load_trace
+from results_store import MODES, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# metric -> True if higher is better
+METRICS = {
+    'output_throughput': True,
+    'mean_ttft_ms': False,
+    'p99_ttft_ms': False,
+    'mean_tpot_ms': False,
+}
+
+# The prompt count changes the warm-up and tail share of a run's summary
+CONFIG_KEYS = GROUPINGS['config'] + ['num_prompts']
+
+N_BOOT = 2000
+# The bootstrap of a tail percentile is only trustworthy with enough samples
+# beyond it (10 per side means 1000 requests for p99)
+MIN_TAIL_SAMPLES = 10
+# Runs per side needed to bootstrap the per-run summary values
+MIN_RUNS = 5
+# Bootstrap resamples drawn per chunk, bounding memory to chunk x samples
+CHUNK = 256
+
+# Verdicts of metrics that were actually compared
+JUDGED = {'REGRESSION', 'improved', 'ok'}
+# Exit status when the evidence does not support a verdict
+EXIT_UNJUDGED = 3
+
+
+# ===== Samples =====
+
+def request_arrays(traces):
+    """Pooled per-request samples of successful requests.
+
+    Returns {metric: 2-D array} with one row per sample; throughput rows are
+    (output tokens, E2E ms) pairs.
+    """
+    ok = [t['success'] for t in traces]
+    ttft = np.concatenate([np.asarray(t['ttft_ms'], np.float64)[m] for t, m in zip(traces, ok)])
+    tpot = np.concatenate([request_tpot_ms(t)[m] for t, m in zip(traces, ok)])
+    out = np.concatenate([np.asarray(t['output_len'], np.float64)[m] for t, m in zip(traces, ok)])
+    e2e = np.concatenate([np.asarray(t['e2e_ms'], np.float64)[m] for t, m in zip(traces, ok)])
+    return {
+        'output_throughput': np.column_stack([out, e2e]),
+        'mean_ttft_ms': ttft[:, None],
+        'p99_ttft_ms': ttft[:, None],
+        'mean_tpot_ms': tpot[~np.isnan(tpot)][:, None],
+    }
+
+
+def request_statistic(metric, samples):
+    """Vectorized statistic over the last-but-one axis of (..., n, k) samples."""
+    if metric == 'output_throughput':
+        return samples[..., 0].sum(-1) / samples[..., 1].sum(-1)
+    if metric == 'p99_ttft_ms':
+        return np.percentile(samples[..., 0], 99, axis=-1)
+    return samples[..., 0].mean(-1)
+
+
+def run_statistic(metric, samples):
+    return samples[..., 0].mean(-1)
+
+
+def bootstrap(samples, statistic, n_boot, rng):
+    """Point estimate and n_boot bootstrap replicates of statistic(samples)."""
+    n = len(samples)
+    point = statistic(samples)
+    replicates = np.empty(n_boot)
+    for start in range(0, n_boot, CHUNK):
+        size = min(CHUNK, n_boot - start)
+        idx = rng.integers(0, n, size=(size, n))
+        replicates[start:start + size] = statistic(samples[idx])
+    return point, replicates
+
+
+def group_traces(group, results_dir):
+    """Traces of every run in a group, or None if any run has none."""
+    traces = [load_trace(tag, results_dir) for tag in group['tag']]
+    return traces if all(t is not None for t in traces) else None
+
+
+def run_samples(group):
+    """Per-run summary values, one sample per run."""
+    return {m: group[m].dropna().to_numpy(np.float64)[:, None] for m in METRICS}
+
+
+# ===== Comparison =====
+
+def compare_metric(metric, base, cand, base_group, cand_group, kind, n_boot, rng,
+                   confidence):
+    """Relative change (candidate / baseline - 1) with a bootstrap CI."""
+    statistic = request_statistic if kind == 'requests' else run_statistic
+    b_point, b_boot = bootstrap(base, lambda s: statistic(metric, s), n_boot, rng)
+    c_point, c_boot = bootstrap(cand, lambda s: statistic(metric, s), n_boot, rng)
+    if kind == 'requests' and metric == 'output_throughput':
+        # The token-rate ratio only sets the relative spread; report the
+        # measured throughput
+        b_scale = base_group['output_throughput'].median() / b_point
+        c_scale = cand_group['output_throughput'].median() / c_point
+        b_point, b_boot = b_point * b_scale, b_boot * b_scale
+        c_point, c_boot = c_point * c_scale, c_boot * c_scale
+    change = c_boot / b_boot - 1
+    alpha = (1 - confidence) / 2
+    low, high = np.percentile(change, [100 * alpha, 100 * (1 - alpha)])
+    return {'baseline': b_point, 'candidate': c_point, 'change': c_point / b_point - 1,
+            'ci_low': low, 'ci_high': high}
+
+
+def verdict(metric, row, threshold):
+    higher_better = METRICS[metric]
+    worse = -row['change'] if higher_better else row['change']
+    bad_low, bad_high = ((-row['ci_high'], -row['ci_low']) if higher_better
+                         else (row['ci_low'], row['ci_high']))
+    if bad_low > 0 and worse >= threshold:
+        return 'REGRESSION'
+    if bad_high < 0 and -worse >= threshold:
+        return 'improved'
+    return 'ok'
+
+
+def config_groups(table):
+    """{config key: runs}; missing key values become '-' so that the keys of
+    both sides compare equal (NaN != NaN)."""
+    return {tuple('-' if pd.isna(v) else v for v in key): group
+            for key, group in table.groupby(CONFIG_KEYS, observed=True, dropna=False)}
+
+
+def compare(baseline, candidate, baseline_dir, candidate_dir, threshold=0.05,
+            confidence=0.95, n_boot=N_BOOT, seed=0):
+    """Compare two run tables config by config.
+
+    Args:
+        baseline, candidate: DataFrames from results_store.load_table
+        threshold: Minimum relative change that counts (0.05 = 5%)
+    Returns:
+        DataFrame, one row per (config, metric), with baseline, candidate,
+        change, ci_low, ci_high, source and verdict
+    """
+    rng = np.random.default_rng(seed)
+    base_groups = config_groups(baseline)
+    cand_groups = config_groups(candidate)
+    rows = []
+    for key in sorted(set(base_groups) | set(cand_groups), key=str):
+        config = dict(zip(CONFIG_KEYS, key))
+        if key not in base_groups or key not in cand_groups:
+            rows.append({**config, 'metric': '-',
+                         'verdict': 'baseline only' if key in base_groups else 'candidate only'})
+            continue
+        b_group, c_group = base_groups[key], cand_groups[key]
+        b_traces = group_traces(b_group, baseline_dir)
+        c_traces = group_traces(c_group, candidate_dir)
+        # Both sides must be measured the same way
+        if b_traces is not None and c_traces is not None:
+            kind, b_samples, c_samples = ('requests', request_arrays(b_traces),
+                                          request_arrays(c_traces))
+        else:
+            kind, b_samples, c_samples = 'runs', run_samples(b_group), run_samples(c_group)
+        for metric in METRICS:
+            base, cand = b_samples[metric], c_samples[metric]
+            row = {**config, 'metric': metric, 'source': kind,
+                   'n_base': len(base), 'n_cand': len(cand)}
+            if kind == 'runs' and min(len(base), len(cand)) < MIN_RUNS:
+                row['verdict'] = 'too few runs'
+            elif (kind == 'requests' and metric == 'p99_ttft_ms'
+                  and min(len(base), len(cand)) * 0.01 < MIN_TAIL_SAMPLES):
+                row['verdict'] = 'too few requests'
+            elif min(len(base), len(cand)) == 0:
+                row['verdict'] = 'no samples'
+            else:
+                row.update(compare_metric(metric, base, cand, b_group, c_group, kind,
+                                          n_boot, rng, confidence))
+                row['verdict'] = verdict(metric, row, threshold)
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def format_report(report):
+    shown = report.copy()
+    # Keys beyond the layout and lengths are named only where configs differ
+    extra = [k for k in CONFIG_KEYS[6:] if shown[k].nunique(dropna=False) > 1]
+    shown['config'] = shown.apply(
+        lambda r: (f"{r['mode']} {int(r['num_prefills'])}p{int(r['num_decoders'])}d "
+                   f"in{int(r['input_len'])} out{int(r['output_len'])} c{int(r['concurrency'])}"
+                   + "".join(f" {k}={r[k]}" for k in extra)),
+        axis=1)
+    for col in ['change', 'ci_low', 'ci_high']:
+        if col not in shown:
+            shown[col] = np.nan
+        shown[col] = shown[col] * 100
+    cols = ['config', 'metric', 'baseline', 'candidate', 'change', 'ci_low', 'ci_high',
+            'source', 'verdict']
+    shown = shown.reindex(columns=cols).rename(
+        columns={'change': 'change_%', 'ci_low': 'ci_low_%', 'ci_high': 'ci_high_%'})
+    return shown.to_string(index=False, float_format=lambda v: f"{v:.2f}", na_rep='-')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap regression gate: candidate vs baseline")
+    parser.add_argument("--baseline-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--candidate-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--baseline-pattern", default="*.jsonl")
+    parser.add_argument("--candidate-pattern", default="*.jsonl")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--threshold", type=float, default=5.0,
+                        help="Minimum relative change in percent that can fail the gate")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--n-boot", type=int, default=N_BOOT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="Also write the full report here")
+    parser.add_argument("--allow-unjudged", action="store_true",
+                        help="Pass even if no metric or only some of the shared configs "
+                             "could be judged")
+    args = parser.parse_args(argv)
+
+    baseline_dir = pathlib.Path(args.baseline_dir)
+    candidate_dir = pathlib.Path(args.candidate_dir)
+    if baseline_dir == candidate_dir and args.baseline_pattern == args.candidate_pattern:
+        parser.error("baseline and candidate select the same runs")
+    modes = args.modes.split(",")
+    baseline = load_table(args.baseline_pattern, baseline_dir, modes)
+    candidate = load_table(args.candidate_pattern, candidate_dir, modes)
+    if baseline.empty or candidate.empty:
+        raise SystemExit("No runs found for the baseline or the candidate")
+
+    report = compare(baseline, candidate, baseline_dir, candidate_dir,
+                     args.threshold / 100, args.confidence, args.n_boot, args.seed)
+    print(f"Baseline: {len(baseline)} run(s) from {baseline_dir}/{args.baseline_pattern}")
+    print(f"Candidate: {len(candidate)} run(s) from {candidate_dir}/{args.candidate_pattern}")
+    print(f"{args.confidence:.0%} bootstrap CIs, threshold {args.threshold:g}%\n")
+    print(format_report(report))
+    if args.csv:
+        report.to_csv(args.csv, index=False)
+
+    regressions = report[report['verdict'] == 'REGRESSION']
+    if len(regressions):
+        print(f"\nFAIL: {len(regressions)} significant regression(s)")
+        raise SystemExit(1)
+    judged = report['verdict'].isin(JUDGED)
+    shared = report['metric'] != '-'
+    unjudged = report[shared & ~judged]
+    if not args.allow_unjudged and (not judged.any() or len(unjudged)):
+        print(f"\nFAIL: {judged.sum()} metric(s) judged, {len(unjudged)} metric(s) of configs "
+              "on both sides could not be judged (--allow-unjudged to accept)")
+        raise SystemExit(EXIT_UNJUDGED)
+    print("\nPASS: no significant regression")
+
+
+if __name__ == "__main__":
+    main()
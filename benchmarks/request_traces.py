@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Per-request latency traces stored as .npy arrays next to the summaries.
+
+Summary records only keep a few aggregates (mean/median/p99 TTFT, p95 ITL,
+...). Traces keep the per-request data so any percentile or CDF can be
+computed later without rerunning on GPUs:
+
+    results/traces/<tag>/
+        meta.json          tag, request count, source
+        input_len.npy      int32   [n]
+        output_len.npy     int32   [n]
+        success.npy        bool    [n]
+        ttft_ms.npy        float32 [n]
+        e2e_ms.npy         float32 [n]
+        itl_ms.npy         float32 [total ITL samples], flattened
+        itl_offsets.npy    int64   [n + 1], request i owns itl_ms[o[i]:o[i+1]]
+    Written by load_generator.py only:
+        send_s.npy         float64 [n]  send time from run start
+        token_s.npy        float64 [total tokens], flattened arrival times
+        token_offsets.npy  int64   [n + 1]
+
+load_trace() memory-maps the arrays, so percentiles over millions of ITL
+samples never go through Python lists.
+
+bench_serving runs with --output-details embed per-request lists in the
+JSONL record; `extract` moves them into a trace and strips them from the
+record.
+
+Usage:
+    from request_traces import load_trace, trace_percentiles
+    trace = load_trace("pd_intra_n100_in512_out128_c32")
+    trace_percentiles(trace, "ttft_ms", [50, 90, 99.9])
+
+    python3 benchmarks/request_traces.py extract     # after bench_serving sweeps
+    python3 benchmarks/request_traces.py list
+    python3 benchmarks/request_traces.py show <tag>
+"""
+
+import argparse
+import json
+import os
+import pathlib
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+TRACES_DIRNAME = "traces"
+
+# Per-request lists bench_serving adds with --output-details
+DETAIL_KEYS = ["input_lens", "output_lens", "ttfts", "itls", "generated_texts", "errors"]
+
+
+def trace_dir(tag, results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / TRACES_DIRNAME / tag
+
+
+def _offsets(lists):
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(x) for x in lists], out=offsets[1:])
+    return offsets
+
+
+def _flatten(lists, dtype):
+    if not lists:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate([np.asarray(x, dtype=dtype) for x in lists])
+
+
+def write_trace(tag, arrays, results_dir=RESULTS_DIR, source="unknown"):
+    """Write a dict of arrays as a trace, replacing any previous one."""
+    out = trace_dir(tag, results_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        tmp_path = out / f".{name}.tmp.npy"
+        np.save(tmp_path, array)
+        os.replace(tmp_path, out / f"{name}.npy")
+    meta = {"tag": tag, "num_requests": int(len(arrays["ttft_ms"])), "source": source,
+            "arrays": sorted(arrays)}
+    (out / "meta.json").write_text(json.dumps(meta, indent=2) + "\n")
+    return out
+
+
+def from_bench_details(rec):
+    """Trace arrays from a bench_serving record written with --output-details."""
+    ttft_s = np.asarray(rec["ttfts"], dtype=np.float64)
+    itls_s = [x or [] for x in rec["itls"]]
+    errors = rec.get("errors") or [""] * len(ttft_s)
+    itl_s = _flatten(itls_s, np.float64)
+    offsets = _offsets(itls_s)
+    # bench_serving has no per-request E2E; TTFT + sum(ITL) is the same interval
+    cumsum = np.concatenate([[0.0], np.cumsum(itl_s)])
+    itl_sums = cumsum[offsets[1:]] - cumsum[offsets[:-1]]
+    return {
+        "input_len": np.asarray(rec["input_lens"], dtype=np.int32),
+        "output_len": np.asarray(rec["output_lens"], dtype=np.int32),
+        "success": np.array([not e for e in errors], dtype=bool),
+        "ttft_ms": (ttft_s * 1000).astype(np.float32),
+        "e2e_ms": ((ttft_s + itl_sums) * 1000).astype(np.float32),
+        "itl_ms": (itl_s * 1000).astype(np.float32),
+        "itl_offsets": offsets,
+    }
+
+
+def from_request_results(results):
+    """Trace arrays from load_generator per-request results."""
+    token_times = [r.get("token_times") or [] for r in results]
+    send = np.array([r.get("send_time", np.nan) for r in results], dtype=np.float64)
+    first = np.array([t[0] if t else np.nan for t in token_times], dtype=np.float64)
+    finish = np.array([t[-1] if t else np.nan for t in token_times], dtype=np.float64)
+    itls = [np.diff(t) for t in token_times]
+    return {
+        "input_len": np.array([r["input_len"] for r in results], dtype=np.int32),
+        "output_len": np.array([r["output_len"] for r in results], dtype=np.int32),
+        "success": np.array([r["success"] for r in results], dtype=bool),
+        "ttft_ms": ((first - send) * 1000).astype(np.float32),
+        "e2e_ms": ((finish - send) * 1000).astype(np.float32),
+        "itl_ms": (_flatten(itls, np.float64) * 1000).astype(np.float32),
+        "itl_offsets": _offsets(itls),
+        "send_s": send,
+        "token_s": _flatten(token_times, np.float64),
+        "token_offsets": _offsets(token_times),
+    }
+
+
+def load_trace(tag, results_dir=RESULTS_DIR, mmap=True):
+    """Load a trace as {name: array}, memory-mapped by default.
+
+    Returns None if the run has no trace.
+    """
+    path = trace_dir(tag, results_dir)
+    if not (path / "meta.json").exists():
+        return None
+    mode = "r" if mmap else None
+    return {p.stem: np.load(p, mmap_mode=mode) for p in path.glob("*.npy")
+            if not p.name.startswith(".")}
+
+
+def list_traces(results_dir=RESULTS_DIR):
+    root = pathlib.Path(results_dir) / TRACES_DIRNAME
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if (p / "meta.json").exists())
+
+
+def trace_percentiles(trace, field, percentiles):
+    """Percentiles of a per-request field over successful requests.
+
+    Args:
+        trace: Dict returned by load_trace
+        field: "ttft_ms", "e2e_ms", "itl_ms" (all samples) or "output_len"
+        percentiles: Iterable of percentiles in [0, 100]
+    """
+    values = trace[field]
+    if field != "itl_ms":
+        values = values[trace["success"]]
+    if len(values) == 0:
+        return np.full(len(list(percentiles)), np.nan)
+    return np.percentile(values, list(percentiles))
+
+
+def extract_file(path, results_dir=RESULTS_DIR, dry_run=False):
+    """Move --output-details lists from one JSONL file into traces.
+
+    Returns the tags that were extracted.
+    """
+    path = pathlib.Path(path)
+    lines = []
+    tags = []
+    with path.open() as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            if rec.get("ttfts") is not None and rec.get("itls") is not None:
+                tag = rec.get("tag") or path.stem
+                if not dry_run:
+                    write_trace(tag, from_bench_details(rec), results_dir, source="bench_serving")
+                for key in DETAIL_KEYS:
+                    rec.pop(key, None)
+                rec["trace"] = f"{TRACES_DIRNAME}/{tag}"
+                tags.append(tag)
+            lines.append(json.dumps(rec))
+    if tags and not dry_run:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+    return tags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request latency traces")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_extract = sub.add_parser("extract", help="Move --output-details lists into traces")
+    p_extract.add_argument("--dry-run", action="store_true")
+    sub.add_parser("list", help="List runs with traces")
+    p_show = sub.add_parser("show", help="Percentiles of one trace")
+    p_show.add_argument("tag")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+
+    if args.command == "extract":
+        total = 0
+        for path in sorted(results_dir.glob("*.jsonl")):
+            tags = extract_file(path, results_dir, dry_run=args.dry_run)
+            for tag in tags:
+                print(f"  {tag}")
+            total += len(tags)
+        print(f"{'Would extract' if args.dry_run else 'Extracted'} {total} trace(s)")
+        return
+
+    if args.command == "list":
+        for tag in list_traces(results_dir):
+            meta = json.loads((trace_dir(tag, results_dir) / "meta.json").read_text())
+            print(f"{tag:<50} {meta['num_requests']:>7} requests  ({meta['source']})")
+        return
+
+    trace = load_trace(args.tag, results_dir)
+    if trace is None:
+        raise SystemExit(f"No trace for {args.tag}")
+    percentiles = [50, 90, 99, 99.9]
+    print(f"{args.tag}: {int(trace['success'].sum())}/{len(trace['success'])} succeeded")
+    print(f"{'':<12}" + "".join(f"{'p' + str(p):>10}" for p in percentiles))
+    for field in ("ttft_ms", "e2e_ms", "itl_ms"):
+        values = trace_percentiles(trace, field, percentiles)
+        print(f"{field:<12}" + "".join(f"{v:>10.1f}" for v in values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Indexed queries over the results table.
+
+The results_store table is re-keyed on INDEX_KEYS as a sorted MultiIndex, so
+lookups by any prefix of those keys are binary searches rather than scans,
+and metric constraints are applied to the few matching rows only:
+
+    index = load_index()
+    query(index, mode='agg', input_len=512, output_len=128)
+    query(index, mode=['pd_intra', 'pd_inter'], where='p99_ttft_ms < 200')
+    best(query(index, input_len=512, output_len=128), by=['mode'])
+    best(query(index, where='p99_ttft_ms < 200'))     # max-throughput config
+
+Key values may be scalars, lists or slice(lo, hi) (inclusive). With
+points=True, repeated trials are first reduced to their median (see
+results_store.aggregate_trials).
+
+Usage:
+    python3 benchmarks/results_index.py --mode agg --input-len 512 --output-len 128
+    python3 benchmarks/results_index.py --where 'p99_ttft_ms < 200' --best --by mode
+    python3 benchmarks/results_index.py --concurrency 32:128 --points --metric mean_ttft_ms --lowest
+    python3 benchmarks/results_index.py --workload chat --points --best --by mode
+    python3 benchmarks/results_index.py --mode pd_1pxd --num-prefills 2 --points --best --by num_decoders
+    python3 benchmarks/results_index.py --where 'prefill_chunked_prefill_size == 4096' \
+        --points --best --by mode,decode_page_size
+"""
+
+import argparse
+import pathlib
+import time
+
+import pandas as pd
+
+from results_store import MODES, aggregate_trials, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+INDEX_KEYS = ['mode', 'num_prompts', 'input_len', 'output_len', 'concurrency',
+              'num_prefills', 'num_decoders', 'workload', 'image']
+
+# Columns shown by the CLI
+SHOW = ['tag', 'output_throughput', 'mean_ttft_ms', 'p99_ttft_ms', 'mean_tpot_ms',
+        'mean_e2e_latency_ms', 'p99_e2e_latency_ms']
+POINT_METRICS = SHOW[1:]
+
+
+def build_index(table):
+    """Key a results_store table on INDEX_KEYS (sorted, so lookups bisect)."""
+    table = table.assign(mode=table['mode'].astype(str), image=table['image'].fillna('-'),
+                         workload=table['workload'].fillna('-'))
+    return table.set_index(INDEX_KEYS).sort_index()
+
+
+def load_index(results_dir=RESULTS_DIR, pattern="*.jsonl", warmup=False):
+    return build_index(load_table(pattern, results_dir=results_dir, warmup=warmup))
+
+
+def query(index, where=None, points=False, **keys):
+    """Rows matching the key values and an optional metric expression.
+
+    Args:
+        index: Frame from build_index/load_index
+        where: pandas query string over metric columns, e.g. 'p99_ttft_ms < 200'
+        points: Reduce repeated trials to their median first
+        keys: INDEX_KEYS values (scalar, list or inclusive slice)
+    Returns:
+        DataFrame with the index keys as ordinary columns
+    """
+    unknown = set(keys) - set(INDEX_KEYS)
+    if unknown:
+        raise KeyError(f"not an index key: {', '.join(sorted(unknown))}")
+    selector = []
+    for level, key in zip(index.index.levels, INDEX_KEYS):
+        value = keys.get(key, slice(None))
+        if isinstance(value, (list, tuple, set)):
+            # .loc raises if any listed value is absent from the level
+            value = [v for v in value if v in level]
+            if not value:
+                return index.iloc[:0].reset_index()
+        selector.append(value)
+    try:
+        rows = index.loc[tuple(selector), :]
+    except KeyError:
+        rows = index.iloc[:0]
+    rows = rows.reset_index()
+    if points and not rows.empty:
+        rows = aggregate_trials(rows, POINT_METRICS, INDEX_KEYS + ['point'])
+        rows['tag'] = rows['point']
+    if where:
+        rows = rows.query(where)
+    return rows.reset_index(drop=True)
+
+
+def best(rows, metric='output_throughput', by=None, highest=True):
+    """Best row overall, or per group of the `by` columns."""
+    rows = rows.dropna(subset=[metric])
+    if rows.empty:
+        return rows
+    if not by:
+        pick = rows[metric].idxmax() if highest else rows[metric].idxmin()
+        return rows.loc[[pick]].reset_index(drop=True)
+    grouped = rows.groupby(list(by), sort=True)[metric]
+    picks = grouped.idxmax() if highest else grouped.idxmin()
+    return rows.loc[picks.to_numpy()].reset_index(drop=True)
+
+
+def key_value(text):
+    """CLI key value: 512, 128,512 (list) or 32:128 (inclusive range)."""
+    def num(v):
+        return int(v) if v.lstrip('-').isdigit() else v
+    if ':' in text:
+        lo, hi = text.split(':')
+        return slice(num(lo) if lo else None, num(hi) if hi else None)
+    values = [num(v) for v in text.split(',')]
+    return values if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the indexed results table")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    for key in INDEX_KEYS:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=key_value,
+                            help="value, v1,v2 or lo:hi" if key != 'mode' else
+                            f"one or more of {','.join(MODES)}")
+    parser.add_argument("--where", help="Metric constraint, e.g. 'p99_ttft_ms < 200'")
+    parser.add_argument("--points", action="store_true", help="Median over trials per point")
+    parser.add_argument("--best", action="store_true", help="Only the best row (per --by group)")
+    parser.add_argument("--lowest", action="store_true", help="Best means lowest --metric")
+    parser.add_argument("--metric", default="output_throughput")
+    parser.add_argument("--by", help="Comma-separated columns for --best, e.g. mode")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = load_index(args.results_dir)
+    loaded = time.perf_counter()
+    keys = {k: getattr(args, k) for k in INDEX_KEYS if getattr(args, k) is not None}
+    rows = query(index, args.where, args.points, **keys)
+    if args.best or args.lowest:
+        rows = best(rows, args.metric, args.by.split(",") if args.by else None,
+                    highest=not args.lowest)
+    done = time.perf_counter()
+
+    cols = INDEX_KEYS + [c for c in SHOW if c != args.metric] + [args.metric]
+    if args.points:
+        cols += ['trials', 'noisy']
+    with pd.option_context('display.width', 250, 'display.max_columns', None):
+        print(rows[cols].to_string(index=False, float_format=lambda v: f"{v:.2f}")
+              if not rows.empty else "No matching runs")
+    print(f"\n{len(rows)} row(s) of {len(index)}; load {1000 * (loaded - start):.1f} ms, "
+          f"query {1000 * (done - loaded):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
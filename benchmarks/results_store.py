@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Result ingestion engine shared by all plot scripts.
+
+Every JSONL record written by bench_serving carries a ~50 KB server_info
+blob next to a few dozen summary scalars. This module parses the records
+once, maps every tag family onto one typed schema (see SCHEMA) and keeps the
+resulting table in a pickled pandas DataFrame (`.results_cache.pkl`). Only
+files whose (mtime, size) changed since the last load are parsed again, and
+large batches are parsed in a process pool.
+
+Tag families:
+    agg_nN_inI_outO_cC          Aggregated server
+    pd_intra_nN_inI_outO_cC     Intra-node PD (same GH200)
+    pd_inter_nN_inI_outO_cC     Inter-node PD (GH200 -> A100)
+    pd_[inter_]1pXd_nN_...      1PxD (GH200 prefill -> X A100 decoders)
+Free-form tags (agg_local, pd_inter_node, ...) fall back to the record's
+own num_prompts / random_*_len / max_concurrency fields.
+
+Runs replaying a workload (workloads.py) end in _wl-<name>; 'workload' is
+that name, else the record's 'workload' or 'dataset_name' ("random",
+"trace", ...), so runs can be grouped by what was sent.
+
+Repeated trials of one sweep point append to the same file, one line each,
+tagged <tag>_t<k> (measured) or <tag>_w<k> (warmup, discarded by default).
+'point' is the tag without that suffix. aggregate_trials() reduces the
+trials of each point to median, min/max and coefficient of variation.
+
+'image' identifies the server build: the record's own 'image' field if the
+sweep wrote one, else the SGLang version from server_info ("P:<v>/D:<v>"
+when prefill and decode servers differ).
+
+The scheduler knobs of SERVER_KNOBS are read from server_info per role:
+prefill_<knob> and decode_<knob> (an aggregated server fills both, a
+router's record the first server of each role). Sweeps over server_args
+(experiment/sweep.py) mark their points with _srv-<settings>, so runs that
+differ only in server settings stay separate points.
+
+Usage:
+    from results_store import load_table
+    df = load_table()                   # one row per JSONL record
+    df = load_table("pd_*p*d_*.jsonl")
+    points = aggregate_trials(df, ['output_throughput', 'mean_ttft_ms'])
+
+    python3 benchmarks/results_store.py            # refresh + print stats
+    python3 benchmarks/results_store.py --rebuild  # drop cache and re-ingest
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import pathlib
+import pickle
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from server_configs import flatten, get_config, load_index, record_config
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+CACHE_NAME = ".results_cache.pkl"
+
+# Bump whenever SCHEMA or the parsing rules change
+CACHE_VERSION = 9
+
+# Below this many changed files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+MODES = ['agg', 'pd_intra', 'pd_inter', 'pd_1pxd']
+
+# Scheduler knobs swept per role (scripts/00_common.sh server_knob_args)
+SERVER_KNOBS = {
+    'chunked_prefill_size': 'float64',
+    'max_prefill_tokens': 'float64',
+    'schedule_policy': 'object',
+    'page_size': 'float64',
+    'mem_fraction_static': 'float64',
+}
+KNOB_ROLES = ['prefill', 'decode']
+KNOB_COLUMNS = [f'{role}_{knob}' for role in KNOB_ROLES for knob in SERVER_KNOBS]
+
+# Column -> dtype. Metric columns keep bench_serving's field names.
+SCHEMA = {
+    # Identity
+    'tag': 'object',
+    'file': 'object',
+    'line': 'int32',
+    'server_config': 'object',
+    'point': 'object',
+    'trial': 'int16',
+    'warmup': 'bool',
+    'image': 'object',
+    # Parsed from tag (or record fallback)
+    'mode': pd.CategoricalDtype(MODES),
+    'num_prefills': 'int16',
+    'num_decoders': 'int16',
+    'num_prompts': 'int32',
+    'input_len': 'int32',
+    'output_len': 'int32',
+    'concurrency': 'int32',
+    'workload': 'object',
+    # Run description
+    'backend': 'object',
+    'dataset_name': 'object',
+    'request_rate': 'float64',
+    'duration': 'float64',
+    'completed': 'float64',
+    'total_input_tokens': 'float64',
+    'total_output_tokens': 'float64',
+    # Shared-prefix runs (load_generator.py --prefix-ratio)
+    'prefix_ratio': 'float64',
+    'prefix_len': 'int32',
+    'num_prefixes': 'int32',
+    'prefix_hit_ratio': 'float64',
+    'cache_hit_ratio': 'float64',
+    # Throughput
+    'request_throughput': 'float64',
+    'input_throughput': 'float64',
+    'output_throughput': 'float64',
+    'total_throughput': 'float64',
+    # Latency
+    'mean_e2e_latency_ms': 'float64',
+    'median_e2e_latency_ms': 'float64',
+    'std_e2e_latency_ms': 'float64',
+    'p99_e2e_latency_ms': 'float64',
+    'mean_ttft_ms': 'float64',
+    'median_ttft_ms': 'float64',
+    'std_ttft_ms': 'float64',
+    'p99_ttft_ms': 'float64',
+    'mean_tpot_ms': 'float64',
+    'median_tpot_ms': 'float64',
+    'std_tpot_ms': 'float64',
+    'p99_tpot_ms': 'float64',
+    'mean_itl_ms': 'float64',
+    'median_itl_ms': 'float64',
+    'std_itl_ms': 'float64',
+    'p95_itl_ms': 'float64',
+    'p99_itl_ms': 'float64',
+    # Server knobs per role (from server_info)
+    **{f'{role}_{knob}': dtype for role in KNOB_ROLES for knob, dtype in SERVER_KNOBS.items()},
+}
+
+# Format: <prefix>_nN_inI_outO_cC (run_sweep.sh writes _concC)
+SWEEP_TAG_RE = re.compile(
+    r'^(?P<prefix>\w+?)_n(?P<n>\d+)_in(?P<inp>\d+)_out(?P<out>\d+)_c(?:onc)?(?P<c>\d+)'
+)
+LAYOUT_RE = re.compile(r'(?:^|_)(\d+)p(\d+)d(?:_|$)')
+# Trial suffix added by the sweeps when a point runs more than once
+TRIAL_RE = re.compile(r'_(?P<kind>[tw])(?P<k>\d+)$')
+# Workload suffix of the point (see workloads.NAME_RE)
+WORKLOAD_RE = re.compile(r'_wl-(?P<name>[A-Za-z0-9][A-Za-z0-9.-]*)$')
+# Server settings of a server_args sweep point (see experiment/sweep.py)
+SERVER_ARGS_RE = re.compile(r'_srv-[A-Za-z0-9.-]+')
+
+# Trials whose coefficient of variation exceeds this are flagged as noisy
+CV_THRESHOLD = 0.05
+
+
+def classify_mode(prefix):
+    """Map a tag (or tag prefix) to (mode, num_prefills, num_decoders)."""
+    prefix = prefix.lower()
+    layout = LAYOUT_RE.search(prefix)
+    if layout:
+        return 'pd_1pxd', int(layout.group(1)), int(layout.group(2))
+    if 'inter' in prefix:
+        return 'pd_inter', 1, 1
+    if 'pd' in prefix or 'disagg' in prefix or 'intra' in prefix:
+        return 'pd_intra', 1, 1
+    return 'agg', 0, 0
+
+
+def parse_tag(tag, rec=None):
+    """Parse a run tag into schema fields.
+
+    Args:
+        tag: Run tag, e.g. "pd_1p4d_n100_in512_out128_c64"
+        rec: Optional record used when the tag carries no sweep parameters
+    """
+    rec = rec or {}
+    trial = TRIAL_RE.search(tag)
+    point = tag[:trial.start()] if trial else tag
+    workload = WORKLOAD_RE.search(point)
+    match = SWEEP_TAG_RE.match(point)
+    if match:
+        mode, num_prefills, num_decoders = classify_mode(match.group('prefix'))
+        params = {
+            'num_prompts': int(match.group('n')),
+            'input_len': int(match.group('inp')),
+            'output_len': int(match.group('out')),
+            'concurrency': int(match.group('c')),
+        }
+    else:
+        # Neither a workload name ("inter-chat") nor server settings
+        # ("srv-pspdfs") may pass for a mode
+        mode, num_prefills, num_decoders = classify_mode(
+            SERVER_ARGS_RE.sub('', point[:workload.start()] if workload else tag))
+        params = {
+            'num_prompts': rec.get('num_prompts') or rec.get('completed') or 0,
+            'input_len': rec.get('random_input_len') or 0,
+            'output_len': rec.get('random_output_len') or 0,
+            'concurrency': rec.get('max_concurrency') or 0,
+        }
+    return {
+        'mode': mode,
+        'num_prefills': num_prefills,
+        'num_decoders': num_decoders,
+        **params,
+        'workload': (workload.group('name') if workload
+                     else rec.get('workload') or rec.get('dataset_name')),
+        'point': point,
+        'trial': int(trial.group('k')) if trial else 0,
+        'warmup': bool(trial) and trial.group('kind') == 'w',
+    }
+
+
+def server_image(config):
+    """SGLang version(s) recorded in a server_info config, or None."""
+    if not config:
+        return None
+    if config.get('version'):
+        return str(config['version'])
+    roles = {}
+    for role in ('prefill', 'decode'):
+        servers = config.get(role) or []
+        versions = sorted({str(s['version']) for s in servers
+                           if isinstance(s, dict) and s.get('version')})
+        if versions:
+            roles[role] = ','.join(versions)
+    if len(set(roles.values())) == 1:
+        return next(iter(roles.values()))
+    return '/'.join(f"{role[0].upper()}:{v}" for role, v in roles.items()) or None
+
+
+def server_knobs(config):
+    """KNOB_COLUMNS values recorded in a server_info config."""
+    knobs = dict.fromkeys(KNOB_COLUMNS)
+    if not config:
+        return knobs
+    for role in KNOB_ROLES:
+        servers = config.get(role)
+        if servers is None and 'prefill' not in config and 'decode' not in config:
+            # An aggregated server does both
+            servers = [config]
+        server = servers[0] if servers and isinstance(servers[0], dict) else {}
+        for knob in SERVER_KNOBS:
+            knobs[f'{role}_{knob}'] = server.get(knob)
+    return knobs
+
+
+def _stored_config(h, results_dir):
+    try:
+        return get_config(h, results_dir)
+    except FileNotFoundError:
+        return None
+
+
+def _parse_file(path):
+    """Parse one JSONL file into schema rows, one record at a time.
+
+    Returns (rows, configs) where configs maps hash -> config for records
+    that still carried server_info inline (see server_configs.py).
+    """
+    path = pathlib.Path(path)
+    rows = []
+    configs = {}
+    images = {}
+    knobs = {}
+    with path.open() as f:
+        for lineno, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            h, config = record_config(rec)
+            if config is not None:
+                configs[h] = config
+            if h not in images:
+                # Compacted records reference the config store next to the file
+                if config is None:
+                    config = h and _stored_config(h, path.parent)
+                images[h] = server_image(config)
+                knobs[h] = server_knobs(config)
+            tag = rec.get('tag') or path.stem
+            row = {k: rec.get(k) for k in SCHEMA}
+            row.update(parse_tag(tag, rec))
+            row.update(knobs[h])
+            row.update(tag=tag, file=path.name, line=lineno, server_config=h,
+                       image=rec.get('image') or images[h])
+            rows.append(row)
+    return rows, configs
+
+
+def _safe_parse_file(path):
+    try:
+        return _parse_file(path), None
+    except Exception as e:
+        return ([], {}), f"Warning: Could not parse {path}: {e}"
+
+
+def to_schema(rows):
+    """Build a typed DataFrame from schema rows."""
+    df = pd.DataFrame(rows, columns=list(SCHEMA))
+    for col, dtype in SCHEMA.items():
+        if dtype in ('int16', 'int32'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        elif dtype == 'bool':
+            df[col] = df[col].fillna(False)
+        elif dtype == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.astype(SCHEMA)
+
+
+def _parse_many(paths, workers=None):
+    """Parse files, in a process pool when there are enough of them."""
+    workers = workers or os.cpu_count() or 1
+    if len(paths) >= PARALLEL_MIN_FILES and workers > 1:
+        chunksize = max(1, len(paths) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_safe_parse_file, paths, chunksize=chunksize))
+    else:
+        results = [_safe_parse_file(p) for p in paths]
+
+    rows = []
+    configs = {}
+    for (file_rows, file_configs), warning in results:
+        if warning:
+            print(warning)
+        rows.extend(file_rows)
+        configs.update(file_configs)
+    return rows, configs
+
+
+def _read_cache(cache_path):
+    """Return the cached state, or an empty one if missing/incompatible."""
+    empty = {
+        "version": CACHE_VERSION,
+        "files": {},
+        "table": to_schema([]),
+        "configs": {},
+    }
+    if not cache_path.exists():
+        return empty
+    try:
+        with cache_path.open("rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"Warning: ignoring unreadable results cache {cache_path}: {e}")
+        return empty
+    if state.get("version") != CACHE_VERSION:
+        return empty
+    return state
+
+
+def _write_cache(cache_path, state):
+    """Atomically replace the cache file."""
+    tmp_path = cache_path.with_suffix(".tmp")
+    with tmp_path.open("wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+def refresh(results_dir=RESULTS_DIR, workers=None):
+    """Bring the on-disk cache up to date with results_dir.
+
+    Returns (state, stats) where stats counts parsed/reused/dropped files.
+    """
+    results_dir = pathlib.Path(results_dir)
+    cache_path = results_dir / CACHE_NAME
+    state = _read_cache(cache_path)
+
+    current = {}
+    with os.scandir(results_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".jsonl") and entry.is_file():
+                st = entry.stat()
+                current[entry.name] = (st.st_mtime_ns, st.st_size)
+
+    stale = sorted(name for name, key in current.items()
+                   if state["files"].get(name) != key)
+    dropped = [name for name in state["files"] if name not in current]
+
+    if stale or dropped:
+        table = state["table"]
+        table = table[~table["file"].isin(set(stale) | set(dropped))]
+        for name in dropped:
+            del state["files"][name]
+
+        # Inline configs stay in the cache; only compaction writes the store
+        rows, configs = _parse_many([results_dir / name for name in stale], workers)
+        state["configs"].update((h, flatten(c)) for h, c in configs.items())
+        for name in stale:
+            state["files"][name] = current[name]
+
+        if rows:
+            new = to_schema(rows)
+            table = new if table.empty else pd.concat([table, new], ignore_index=True)
+        state["table"] = table.sort_values(["file", "line"], ignore_index=True)
+        live = set(table["server_config"].dropna())
+        state["configs"] = {h: c for h, c in state["configs"].items() if h in live}
+
+    if stale or dropped or not cache_path.exists():
+        _write_cache(cache_path, state)
+
+    stats = {
+        "files": len(current),
+        "parsed": len(stale),
+        "reused": len(current) - len(stale),
+        "dropped": len(dropped),
+    }
+    return state, stats
+
+
+def config_index(results_dir=RESULTS_DIR):
+    """Flattened configs by hash, from the store and from inline records."""
+    state, _ = refresh(results_dir)
+    return {**state["configs"], **load_index(results_dir)}
+
+
+def load_table(pattern="*.jsonl", results_dir=RESULTS_DIR, modes=None, warmup=False):
+    """Load the typed results table.
+
+    Args:
+        pattern: Glob applied to file names inside results_dir
+        results_dir: Directory holding the JSONL results
+        modes: Optional iterable of modes to keep (see MODES)
+        warmup: Also return warmup trials
+
+    Returns:
+        DataFrame with one row per record and the columns of SCHEMA.
+    """
+    state, _ = refresh(results_dir)
+    table = state["table"]
+    if pattern != "*.jsonl":
+        table = table[table["file"].map(lambda name: fnmatch.fnmatchcase(name, pattern))]
+    if modes is not None:
+        table = table[table["mode"].isin(list(modes))]
+    if not warmup:
+        table = table[~table["warmup"]]
+    return table.reset_index(drop=True)
+
+
+def aggregate_trials(table, metrics, keys=('point',)):
+    """Reduce repeated trials to one row per point.
+
+    Args:
+        table: DataFrame from load_table
+        metrics: Metric columns to aggregate
+        keys: Columns identifying a point; extra schema columns that are
+            constant within a point (mode, num_decoders, ...) are kept
+    Returns:
+        DataFrame with, per metric, <m> (median), <m>_min, <m>_max and
+        <m>_cv, plus 'trials' and 'noisy' (any CV above CV_THRESHOLD)
+    """
+    keys = list(keys)
+    constant = [c for c in ['mode', 'num_prefills', 'num_decoders', 'num_prompts',
+                            'input_len', 'output_len', 'concurrency', 'workload'] + KNOB_COLUMNS
+                if c not in keys]
+    grouped = table.groupby(keys, observed=True, sort=True, dropna=False)
+    out = grouped[constant].first()
+    out['trials'] = grouped.size()
+    for m in metrics:
+        values = grouped[m]
+        mean = values.mean()
+        out[m] = values.median()
+        out[f'{m}_min'] = values.min()
+        out[f'{m}_max'] = values.max()
+        out[f'{m}_cv'] = (values.std(ddof=1) / mean).where(mean != 0)
+    cvs = out[[f'{m}_cv' for m in metrics]]
+    out['noisy'] = (cvs > CV_THRESHOLD).any(axis=1)
+    return out.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the results cache")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Discard the cache and re-parse every file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: all cores)")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    if args.rebuild:
+        (results_dir / CACHE_NAME).unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    state, stats = refresh(results_dir, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    table = state["table"]
+    print(f"Results cache: {results_dir / CACHE_NAME}")
+    print(f"  Files:   {stats['files']} "
+          f"({stats['parsed']} parsed, {stats['reused']} reused, "
+          f"{stats['dropped']} dropped)")
+    print(f"  Records: {len(table)}")
+    for mode, count in table["mode"].value_counts(sort=False).items():
+        print(f"    {mode:<10} {count}")
+    print(f"  Elapsed: {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
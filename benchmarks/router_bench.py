@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Router overhead microbenchmark with zero-cost stub backends.
+
+Runs sglang_router.launch_router in PD mode in front of one prefill and N
+decode stand-ins (standin_server.py --time-scale 0, i.e. no modeled GPU
+time) and drives it open-loop at increasing request rates with tiny
+requests. The same load is also sent straight to an aggregated stub, so
+
+    added latency = routed E2E percentile - direct E2E percentile
+
+is what the router (plus the PD fan-out it orchestrates) costs per request.
+
+Per (router, decoders, rate) row:
+    achieved_qps, failed, p50/p90/p99 direct and routed E2E, added p50/p90/p99
+    cpu_ms_per_req   router process-tree CPU time (/proc) per completed request
+
+A rate is sustainable when the router achieves >= 95% of the offered rate
+without failures and added p99 stays under --max-added-ms. Rows whose
+direct baseline already falls behind are flagged client_bound: the client,
+not the router, is the limit there.
+
+Usage:
+    python3 benchmarks/router_bench.py run --decoders 1,2,4,8,16,32,64 \\
+        --qps 100,200,500,1000,2000
+    python3 benchmarks/router_bench.py run --router mini-lb --decoders 1,8
+    python3 benchmarks/router_bench.py report --plot
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from load_generator import arrival_times, build_parser as lg_parser, request_lengths, run_load
+from readiness import wait_ready
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+BENCH_DIRNAME = "router_overhead"
+BENCH_FILE = "router_bench.jsonl"
+STANDIN = ROOT / "benchmarks" / "standin_server.py"
+
+PERCENTILES = [50, 90, 99]
+ACHIEVED_FRACTION = 0.95
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+# ===== Processes =====
+
+def start_stub(port, mode, extra=()):
+    cmd = [sys.executable, str(STANDIN), "--port", str(port), "--time-scale", "0",
+           "--disaggregation-mode", mode, *extra]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_router(router, prefill_url, bootstrap_port, decode_urls, port):
+    cmd = [sys.executable, "-m", "sglang_router.launch_router", "--pd-disaggregation",
+           "--prefill", prefill_url, str(bootstrap_port)]
+    if router == "mini-lb":
+        cmd.insert(3, "--mini-lb")
+    for url in decode_urls:
+        cmd += ["--decode", url]
+    cmd += ["--host", "127.0.0.1", "--port", str(port)]
+    log = open(f"/tmp/router_bench_{router}.log", "w")
+    return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def process_tree_cpu_s(pid):
+    """utime + stime (s) of `pid` and all its descendants, from /proc."""
+    stats = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # comm may contain spaces; fields after it are fixed
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        stats[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [p for p, (ppid, _) in stats.items() if ppid == parent and p not in tree]
+        tree.update(children)
+        frontier.extend(children)
+    return sum(stats[p][1] for p in tree if p in stats) / CLK_TCK
+
+
+# ===== Load =====
+
+def probe(base_url, qps, duration_s, input_len, output_len, seed):
+    """Open-loop load at `qps` for about `duration_s`. Returns (e2e_ms, failed, achieved_qps)."""
+    args = lg_parser().parse_args([
+        "--base-url", base_url,
+        "--num-prompts", str(max(int(qps * duration_s), 20)),
+        "--random-input-len", str(input_len),
+        "--random-output-len", str(output_len),
+        "--request-rate", str(qps),
+        "--seed", str(seed),
+    ])
+    rng = np.random.default_rng(seed)
+    inputs, outputs = request_lengths(args.num_prompts, input_len, output_len, 1.0, rng)
+    offsets = arrival_times("poisson", args.num_prompts, qps, 1.0, rng)
+    results = asyncio.run(run_load(args, zip(offsets, inputs, outputs)))
+    ok = [r for r in results if r["success"]]
+    e2e = np.array([(r["finish_time"] - r["send_time"]) * 1000 for r in ok])
+    if ok:
+        span = max(r["finish_time"] for r in ok) - min(r["send_time"] for r in ok)
+    achieved = len(ok) / span if ok and span > 0 else 0.0
+    return e2e, len(results) - len(ok), achieved
+
+
+def percentiles(values):
+    if not len(values):
+        return [None] * len(PERCENTILES)
+    return [float(v) for v in np.percentile(values, PERCENTILES)]
+
+
+def sustainable(row, max_added_ms):
+    return (row["failed"] == 0
+            and row["achieved_qps"] >= ACHIEVED_FRACTION * row["qps"]
+            and row["added_p99_ms"] is not None
+            and row["added_p99_ms"] <= max_added_ms)
+
+
+def run_decoders(args, num_decoders, baseline):
+    """Measure every rate for one decoder count. Returns result rows."""
+    prefill_url = f"http://127.0.0.1:{args.base_port}"
+    decode_urls = [f"http://127.0.0.1:{args.base_port + 1 + i}" for i in range(num_decoders)]
+    procs = [start_stub(args.base_port, "prefill",
+                        ["--disaggregation-bootstrap-port", str(args.bootstrap_port)])]
+    procs += [start_stub(args.base_port + 1 + i, "decode") for i in range(num_decoders)]
+    rows = []
+    try:
+        ready = wait_ready([prefill_url] + decode_urls, timeout=120)
+        if None in ready.values():
+            raise RuntimeError("Stub backends did not start")
+        router = start_router(args.router, prefill_url, args.bootstrap_port,
+                              decode_urls, args.router_port)
+        procs.append(router)
+        router_url = f"http://127.0.0.1:{args.router_port}"
+        deadline = time.monotonic() + 60
+        while router.poll() is None and time.monotonic() < deadline:
+            if wait_ready([router_url], timeout=1)[router_url] is not None:
+                break
+        else:
+            raise RuntimeError(f"Router did not start (see /tmp/router_bench_{args.router}.log)")
+
+        for qps in args.qps:
+            cpu0 = process_tree_cpu_s(router.pid)
+            e2e, failed, achieved = probe(router_url, qps, args.duration, args.input_len,
+                                          args.output_len, args.seed)
+            cpu = process_tree_cpu_s(router.pid) - cpu0
+            direct_e2e, direct_failed, direct_achieved = baseline[qps]
+            routed_p = percentiles(e2e)
+            direct_p = percentiles(direct_e2e)
+            row = {
+                "router": args.router,
+                "num_decoders": num_decoders,
+                "qps": qps,
+                "achieved_qps": achieved,
+                "failed": failed,
+                "cpu_ms_per_req": cpu * 1000 / len(e2e) if len(e2e) else None,
+                "client_bound": direct_failed > 0
+                                or direct_achieved < ACHIEVED_FRACTION * qps,
+            }
+            for q, routed, direct in zip(PERCENTILES, routed_p, direct_p):
+                row[f"direct_p{q}_ms"] = direct
+                row[f"routed_p{q}_ms"] = routed
+                row[f"added_p{q}_ms"] = (routed - direct
+                                         if routed is not None and direct is not None else None)
+            row["sustainable"] = sustainable(row, args.max_added_ms)
+            rows.append(row)
+            print(f"  {num_decoders:>3}D qps={qps:<7g} achieved={achieved:8.1f} "
+                  f"added p50/p99={_fmt(row['added_p50_ms'])}/{_fmt(row['added_p99_ms'])} ms "
+                  f"cpu={_fmt(row['cpu_ms_per_req'], '.3f')} ms/req"
+                  + (" [client-bound]" if row["client_bound"] else ""))
+            if not row["sustainable"] and not row["client_bound"] and args.stop_on_fail:
+                break
+    finally:
+        stop(procs)
+    return rows
+
+
+def measure_baseline(args):
+    """Direct-to-stub E2E at every rate (independent of the decoder count)."""
+    port = args.base_port - 1
+    proc = start_stub(port, "null")
+    try:
+        url = f"http://127.0.0.1:{port}"
+        if wait_ready([url], timeout=60)[url] is None:
+            raise RuntimeError("Baseline stub did not start")
+        baseline = {}
+        for qps in args.qps:
+            baseline[qps] = probe(url, qps, args.duration, args.input_len,
+                                  args.output_len, args.seed)
+            print(f"  direct qps={qps:<7g} p50={_fmt(percentiles(baseline[qps][0])[0])} ms")
+        return baseline
+    finally:
+        stop([proc])
+
+
+# ===== Report =====
+
+def _fmt(value, spec=".2f"):
+    return format(value, spec) if value is not None else "-"
+
+
+def load_rows(results_dir=RESULTS_DIR):
+    path = pathlib.Path(results_dir) / BENCH_DIRNAME / BENCH_FILE
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latest_rows(rows):
+    """Keep the most recent row per (router, decoders, qps)."""
+    latest = {}
+    for row in rows:
+        latest[(row["router"], row["num_decoders"], row["qps"])] = row
+    return [latest[k] for k in sorted(latest)]
+
+
+def print_report(rows):
+    print(f"{'Router':<8} {'Dec':>4} {'Max QPS':>9} {'Added p50':>10} {'Added p90':>10} "
+          f"{'Added p99':>10} {'CPU ms/req':>11}   (latency/CPU at the lowest rate)")
+    print("-" * 92)
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["router"], row["num_decoders"]), []).append(row)
+    for (router, n), group in sorted(groups.items()):
+        group.sort(key=lambda r: r["qps"])
+        ok = [r["qps"] for r in group if r["sustainable"]]
+        bound = any(r["client_bound"] for r in group)
+        max_qps = f"{max(ok):g}" + ("+" if bound or ok and max(ok) == group[-1]["qps"] else "") \
+            if ok else "-"
+        low = group[0]
+        print(f"{router:<8} {n:>4} {max_qps:>9} {_fmt(low['added_p50_ms']):>10} "
+              f"{_fmt(low['added_p90_ms']):>10} {_fmt(low['added_p99_ms']):>10} "
+              f"{_fmt(low['cpu_ms_per_req'], '.3f'):>11}")
+    print("\n'+' = limit not reached (highest rate tried, or the client saturated first)")
+
+
+def plot_overhead(rows, out_path):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5.5))
+    fig.suptitle('Router Overhead vs Offered Load (stub backends)', fontsize=14, fontweight='bold')
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["router"], row["num_decoders"]), []).append(row)
+    for (router, n), group in sorted(groups.items()):
+        group.sort(key=lambda r: r["qps"])
+        qps = [r["qps"] for r in group]
+        label = f"{router} 1P{n}D"
+        axes[0].plot(qps, [r["added_p99_ms"] for r in group], marker='o', label=label)
+        axes[1].plot(qps, [r["cpu_ms_per_req"] for r in group], marker='o', label=label)
+    for ax, ylabel in zip(axes, ['Added P99 latency (ms)', 'Router CPU (ms/request)']):
+        ax.set_xscale('log')
+        ax.set_xlabel('Offered load (req/s)')
+        ax.set_ylabel(ylabel)
+        ax.grid(alpha=0.3, linestyle='--')
+        ax.legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved plot: {out_path}")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Router overhead microbenchmark")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Measure the router at increasing rates")
+    p_run.add_argument("--router", choices=["full", "mini-lb"], default="full",
+                       help="Full router (as in 52) or --mini-lb (as in 31)")
+    p_run.add_argument("--decoders", type=int_list, default=[1, 2, 4, 8, 16, 32, 64])
+    p_run.add_argument("--qps", type=lambda v: [float(x) for x in v.split(",")],
+                       default=[50, 100, 200, 500, 1000, 2000])
+    p_run.add_argument("--duration", type=float, default=10.0,
+                       help="Seconds of load per rate")
+    p_run.add_argument("--input-len", type=int, default=16)
+    p_run.add_argument("--output-len", type=int, default=1)
+    p_run.add_argument("--max-added-ms", type=float, default=10.0,
+                       help="Added p99 latency bound for a sustainable rate")
+    p_run.add_argument("--stop-on-fail", action="store_true",
+                       help="Skip higher rates once one is unsustainable")
+    p_run.add_argument("--base-port", type=int, default=41000,
+                       help="Prefill stub port; decoders follow, baseline stub is port - 1")
+    p_run.add_argument("--bootstrap-port", type=int, default=48998)
+    p_run.add_argument("--router-port", type=int, default=48000)
+    p_run.add_argument("--seed", type=int, default=1)
+
+    p_report = sub.add_parser("report", help="Summarize recorded runs")
+    p_report.add_argument("--plot", action="store_true", help="Also write router_overhead.png")
+    args = parser.parse_args()
+    results_dir = pathlib.Path(args.results_dir)
+
+    if args.command == "report":
+        rows = latest_rows(load_rows(results_dir))
+        if not rows:
+            raise SystemExit(f"No runs in {results_dir / BENCH_DIRNAME}")
+        print_report(rows)
+        if args.plot:
+            plot_overhead(rows, results_dir / BENCH_DIRNAME / "router_overhead.png")
+        return
+
+    out_path = results_dir / BENCH_DIRNAME / BENCH_FILE
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    print("Baseline (direct to stub):")
+    baseline = measure_baseline(args)
+    rows = []
+    for n in args.decoders:
+        print(f"Router {args.router} with 1P{n}D:")
+        try:
+            new = run_decoders(args, n, baseline)
+        except RuntimeError as e:
+            print(f"  ERROR: {e}")
+            continue
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(out_path, "a") as f:
+            for row in new:
+                f.write(json.dumps({**row, "measured_at": stamp}) + "\n")
+        rows.extend(new)
+    if rows:
+        print()
+        print_report(rows)
+    print(f"\nResults: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for server_info blobs.
+
+Each bench_serving record embeds the full server_info dict (~50 KB), and it
+is almost always identical across runs of the same server setup. The store
+keeps one copy per distinct config under results/server_configs/<hash>.json
+and lets result files reference it:
+
+    {"tag": ..., "server_info_ref": "3f2a...", "server_runtime": {...}}
+
+server_runtime keeps the few per-run values (e.g. last_gen_throughput) that
+would otherwise defeat deduplication.
+
+index.json maps every config hash to its flattened scalar keys, so
+questions like "which runs differ only in page_size" are answered from the
+index and the results cache without opening any record.
+
+Usage:
+    python3 benchmarks/server_configs.py compact          # rewrite results in place
+    python3 benchmarks/server_configs.py list             # configs + run counts
+    python3 benchmarks/server_configs.py diff page_size   # runs differing only in key
+    python3 benchmarks/server_configs.py show <hash>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+from collections import defaultdict
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+STORE_DIRNAME = "server_configs"
+INDEX_NAME = "index.json"
+
+# Keys that change from run to run without reflecting server configuration
+VOLATILE_KEYS = {"last_gen_throughput"}
+
+HASH_LEN = 16
+
+
+def store_dir(results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / STORE_DIRNAME
+
+
+def split_server_info(server_info):
+    """Split server_info into (config, runtime).
+
+    runtime maps dotted paths of volatile keys to their values; config is a
+    copy of server_info with those keys removed.
+    """
+    runtime = {}
+
+    # Only containers are copied and descended into; this runs once per
+    # ingested record, so it has to stay cheap on ~1000-key blobs.
+    def strip(node, path):
+        if isinstance(node, dict):
+            out = dict(node)
+            for k in VOLATILE_KEYS.intersection(out):
+                runtime[f"{path}{k}"] = out.pop(k)
+            for k, v in out.items():
+                if isinstance(v, (dict, list)):
+                    out[k] = strip(v, f"{path}{k}.")
+            return out
+        # Lists are homogeneous; long scalar lists (cuda_graph_bs, ...) are
+        # shared rather than walked element by element
+        if not node or not isinstance(node[0], (dict, list)):
+            return node
+        return [strip(v, f"{path}{i}.") for i, v in enumerate(node)]
+
+    return strip(server_info, ""), runtime
+
+
+def merge_runtime(config, runtime):
+    """Inverse of split_server_info."""
+    merged = json.loads(json.dumps(config))
+    for path, value in (runtime or {}).items():
+        *parents, leaf = path.split(".")
+        node = merged
+        for p in parents:
+            node = node[int(p)] if isinstance(node, list) else node[p]
+        node[leaf] = value
+    return merged
+
+
+def config_hash(config):
+    """Stable content hash of a config dict."""
+    blob = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()[:HASH_LEN]
+
+
+def flatten(config):
+    """Flatten a config into {dotted.key: scalar}.
+
+    Single-element lists (internal_states, prefill, decode) are collapsed so
+    keys read e.g. "decode.page_size"; longer lists become JSON strings.
+    """
+    flat = {}
+
+    def walk(node, path):
+        if isinstance(node, dict):
+            for k, v in node.items():
+                walk(v, f"{path}{k}.")
+        elif isinstance(node, list) and len(node) == 1:
+            walk(node[0], path)
+        elif isinstance(node, list):
+            flat[path[:-1]] = json.dumps(node, sort_keys=True)
+        else:
+            flat[path[:-1]] = node
+
+    walk(config, "")
+    return flat
+
+
+def load_index(results_dir=RESULTS_DIR):
+    path = store_dir(results_dir) / INDEX_NAME
+    if not path.exists():
+        return {}
+    with path.open() as f:
+        return json.load(f)
+
+
+def _write_json(path, obj):
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w") as f:
+        json.dump(obj, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def put_configs(configs, results_dir=RESULTS_DIR):
+    """Add {hash: config} entries to the store and index."""
+    if not configs:
+        return
+    sdir = store_dir(results_dir)
+    sdir.mkdir(parents=True, exist_ok=True)
+    index = load_index(results_dir)
+    changed = False
+    for h, config in configs.items():
+        path = sdir / f"{h}.json"
+        if not path.exists():
+            _write_json(path, config)
+        if h not in index:
+            index[h] = flatten(config)
+            changed = True
+    if changed:
+        _write_json(sdir / INDEX_NAME, index)
+
+
+def get_config(h, results_dir=RESULTS_DIR):
+    with (store_dir(results_dir) / f"{h}.json").open() as f:
+        return json.load(f)
+
+
+def record_config(rec):
+    """Return (hash, config_or_None) for a result record.
+
+    config is only returned for records that still carry server_info inline;
+    compact_file registers those with put_configs.
+    """
+    if rec.get("server_info_ref"):
+        return rec["server_info_ref"], None
+    server_info = rec.get("server_info")
+    if not server_info:
+        return None, None
+    config, _ = split_server_info(server_info)
+    return config_hash(config), config
+
+
+def resolve_server_info(rec, results_dir=RESULTS_DIR):
+    """Return the full server_info of a record, inline or referenced."""
+    if rec.get("server_info") is not None:
+        return rec["server_info"]
+    if rec.get("server_info_ref"):
+        config = get_config(rec["server_info_ref"], results_dir)
+        return merge_runtime(config, rec.get("server_runtime"))
+    return None
+
+
+def compact_file(path, results_dir=RESULTS_DIR, dry_run=False):
+    """Replace inline server_info with references in one JSONL file.
+
+    Returns (bytes_before, bytes_after).
+    """
+    path = pathlib.Path(path)
+    before = path.stat().st_size
+    lines = []
+    configs = {}
+    changed = False
+    with path.open() as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            if rec.get("server_info") is not None:
+                config, runtime = split_server_info(rec.pop("server_info"))
+                h = config_hash(config)
+                configs[h] = config
+                # Keep the reference where server_info used to be
+                rec["server_info_ref"] = h
+                rec["server_runtime"] = runtime
+                changed = True
+            lines.append(json.dumps(rec))
+    if not changed:
+        return before, before
+    data = "\n".join(lines) + "\n"
+    if not dry_run:
+        put_configs(configs, results_dir)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(data)
+        os.replace(tmp_path, path)
+    return before, len(data.encode())
+
+
+def runs_differing_only_in(key, runs, results_dir=RESULTS_DIR, index=None):
+    """Group runs whose server configs differ only in `key`.
+
+    Args:
+        key: Flattened config key, either a full dotted path
+             ("decode.page_size") or a leaf name ("page_size") that matches
+             every path ending in it
+        runs: DataFrame with 'tag' and 'server_config' columns (as returned
+              by results_store.load_table)
+        index: {hash: flattened config}; defaults to the store's index.json,
+               pass results_store.config_index to include uncompacted runs
+
+    Returns:
+        List of {value: [tags]} dicts, one per group of configs that are
+        identical apart from `key` and take at least two values of it.
+    """
+    if index is None:
+        index = load_index(results_dir)
+
+    def matches(k):
+        return k == key or k.endswith("." + key)
+
+    tags_by_hash = defaultdict(list)
+    for tag, h in zip(runs["tag"], runs["server_config"]):
+        if isinstance(h, str) and h in index:
+            tags_by_hash[h].append(tag)
+
+    groups = defaultdict(dict)
+    for h, tags in tags_by_hash.items():
+        flat = index[h]
+        rest = tuple(sorted((k, json.dumps(v)) for k, v in flat.items()
+                            if not matches(k)))
+        value = tuple(sorted((k, v) for k, v in flat.items() if matches(k)))
+        value_label = ", ".join(f"{k}={v}" for k, v in value) or "(unset)"
+        groups[rest].setdefault(value_label, []).extend(tags)
+
+    return [dict(g) for g in groups.values() if len(g) > 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicated server_info store")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_compact = sub.add_parser("compact", help="Replace inline server_info with refs")
+    p_compact.add_argument("--dry-run", action="store_true")
+    sub.add_parser("list", help="List stored configs and their runs")
+    p_diff = sub.add_parser("diff", help="Runs differing only in one config key")
+    p_diff.add_argument("key")
+    p_show = sub.add_parser("show", help="Print a stored config")
+    p_show.add_argument("hash")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+
+    if args.command == "compact":
+        total_before = total_after = 0
+        for path in sorted(results_dir.glob("*.jsonl")):
+            before, after = compact_file(path, results_dir, dry_run=args.dry_run)
+            total_before += before
+            total_after += after
+        saved = 100 * (1 - total_after / total_before) if total_before else 0
+        verb = "Would shrink" if args.dry_run else "Shrank"
+        print(f"{verb} results from {total_before / 1e6:.2f} MB to "
+              f"{total_after / 1e6:.2f} MB ({saved:.1f}% saved)")
+        return
+
+    if args.command == "show":
+        print(json.dumps(get_config(args.hash, results_dir), indent=2, sort_keys=True))
+        return
+
+    from results_store import config_index, load_table
+    runs = load_table(results_dir=results_dir)
+
+    if args.command == "list":
+        counts = runs.groupby("server_config")["tag"].apply(list)
+        for h, tags in counts.items():
+            print(f"{h}  {len(tags):>4} run(s)  e.g. {tags[0]}")
+        return
+
+    groups = runs_differing_only_in(args.key, runs, results_dir,
+                                    index=config_index(results_dir))
+    if not groups:
+        print(f"No runs differ only in '{args.key}'")
+        return
+    for i, group in enumerate(groups, 1):
+        print(f"Group {i}:")
+        for value, tags in sorted(group.items()):
+            print(f"  {value}")
+            for tag in sorted(tags):
+                print(f"    {tag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Effect of server knobs per mode, from server_args sweeps.
+
+experiment/sweep.py --server-args runs every point once per combination of
+scheduler knob values (chunked_prefill_size, max_prefill_tokens,
+schedule_policy, page_size, mem_fraction_static; for all servers or one
+role). results_store reads the values each server actually ran with from
+server_info into prefill_<knob> / decode_<knob>, so runs are sliced by what
+was applied, not by what was asked for. xPyD servers relaunched by hand with
+other knob values separate the same way.
+
+Points are grouped by everything but the server settings (mode and the point
+without its _srv- suffix). Groups with a single setting are skipped. Within a
+group, the baseline is the setting run without --server-args overrides (the
+first such setting if there are several, else the first setting):
+
+    tput_gain     output throughput / baseline output throughput - 1
+    ttft_change   mean TTFT / baseline mean TTFT - 1
+    tpot_change   mean TPOT / baseline mean TPOT - 1
+
+Only the knob columns that vary within some group are shown.
+
+Usage:
+    python3 benchmarks/server_knobs.py                  # report
+    python3 benchmarks/server_knobs.py --plot           # + results/server_knobs.png
+    python3 benchmarks/server_knobs.py --where 'decode_page_size == 16' --csv knobs.csv
+"""
+
+import argparse
+import pathlib
+
+import numpy as np
+
+from results_store import KNOB_COLUMNS, MODES, SERVER_ARGS_RE, aggregate_trials, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+METRICS = ['output_throughput', 'mean_ttft_ms', 'p99_ttft_ms', 'mean_tpot_ms']
+CHANGES = {'tput_gain': 'output_throughput', 'ttft_change': 'mean_ttft_ms',
+           'tpot_change': 'mean_tpot_ms'}
+
+# Knob columns drawn by --plot
+MAX_PLOT_KNOBS = 6
+
+
+def knob_table(results_dir=RESULTS_DIR, modes=MODES, where=None):
+    """One row per (point, server settings) of groups with several settings.
+
+    Args:
+        where: Optional pandas query over the run columns, e.g.
+            'prefill_chunked_prefill_size >= 4096'
+    """
+    runs = load_table(results_dir=results_dir, modes=modes)
+    if where:
+        runs = runs.query(where)
+    if runs.empty:
+        return runs
+    # Records without server_info have no knob values; they still form a setting
+    runs = runs.assign(settings=runs[KNOB_COLUMNS].astype(str).agg('|'.join, axis=1))
+    points = aggregate_trials(runs, METRICS, ['point', 'settings'])
+    points['mode'] = points['mode'].astype(str)
+    points['base'] = points['point'].str.replace(SERVER_ARGS_RE, '', regex=True)
+    points['overrides'] = points['point'] != points['base']
+
+    group = ['mode', 'base']
+    points = points[points.groupby(group)['settings'].transform('nunique') > 1]
+    if points.empty:
+        return points
+    points = points.sort_values(group + ['overrides', 'point', 'settings']).reset_index(drop=True)
+    base = points.groupby(group, sort=False)
+    for change, metric in CHANGES.items():
+        points[change] = points[metric] / base[metric].transform('first') - 1
+    return points.drop(columns=['settings'])
+
+
+def knob_rows(points, column):
+    """Rows that count for `column`: an aggregated server's knobs are listed
+    under prefill_ only, since decode_ repeats them."""
+    if column.startswith('decode_'):
+        return points[points['mode'] != 'agg']
+    return points
+
+
+def varied_knobs(points):
+    """Knob columns whose value differs within some (mode, base) group."""
+    knobs = []
+    for column in KNOB_COLUMNS:
+        rows = knob_rows(points, column)
+        grouped = rows.groupby(['mode', 'base'], sort=False)[column]
+        if not rows.empty and (grouped.nunique(dropna=False) > 1).any():
+            knobs.append(column)
+    return knobs
+
+
+def knob_label(column):
+    """prefill_chunked_prefill_size -> P.chunked_prefill_size"""
+    role, _, knob = column.partition('_')
+    return f"{role[0].upper()}.{knob}"
+
+
+def format_table(points):
+    """Fixed-width report, one block per point."""
+    knobs = varied_knobs(points)
+    cols = ['mode'] + knobs + ['output_throughput', 'mean_ttft_ms', 'p99_ttft_ms',
+                               'mean_tpot_ms'] + list(CHANGES) + ['trials']
+    names = {'output_throughput': 'tok_s', 'mean_ttft_ms': 'ttft', 'p99_ttft_ms': 'p99_ttft',
+             'mean_tpot_ms': 'tpot', **{k: knob_label(k) for k in knobs},
+             **{c: f"{c}_%" for c in CHANGES}}
+    blocks = []
+    for base, rows in points.groupby('base', sort=True):
+        table = rows[cols].copy()
+        for col in knobs:
+            # Token counts print as integers
+            if table[col].dtype.kind == 'f' and (table[col].dropna() % 1 == 0).all():
+                table[col] = table[col].astype('Int64')
+        for col in CHANGES:
+            table[col] = table[col] * 100
+        table = table.rename(columns=names)
+        blocks.append(base + "\n" + table.to_string(
+            index=False, float_format=lambda v: f"{v:.1f}", na_rep='-'))
+    return "\n\n".join(blocks)
+
+
+def _sort_key(value):
+    # Numeric knobs in numeric order, schedule policies by name
+    return (0, float(value), '') if isinstance(value, (int, float)) else (1, 0.0, str(value))
+
+
+def plot_knobs(points, out_path):
+    """Throughput / TTFT / TPOT change against each varied knob, per mode.
+
+    Each marker is the median over the points (and the other knobs' values)
+    run with that knob value.
+    """
+    import matplotlib.pyplot as plt
+    from plot_benchmarks import COLORS, get_mode_label
+
+    knobs = varied_knobs(points)[:MAX_PLOT_KNOBS]
+    if not knobs:
+        return None
+    fig, axes = plt.subplots(len(knobs), 3, figsize=(16, 4 * len(knobs)), squeeze=False)
+    fig.suptitle('Server Knobs: Change vs Baseline Settings (median over points)',
+                 fontsize=14, fontweight='bold')
+    for row, knob in zip(axes, knobs):
+        rows = knob_rows(points, knob).dropna(subset=[knob])
+        values = sorted(rows[knob].unique(), key=_sort_key)
+        x = {v: i for i, v in enumerate(values)}
+        for mode, series in rows.groupby('mode', sort=False):
+            medians = series.groupby(knob)[list(CHANGES)].median()
+            order = sorted(medians.index, key=_sort_key)
+            for ax, change in zip(row, CHANGES):
+                ax.plot([x[v] for v in order], medians.loc[order, change] * 100, 'o-',
+                        color=COLORS.get(mode), label=get_mode_label(mode), linewidth=2)
+        for ax, label in zip(row, ['Output throughput', 'Mean TTFT', 'Mean TPOT']):
+            ax.axhline(0, color='gray', linewidth=0.8)
+            ax.set_xticks(np.arange(len(values)))
+            ax.set_xticklabels([f"{v:g}" if isinstance(v, float) else str(v) for v in values])
+            ax.set_xlabel(knob_label(knob))
+            ax.set_ylabel(f'{label} change (%)')
+            ax.grid(alpha=0.3, linestyle='--')
+            ax.legend(fontsize=9)
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved server knob plot: {out_path}")
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server knob effects per mode")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--where", help="Run filter, e.g. 'decode_page_size == 16'")
+    parser.add_argument("--csv", help="Also write the table to this CSV file")
+    parser.add_argument("--plot", action="store_true", help="Also write server_knobs.png")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    points = knob_table(results_dir, args.modes.split(","), args.where)
+    if points.empty:
+        raise SystemExit(f"No points run with several server settings in {results_dir} "
+                         "(sweep.py --server-args)")
+    print("Points by server settings (median over trials; ms, % vs baseline settings)")
+    print(format_table(points))
+    if args.csv:
+        points.to_csv(args.csv, index=False)
+        print(f"\nWrote {args.csv}")
+    if args.plot:
+        plot_knobs(points, results_dir / "server_knobs.png")
+
+
+if __name__ == "__main__":
+    main()
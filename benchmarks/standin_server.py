@@ -0,0 +1,710 @@
+#!/usr/bin/env python3
+"""
+GPU-free stand-in for an SGLang server.
+
+Accepts the same command line as `python3 -m sglang.launch_server` (unknown
+flags are ignored) and serves the endpoints our scripts, the router and
+bench_serving talk to:
+
+    GET  /health, /health_generate, /get_model_info, /get_server_info
+    POST /generate, /v1/completions     (streaming and non-streaming)
+    POST /flush_cache
+    GET  /metrics                       (with --enable-metrics, Prometheus text)
+
+Requests go through a single continuous-batching loop with a simple latency
+model:
+
+    prefill chunk   = prefill_base_ms + prefill_ms_per_token * tokens
+    decode step     = decode_step_ms + decode_ms_per_seq * running_requests
+    KV transfer     = kv_transfer_base_ms + kv_transfer_ms_per_token * input_len
+
+Prefill chunks and decode steps alternate, so long prompts delay every
+running decode just like on a real server.
+
+Prompts are matched against an LRU prefix cache of CACHE_BLOCK-token blocks
+(chained hashes of token ids, or of text for text prompts) holding up to
+max_total_tokens tokens. Matched tokens skip prefill compute and are
+reported as meta_info.cached_tokens; at least one token is always computed.
+--disable-radix-cache turns the cache off, /flush_cache empties it.
+
+With --disaggregation-mode prefill the server only runs prefill and also
+listens on --disaggregation-bootstrap-port. A decode-mode stand-in that
+receives bootstrap_host/bootstrap_port/bootstrap_room (added by
+sglang_router) waits there until the matching prefill has finished, then
+pays the KV transfer delay before decoding. This reproduces PD TTFT. The
+transfer covers the whole prompt, cached or not, and the decoder reports
+the prefill's cached_tokens. A decode request whose bootstrap server
+cannot be reached, or whose KV has not arrived after KV_WAIT_TIMEOUT_S, is
+aborted with an error response.
+
+As on sglang, a request whose prompt plus max_new_tokens needs more KV than
+max_total_tokens is rejected with HTTP 400 instead of being queued forever.
+
+Usage:
+    python3 benchmarks/standin_server.py --port 30000
+    python3 benchmarks/standin_server.py --port 30000 --disaggregation-mode prefill
+    python3 benchmarks/standin_server.py --port 30001 --disaggregation-mode decode \\
+        --kv-transfer-ms-per-token 0.02
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import time
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, web
+
+# Approximate characters per token for text prompts
+CHARS_PER_TOKEN = 4
+
+# Text emitted per generated token
+TOKEN_TEXT = " tok"
+
+# Window for last_gen_throughput in /get_server_info
+THROUGHPUT_WINDOW_S = 10.0
+
+# Prefix cache granularity in tokens (at least --page-size)
+CACHE_BLOCK = 16
+
+# Decode mode: seconds to wait for a prefill's KV before aborting the request
+KV_WAIT_TIMEOUT_S = 300.0
+# Prefill mode: seconds a finished room stays visible to late decode waiters
+KV_KEEP_S = 60.0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="GPU-free SGLang stand-in server")
+
+    # Subset of sglang.launch_server flags that change behavior here
+    parser.add_argument("--model-path", default="Qwen/Qwen2.5-3B-Instruct")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=30000)
+    parser.add_argument("--mem-fraction-static", type=float, default=0.9)
+    parser.add_argument("--max-running-requests", type=int, default=256)
+    parser.add_argument("--max-total-tokens", type=int, default=1_000_000,
+                        help="KV cache capacity in tokens")
+    parser.add_argument("--chunked-prefill-size", type=int, default=8192)
+    parser.add_argument("--max-prefill-tokens", type=int, default=16384)
+    parser.add_argument("--schedule-policy", default="fcfs")
+    parser.add_argument("--page-size", type=int, default=1)
+    parser.add_argument("--kv-cache-dtype", default="auto")
+    parser.add_argument("--enable-metrics", action="store_true")
+    parser.add_argument("--disable-radix-cache", action="store_true")
+    parser.add_argument("--disaggregation-mode", default="null",
+                        choices=["null", "prefill", "decode"])
+    parser.add_argument("--disaggregation-bootstrap-port", type=int, default=8998)
+    parser.add_argument("--disaggregation-transfer-backend", default="mooncake")
+
+    # Latency model
+    model = parser.add_argument_group("latency model")
+    model.add_argument("--prefill-base-ms", type=float, default=5.0)
+    model.add_argument("--prefill-ms-per-token", type=float, default=0.02)
+    model.add_argument("--decode-step-ms", type=float, default=6.0)
+    model.add_argument("--decode-ms-per-seq", type=float, default=0.03)
+    model.add_argument("--kv-transfer-base-ms", type=float, default=1.0)
+    model.add_argument("--kv-transfer-ms-per-token", type=float, default=0.002)
+    model.add_argument("--time-scale", type=float, default=1.0,
+                       help="Multiply every modeled delay (0 = as fast as possible)")
+    model.add_argument("--load-weights-s", type=float, default=0.0,
+                       help="Startup delay emulating weight loading")
+    model.add_argument("--cuda-graph-s", type=float, default=0.0,
+                       help="Startup delay emulating CUDA graph capture")
+    return parser
+
+
+def log(msg):
+    """Print with the bracketed timestamp prefix sglang uses (plus milliseconds)."""
+    now = time.time()
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    print(f"[{stamp}.{int(now * 1000) % 1000:03d}] {msg}", flush=True)
+
+
+class RequestError(Exception):
+    """A request the server refuses or aborts; answered with an error response."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """One in-flight generation request."""
+
+    __slots__ = ("rid", "input_len", "max_new_tokens", "prefilled", "cached",
+                 "blocks", "generated", "finished", "event")
+
+    def __init__(self, rid, input_len, max_new_tokens, blocks=(), cached=0):
+        self.rid = rid
+        self.input_len = input_len
+        self.max_new_tokens = max(1, max_new_tokens)
+        # Prompt block hashes and the prefix-cache hit; prefill starts after it
+        self.blocks = blocks
+        self.cached = cached
+        self.prefilled = cached
+        self.generated = 0
+        self.finished = False
+        self.event = asyncio.Event()
+
+    def emit(self, n=1):
+        self.generated += n
+        if self.generated >= self.max_new_tokens:
+            self.finished = True
+        self.event.set()
+
+    def finish(self):
+        self.finished = True
+        self.event.set()
+
+
+class PrefixCache:
+    """LRU set of prompt blocks keyed by chained hashes (a flat radix tree)."""
+
+    def __init__(self, capacity_tokens, block_tokens):
+        self.capacity = max(1, capacity_tokens // block_tokens)
+        self.block_tokens = block_tokens
+        self.blocks = collections.OrderedDict()
+
+    def block_hashes(self, units, units_per_token=1):
+        """Chained hashes of the full blocks of a token id list or text."""
+        size = self.block_tokens * units_per_token
+        hashes = []
+        h = hashlib.blake2b(digest_size=8)
+        for start in range(0, len(units) - size + 1, size):
+            h.update(repr(units[start:start + size]).encode())
+            hashes.append(h.copy().digest())
+        return hashes
+
+    def match(self, hashes):
+        """Number of leading blocks present; touches them."""
+        n = 0
+        for h in hashes:
+            if h not in self.blocks:
+                break
+            self.blocks.move_to_end(h)
+            n += 1
+        return n
+
+    def insert(self, hashes):
+        for h in hashes:
+            self.blocks[h] = None
+            self.blocks.move_to_end(h)
+        while len(self.blocks) > self.capacity:
+            self.blocks.popitem(last=False)
+
+    def clear(self):
+        self.blocks.clear()
+
+
+class Scheduler:
+    """Continuous-batching loop implementing the latency model."""
+
+    def __init__(self, args):
+        self.args = args
+        self.waiting = collections.deque()
+        self.running = []
+        self.kv_tokens = 0
+        self.wake = asyncio.Event()
+        self.token_times = collections.deque()
+        self.num_finished = 0
+        self.prompt_tokens_total = 0
+        self.generation_tokens_total = 0
+        self.cached_tokens_total = 0
+        # Decode mode: requests whose KV cache is still in flight
+        self.num_transfer_queue = 0
+        self.cache = (None if args.disable_radix_cache else
+                      PrefixCache(args.max_total_tokens, max(CACHE_BLOCK, args.page_size)))
+
+    def submit(self, req):
+        """Queue a request for prefill."""
+        self.waiting.append(req)
+        self.wake.set()
+
+    def admit_decoded(self, req):
+        """Add a request whose KV cache already arrived (decode mode)."""
+        req.prefilled = req.input_len
+        self.kv_tokens += req.input_len + req.max_new_tokens
+        req.emit(1)
+        self._record_tokens(1)
+        if req.finished:
+            self._release(req)
+        else:
+            self.running.append(req)
+            self.wake.set()
+
+    async def _sleep_ms(self, ms):
+        await asyncio.sleep(ms * self.args.time_scale / 1000)
+
+    def _record_tokens(self, n):
+        self.generation_tokens_total += n
+        now = time.monotonic()
+        self.token_times.append((now, n))
+        while self.token_times and self.token_times[0][0] < now - THROUGHPUT_WINDOW_S:
+            self.token_times.popleft()
+
+    def gen_throughput(self):
+        return sum(n for _, n in self.token_times) / THROUGHPUT_WINDOW_S
+
+    def _release(self, req):
+        self.kv_tokens -= req.input_len + req.max_new_tokens
+        self.num_finished += 1
+
+    def _fits(self, req):
+        return self.kv_tokens + req.input_len + req.max_new_tokens <= self.args.max_total_tokens
+
+    async def _prefill_chunk(self):
+        """Prefill up to chunked_prefill_size tokens from the queue head."""
+        args = self.args
+        budget = min(args.chunked_prefill_size, args.max_prefill_tokens)
+        tokens = 0
+        done = []
+        for req in self.waiting:
+            if budget <= 0 or len(self.running) + len(done) >= args.max_running_requests:
+                break
+            if req.prefilled == req.cached:
+                if not self._fits(req):
+                    break
+                self.kv_tokens += req.input_len + req.max_new_tokens
+            take = min(req.input_len - req.prefilled, budget)
+            req.prefilled += take
+            tokens += take
+            budget -= take
+            if req.prefilled < req.input_len:
+                break
+            done.append(req)
+        if not tokens and not done:
+            return False
+
+        await self._sleep_ms(args.prefill_base_ms + args.prefill_ms_per_token * tokens)
+        self.prompt_tokens_total += tokens
+
+        for req in done:
+            self.waiting.popleft()
+            self.prompt_tokens_total += req.cached
+            self.cached_tokens_total += req.cached
+            if self.cache is not None:
+                self.cache.insert(req.blocks)
+            req.emit(1)
+            if args.disaggregation_mode == "prefill" or req.finished:
+                req.finish()
+                self._release(req)
+            else:
+                self.running.append(req)
+        self._record_tokens(len(done))
+        return True
+
+    async def _decode_step(self):
+        args = self.args
+        await self._sleep_ms(args.decode_step_ms + args.decode_ms_per_seq * len(self.running))
+        still_running = []
+        for req in self.running:
+            req.emit(1)
+            if req.finished:
+                self._release(req)
+            else:
+                still_running.append(req)
+        self._record_tokens(len(self.running))
+        self.running = still_running
+
+    async def run(self):
+        while True:
+            if not self.waiting and not self.running:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+            prefilled = False
+            if self.waiting:
+                prefilled = await self._prefill_chunk()
+            if self.running:
+                await self._decode_step()
+            elif not prefilled:
+                # Blocked on KV capacity with nothing to decode
+                self.wake.clear()
+                await self.wake.wait()
+
+
+class StandinServer:
+    def __init__(self, args):
+        self.args = args
+        self.scheduler = Scheduler(args)
+        self.rids = itertools.count()
+        # bootstrap_room -> asyncio.Event, set once that prefill finished
+        self.kv_ready = {}
+        # bootstrap_room -> prefix-cache hit of that prefill
+        self.kv_cached = {}
+        self.session = None
+
+    # ----- helpers -----
+
+    def _input_len(self, body, prompt_key):
+        if body.get("input_ids") is not None:
+            return len(body["input_ids"])
+        prompt = body.get(prompt_key) or ""
+        if isinstance(prompt, list):
+            # Token ids (OpenAI API) or a batch of one
+            return len(prompt) if prompt and isinstance(prompt[0], int) else \
+                max(1, len(prompt[0]) // CHARS_PER_TOKEN)
+        return max(1, len(prompt) // CHARS_PER_TOKEN)
+
+    def _prompt_units(self, body, prompt_key):
+        """(token ids or text, units per token) of the prompt, for prefix matching."""
+        if body.get("input_ids") is not None:
+            return body["input_ids"], 1
+        prompt = body.get(prompt_key) or ""
+        if isinstance(prompt, list):
+            if prompt and isinstance(prompt[0], int):
+                return prompt, 1
+            prompt = prompt[0] if prompt else ""
+        return prompt, CHARS_PER_TOKEN
+
+    def _lookup(self, body, prompt_key, input_len):
+        """(block hashes, cached tokens) of a prompt."""
+        cache = self.scheduler.cache
+        if cache is None:
+            return (), 0
+        blocks = cache.block_hashes(*self._prompt_units(body, prompt_key))
+        cached = cache.match(blocks) * cache.block_tokens
+        return blocks, min(cached, input_len - 1)
+
+    def _room_event(self, room):
+        if room not in self.kv_ready:
+            self.kv_ready[room] = asyncio.Event()
+        return self.kv_ready[room]
+
+    async def _wait_for_kv(self, body):
+        """Decode mode: wait for the matching prefill.
+
+        Returns the prefill's cached token count.
+        """
+        args = self.args
+        room = body.get("bootstrap_room")
+        host = body.get("bootstrap_host")
+        if room is not None and host:
+            port = body.get("bootstrap_port") or args.disaggregation_bootstrap_port
+            url = f"http://{host}:{port}/kv/{room}"
+            try:
+                async with self.session.get(
+                        url, timeout=ClientTimeout(total=KV_WAIT_TIMEOUT_S)) as resp:
+                    text = await resp.text()
+                    ok = resp.status == 200
+            except asyncio.TimeoutError:
+                ok = False
+            except (ClientError, OSError) as e:
+                # A mis-wired bootstrap host/port must not pass for a transfer
+                raise RequestError(f"Bootstrap server {host}:{port} unreachable for room "
+                                   f"{room}: {e}", 502)
+            if not ok:
+                raise RequestError(f"KV cache of bootstrap room {room} did not arrive "
+                                   f"within {KV_WAIT_TIMEOUT_S:g}s", 500)
+            return int(text) if text.isdigit() else 0
+        return 0
+
+    async def _run_request(self, body, prompt_key, max_tokens_key):
+        args = self.args
+        params = body.get("sampling_params") or {}
+        max_new_tokens = body.get(max_tokens_key) or params.get("max_new_tokens") or 128
+        input_len = self._input_len(body, prompt_key)
+        # It could never be admitted and would block the queue behind it
+        if input_len + int(max_new_tokens) > args.max_total_tokens:
+            raise RequestError(
+                f"Requested token count exceeds the KV capacity: input {input_len} + "
+                f"max_new_tokens {max_new_tokens} > max_total_tokens {args.max_total_tokens}")
+
+        if args.disaggregation_mode == "decode":
+            req = Request(next(self.rids), input_len, int(max_new_tokens))
+            self.scheduler.num_transfer_queue += 1
+            try:
+                req.cached = await self._wait_for_kv(body)
+                await self.scheduler._sleep_ms(
+                    args.kv_transfer_base_ms + args.kv_transfer_ms_per_token * req.input_len)
+            finally:
+                self.scheduler.num_transfer_queue -= 1
+            self.scheduler.admit_decoded(req)
+        else:
+            blocks, cached = self._lookup(body, prompt_key, input_len)
+            req = Request(next(self.rids), input_len, int(max_new_tokens), blocks, cached)
+            self.scheduler.submit(req)
+            if args.disaggregation_mode == "prefill":
+                room = body.get("bootstrap_room")
+                if room is not None:
+                    asyncio.ensure_future(self._signal_kv(req, room))
+        return req
+
+    async def _signal_kv(self, req, room):
+        while not req.finished:
+            await req.event.wait()
+            req.event.clear()
+        self.kv_cached[room] = req.cached
+        self._room_event(room).set()
+        # Late decode waiters still find the event for a while
+        await asyncio.sleep(KV_KEEP_S)
+        self.kv_ready.pop(room, None)
+        self.kv_cached.pop(room, None)
+
+    def _meta(self, req, finished):
+        return {
+            "id": str(req.rid),
+            "prompt_tokens": req.input_len,
+            "completion_tokens": req.generated,
+            "cached_tokens": req.cached,
+            "finish_reason": {"type": "length", "length": req.generated} if finished else None,
+        }
+
+    async def _stream(self, request, req, make_chunk):
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        sent = 0
+        while True:
+            await req.event.wait()
+            req.event.clear()
+            finished = req.finished
+            n = req.generated - sent
+            if n > 0:
+                sent = req.generated
+                chunk = make_chunk(req, n, finished)
+                await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            if finished:
+                break
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    def _error(self, error, openai):
+        """sglang's error body for /generate, or the OpenAI-style one."""
+        if openai:
+            body = {"object": "error", "message": str(error),
+                    "type": "BadRequestError" if error.status == 400 else "InternalServerError",
+                    "param": None, "code": error.status}
+        else:
+            body = {"error": {"message": str(error)}}
+        return web.json_response(body, status=error.status)
+
+    async def _wait_done(self, req):
+        while not req.finished:
+            await req.event.wait()
+            req.event.clear()
+
+    # ----- endpoints -----
+
+    async def health(self, request):
+        return web.Response(text="")
+
+    async def get_model_info(self, request):
+        return web.json_response({
+            "model_path": self.args.model_path,
+            "tokenizer_path": self.args.model_path,
+            "is_generation": True,
+        })
+
+    async def get_server_info(self, request):
+        args = self.args
+        info = {
+            "model_path": args.model_path,
+            "tokenizer_path": args.model_path,
+            "host": args.host,
+            "port": args.port,
+            "dtype": "auto",
+            "kv_cache_dtype": args.kv_cache_dtype,
+            "mem_fraction_static": args.mem_fraction_static,
+            "max_running_requests": args.max_running_requests,
+            "max_total_tokens": args.max_total_tokens,
+            "chunked_prefill_size": args.chunked_prefill_size,
+            "max_prefill_tokens": args.max_prefill_tokens,
+            "schedule_policy": args.schedule_policy,
+            "page_size": args.page_size,
+            "radix_eviction_policy": "lru",
+            "disable_radix_cache": args.disable_radix_cache,
+            "enable_metrics": args.enable_metrics,
+            "disaggregation_mode": args.disaggregation_mode,
+            "disaggregation_transfer_backend": args.disaggregation_transfer_backend,
+            "disaggregation_bootstrap_port": args.disaggregation_bootstrap_port,
+            "standin_latency_model": {
+                "prefill_base_ms": args.prefill_base_ms,
+                "prefill_ms_per_token": args.prefill_ms_per_token,
+                "decode_step_ms": args.decode_step_ms,
+                "decode_ms_per_seq": args.decode_ms_per_seq,
+                "kv_transfer_base_ms": args.kv_transfer_base_ms,
+                "kv_transfer_ms_per_token": args.kv_transfer_ms_per_token,
+                "time_scale": args.time_scale,
+            },
+            "status": "ready",
+            "max_total_num_tokens": args.max_total_tokens,
+            "version": "standin",
+        }
+        info["internal_states"] = [{
+            **{k: v for k, v in info.items() if k != "standin_latency_model"},
+            "last_gen_throughput": self.scheduler.gen_throughput(),
+            "memory_usage": {"token_capacity": args.max_total_tokens},
+        }]
+        return web.json_response(info)
+
+    async def metrics(self, request):
+        """Scheduler gauges and token counters under sglang's metric names."""
+        sched = self.scheduler
+        label = f'{{model_name="{self.args.model_path}"}}'
+        series = [
+            ("num_running_reqs", "gauge", len(sched.running)),
+            ("num_queue_reqs", "gauge", len(sched.waiting)),
+            ("num_used_tokens", "gauge", sched.kv_tokens),
+            ("token_usage", "gauge", sched.kv_tokens / self.args.max_total_tokens),
+            ("gen_throughput", "gauge", sched.gen_throughput()),
+            ("num_retracted_reqs", "gauge", 0),
+            ("num_decode_transfer_queue_reqs", "gauge", sched.num_transfer_queue),
+            ("cache_hit_rate", "gauge",
+             sched.cached_tokens_total / max(1, sched.prompt_tokens_total)),
+            ("prompt_tokens_total", "counter", sched.prompt_tokens_total),
+            ("cached_tokens_total", "counter", sched.cached_tokens_total),
+            ("generation_tokens_total", "counter", sched.generation_tokens_total),
+            ("num_requests_total", "counter", sched.num_finished),
+        ]
+        lines = []
+        for name, kind, value in series:
+            lines.append(f"# TYPE sglang:{name} {kind}")
+            lines.append(f"sglang:{name}{label} {float(value)}")
+        return web.Response(text="\n".join(lines) + "\n",
+                            content_type="text/plain", charset="utf-8")
+
+    async def flush_cache(self, request):
+        if self.scheduler.cache is not None:
+            self.scheduler.cache.clear()
+        return web.Response(text="Cache flushed.\n")
+
+    async def generate(self, request):
+        body = await request.json()
+        try:
+            req = await self._run_request(body, "text", None)
+        except RequestError as e:
+            return self._error(e, openai=False)
+        if body.get("stream"):
+            def make_chunk(req, n, finished):
+                return {
+                    "text": TOKEN_TEXT * req.generated,
+                    "output_ids": list(range(req.generated)),
+                    "meta_info": self._meta(req, finished),
+                }
+            return await self._stream(request, req, make_chunk)
+        await self._wait_done(req)
+        return web.json_response({
+            "text": TOKEN_TEXT * req.generated,
+            "output_ids": list(range(req.generated)),
+            "meta_info": self._meta(req, True),
+        })
+
+    async def completions(self, request):
+        body = await request.json()
+        try:
+            req = await self._run_request(body, "prompt", "max_tokens")
+        except RequestError as e:
+            return self._error(e, openai=True)
+        model = body.get("model") or self.args.model_path
+        if body.get("stream"):
+            def make_chunk(req, n, finished):
+                return {
+                    "id": str(req.rid),
+                    "object": "text_completion",
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "text": TOKEN_TEXT * n,
+                        "finish_reason": "length" if finished else None,
+                    }],
+                    "usage": {
+                        "prompt_tokens": req.input_len,
+                        "completion_tokens": req.generated,
+                        "prompt_tokens_details": {"cached_tokens": req.cached},
+                    } if finished else None,
+                }
+            return await self._stream(request, req, make_chunk)
+        await self._wait_done(req)
+        return web.json_response({
+            "id": str(req.rid),
+            "object": "text_completion",
+            "model": model,
+            "choices": [{"index": 0, "text": TOKEN_TEXT * req.generated,
+                         "finish_reason": "length"}],
+            "usage": {"prompt_tokens": req.input_len,
+                      "completion_tokens": req.generated,
+                      "total_tokens": req.input_len + req.generated,
+                      "prompt_tokens_details": {"cached_tokens": req.cached}},
+        })
+
+    async def bootstrap_wait(self, request):
+        """Bootstrap port: block until the prefill for a room finished."""
+        room = request.match_info["room"]
+        try:
+            room = int(room)
+        except ValueError:
+            pass
+        event = self._room_event(room)
+        try:
+            await asyncio.wait_for(event.wait(), KV_WAIT_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            return web.Response(status=404, text=f"No KV for room {room}")
+        finally:
+            # Unknown or long expired room (or the decoder gave up): drop the
+            # event this wait created
+            if not event.is_set() and self.kv_ready.get(room) is event:
+                del self.kv_ready[room]
+        return web.Response(text=str(self.kv_cached.get(room, 0)))
+
+    # ----- lifecycle -----
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/health_generate", self.health)
+        app.router.add_get("/get_model_info", self.get_model_info)
+        app.router.add_get("/get_server_info", self.get_server_info)
+        app.router.add_get("/server_info", self.get_server_info)
+        app.router.add_post("/flush_cache", self.flush_cache)
+        app.router.add_post("/generate", self.generate)
+        app.router.add_post("/v1/completions", self.completions)
+        if self.args.enable_metrics:
+            app.router.add_get("/metrics", self.metrics)
+        return app
+
+    async def serve(self):
+        args = self.args
+        # Same startup log lines as sglang, so startup_bench.py can parse either
+        log("Load weight begin.")
+        await asyncio.sleep(args.load_weights_s)
+        log(f"Load weight end. type=StandinModel, model={args.model_path}")
+        log("Capture cuda graph begin.")
+        await asyncio.sleep(args.cuda_graph_s)
+        log(f"Capture cuda graph end. Time elapsed: {args.cuda_graph_s:.2f} s")
+
+        self.session = ClientSession(timeout=ClientTimeout(total=None))
+        asyncio.ensure_future(self.scheduler.run())
+
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port, backlog=4096).start()
+
+        if args.disaggregation_mode == "prefill":
+            bootstrap = web.Application()
+            bootstrap.router.add_get("/kv/{room}", self.bootstrap_wait)
+            boot_runner = web.AppRunner(bootstrap, access_log=None)
+            await boot_runner.setup()
+            await web.TCPSite(boot_runner, args.host,
+                              args.disaggregation_bootstrap_port).start()
+
+        log(f"Stand-in server ({args.disaggregation_mode}) listening on "
+            f"{args.host}:{args.port}")
+        log("The server is fired up and ready to roll!")
+        await asyncio.Event().wait()
+
+
+def main():
+    args, unknown = build_parser().parse_known_args()
+    if unknown:
+        print(f"Ignoring unsupported flags: {' '.join(unknown)}")
+    try:
+        asyncio.run(StandinServer(args).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
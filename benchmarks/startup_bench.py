@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Cold-start / time-to-ready benchmark for SGLang server roles.
+
+Each trial stops the role, launches it with the usual script and records,
+relative to the launch:
+
+    container_start   docker inspect .State.StartedAt (process spawn for stand-ins)
+    weights_loaded    "Load weight end" log line
+    cuda_graph_done   "Capture cuda graph end" log line
+    fired_up          "The server is fired up and ready to roll!" log line
+    healthy           first 200 from /health (benchmarks/readiness.py)
+
+plus the weight_load and cuda_graph phase durations where the matching
+"begin" lines are present. Trials are appended to results/startup/startup.jsonl
+with the image and memory settings, so startup can be tracked across images.
+
+Roles:
+    agg        scripts/10_run_agg_server.sh       (sglang-agg, :PREFILL_PORT)
+    prefill    scripts/41_run_prefill_gh200.sh    (sglang-prefill, :PREFILL_PORT)
+    decode     scripts/40_run_decode_a100.sh      (sglang-decode, :DECODE_PORT)
+    decoders   scripts/50_run_multi_decode_a100.sh with NUM_DECODERS=N
+               (sglang-decode-i, :DECODE_BASE_PORT+i); ready = last decoder healthy
+
+Log timestamps come from `docker logs --timestamps`, so run this on the host
+that runs the containers. --standin launches benchmarks/standin_server.py
+instead (with --load-weights-s / --cuda-graph-s to emulate slow phases).
+
+Usage:
+    python3 benchmarks/startup_bench.py run --role agg --trials 5
+    python3 benchmarks/startup_bench.py run --role decoders --num-decoders 4 --trials 3
+    python3 benchmarks/startup_bench.py run --role decode --standin \\
+        --standin-args "--load-weights-s 2 --cuda-graph-s 1"
+    python3 benchmarks/startup_bench.py report
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import re
+import shlex
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from readiness import wait_ready
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SCRIPTS_DIR = ROOT / "scripts"
+STARTUP_DIRNAME = "startup"
+STARTUP_FILE = "startup.jsonl"
+
+PHASES = ['container_start', 'weights_loaded', 'cuda_graph_done', 'fired_up', 'healthy']
+DURATIONS = ['weight_load', 'cuda_graph']
+
+# (phase, regex) in the order they appear in sglang logs
+LOG_MARKERS = [
+    ('weight_load_begin', re.compile(r"Load weight begin")),
+    ('weights_loaded', re.compile(r"Load weight end")),
+    ('cuda_graph_begin', re.compile(r"Capture cuda graph begin")),
+    ('cuda_graph_done', re.compile(r"Capture cuda graph end")),
+    ('fired_up', re.compile(r"fired up and ready to roll")),
+]
+
+# docker logs --timestamps: "2024-05-01T12:00:00.123456789Z message"
+DOCKER_TS = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?Z\s")
+# sglang / stand-in: "[2024-05-01 12:00:00 TP0] message" or "[... 12:00:00.123] message"
+BRACKET_TS = re.compile(r"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)(?:\.(\d+))?[^\]]*\]")
+
+PREFILL_PORT = int(os.environ.get("PREFILL_PORT", "30000"))
+DECODE_PORT = int(os.environ.get("DECODE_PORT", "30000"))
+DECODE_BASE_PORT = int(os.environ.get("DECODE_BASE_PORT", "30000"))
+
+
+def parse_docker_time(value):
+    """RFC 3339 timestamp from docker (UTC, nanoseconds) -> epoch seconds."""
+    m = DOCKER_TS.match(value.strip() + " ")
+    if not m:
+        return None
+    t = datetime.datetime.strptime(m.group(1), "%Y-%m-%dT%H:%M:%S")
+    frac = float("0." + m.group(2)) if m.group(2) else 0.0
+    return t.replace(tzinfo=datetime.timezone.utc).timestamp() + frac
+
+
+def parse_log_time(line):
+    """Epoch seconds of a log line, from a docker or bracketed sglang prefix."""
+    t = parse_docker_time(line[:40])
+    if t is not None:
+        return t
+    m = BRACKET_TS.match(line)
+    if not m:
+        return None
+    t = datetime.datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S")
+    frac = float("0." + m.group(2)) if m.group(2) else 0.0
+    return t.timestamp() + frac
+
+
+def log_markers(lines):
+    """Epoch time of the first line matching each LOG_MARKERS phase."""
+    found = {}
+    for line in lines:
+        for phase, pattern in LOG_MARKERS:
+            if phase not in found and pattern.search(line):
+                t = parse_log_time(line)
+                if t is not None:
+                    found[phase] = t
+    return found
+
+
+# ===== Roles =====
+
+def role_instances(role, num_decoders):
+    """(name, url) of every server a role starts."""
+    if role == "agg":
+        return [("sglang-agg", f"http://127.0.0.1:{PREFILL_PORT}")]
+    if role == "prefill":
+        return [("sglang-prefill", f"http://127.0.0.1:{PREFILL_PORT}")]
+    if role == "decode":
+        return [("sglang-decode", f"http://127.0.0.1:{DECODE_PORT}")]
+    return [(f"sglang-decode-{i}", f"http://127.0.0.1:{DECODE_BASE_PORT + i}")
+            for i in range(num_decoders)]
+
+
+def role_script(role):
+    return SCRIPTS_DIR / {
+        "agg": "10_run_agg_server.sh",
+        "prefill": "41_run_prefill_gh200.sh",
+        "decode": "40_run_decode_a100.sh",
+        "decoders": "50_run_multi_decode_a100.sh",
+    }[role]
+
+
+def standin_args(role, url):
+    port = url.rsplit(":", 1)[1]
+    mode = {"agg": "null", "prefill": "prefill"}.get(role, "decode")
+    return ["--port", port, "--disaggregation-mode", mode]
+
+
+class DockerLauncher:
+    """Launch a role with its script; read timings from docker."""
+
+    def __init__(self, role, instances, num_decoders):
+        self.role = role
+        self.instances = instances
+        self.num_decoders = num_decoders
+
+    def stop(self):
+        names = [name for name, _ in self.instances]
+        subprocess.run(["docker", "rm", "-f"] + names,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def launch(self):
+        env = dict(os.environ, NUM_DECODERS=str(self.num_decoders))
+        subprocess.run(["bash", str(role_script(self.role))], env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+    def inspect(self, name, template):
+        out = subprocess.run(["docker", "inspect", "-f", template, name],
+                             capture_output=True, text=True)
+        return out.stdout.strip() if out.returncode == 0 else None
+
+    def container_start(self, name):
+        started = self.inspect(name, "{{.State.StartedAt}}")
+        return parse_docker_time(started) if started else None
+
+    def log_lines(self, name):
+        out = subprocess.run(["docker", "logs", "--timestamps", name],
+                             capture_output=True, text=True)
+        return (out.stdout + out.stderr).splitlines()
+
+    def image(self):
+        return self.inspect(self.instances[0][0], "{{.Config.Image}}")
+
+
+class StandinLauncher:
+    """Launch standin_server.py processes; logs carry their own timestamps."""
+
+    def __init__(self, role, instances, extra_args):
+        self.role = role
+        self.instances = instances
+        self.extra_args = shlex.split(extra_args)
+        self.procs = {}
+        self.spawned = {}
+
+    def log_path(self, name):
+        return pathlib.Path(f"/tmp/startup_{name}.log")
+
+    def stop(self):
+        for proc in self.procs.values():
+            proc.terminate()
+            proc.wait()
+        self.procs = {}
+
+    def launch(self):
+        for name, url in self.instances:
+            cmd = [sys.executable, str(ROOT / "benchmarks" / "standin_server.py")]
+            cmd += standin_args(self.role, url) + self.extra_args
+            with open(self.log_path(name), "w") as log:
+                self.procs[name] = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+            self.spawned[name] = time.time()
+
+    def container_start(self, name):
+        return self.spawned.get(name)
+
+    def log_lines(self, name):
+        return self.log_path(name).read_text().splitlines()
+
+    def image(self):
+        return "standin"
+
+
+def run_trial(launcher, instances, timeout):
+    """Launch once and collect per-instance phase offsets (seconds from launch)."""
+    launcher.stop()
+    launched_at = time.time()
+    launcher.launch()
+    # wait_ready counts from its own start, i.e. after the script returned
+    launch_s = time.time() - launched_at
+    ready = wait_ready([url for _, url in instances], timeout)
+
+    rows = []
+    for name, url in instances:
+        marks = log_markers(launcher.log_lines(name))
+        row = {"name": name, "url": url}
+        start = launcher.container_start(name)
+        row['container_start'] = start - launched_at if start else None
+        for phase in ['weights_loaded', 'cuda_graph_done', 'fired_up']:
+            row[phase] = marks[phase] - launched_at if phase in marks else None
+        row['healthy'] = ready[url] + launch_s if ready[url] is not None else None
+        row['weight_load'] = (marks['weights_loaded'] - marks['weight_load_begin']
+                              if {'weights_loaded', 'weight_load_begin'} <= marks.keys() else None)
+        row['cuda_graph'] = (marks['cuda_graph_done'] - marks['cuda_graph_begin']
+                             if {'cuda_graph_done', 'cuda_graph_begin'} <= marks.keys() else None)
+        rows.append(row)
+    return launched_at, rows
+
+
+def summarize_values(values):
+    values = np.array([v for v in values if v is not None], dtype=np.float64)
+    if not len(values):
+        return None
+    return {"n": len(values), "min": float(values.min()),
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)), "max": float(values.max())}
+
+
+def load_trials(results_dir=RESULTS_DIR):
+    path = pathlib.Path(results_dir) / STARTUP_DIRNAME / STARTUP_FILE
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_report(trials):
+    """Time-to-ready distributions per (role, decoders, image, mem_fraction)."""
+    groups = {}
+    for t in trials:
+        key = (t['role'], t['num_decoders'], t['image'], t.get('mem_fraction'))
+        groups.setdefault(key, []).append(t)
+
+    for (role, n, image, mem), group in sorted(groups.items(), key=lambda kv: str(kv[0])):
+        label = f"{role}" + (f" x{n}" if role == "decoders" else "")
+        print(f"\n{label}  image={image}  mem_fraction={mem or '-'}  trials={len(group)}")
+        print(f"  {'phase (s)':<18} {'n':>4} {'min':>8} {'p50':>8} {'p90':>8} {'max':>8}")
+        instances = [i for t in group for i in t['instances']]
+        series = [(phase, [i[phase] for i in instances]) for phase in PHASES + DURATIONS]
+        series.append(('all_ready', [t['ready_s'] for t in group]))
+        for phase, values in series:
+            s = summarize_values(values)
+            if s is None:
+                print(f"  {phase:<18} {0:>4} {'-':>8} {'-':>8} {'-':>8} {'-':>8}")
+                continue
+            print(f"  {phase:<18} {s['n']:>4} {s['min']:>8.2f} {s['p50']:>8.2f} "
+                  f"{s['p90']:>8.2f} {s['max']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server cold-start benchmark")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Launch a role repeatedly and record startup")
+    p_run.add_argument("--role", choices=["agg", "prefill", "decode", "decoders"], required=True)
+    p_run.add_argument("--num-decoders", type=int, default=1,
+                       help="Decoders started together (role 'decoders')")
+    p_run.add_argument("--trials", type=int, default=3)
+    p_run.add_argument("--timeout", type=float, default=900,
+                       help="Seconds to wait for /health per trial")
+    p_run.add_argument("--keep", action="store_true", help="Leave the last trial running")
+    p_run.add_argument("--standin", action="store_true",
+                       help="Launch standin_server.py instead of containers")
+    p_run.add_argument("--standin-args", default="",
+                       help="Extra stand-in flags, e.g. '--load-weights-s 2'")
+
+    sub.add_parser("report", help="Time-to-ready distributions of recorded trials")
+    args = parser.parse_args()
+    results_dir = pathlib.Path(args.results_dir)
+
+    if args.command == "report":
+        trials = load_trials(results_dir)
+        if not trials:
+            raise SystemExit(f"No trials in {results_dir / STARTUP_DIRNAME}")
+        print_report(trials)
+        return
+
+    num_decoders = args.num_decoders if args.role == "decoders" else 1
+    instances = role_instances(args.role, num_decoders)
+    if args.standin:
+        launcher = StandinLauncher(args.role, instances, args.standin_args)
+    else:
+        launcher = DockerLauncher(args.role, instances, num_decoders)
+
+    out_path = results_dir / STARTUP_DIRNAME / STARTUP_FILE
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    trials = []
+    try:
+        for trial in range(args.trials):
+            launched_at, rows = run_trial(launcher, instances, args.timeout)
+            healthy = [r['healthy'] for r in rows]
+            record = {
+                "role": args.role,
+                "num_decoders": num_decoders,
+                "trial": trial,
+                "image": launcher.image(),
+                "model": os.environ.get("MODEL_PATH", "Qwen/Qwen2.5-3B-Instruct"),
+                "mem_fraction": os.environ.get("MEM_FRACTION"),
+                "launched_at": datetime.datetime.fromtimestamp(launched_at).isoformat(),
+                "ready_s": None if None in healthy else max(healthy),
+                "instances": rows,
+            }
+            with open(out_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            trials.append(record)
+            ready = f"{record['ready_s']:.2f}s" if record['ready_s'] is not None else "NOT READY"
+            print(f"[trial {trial + 1}/{args.trials}] {args.role}: ready after {ready}")
+    finally:
+        if not args.keep:
+            launcher.stop()
+
+    print_report(trials)
+    print(f"\nAppended {len(trials)} trial(s) to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
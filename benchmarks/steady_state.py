@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Windowed throughput timelines and steady-state detection per run.
+
+A run's duration, output_throughput and latency means average ramp-up,
+steady state and drain together. With --request-rate inf, 100 prompts and
+c=128 there is hardly any steady state, so those numbers understate what a
+config sustains. This rebuilds each run's timeline from its per-request
+trace (see request_traces.py) and reports steady-state numbers next to the
+whole-run ones:
+
+    timeline     tok/s over a sliding window and requests in flight, on a
+                 grid of window/4 steps
+    steady state from the end of ramp-up (windowed tok/s first reaches
+                 PLATEAU x its median) to the last request sent; after
+                 that the run only drains
+    steady_*     output tok/s over that stretch; TTFT, TPOT and E2E of the
+                 requests sent in it
+
+A run that sends everything at once (num_prompts <= concurrency) has no
+steady state at all.
+
+load_generator.py traces carry send and token arrival times. bench_serving
+traces only have TTFT and ITLs, so the closed-loop schedule is replayed:
+requests start in order, each as soon as one of the max-concurrency slots
+frees up.
+
+Usage:
+    python3 benchmarks/steady_state.py report
+    python3 benchmarks/steady_state.py report --modes pd_1pxd --window 2 --csv steady.csv
+    python3 benchmarks/steady_state.py plot pd_1p8d_n200_in1024_out256_c128_t0
+"""
+
+import argparse
+import heapq
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from latency_analysis import request_tpot_ms
+from request_traces import load_trace
+from results_store import MODES, load_table
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Fraction of the median windowed tok/s that ends ramp-up
+PLATEAU = 0.9
+# Without --window: run length / WINDOW_DIVISOR but at least the median E2E
+# (batches finishing together make tok/s oscillate at about that period),
+# clipped to [MIN_WINDOW_S, MAX_WINDOW_S]
+WINDOW_DIVISOR = 20
+MIN_WINDOW_S, MAX_WINDOW_S = 0.25, 5.0
+# A steady state shorter than this many windows is not reported
+MIN_WINDOWS = 2
+
+
+# ===== Timelines =====
+
+def closed_loop_starts(durations, concurrency):
+    """Start times of requests sent in order through `concurrency` slots."""
+    slots = [0.0] * max(1, min(concurrency or len(durations), len(durations)))
+    starts = np.empty(len(durations))
+    for i, duration in enumerate(durations):
+        start = heapq.heappop(slots)
+        starts[i] = start
+        heapq.heappush(slots, start + duration)
+    return starts
+
+
+def request_timeline(trace, concurrency=None):
+    """Per-request intervals and output token arrivals, in seconds from run start.
+
+    Returns dict with start, finish, ok ([n] each), token_s and token_w
+    (arrival time and tokens carried, one entry per arrival).
+    """
+    ok = np.asarray(trace['success'], dtype=bool)
+    out_len = np.asarray(trace['output_len'], dtype=np.float64)
+    if 'token_s' in trace:
+        start = np.asarray(trace['send_s'], dtype=np.float64)
+        token_s = np.asarray(trace['token_s'], dtype=np.float64)
+        offsets = np.asarray(trace['token_offsets'])
+        counts = np.diff(offsets)
+        owner = np.repeat(np.arange(len(counts)), counts)
+        last = np.where(counts > 0, token_s[np.maximum(offsets[1:] - 1, 0)], np.nan)
+        finish = np.where(np.isnan(last), start, last)
+    else:
+        # bench_serving: first token at TTFT, then one arrival per ITL
+        ttft = np.asarray(trace['ttft_ms'], dtype=np.float64) / 1000
+        e2e = np.asarray(trace['e2e_ms'], dtype=np.float64) / 1000
+        itl = np.asarray(trace['itl_ms'], dtype=np.float64) / 1000
+        offsets = np.asarray(trace['itl_offsets'])
+        n_itl = np.diff(offsets)
+        start = closed_loop_starts(np.where(ok, np.nan_to_num(e2e), 0.0), concurrency)
+        finish = start + np.where(ok, np.nan_to_num(e2e), 0.0)
+        itl_owner = np.repeat(np.arange(len(n_itl)), n_itl)
+        cumsum = np.concatenate([[0.0], np.cumsum(itl)])
+        within = cumsum[1:] - cumsum[offsets[itl_owner]]
+        first = np.flatnonzero(ok)
+        token_s = np.concatenate([start[first] + ttft[first],
+                                  start[itl_owner] + ttft[itl_owner] + within])
+        owner = np.concatenate([first, itl_owner])
+        counts = np.bincount(owner, minlength=len(ok))
+    # Spread each request's output tokens over its arrivals (chunks may
+    # carry several tokens)
+    keep = ok[owner]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        token_w = out_len[owner] / counts[owner]
+    order = np.argsort(token_s[keep], kind='stable')
+    return {'start': start, 'finish': finish, 'ok': ok,
+            'token_s': token_s[keep][order], 'token_w': token_w[keep][order]}
+
+
+def auto_window(timeline):
+    ok = timeline['ok']
+    if not ok.any():
+        return MIN_WINDOW_S
+    end = float(np.nanmax(timeline['finish']))
+    e2e = float(np.median(timeline['finish'][ok] - timeline['start'][ok]))
+    return float(np.clip(max(end / WINDOW_DIVISOR, e2e), MIN_WINDOW_S, MAX_WINDOW_S))
+
+
+def windowed(timeline, window, step=None):
+    """Sliding-window series on a regular grid.
+
+    Returns DataFrame indexed by grid time t (s) with tok_s (output tokens
+    received in (t - window, t] per second) and in_flight (requests sent and
+    not finished at t).
+    """
+    step = step or window / 4
+    end = float(np.nanmax(timeline['finish'])) if len(timeline['finish']) else 0.0
+    grid = np.arange(0.0, end + step, step)
+    cum = np.concatenate([[0.0], np.cumsum(timeline['token_w'])])
+    upto = cum[np.searchsorted(timeline['token_s'], grid, side='right')]
+    before = cum[np.searchsorted(timeline['token_s'], grid - window, side='right')]
+    starts = np.sort(timeline['start'])
+    finishes = np.sort(timeline['finish'])
+    in_flight = (np.searchsorted(starts, grid, side='right')
+                 - np.searchsorted(finishes, grid, side='right'))
+    return pd.DataFrame({'tok_s': (upto - before) / window, 'in_flight': in_flight},
+                        index=pd.Index(grid, name='t'))
+
+
+def steady_window(series, timeline, window, plateau=PLATEAU):
+    """(start, end) seconds of the steady state in a windowed() series, or None."""
+    ok = timeline['ok']
+    if not ok.any():
+        return None
+    last_send = float(timeline['start'][ok].max())
+    t = series.index.to_numpy()
+    rates = series['tok_s'].to_numpy()
+    # Windowed rates are only meaningful a full window into the run
+    loaded = (t >= window) & (t <= last_send)
+    if not loaded.any():
+        return None
+    ramped = np.flatnonzero(loaded & (rates >= plateau * np.median(rates[loaded])))
+    if not len(ramped):
+        return None
+    start = float(t[ramped[0]])
+    if last_send - start < MIN_WINDOWS * window:
+        return None
+    return start, last_send
+
+
+# ===== Steady-state metrics =====
+
+def steady_metrics(trace, timeline, span):
+    """Output tok/s over `span` and latencies of the requests sent in it."""
+    start, end = span
+    s = timeline['token_s']
+    inside = (s > start) & (s <= end)
+    sent = timeline['ok'] & (timeline['start'] >= start) & (timeline['start'] <= end)
+    ttft = np.asarray(trace['ttft_ms'], dtype=np.float64)[sent]
+    tpot = request_tpot_ms(trace)[sent]
+    e2e = np.asarray(trace['e2e_ms'], dtype=np.float64)[sent]
+    return {
+        'steady_start_s': start,
+        'steady_s': end - start,
+        'steady_requests': int(sent.sum()),
+        'steady_output_throughput': float(timeline['token_w'][inside].sum() / (end - start)),
+        'steady_mean_ttft_ms': float(np.nanmean(ttft)) if len(ttft) else np.nan,
+        'steady_p99_ttft_ms': float(np.nanpercentile(ttft, 99)) if len(ttft) else np.nan,
+        'steady_mean_tpot_ms': (float(np.nanmean(tpot)) if np.isfinite(tpot).any()
+                                else np.nan),
+        'steady_mean_e2e_latency_ms': float(np.nanmean(e2e)) if len(e2e) else np.nan,
+    }
+
+
+def analyze_run(row, results_dir=RESULTS_DIR, window=None, plateau=PLATEAU):
+    """Timeline, steady span and steady-state metrics of one results row.
+
+    Returns (series, span, metrics), or None if the run has no trace.
+    """
+    trace = load_trace(row['tag'], results_dir)
+    if trace is None:
+        return None
+    concurrency = row.get('concurrency')
+    concurrency = int(concurrency) if pd.notna(concurrency) else None
+    timeline = request_timeline(trace, concurrency)
+    window = window or auto_window(timeline)
+    series = windowed(timeline, window)
+    span = steady_window(series, timeline, window, plateau)
+    metrics = {'window_s': window, 'run_s': float(series.index[-1])}
+    if span:
+        metrics.update(steady_metrics(trace, timeline, span))
+    return series, span, metrics
+
+
+def steady_table(runs, results_dir=RESULTS_DIR, window=None, plateau=PLATEAU):
+    """Whole-run and steady-state numbers per traced run (one row per tag)."""
+    whole = ['output_throughput', 'mean_ttft_ms', 'p99_ttft_ms', 'mean_tpot_ms',
+             'mean_e2e_latency_ms']
+    rows = []
+    for row in runs.to_dict('records'):
+        analyzed = analyze_run(row, results_dir, window, plateau)
+        if analyzed is None:
+            continue
+        rows.append({'tag': row['tag'], 'mode': row['mode'],
+                     **{m: row.get(m) for m in whole}, **analyzed[2]})
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        for col in ['steady_s', 'steady_output_throughput']:
+            if col not in table:
+                table[col] = np.nan
+        table['steady_fraction'] = table['steady_s'] / table['run_s']
+        table['steady_gain'] = table['steady_output_throughput'] / table['output_throughput'] - 1
+    return table
+
+
+def format_table(table):
+    cols = {
+        'tag': 'tag',
+        'run_s': 'run_s',
+        'steady_fraction': 'steady_%',
+        'output_throughput': 'tok_s',
+        'steady_output_throughput': 'steady_tok_s',
+        'steady_gain': 'gain_%',
+        'mean_ttft_ms': 'ttft',
+        'steady_mean_ttft_ms': 'steady_ttft',
+        'mean_tpot_ms': 'tpot',
+        'steady_mean_tpot_ms': 'steady_tpot',
+    }
+    shown = table.reindex(columns=list(cols)).rename(columns=cols)
+    shown['steady_%'] = shown['steady_%'] * 100
+    shown['gain_%'] = shown['gain_%'] * 100
+    return shown.to_string(index=False, float_format=lambda v: f"{v:.1f}", na_rep='-')
+
+
+# ===== Plot =====
+
+def plot_timeline(tag, series, span, metrics, out_path):
+    """tok/s and requests in flight over time with the steady span shaded."""
+    import matplotlib.pyplot as plt
+
+    fig, (ax_tok, ax_req) = plt.subplots(2, 1, figsize=(12, 7), sharex=True)
+    fig.suptitle(f"Timeline: {tag} (window {metrics['window_s']:.2f}s)",
+                 fontsize=13, fontweight='bold')
+    ax_tok.plot(series.index, series['tok_s'], color='#3498db', linewidth=1.8)
+    ax_tok.set_ylabel('Output tok/s')
+    ax_req.step(series.index, series['in_flight'], where='post', color='#e74c3c')
+    ax_req.set_ylabel('Requests in flight')
+    ax_req.set_xlabel('Seconds since run start')
+    for ax in (ax_tok, ax_req):
+        if span:
+            ax.axvspan(*span, color='#2ecc71', alpha=0.15,
+                       label='steady state' if ax is ax_tok else None)
+        ax.grid(alpha=0.3, linestyle='--')
+    if span:
+        rate = metrics['steady_output_throughput']
+        ax_tok.axhline(rate, color='#27ae60', linestyle='--',
+                       label=f"steady {rate:.0f} tok/s")
+        ax_tok.legend(fontsize=9)
+    plt.tight_layout()
+    plt.savefig(out_path, dpi=150, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"Saved: {out_path}")
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Steady-state throughput and latency per run")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--window", type=float, help="Sliding window (s); default per run")
+    parser.add_argument("--plateau", type=float, default=PLATEAU)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_report = sub.add_parser("report", help="Whole-run vs steady-state table")
+    p_report.add_argument("--modes", default=",".join(MODES))
+    p_report.add_argument("--pattern", default="*.jsonl")
+    p_report.add_argument("--csv", help="Also write the full table here")
+    p_plot = sub.add_parser("plot", help="Timeline of one run")
+    p_plot.add_argument("tag")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    if args.command == "report":
+        runs = load_table(args.pattern, results_dir, modes=args.modes.split(","))
+        table = steady_table(runs, results_dir, args.window, args.plateau)
+        if table.empty:
+            raise SystemExit(f"No traced runs in {results_dir}")
+        print(format_table(table))
+        none = int(table['steady_s'].isna().sum())
+        if none:
+            print(f"\n{none} run(s) without a steady state (ramp-up and drain only)")
+        if args.csv:
+            table.to_csv(args.csv, index=False)
+        return
+
+    runs = load_table(results_dir=results_dir, warmup=True)
+    rows = runs[runs['tag'] == args.tag]
+    if rows.empty:
+        raise SystemExit(f"No run tagged {args.tag} in {results_dir}")
+    analyzed = analyze_run(rows.iloc[-1].to_dict(), results_dir, args.window, args.plateau)
+    if analyzed is None:
+        raise SystemExit(f"{args.tag} has no trace")
+    series, span, metrics = analyzed
+    if span:
+        print(f"Steady state {span[0]:.1f}-{span[1]:.1f}s of {metrics['run_s']:.1f}s: "
+              f"{metrics['steady_output_throughput']:.1f} tok/s")
+    else:
+        print(f"No steady state in {metrics['run_s']:.1f}s")
+    plot_timeline(args.tag, series, span, metrics, results_dir / f"timeline_{args.tag}.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Request workloads: synthesized or imported traces of arrival times and
+input/output lengths, replayed by load_generator.py.
+
+The fixed-length random dataset sends every request with the same shape,
+which hides batching and padding effects and the long-tail prompts that
+stall the prefill node. A workload describes every request instead, in a
+compact on-disk format:
+
+    results/workloads/<name>/requests.bin   fixed 16-byte records
+                                            (arrival_s f8, input_len u4,
+                                            output_len u4), arrival_s
+                                            relative to the first request
+    results/workloads/<name>/meta.json      source, counts, mean lengths,
+                                            content hash
+
+Workloads are written and read in chunks of CHUNK records (the file is
+memory-mapped), so a trace of millions of requests never has to fit in
+memory and replay can stream it at full rate.
+
+Length distributions (--input / --output):
+    fixed:value=512
+    uniform:low=128,high=2048
+    lognormal:median=512,sigma=1.0[,min=1,max=16384]
+    pareto:min=128,alpha=1.5[,max=16384]      heavy tail
+
+Arrival processes (--arrival):
+    poisson:rate=10
+    gamma:rate=10,cv=3                        cv > 1 is burstier than Poisson
+    constant:rate=10
+    onoff:rate=2,burst_rate=40,burst_s=5,idle_s=30
+                                              alternating exponentially long
+                                              idle and burst phases
+
+Imports read JSONL ("timestamp", "input_len", "output_len" per line, as for
+load_generator.py --arrival trace) or CSV. CSV columns are detected by name
+(e.g. the Azure LLM inference traces' TIMESTAMP / ContextTokens /
+GeneratedTokens); timestamps may be seconds or date strings. Rows must be
+sorted by time.
+
+Runs replaying a workload are tagged <point>_wl-<name> and results_store.py
+exposes the name as the 'workload' column.
+
+Usage:
+    python3 benchmarks/workloads.py synth chat --num-requests 100000 \\
+        --input lognormal:median=1024,sigma=1.2,max=16384 \\
+        --output lognormal:median=200,sigma=0.8,max=2048 \\
+        --arrival onoff:rate=4,burst_rate=40,burst_s=5,idle_s=30
+    python3 benchmarks/workloads.py import azure-conv AzureLLMInferenceTrace_conv.csv
+    python3 benchmarks/workloads.py list
+    python3 benchmarks/workloads.py show chat
+    python3 benchmarks/load_generator.py --workload chat --num-prompts 5000 ...
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import re
+import time
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+WORKLOADS_DIRNAME = "workloads"
+
+RECORD = np.dtype([("arrival_s", "<f8"), ("input_len", "<u4"), ("output_len", "<u4")])
+
+# Records generated, written and streamed per step
+CHUNK = 1 << 16
+
+# No underscores, so a name never collides with the _t<k>/_w<k> trial suffix
+NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.-]*$')
+
+# CSV column names recognized by import, in order of preference
+TIME_COLUMNS = ["timestamp", "TIMESTAMP", "arrival_time", "time"]
+INPUT_COLUMNS = ["input_len", "ContextTokens", "prompt_tokens", "input_tokens"]
+OUTPUT_COLUMNS = ["output_len", "GeneratedTokens", "completion_tokens", "output_tokens"]
+
+
+def workload_dir(name, results_dir=RESULTS_DIR):
+    return pathlib.Path(results_dir) / WORKLOADS_DIRNAME / name
+
+
+def check_name(name):
+    if not NAME_RE.match(name):
+        raise ValueError(f"Invalid workload name {name!r} (letters, digits, '.' and '-')")
+    return name
+
+
+def parse_spec(text):
+    """'lognormal:median=512,sigma=1' -> ('lognormal', {'median': 512.0, 'sigma': 1.0})."""
+    kind, _, rest = text.partition(":")
+    params = {}
+    for item in filter(None, rest.split(",")):
+        key, _, value = item.partition("=")
+        params[key.strip()] = float(value)
+    return kind.strip(), params
+
+
+# ===== Synthesis =====
+
+def sample_lengths(spec, size, rng):
+    """Draw `size` token lengths from a length spec."""
+    kind, p = parse_spec(spec)
+    if kind == "fixed":
+        values = np.full(size, p["value"])
+    elif kind == "uniform":
+        values = rng.integers(int(p["low"]), int(p["high"]) + 1, size)
+    elif kind == "lognormal":
+        values = rng.lognormal(np.log(p["median"]), p["sigma"], size)
+    elif kind == "pareto":
+        values = p["min"] * (1.0 + rng.pareto(p["alpha"], size))
+    else:
+        raise ValueError(f"Unknown length distribution: {kind}")
+    low = p.get("min", 1)
+    high = p.get("max", np.iinfo(np.uint32).max)
+    return np.clip(np.rint(values), max(low, 1), high).astype(np.uint32)
+
+
+def arrival_chunks(spec, rng):
+    """Endless arrival times (seconds, increasing) in chunks."""
+    kind, p = parse_spec(spec)
+    t = 0.0
+    if kind == "onoff":
+        burst = False
+        while True:
+            length = rng.exponential(p["burst_s"] if burst else p["idle_s"])
+            rate = p["burst_rate"] if burst else p["rate"]
+            yield t + np.sort(rng.uniform(0.0, length, rng.poisson(rate * length)))
+            t += length
+            burst = not burst
+    while True:
+        rate = p["rate"]
+        if kind == "poisson":
+            gaps = rng.exponential(1.0 / rate, CHUNK)
+        elif kind == "gamma":
+            shape = 1.0 / p["cv"] ** 2
+            gaps = rng.gamma(shape, 1.0 / (rate * shape), CHUNK)
+        elif kind == "constant":
+            gaps = np.full(CHUNK, 1.0 / rate)
+        else:
+            raise ValueError(f"Unknown arrival process: {kind}")
+        times = t + np.cumsum(gaps)
+        t = times[-1]
+        yield times
+
+
+def take(chunks, count):
+    """Re-chunk an endless array stream into exactly `count` values."""
+    left = count
+    pending = []
+    for chunk in chunks:
+        pending.append(chunk)
+        buffered = sum(len(c) for c in pending)
+        while buffered >= CHUNK or (buffered and buffered >= left):
+            joined = np.concatenate(pending)
+            size = min(CHUNK, left)
+            yield joined[:size]
+            left -= size
+            pending = [joined[size:]]
+            buffered -= size
+            if not left:
+                return
+
+
+def synthesize(num_requests, input_spec, output_spec, arrival_spec, seed=0):
+    """Record chunks of a synthetic workload."""
+    rng = np.random.default_rng(seed)
+    for times in take(arrival_chunks(arrival_spec, rng), num_requests):
+        records = np.empty(len(times), dtype=RECORD)
+        records["arrival_s"] = times
+        records["input_len"] = sample_lengths(input_spec, len(times), rng)
+        records["output_len"] = sample_lengths(output_spec, len(times), rng)
+        yield records
+
+
+# ===== Import =====
+
+def _pick(columns, candidates, what):
+    for name in candidates:
+        if name in columns:
+            return name
+    raise ValueError(f"No {what} column (expected one of {', '.join(candidates)})")
+
+
+def _to_seconds(values):
+    """Timestamps as float seconds (numbers pass through, strings are dates)."""
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    return pd.to_datetime(values).to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+
+def read_csv_chunks(path, time_col=None, input_col=None, output_col=None):
+    """Record chunks from a CSV trace."""
+    import pandas as pd
+    for frame in pd.read_csv(path, chunksize=CHUNK):
+        time_col = time_col or _pick(frame.columns, TIME_COLUMNS, "timestamp")
+        input_col = input_col or _pick(frame.columns, INPUT_COLUMNS, "input length")
+        output_col = output_col or _pick(frame.columns, OUTPUT_COLUMNS, "output length")
+        records = np.empty(len(frame), dtype=RECORD)
+        records["arrival_s"] = _to_seconds(frame[time_col])
+        records["input_len"] = frame[input_col].to_numpy()
+        records["output_len"] = frame[output_col].to_numpy()
+        yield records
+
+
+def read_jsonl_chunks(path):
+    """Record chunks from a load_generator JSONL trace."""
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            rows.append((float(rec["timestamp"]), int(rec["input_len"]), int(rec["output_len"])))
+            if len(rows) == CHUNK:
+                yield np.array(rows, dtype=RECORD)
+                rows = []
+    if rows:
+        yield np.array(rows, dtype=RECORD)
+
+
+# ===== Storage =====
+
+def write_workload(name, chunks, results_dir=RESULTS_DIR, source=None, num_requests=None):
+    """Write record chunks as workload `name`, replacing any previous one.
+
+    Arrival times are shifted so the first request is at t=0. Stops after
+    num_requests records if given. Returns the metadata.
+    """
+    out = workload_dir(check_name(name), results_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    tmp_path = out / ".requests.tmp.bin"
+    digest = hashlib.sha1()
+    count = input_sum = output_sum = 0
+    input_max = output_max = 0
+    t0 = last = None
+    try:
+        with tmp_path.open("wb") as f:
+            for records in chunks:
+                if num_requests is not None:
+                    records = records[:num_requests - count]
+                if not len(records):
+                    break
+                times = records["arrival_s"]
+                if t0 is None:
+                    t0 = last = times[0]
+                if times[0] < last:
+                    raise ValueError(f"Arrival times are not sorted (request {count})")
+                unsorted = np.flatnonzero(np.diff(times) < 0)
+                if len(unsorted):
+                    raise ValueError("Arrival times are not sorted "
+                                     f"(request {count + int(unsorted[0]) + 1})")
+                last = times[-1]
+                records = records.copy()
+                records["arrival_s"] -= t0
+                data = records.tobytes()
+                f.write(data)
+                digest.update(data)
+                count += len(records)
+                input_sum += int(records["input_len"].sum(dtype=np.int64))
+                output_sum += int(records["output_len"].sum(dtype=np.int64))
+                input_max = max(input_max, int(records["input_len"].max()))
+                output_max = max(output_max, int(records["output_len"].max()))
+                if count == num_requests:
+                    break
+        if not count:
+            raise ValueError(f"Workload {name} has no requests")
+        os.replace(tmp_path, out / "requests.bin")
+    finally:
+        # Left behind only if the workload was rejected
+        tmp_path.unlink(missing_ok=True)
+    meta = {
+        "name": name,
+        "source": source,
+        "num_requests": count,
+        "duration_s": float(last - t0),
+        "mean_input_len": input_sum / count,
+        "mean_output_len": output_sum / count,
+        "max_input_len": input_max,
+        "max_output_len": output_max,
+        "hash": digest.hexdigest()[:12],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    (out / "meta.json").write_text(json.dumps(meta, indent=2) + "\n")
+    return meta
+
+
+def load_meta(name, results_dir=RESULTS_DIR):
+    path = workload_dir(name, results_dir) / "meta.json"
+    if not path.exists():
+        raise FileNotFoundError(f"No workload {name!r} in {path.parent.parent}")
+    return json.loads(path.read_text())
+
+
+def open_workload(name, results_dir=RESULTS_DIR):
+    """(meta, memory-mapped record array) of a workload."""
+    meta = load_meta(name, results_dir)
+    path = workload_dir(name, results_dir) / "requests.bin"
+    return meta, np.memmap(path, dtype=RECORD, mode="r", shape=(meta["num_requests"],))
+
+
+def stream(records, start=0, count=None, speedup=1.0):
+    """Yield (send offset, input_len, output_len) from a record array.
+
+    Offsets are relative to request `start` and divided by `speedup`; the
+    array is read CHUNK records at a time.
+    """
+    stop = len(records) if count is None else min(len(records), start + count)
+    if start >= stop:
+        return
+    t0 = float(records["arrival_s"][start])
+    for lo in range(start, stop, CHUNK):
+        chunk = records[lo:min(lo + CHUNK, stop)]
+        offsets = (chunk["arrival_s"] - t0) / speedup
+        yield from zip(offsets.tolist(), chunk["input_len"].tolist(),
+                       chunk["output_len"].tolist())
+
+
+def list_workloads(results_dir=RESULTS_DIR):
+    base = pathlib.Path(results_dir) / WORKLOADS_DIRNAME
+    if not base.is_dir():
+        return []
+    return sorted(p.name for p in base.iterdir() if (p / "meta.json").exists())
+
+
+# ===== Inspection =====
+
+def describe(records):
+    """Length percentiles and burstiness of a record array."""
+    times = np.asarray(records["arrival_s"])
+    stats = {}
+    for field in ("input_len", "output_len"):
+        values = np.asarray(records[field])
+        for q in (50, 90, 99):
+            stats[f"p{q}_{field}"] = float(np.percentile(values, q))
+    gaps = np.diff(times)
+    if len(gaps) and gaps.mean() > 0:
+        # 1 for Poisson arrivals, larger for bursty ones
+        stats["interarrival_cv"] = float(gaps.std() / gaps.mean())
+    if times[-1] > 0:
+        per_second = np.bincount(times.astype(np.int64))
+        stats["mean_rate"] = float(len(times) / times[-1])
+        stats["peak_1s_rate"] = float(per_second.max())
+    return stats
+
+
+def print_show(name, results_dir):
+    meta, records = open_workload(name, results_dir)
+    print(f"Workload {name} ({meta['hash']}): {meta['num_requests']} requests "
+          f"over {meta['duration_s']:.1f}s")
+    print(f"  Source: {meta['source']}")
+    stats = describe(records)
+    for field in ("input_len", "output_len"):
+        print(f"  {field:<11} mean {meta[f'mean_{field}']:8.1f}  "
+              + "  ".join(f"p{q} {stats[f'p{q}_{field}']:8.0f}" for q in (50, 90, 99))
+              + f"  max {meta[f'max_{field}']}")
+    if "mean_rate" in stats:
+        print(f"  Arrivals:   {stats['mean_rate']:.2f} req/s mean, "
+              f"{stats['peak_1s_rate']:.0f} req/s peak (1s), "
+              f"inter-arrival CV {stats.get('interarrival_cv', 0):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request workloads")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_synth = sub.add_parser("synth", help="Synthesize a workload")
+    p_synth.add_argument("name")
+    p_synth.add_argument("--num-requests", type=int, required=True)
+    p_synth.add_argument("--input", default="lognormal:median=512,sigma=1.0,max=16384",
+                         help="Input length distribution")
+    p_synth.add_argument("--output", default="lognormal:median=128,sigma=0.8,max=4096",
+                         help="Output length distribution")
+    p_synth.add_argument("--arrival", default="poisson:rate=10", help="Arrival process")
+    p_synth.add_argument("--seed", type=int, default=0)
+
+    p_import = sub.add_parser("import", help="Import a JSONL or CSV trace")
+    p_import.add_argument("name")
+    p_import.add_argument("path")
+    p_import.add_argument("--num-requests", type=int, default=None,
+                          help="Keep only the first N requests")
+    p_import.add_argument("--time-col")
+    p_import.add_argument("--input-col")
+    p_import.add_argument("--output-col")
+
+    sub.add_parser("list", help="List workloads")
+    p_show = sub.add_parser("show", help="Length and arrival statistics")
+    p_show.add_argument("name")
+    args = parser.parse_args()
+
+    results_dir = pathlib.Path(args.results_dir)
+    if args.command == "synth":
+        source = {"input": args.input, "output": args.output,
+                  "arrival": args.arrival, "seed": args.seed}
+        chunks = synthesize(args.num_requests, args.input, args.output, args.arrival, args.seed)
+        write_workload(args.name, chunks, results_dir, source=source)
+        print_show(args.name, results_dir)
+    elif args.command == "import":
+        path = pathlib.Path(args.path)
+        if path.suffix == ".jsonl":
+            chunks = read_jsonl_chunks(path)
+        else:
+            chunks = read_csv_chunks(path, args.time_col, args.input_col, args.output_col)
+        write_workload(args.name, chunks, results_dir, source=str(path),
+                       num_requests=args.num_requests)
+        print_show(args.name, results_dir)
+    elif args.command == "list":
+        for name in list_workloads(results_dir):
+            meta = load_meta(name, results_dir)
+            print(f"  {name:<24} {meta['num_requests']:>10} requests  "
+                  f"{meta['duration_s']:>10.1f}s  in {meta['mean_input_len']:.0f} / "
+                  f"out {meta['mean_output_len']:.0f} mean  {meta['hash']}")
+    else:
+        print_show(args.name, results_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@
 set -euo pipefail
 
 # ============================================================
-# 1PxD Scaling Sweep: Benchmark with varying number of decoders
-# Tests 1P1D, 1P2D, 1P4D, 1P8D configurations
+# xPyD Scaling Sweep: Benchmark with varying numbers of prefills and decoders
+# Tests 1P1D, 1P2D, 1P4D, 1P8D configurations by default; --prefills 1,2
+# adds 2P1D ... 2P8D
 # 
 # This script should be run on the A100 node after:
-# 1. Prefill server is running on GH200
+# 1. Prefill servers are running on GH200 (NUM_PREFILLS = largest count)
 # 2. All decode servers are started (NUM_DECODERS=8)
 # ============================================================
 
@@ -18,7 +19,8 @@ source "${SCRIPTS_DIR}/00_extended_config.sh"
 
 # ===== SWEEP CONFIGURATION =====
 
-# Number of decoders to test (scaling study)
+# Number of prefills and decoders to test (every combination)
+PREFILL_COUNTS=(1)
 DECODER_COUNTS=(1 2 4 8)
 
 # Benchmark parameters (can be overridden via env)
@@ -28,8 +30,18 @@ SWEEP_INPUT_LEN="${SWEEP_INPUT_LEN:-1024}"
 SWEEP_OUTPUT_LEN="${SWEEP_OUTPUT_LEN:-256}"
 SWEEP_CONCURRENCY="${SWEEP_CONCURRENCY:-128}"
 
-# Prefill server location
-PREFILL_URL="http://${PREFILL_HOST}:${PREFILL_PORT}"
+# Repeated trials per decoder count; warmups are tagged _w<k>, trials _t<k>
+# (default: one plain run, as before --trials existed)
+TRIALS="${TRIALS:-1}"
+WARMUP_TRIALS="${WARMUP_TRIALS:-0}"
+
+# Sample server /metrics during every run into results/metrics/<tag> (--no-metrics)
+METRICS="${METRICS:-1}"
+
+# Deduplicate server_info into results/server_configs after the sweep
+# (--compact). Rewrites the result files in place; commit the store with them.
+COMPACT="${COMPACT:-0}"
+
 
 # ===== HELPER FUNCTIONS =====
 
@@ -62,9 +74,11 @@ stop_router() {
 }
 
 start_router() {
-    local num_decoders=$1
+    local num_prefills=$1
+    local num_decoders=$2
+    local layout="${num_prefills}p${num_decoders}d"
     
-    log "Starting router for 1P${num_decoders}D configuration..."
+    log "Starting router for ${num_prefills}P${num_decoders}D configuration..."
     
     # Build decode endpoints
     local decode_args=""
@@ -77,32 +91,58 @@ start_router() {
     source "${VENV_DIR}/bin/activate"
     nohup python3 -m sglang_router.launch_router \
         --pd-disaggregation \
-        --prefill "${PREFILL_URL}" \
+        $(get_prefill_router_args "${num_prefills}") \
         ${decode_args} \
         --host 0.0.0.0 --port "${ROUTER_PORT}" \
-        > /tmp/router_1p${num_decoders}d.log 2>&1 &
+        --prometheus-port "${ROUTER_METRICS_PORT}" \
+        > "/tmp/router_${layout}.log" 2>&1 &
     
     sleep 10
     
     # Verify router is running
     if ! curl -s --max-time 10 "http://127.0.0.1:${ROUTER_PORT}/health" > /dev/null 2>&1; then
-        log "ERROR: Router failed to start. Check /tmp/router_1p${num_decoders}d.log"
+        log "ERROR: Router failed to start. Check /tmp/router_${layout}.log"
         return 1
     fi
     
-    log "Router started for 1P${num_decoders}D"
+    log "Router started for ${num_prefills}P${num_decoders}D"
 }
 
 run_benchmark() {
-    local num_decoders=$1
-    local tag="pd_1p${num_decoders}d_n${SWEEP_NUM_PROMPTS}_in${SWEEP_INPUT_LEN}_out${SWEEP_OUTPUT_LEN}_c${SWEEP_CONCURRENCY}"
-    local output_file="${RESULTS_DIR}/${tag}.jsonl"
+    local num_prefills=$1
+    local num_decoders=$2
+    local suffix="${3:-}"
+    local point="pd_${num_prefills}p${num_decoders}d_n${SWEEP_NUM_PROMPTS}_in${SWEEP_INPUT_LEN}_out${SWEEP_OUTPUT_LEN}_c${SWEEP_CONCURRENCY}"
+    local tag="${point}${suffix}"
+    local output_file="${RESULTS_DIR}/${point}.jsonl"
     
     log "Running benchmark: ${tag}"
     
     source "${VENV_DIR}/bin/activate"
     
-    python3 -m sglang.bench_serving \
+    # Scrape every prefill, every decoder and the router while bench_serving runs
+    local sampler=()
+    if [ "${METRICS}" = "1" ]; then
+        sampler=(python3 "${REPO_ROOT}/benchmarks/metrics_sampler.py" --results-dir "${RESULTS_DIR}"
+                 run --tag "${tag}" --interval "${METRICS_INTERVAL}"
+                 --target "router=http://127.0.0.1:${ROUTER_METRICS_PORT}")
+        local i=0
+        while read -r url _; do
+            # A single prefill keeps the role name of the 1PxD runs
+            if [ "${num_prefills}" -eq 1 ]; then
+                sampler+=(--target "prefill=${url}")
+            else
+                sampler+=(--target "prefill${i}=${url}")
+            fi
+            i=$((i + 1))
+        done < <(get_prefill_endpoints "${num_prefills}")
+        for ((i=0; i<num_decoders; i++)); do
+            sampler+=(--target "decode${i}=http://127.0.0.1:$((DECODE_BASE_PORT + i))")
+        done
+        sampler+=(--)
+    fi
+    
+    ${sampler[@]+"${sampler[@]}"} python3 -m sglang.bench_serving \
         --backend sglang \
         --base-url "http://127.0.0.1:${ROUTER_PORT}" \
         --dataset-name random \
@@ -113,34 +153,63 @@ run_benchmark() {
         --max-concurrency "${SWEEP_CONCURRENCY}" \
         --pd-separated \
         --output-file "${output_file}" \
-        --tag "${tag}"
+        --tag "${tag}" \
+        --output-details
     
     log "Results saved to: ${output_file}"
 }
 
+run_trials() {
+    local num_prefills=$1
+    local num_decoders=$2
+    local layout="${num_prefills}P${num_decoders}D"
+    
+    if [ "${TRIALS}" -eq 1 ] && [ "${WARMUP_TRIALS}" -eq 0 ]; then
+        run_benchmark "${num_prefills}" "${num_decoders}"
+        return
+    fi
+    for ((k=0; k<WARMUP_TRIALS; k++)); do
+        run_benchmark "${num_prefills}" "${num_decoders}" "_w${k}" \
+            || log "Warmup ${k} failed for ${layout}"
+    done
+    local failed=0
+    for ((k=0; k<TRIALS; k++)); do
+        if ! run_benchmark "${num_prefills}" "${num_decoders}" "_t${k}"; then
+            log "Trial ${k} failed for ${layout}"
+            failed=$((failed + 1))
+        fi
+    done
+    [ "${failed}" -lt "${TRIALS}" ]
+}
+
 # ===== MAIN =====
 
 main() {
     log "=============================================="
-    log "1PxD Scaling Sweep"
+    log "xPyD Scaling Sweep"
     log "=============================================="
+    log "Prefill counts: ${PREFILL_COUNTS[*]}"
     log "Decoder counts: ${DECODER_COUNTS[*]}"
     log "Num prompts: ${SWEEP_NUM_PROMPTS}"
     log "Input length: ${SWEEP_INPUT_LEN}"
     log "Output length: ${SWEEP_OUTPUT_LEN}"
     log "Concurrency: ${SWEEP_CONCURRENCY}"
+    log "Trials: ${TRIALS} (+${WARMUP_TRIALS} warmup)"
     log "=============================================="
     
     mkdir -p "${RESULTS_DIR}"
     
-    # Verify prefill server is running
-    log "Checking prefill server..."
-    if ! curl -s --max-time 10 "${PREFILL_URL}/health" > /dev/null 2>&1; then
-        log "ERROR: Prefill server not running at ${PREFILL_URL}"
-        log "Start it on GH200 with: bash scripts/51_run_prefill_gh200_1pxd.sh"
-        exit 1
-    fi
-    log "Prefill server OK"
+    # Verify prefill servers are running (check max needed)
+    local max_prefills=$(printf '%s\n' "${PREFILL_COUNTS[@]}" | sort -n | tail -1)
+    log "Checking ${max_prefills} prefill servers..."
+    while read -r url _; do
+        if ! curl -s --max-time 10 "${url}/health" > /dev/null 2>&1; then
+            log "ERROR: Prefill server not running at ${url}"
+            log "Start them on GH200 with: NUM_PREFILLS=${max_prefills} bash scripts/51_run_prefill_gh200_1pxd.sh"
+            exit 1
+        fi
+    done < <(get_prefill_endpoints "${max_prefills}")
+    log "All ${max_prefills} prefill servers OK"
     
     # Verify decode servers are running (check max needed)
     local max_decoders=${DECODER_COUNTS[-1]}
@@ -155,29 +224,32 @@ main() {
     done
     log "All ${max_decoders} decode servers OK"
     
-    # Run sweep for each decoder count
-    for num_decoders in "${DECODER_COUNTS[@]}"; do
-        log ""
-        log "=============================================="
-        log "Testing 1P${num_decoders}D configuration"
-        log "=============================================="
-        
-        # Stop existing router
-        stop_router
-        
-        # Start router with this many decoders
-        if ! start_router "${num_decoders}"; then
-            log "Failed to start router for 1P${num_decoders}D, skipping..."
-            continue
-        fi
-        
-        # Run benchmark
-        if ! run_benchmark "${num_decoders}"; then
-            log "Benchmark failed for 1P${num_decoders}D, continuing..."
-        fi
-        
-        # Brief pause between tests
-        sleep 5
+    # Run sweep for each layout
+    for num_prefills in "${PREFILL_COUNTS[@]}"; do
+        for num_decoders in "${DECODER_COUNTS[@]}"; do
+            local layout="${num_prefills}P${num_decoders}D"
+            log ""
+            log "=============================================="
+            log "Testing ${layout} configuration"
+            log "=============================================="
+            
+            # Stop existing router
+            stop_router
+            
+            # Start router with these prefills and decoders
+            if ! start_router "${num_prefills}" "${num_decoders}"; then
+                log "Failed to start router for ${layout}, skipping..."
+                continue
+            fi
+            
+            # Run warmup and measured trials
+            if ! run_trials "${num_prefills}" "${num_decoders}"; then
+                log "Benchmark failed for ${layout}, continuing..."
+            fi
+            
+            # Brief pause between tests
+            sleep 5
+        done
     done
     
     # Cleanup
@@ -185,14 +257,21 @@ main() {
     
     log ""
     log "=============================================="
-    log "1PxD Scaling Sweep Complete!"
+    log "xPyD Scaling Sweep Complete!"
     log "Results in: ${RESULTS_DIR}"
     log "=============================================="
     
     # List generated files
     log ""
     log "Generated files:"
-    ls -la "${RESULTS_DIR}"/pd_1p*d_*.jsonl 2>/dev/null || echo "No files found"
+    ls -la "${RESULTS_DIR}"/pd_*p*d_*.jsonl 2>/dev/null || echo "No files found"
+    
+    # Move per-request --output-details lists into results/traces
+    python3 "${REPO_ROOT}/benchmarks/request_traces.py" extract || true
+    # Deduplicate server_info into benchmarks/results/server_configs
+    if [ "${COMPACT}" = "1" ]; then
+        python3 "${REPO_ROOT}/benchmarks/server_configs.py" compact || true
+    fi
 }
 
 # ===== ENTRY POINT =====
@@ -200,6 +279,10 @@ main() {
 # Parse arguments
 while [[ $# -gt 0 ]]; do
     case $1 in
+        --prefills)
+            IFS=',' read -ra PREFILL_COUNTS <<< "$2"
+            shift 2
+            ;;
         --decoders)
             IFS=',' read -ra DECODER_COUNTS <<< "$2"
             shift 2
@@ -220,22 +303,45 @@ while [[ $# -gt 0 ]]; do
             SWEEP_CONCURRENCY="$2"
             shift 2
             ;;
+        --trials)
+            TRIALS="$2"
+            shift 2
+            ;;
+        --warmup-trials)
+            WARMUP_TRIALS="$2"
+            shift 2
+            ;;
+        --no-metrics)
+            METRICS=0
+            shift
+            ;;
+        --compact)
+            COMPACT=1
+            shift
+            ;;
         --help)
             echo "Usage: $0 [OPTIONS]"
             echo ""
             echo "Options:"
+            echo "  --prefills N1,N2,...     Number of prefills to test (default: 1)"
             echo "  --decoders N1,N2,...     Number of decoders to test (default: 1,2,4,8)"
             echo "  --num-prompts N          Number of prompts (default: 200)"
             echo "  --input-len L            Input token length (default: 1024)"
             echo "  --output-len L           Output token length (default: 256)"
             echo "  --concurrency C          Max concurrency (default: 128)"
+            echo "  --trials N               Measured trials per layout (default: 1)"
+            echo "  --warmup-trials N        Discarded warmup trials (default: 0)"
+            echo "  --no-metrics             Do not sample server /metrics during runs"
+            echo "  --compact                Dedupe server_info into results/server_configs"
+            echo "                           afterwards (rewrites the result files in place)"
             echo ""
             echo "Prerequisites:"
-            echo "  1. Prefill server running on GH200"
+            echo "  1. Prefill servers running on GH200 (NUM_PREFILLS = largest --prefills)"
             echo "  2. Decode servers running on A100 (NUM_DECODERS=8)"
             echo ""
             echo "Example:"
             echo "  $0 --decoders 1,2,4,8 --concurrency 256"
+            echo "  $0 --prefills 1,2 --decoders 2,4,8 --input-len 4096"
             exit 0
             ;;
         *)
@@ -4,7 +4,7 @@ set -euo pipefail
 # ============================================================
 # Extended Parameter Sweep for Maximum Configuration Testing
 # Tests larger input/output lengths, higher concurrency
-# Includes both intra-node and inter-node (1PxD) configurations
+# Includes both intra-node and inter-node (xPyD) configurations
 # ============================================================
 
 REPO_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
@@ -32,13 +32,23 @@ CONCURRENCY_LIST=(64 128 256)
 # Which modes to run
 # agg: Aggregated on single node
 # pd_intra: Intra-node PD (same node)
-# pd_inter_1pXd: Inter-node with X decoders
+# pd_inter_XpYd: Inter-node with X prefills and Y decoders
 MODES=("pd_inter_1p1d" "pd_inter_1p2d" "pd_inter_1p4d" "pd_inter_1p8d")
 
 # ===== ENVIRONMENT =====
 A100_HOST="${A100_HOST:-172.16.40.99}"
 GH200_HOST="${PREFILL_HOST:-172.16.40.79}"
 
+# Adaptive search instead of the grid (--search rate|concurrency):
+# for each (mode, input_len, output_len), find the highest load that meets the SLOs
+SEARCH=""
+SEARCH_TTFT_SLO="${SEARCH_TTFT_SLO:-200}"
+SEARCH_TPOT_SLO="${SEARCH_TPOT_SLO:-50}"
+
+# Deduplicate server_info into results/server_configs after the sweep
+# (--compact). Rewrites the result files in place; commit the store with them.
+COMPACT="${COMPACT:-0}"
+
 # ===== HELPER FUNCTIONS =====
 
 log() {
@@ -65,12 +75,12 @@ stop_router() {
     sleep 3
 }
 
-# Start router for 1PxD configuration
-start_1pxd_router() {
-    local num_decoders=$1
-    local prefill_url="http://${GH200_HOST}:${PREFILL_PORT}"
+# Start router for xPyD configuration
+start_xpyd_router() {
+    local num_prefills=$1
+    local num_decoders=$2
     
-    log "Starting router for 1P${num_decoders}D..."
+    log "Starting router for ${num_prefills}P${num_decoders}D..."
     
     stop_router
     
@@ -84,7 +94,7 @@ start_1pxd_router() {
     source "${VENV_DIR}/bin/activate"
     nohup python3 -m sglang_router.launch_router \
         --pd-disaggregation \
-        --prefill "${prefill_url}" \
+        $(get_prefill_router_args "${num_prefills}") \
         ${decode_args} \
         --host 0.0.0.0 --port "${ROUTER_PORT}" \
         > /tmp/router_extended.log 2>&1 &
@@ -121,6 +131,7 @@ run_benchmark() {
         --max-concurrency "${BENCH_MAX_CONCURRENCY}" \
         --output-file "${output_file}" \
         --tag "${tag}" \
+        --output-details \
         ${pd_flag} || {
             log "WARNING: Benchmark failed for ${tag}"
             return 1
@@ -129,6 +140,29 @@ run_benchmark() {
     log "Saved: ${output_file}"
 }
 
+run_search() {
+    local mode="$1"
+    local base_url="$2"
+    
+    source "${VENV_DIR}/bin/activate"
+    for input_len in "${INPUT_LEN_LIST[@]}"; do
+        for output_len in "${OUTPUT_LEN_LIST[@]}"; do
+            log ""
+            log "--- ${mode} search (${SEARCH}) in=${input_len} out=${output_len} ---"
+            python3 "${REPO_ROOT}/benchmarks/rate_search.py" run \
+                --mode "${mode}" \
+                --base-url "${base_url}" \
+                --input-len "${input_len}" \
+                --output-len "${output_len}" \
+                --search "${SEARCH}" \
+                --ttft-slo "${SEARCH_TTFT_SLO}" \
+                --tpot-slo "${SEARCH_TPOT_SLO}" || {
+                    log "WARNING: Search failed for ${mode} in=${input_len} out=${output_len}"
+                }
+        done
+    done
+}
+
 # ===== MAIN SWEEP =====
 
 main() {
@@ -178,10 +212,12 @@ main() {
         log "MODE: ${mode}"
         log "=============================================="
         
-        # Extract number of decoders from mode
+        # Extract number of prefills and decoders from mode
+        local num_prefills=1
         local num_decoders=1
-        if [[ "$mode" =~ pd_inter_1p([0-9]+)d ]]; then
-            num_decoders="${BASH_REMATCH[1]}"
+        if [[ "$mode" =~ pd_inter_([0-9]+)p([0-9]+)d ]]; then
+            num_prefills="${BASH_REMATCH[1]}"
+            num_decoders="${BASH_REMATCH[2]}"
         fi
         
         # Check if we have enough decoders
@@ -191,7 +227,7 @@ main() {
         fi
         
         # Start appropriate router
-        if ! start_1pxd_router "$num_decoders"; then
+        if ! start_xpyd_router "$num_prefills" "$num_decoders"; then
             log "Failed to start router for ${mode}, skipping..."
             continue
         fi
@@ -199,6 +235,11 @@ main() {
         BASE_URL="http://127.0.0.1:${ROUTER_PORT}"
         PD_FLAG="--pd-separated"
         
+        if [ -n "${SEARCH}" ]; then
+            run_search "${mode}" "${BASE_URL}"
+            continue
+        fi
+        
         # Run parameter sweep for this mode
         for num_prompts in "${NUM_PROMPTS_LIST[@]}"; do
             for input_len in "${INPUT_LEN_LIST[@]}"; do
@@ -242,8 +283,15 @@ main() {
     log "=============================================="
     
     # Count results
-    local result_count=$(ls -1 "${RESULTS_DIR}"/pd_inter_1p*d_*.jsonl 2>/dev/null | wc -l)
+    local result_count=$(ls -1 "${RESULTS_DIR}"/pd_inter_*p*d_*.jsonl 2>/dev/null | wc -l)
     log "Total result files: ${result_count}"
+    
+    # Move per-request --output-details lists into results/traces
+    python3 "${REPO_ROOT}/benchmarks/request_traces.py" extract || true
+    # Deduplicate server_info into benchmarks/results/server_configs
+    if [ "${COMPACT}" = "1" ]; then
+        python3 "${REPO_ROOT}/benchmarks/server_configs.py" compact || true
+    fi
 }
 
 # ===== USAGE =====
@@ -253,14 +301,19 @@ usage() {
     echo ""
     echo "Options:"
     echo "  --modes M1,M2,...           Modes to test"
-    echo "                              (pd_inter_1p1d,pd_inter_1p2d,pd_inter_1p4d,pd_inter_1p8d)"
+    echo "                              (pd_inter_1p1d,pd_inter_1p2d,pd_inter_1p4d,pd_inter_1p8d;"
+    echo "                              pd_inter_2p4d etc. need NUM_PREFILLS=2 prefill servers)"
     echo "  --num-prompts N1,N2,...     Number of prompts (default: 200,500)"
     echo "  --input-lens L1,L2,...      Input lengths (default: 512,1024,2048,4096)"
     echo "  --output-lens L1,L2,...     Output lengths (default: 128,256,512)"
     echo "  --concurrency C1,C2,...     Concurrency levels (default: 64,128,256)"
+    echo "  --search rate|concurrency   Find max load under SLO per (mode, in, out)"
+    echo "                              instead of the grid (SEARCH_TTFT_SLO/SEARCH_TPOT_SLO ms)"
+    echo "  --compact                   Dedupe server_info into results/server_configs"
+    echo "                              afterwards (rewrites the result files in place)"
     echo ""
     echo "Prerequisites:"
-    echo "  1. Prefill server on GH200: bash scripts/51_run_prefill_gh200_1pxd.sh"
+    echo "  1. Prefill server(s) on GH200: NUM_PREFILLS=x bash scripts/51_run_prefill_gh200_1pxd.sh"
     echo "  2. Decode servers on A100: NUM_DECODERS=8 bash scripts/50_run_multi_decode_a100.sh"
     echo ""
     echo "Example (quick test):"
@@ -293,6 +346,14 @@ while [[ $# -gt 0 ]]; do
             IFS=',' read -ra CONCURRENCY_LIST <<< "$2"
             shift 2
             ;;
+        --search)
+            SEARCH="$2"
+            shift 2
+            ;;
+        --compact)
+            COMPACT=1
+            shift
+            ;;
         --help|-h)
             usage
             exit 0
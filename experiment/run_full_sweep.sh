@@ -25,10 +25,36 @@ CONCURRENCY_LIST=(8 32 128)
 # Which modes to run (comment out to skip)
 MODES=("agg" "pd_intra" "pd_inter")
 
+# Use GPU-free stand-in servers instead of Docker (--standin)
+STANDIN=0
+
+# Repeated trials per sweep point (--trials / --warmup-trials). Warmup trials
+# are tagged <tag>_w<k> and measured ones <tag>_t<k>, all in <tag>.jsonl;
+# results_store drops the warmups and aggregate_trials() takes the median.
+# The default single run keeps plain <tag> and the GPU time of one pass;
+# --trials 3 --warmup-trials 1 gives medians and CVs at 4x the time.
+TRIALS="${TRIALS:-1}"
+WARMUP_TRIALS="${WARMUP_TRIALS:-0}"
+
+# Sample server /metrics during every run into results/metrics/<tag>
+# (--no-metrics); METRICS_TARGETS is set per mode in main()
+METRICS="${METRICS:-1}"
+METRICS_TARGETS=()
+
+# Deduplicate server_info into results/server_configs after the sweep
+# (--compact). Rewrites the result files in place; commit the store with them.
+COMPACT="${COMPACT:-0}"
+
 # Inter-node settings
 A100_HOST="${A100_HOST:-172.16.40.99}"
 GH200_IP="${GH200_IP:-172.16.40.79}"
 
+# Adaptive search instead of the grid (--search rate|concurrency):
+# for each (mode, input_len, output_len), find the highest load that meets the SLOs
+SEARCH=""
+SEARCH_TTFT_SLO="${SEARCH_TTFT_SLO:-200}"
+SEARCH_TPOT_SLO="${SEARCH_TPOT_SLO:-50}"
+
 # ===== HELPER FUNCTIONS =====
 
 log() {
@@ -54,6 +80,10 @@ wait_for_server() {
 
 stop_all_servers() {
     log "Stopping all servers..."
+    if [ "${STANDIN}" = "1" ]; then
+        bash "${SCRIPTS_DIR}/60_run_standin_servers.sh" stop
+        return
+    fi
     docker stop sglang-agg sglang-prefill sglang-decode 2>/dev/null || true
     docker rm sglang-agg sglang-prefill sglang-decode 2>/dev/null || true
     ssh "${A100_HOST}" "docker stop sglang-decode 2>/dev/null; docker rm sglang-decode 2>/dev/null; pkill -f sglang_router" 2>/dev/null || true
@@ -65,6 +95,10 @@ stop_all_servers() {
 
 start_agg_server() {
     log "Starting aggregated server..."
+    if [ "${STANDIN}" = "1" ]; then
+        bash "${SCRIPTS_DIR}/60_run_standin_servers.sh" agg
+        return
+    fi
     stop_all_servers
     bash "${SCRIPTS_DIR}/10_run_agg_server.sh"
     wait_for_server "http://127.0.0.1:30000"
@@ -72,6 +106,10 @@ start_agg_server() {
 
 start_intra_node_pd() {
     log "Starting intra-node PD servers..."
+    if [ "${STANDIN}" = "1" ]; then
+        bash "${SCRIPTS_DIR}/60_run_standin_servers.sh" pd_intra
+        return
+    fi
     stop_all_servers
     bash "${SCRIPTS_DIR}/30_run_intra_node_pd.sh"
     wait_for_server "http://127.0.0.1:${PREFILL_PORT}"
@@ -92,6 +130,10 @@ start_intra_node_pd() {
 
 start_inter_node_pd() {
     log "Starting inter-node PD servers (GH200 + A100)..."
+    if [ "${STANDIN}" = "1" ]; then
+        bash "${SCRIPTS_DIR}/60_run_standin_servers.sh" pd_inter
+        return
+    fi
     stop_all_servers
     
     # Start prefill on GH200 with NIXL
@@ -111,6 +153,7 @@ start_inter_node_pd() {
             --host 0.0.0.0 \
             --port 30000 \
             --mem-fraction-static 0.9 \
+            ${METRICS_ARGS} \
             --disaggregation-mode prefill \
             --disaggregation-transfer-backend nixl
     
@@ -131,12 +174,13 @@ start_inter_node_pd() {
             --host 0.0.0.0 \
             --port 30000 \
             --mem-fraction-static 0.9 \
+            ${METRICS_ARGS} \
             --disaggregation-mode decode \
             --disaggregation-transfer-backend nixl"
     
     # Wait for servers
     wait_for_server "http://127.0.0.1:30000" 120
-    sleep 30  # Extra time for A100
+    wait_for_server "http://${A100_HOST}:30000" 300
     
     # Start router on A100
     log "Starting router on A100..."
@@ -146,6 +190,7 @@ start_inter_node_pd() {
             --prefill http://${GH200_IP}:30000 \
             --decode http://127.0.0.1:30000 \
             --host 0.0.0.0 --port 8000 \
+            --prometheus-host 0.0.0.0 --prometheus-port ${ROUTER_METRICS_PORT} \
             > /tmp/router_inter.log 2>&1 &"
     sleep 10
 }
@@ -157,14 +202,21 @@ run_benchmark() {
     local tag="$2"
     local base_url="$3"
     local pd_flag="$4"
+    local point="${5:-$2}"
     
     log "Running benchmark: ${tag}"
     
     source "${VENV_DIR}/bin/activate"
     
-    local output_file="${RESULTS_DIR}/${tag}.jsonl"
+    local output_file="${RESULTS_DIR}/${point}.jsonl"
     
-    python3 -m sglang.bench_serving \
+    local sampler=()
+    if [ "${METRICS}" = "1" ]; then
+        sampler=(python3 "${REPO_ROOT}/benchmarks/metrics_sampler.py" --results-dir "${RESULTS_DIR}"
+                 run --tag "${tag}" --interval "${METRICS_INTERVAL}" "${METRICS_TARGETS[@]}" --)
+    fi
+    
+    ${sampler[@]+"${sampler[@]}"} python3 -m sglang.bench_serving \
         --backend sglang \
         --dataset-name random \
         --num-prompts "${BENCH_NUM_PROMPTS}" \
@@ -175,11 +227,60 @@ run_benchmark() {
         --base-url "${base_url}" \
         --output-file "${output_file}" \
         --tag "${tag}" \
+        --output-details \
         ${pd_flag}
     
     log "Results saved to: ${output_file}"
 }
 
+run_trials() {
+    local mode="$1"
+    local point="$2"
+    local base_url="$3"
+    local pd_flag="$4"
+    
+    if [ "${TRIALS}" -eq 1 ] && [ "${WARMUP_TRIALS}" -eq 0 ]; then
+        run_benchmark "${mode}" "${point}" "${base_url}" "${pd_flag}"
+        return
+    fi
+    for ((k=0; k<WARMUP_TRIALS; k++)); do
+        run_benchmark "${mode}" "${point}_w${k}" "${base_url}" "${pd_flag}" "${point}" || {
+            log "WARNING: Warmup ${k} failed for ${point}"
+        }
+    done
+    local failed=0
+    for ((k=0; k<TRIALS; k++)); do
+        run_benchmark "${mode}" "${point}_t${k}" "${base_url}" "${pd_flag}" "${point}" || {
+            log "WARNING: Trial ${k} failed for ${point}"
+            failed=$((failed + 1))
+        }
+    done
+    [ "${failed}" -lt "${TRIALS}" ]
+}
+
+run_search() {
+    local mode="$1"
+    local base_url="$2"
+    
+    source "${VENV_DIR}/bin/activate"
+    for input_len in "${INPUT_LEN_LIST[@]}"; do
+        for output_len in "${OUTPUT_LEN_LIST[@]}"; do
+            log ""
+            log "--- ${mode} search (${SEARCH}) in=${input_len} out=${output_len} ---"
+            python3 "${REPO_ROOT}/benchmarks/rate_search.py" run \
+                --mode "${mode}" \
+                --base-url "${base_url}" \
+                --input-len "${input_len}" \
+                --output-len "${output_len}" \
+                --search "${SEARCH}" \
+                --ttft-slo "${SEARCH_TTFT_SLO}" \
+                --tpot-slo "${SEARCH_TPOT_SLO}" || {
+                    log "WARNING: Search failed for ${mode} in=${input_len} out=${output_len}"
+                }
+        done
+    done
+}
+
 # ===== MAIN SWEEP LOGIC =====
 
 main() {
@@ -191,6 +292,7 @@ main() {
     log "Input Lengths: ${INPUT_LEN_LIST[*]}"
     log "Output Lengths: ${OUTPUT_LEN_LIST[*]}"
     log "Concurrency: ${CONCURRENCY_LIST[*]}"
+    log "Trials: ${TRIALS} (+${WARMUP_TRIALS} warmup)"
     log "=========================================="
     
     mkdir -p "${RESULTS_DIR}"
@@ -207,16 +309,28 @@ main() {
                 start_agg_server
                 BASE_URL="http://127.0.0.1:30000"
                 PD_FLAG=""
+                METRICS_TARGETS=(--target "agg=http://127.0.0.1:30000")
                 ;;
             "pd_intra")
                 start_intra_node_pd
                 BASE_URL="http://127.0.0.1:${ROUTER_PORT}"
                 PD_FLAG="--pd-separated"
+                # The mini-lb router exports no metrics
+                METRICS_TARGETS=(--target "prefill=http://127.0.0.1:${PREFILL_PORT}"
+                                 --target "decode=http://127.0.0.1:${DECODE_PORT}")
                 ;;
             "pd_inter")
                 start_inter_node_pd
                 BASE_URL="http://${A100_HOST}:8000"
                 PD_FLAG="--pd-separated"
+                # Stand-in decode listens on DECODE_PORT next to the prefill
+                DECODE_METRICS_PORT=30000
+                if [ "${STANDIN}" = "1" ]; then
+                    DECODE_METRICS_PORT="${DECODE_PORT}"
+                fi
+                METRICS_TARGETS=(--target "prefill=http://127.0.0.1:30000"
+                                 --target "decode=http://${A100_HOST}:${DECODE_METRICS_PORT}"
+                                 --target "router=http://${A100_HOST}:${ROUTER_METRICS_PORT}")
                 ;;
             *)
                 log "Unknown mode: ${mode}"
@@ -224,6 +338,11 @@ main() {
                 ;;
         esac
         
+        if [ -n "${SEARCH}" ]; then
+            run_search "${mode}" "${BASE_URL}"
+            continue
+        fi
+        
         # Run sweep for this mode
         for num_prompts in "${NUM_PROMPTS_LIST[@]}"; do
             for input_len in "${INPUT_LEN_LIST[@]}"; do
@@ -242,8 +361,8 @@ main() {
                         log ""
                         log "--- ${TAG} ---"
                         
-                        # Run benchmark
-                        run_benchmark "${mode}" "${TAG}" "${BASE_URL}" "${PD_FLAG}" || {
+                        # Run warmup and measured trials
+                        run_trials "${mode}" "${TAG}" "${BASE_URL}" "${PD_FLAG}" || {
                             log "WARNING: Benchmark failed for ${TAG}, continuing..."
                         }
                         
@@ -267,6 +386,15 @@ main() {
     log "Results in: ${RESULTS_DIR}"
     log "=========================================="
     
+    # Move per-request --output-details lists into results/traces
+    python3 "${REPO_ROOT}/benchmarks/request_traces.py" extract || true
+    
+    # Deduplicate server_info into benchmarks/results/server_configs
+    if [ "${COMPACT}" = "1" ]; then
+        log "Compacting results..."
+        python3 "${REPO_ROOT}/benchmarks/server_configs.py" compact || true
+    fi
+    
     # Generate plots
     log "Generating plots..."
     python3 "${REPO_ROOT}/benchmarks/plot_benchmarks.py" || true
@@ -297,6 +425,31 @@ while [[ $# -gt 0 ]]; do
             IFS=',' read -ra CONCURRENCY_LIST <<< "$2"
             shift 2
             ;;
+        --trials)
+            TRIALS="$2"
+            shift 2
+            ;;
+        --warmup-trials)
+            WARMUP_TRIALS="$2"
+            shift 2
+            ;;
+        --search)
+            SEARCH="$2"
+            shift 2
+            ;;
+        --no-metrics)
+            METRICS=0
+            shift
+            ;;
+        --compact)
+            COMPACT=1
+            shift
+            ;;
+        --standin)
+            STANDIN=1
+            A100_HOST=127.0.0.1  # pd_inter router runs locally
+            shift
+            ;;
         --help)
             echo "Usage: $0 [OPTIONS]"
             echo ""
@@ -306,6 +459,14 @@ while [[ $# -gt 0 ]]; do
             echo "  --input-lens L1,L2,...      Input lengths"
             echo "  --output-lens L1,L2,...     Output lengths"
             echo "  --concurrency C1,C2,...     Concurrency levels"
+            echo "  --trials N                  Measured trials per point (default: 1)"
+            echo "  --warmup-trials N           Discarded warmup trials per point (default: 0)"
+            echo "  --search rate|concurrency   Find max load under SLO per (mode, in, out)"
+            echo "                              instead of the grid (SEARCH_TTFT_SLO/SEARCH_TPOT_SLO ms)"
+            echo "  --standin                   Use GPU-free stand-in servers (scripts/60)"
+            echo "  --no-metrics                Do not sample server /metrics during runs"
+            echo "  --compact                   Dedupe server_info into results/server_configs"
+            echo "                              afterwards (rewrites the result files in place)"
             echo ""
             echo "Example:"
             echo "  $0 --modes agg,pd_intra --num-prompts 50,100 --input-lens 128,512"
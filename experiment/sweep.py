@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+Sweep orchestrator: warm server reuse, fast readiness and resumable runs.
+
+Replaces the launch/wait/bench loop of the bash sweeps:
+
+    - Points are grouped by server config (see server_spec), so servers are
+      launched once per config, and a config left running by a previous
+      invocation (--keep-servers) is reused if it still answers /health.
+    - All backends of a config are launched together and probed concurrently
+      with sub-second backoff (benchmarks/readiness.py) instead of fixed
+      sleeps and 5 s curl polling. Between points the radix cache is flushed
+      rather than sleeping.
+    - Every finished point is recorded in results/manifests/<name>.json;
+      rerunning the same command skips completed tags (--fresh to redo).
+      Points of a config whose servers fail to launch are recorded as
+      failed, and the sweep exits 1 if any point failed.
+    - Each point runs warmup_trials discarded trials (<tag>_w<k>) and then
+      trials measured ones (<tag>_t<k>), all appended to <tag>.jsonl.
+    - Every run is sampled by benchmarks/metrics_sampler.py, which scrapes
+      the /metrics of each server of the config into results/metrics/<tag>
+      (--no-metrics to skip).
+    - With --workloads, points replay workloads (benchmarks/workloads.py)
+      through the load generator instead of fixed input/output lengths:
+      <mode>_n<N>_c<C>_wl-<name>, where N caps the requests replayed and C
+      the requests in flight.
+    - With --prefix-ratios, points send shared prefixes (load_generator.py
+      --prefix-ratio/--prefix-len/--num-prefixes), for every combination
+      with --prefix-lens and --prefix-counts: ..._px<len>g<count>r<percent>.
+      benchmarks/prefix_cache.py relates them to TTFT and throughput.
+    - With --interference, each mode runs benchmarks/interference.py once
+      per concurrency (the background users) instead of the length grid:
+      a decode-heavy stream with periodic long-prompt prefill bursts. A JSON
+      object overrides its run options, e.g. '{"burst_size": 16}'. These
+      runs and their metrics go to <results-dir>/interference/.
+    - With --server-args, every point runs once per combination of server
+      knob values, each on freshly launched servers: a JSON object mapping
+      a knob (chunked_prefill_size, max_prefill_tokens, schedule_policy,
+      page_size, mem_fraction_static) or a role.knob (agg., prefill.,
+      decode.) to its values, e.g. '{"prefill.chunked_prefill_size": [2048,
+      8192], "decode.page_size": [1, 16]}'. The launch scripts read them as
+      env vars (server_knob_args in scripts/00_common.sh); points get
+      _srv-<settings> and the analysis reads the applied values back from
+      server_info (benchmarks/server_knobs.py). Only configs this sweep
+      launches can change them, not the long-lived pd_inter/xPyD servers.
+
+Modes: agg, pd_intra, pd_inter (as in run_full_sweep.sh) and pd_inter_<P>p<D>d
+(as in run_extended_sweep.sh, prefills + decoders must already be running;
+only the router is started).
+
+Usage:
+    python3 experiment/sweep.py --modes agg,pd_intra --num-prompts 50,100 \\
+        --input-lens 128,512 --output-lens 64,128 --concurrency 8,32
+    python3 experiment/sweep.py --standin --name smoke --modes agg,pd_intra
+    python3 experiment/sweep.py --sweep-file sweep.json --keep-servers
+    python3 experiment/sweep.py --name smoke --status
+    python3 experiment/sweep.py --name chat --workloads chat,azure-conv \
+        --num-prompts 5000 --concurrency 256
+    python3 experiment/sweep.py --name prefix --prefix-ratios 0,0.5,0.9 \
+        --prefix-lens 1024 --prefix-counts 1,16 --input-lens 2048 --output-lens 128
+    python3 experiment/sweep.py --name interference --interference --concurrency 32 \
+        --modes agg,pd_intra,pd_inter
+    python3 experiment/sweep.py --name knobs --modes agg,pd_intra \
+        --server-args '{"chunked_prefill_size": [2048, 8192], "decode.schedule_policy": ["fcfs", "lpm"]}'
+
+A sweep file is JSON with any of the flag names as keys, e.g.
+    {"name": "extended", "modes": ["pd_inter_1p2d", "pd_inter_1p4d", "pd_inter_2p4d"],
+     "input_lens": [1024, 2048], "concurrency": [64, 128]}
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import pathlib
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from readiness import wait_ready  # noqa: E402
+
+SCRIPTS_DIR = ROOT / "scripts"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+MANIFEST_DIRNAME = "manifests"
+
+# Seconds to wait for metrics_sampler.py record to take its first scrape
+SAMPLER_READY_S = 30
+
+# Same defaults as run_full_sweep.sh
+DEFAULTS = {
+    "name": "default",
+    "modes": ["agg", "pd_intra", "pd_inter"],
+    "num_prompts": [50, 100, 200],
+    "input_lens": [128, 512, 1024],
+    "output_lens": [64, 128, 256],
+    "concurrency": [8, 32, 128],
+    "trials": 1,
+    "warmup_trials": 0,
+    "workloads": [],
+    "prefix_ratios": [],
+    "prefix_lens": [1024],
+    "prefix_counts": [1],
+    "interference": None,
+    "server_args": {},
+}
+
+# Environment shared with scripts/00_common.sh
+ENV = {
+    "PREFILL_PORT": os.environ.get("PREFILL_PORT", "30000"),
+    "DECODE_PORT": os.environ.get("DECODE_PORT", "30001"),
+    "DECODE_BASE_PORT": os.environ.get("DECODE_BASE_PORT", "30000"),
+    "ROUTER_PORT": os.environ.get("ROUTER_PORT", "8000"),
+    "PREFILL_HOST": os.environ.get("PREFILL_HOST", "172.16.40.79"),
+    "PREFILL_HOSTS": os.environ.get("PREFILL_HOSTS", os.environ.get("PREFILL_HOST",
+                                                                    "172.16.40.79")),
+    "PREFILL_BOOTSTRAP_PORT": os.environ.get("PREFILL_BOOTSTRAP_PORT", "8998"),
+    "A100_HOST": os.environ.get("A100_HOST", "172.16.40.99"),
+    "GH200_IP": os.environ.get("GH200_IP", "172.16.40.79"),
+    "VENV_DIR": os.environ.get("VENV_DIR", str(pathlib.Path.home() / "venv_sglang")),
+    "ROUTER_METRICS_PORT": os.environ.get("ROUTER_METRICS_PORT", "29000"),
+    "METRICS_INTERVAL": os.environ.get("METRICS_INTERVAL", "0.5"),
+    "STANDIN_PREFILL_PORT": os.environ.get("STANDIN_PREFILL_PORT", "29999"),
+}
+
+X_P_Y_D = re.compile(r"pd_inter_(\d+)p(\d+)d$")
+
+# Server knobs of --server-args -> tag abbreviation; the launch scripts read
+# <KNOB> or <ROLE>_<KNOB> (scripts/00_common.sh)
+SERVER_KNOBS = {
+    "chunked_prefill_size": "cp",
+    "max_prefill_tokens": "mpt",
+    "schedule_policy": "sp",
+    "page_size": "ps",
+    "mem_fraction_static": "mf",
+}
+KNOB_ROLES = ["agg", "prefill", "decode"]
+
+
+def log(msg=""):
+    print(f"[{datetime.datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", flush=True)
+
+
+def sh(cmd, check=False):
+    """Run a shell command the way the bash sweeps do."""
+    return subprocess.run(cmd, shell=True, executable="/bin/bash", check=check).returncode
+
+
+# ===== Server configs =====
+
+def prefill_endpoints(num_prefills):
+    """[(url, bootstrap port)] of the xPyD prefills, laid out as by
+    get_prefill_endpoints in scripts/00_extended_config.sh."""
+    hosts = [h for h in re.split(r"[,\s]+", ENV["PREFILL_HOSTS"]) if h]
+    return [(f"http://{hosts[i % len(hosts)]}:{int(ENV['PREFILL_PORT']) + i // len(hosts)}",
+             int(ENV["PREFILL_BOOTSTRAP_PORT"]) + i // len(hosts))
+            for i in range(num_prefills)]
+
+
+def server_spec(mode, standin=False):
+    """How to bring up the servers for `mode`.
+
+    Returns dict with:
+        key       identifies the config; points with equal keys share servers
+        launch    shell commands started together (containers run detached)
+        backends  URLs that must be healthy before the router starts
+        router    shell command starting the router in the background, or None
+        base_url  where the client sends requests
+        pd        whether to pass --pd-separated to bench_serving
+        router_only  backends are long-lived; switching configs only
+                     restarts the router
+        knobs     whether the launch commands honor the server knob env vars
+        metrics   {role: base URL} scraped by metrics_sampler.py
+    """
+    env = ENV
+    local = "http://127.0.0.1"
+    router_url = f"{local}:{env['ROUTER_PORT']}"
+    match = X_P_Y_D.match(mode)
+    num_prefills, num_decoders = (int(match.group(1)), int(match.group(2))) if match else (1, 1)
+
+    if standin:
+        # Script 60 launches and polls /health itself; its mini-lb router
+        # exports no metrics
+        arg = f"xpyd {num_prefills} {num_decoders}" if match else mode
+        if mode == "agg":
+            metrics = {"agg": f"{local}:{env['PREFILL_PORT']}"}
+        elif match:
+            # Script 60 puts prefill i on STANDIN_PREFILL_PORT - i
+            prefills = [f"{local}:{int(env['STANDIN_PREFILL_PORT']) - i}"
+                        for i in range(num_prefills)]
+            metrics = {**prefill_roles(prefills),
+                       **{f"decode{i}": f"{local}:{int(env['DECODE_BASE_PORT']) + i}"
+                          for i in range(num_decoders)}}
+        else:
+            metrics = {"prefill": f"{local}:{env['PREFILL_PORT']}",
+                       "decode": f"{local}:{env['DECODE_PORT']}"}
+        return {
+            "key": f"standin:{mode}",
+            "launch": [f"bash {SCRIPTS_DIR}/60_run_standin_servers.sh {arg}"],
+            "backends": [],
+            "router": None,
+            "base_url": f"{local}:{env['PREFILL_PORT']}" if mode == "agg" else router_url,
+            "pd": mode != "agg",
+            "router_only": False,
+            "knobs": True,
+            "metrics": metrics,
+        }
+
+    activate = f"source {env['VENV_DIR']}/bin/activate 2>/dev/null;"
+    if mode == "agg":
+        url = f"{local}:{env['PREFILL_PORT']}"
+        return {"key": mode, "launch": [f"bash {SCRIPTS_DIR}/10_run_agg_server.sh"],
+                "backends": [url], "router": None, "base_url": url, "pd": False,
+                "router_only": False, "knobs": True, "metrics": {"agg": url}}
+
+    if mode == "pd_intra":
+        prefill = f"{local}:{env['PREFILL_PORT']}"
+        decode = f"{local}:{env['DECODE_PORT']}"
+        router = (f"{activate} nohup python3 -m sglang_router.launch_router "
+                  f"--mini-lb --pd-disaggregation --prefill {prefill} --decode {decode} "
+                  f"--host 0.0.0.0 --port {env['ROUTER_PORT']} > /tmp/router_intra.log 2>&1 &")
+        return {"key": mode,
+                "launch": [f"STARTUP_WAIT=0 bash {SCRIPTS_DIR}/30_run_intra_node_pd.sh"],
+                "backends": [prefill, decode], "router": router,
+                "base_url": router_url, "pd": True, "router_only": False, "knobs": True,
+                "metrics": {"prefill": prefill, "decode": decode}}
+
+    if mode == "pd_inter":
+        a100 = env["A100_HOST"]
+        router = (f"ssh -f {a100} \"source ~/venv_sglang/bin/activate && "
+                  f"nohup python3 -m sglang_router.launch_router --pd-disaggregation "
+                  f"--prefill http://{env['GH200_IP']}:30000 --decode http://127.0.0.1:30000 "
+                  f"--host 0.0.0.0 --port 8000 --prometheus-host 0.0.0.0 "
+                  f"--prometheus-port {env['ROUTER_METRICS_PORT']} > /tmp/router_inter.log 2>&1 &\"")
+        return {"key": mode,
+                "launch": [f"bash {SCRIPTS_DIR}/41_run_prefill_gh200.sh",
+                           f"ssh {a100} 'bash -s' < {SCRIPTS_DIR}/40_run_decode_a100.sh"],
+                "backends": [f"{local}:30000", f"http://{a100}:30000"],
+                "router": router, "base_url": f"http://{a100}:8000", "pd": True,
+                "router_only": False, "knobs": False,
+                "metrics": {"prefill": f"{local}:30000", "decode": f"http://{a100}:30000",
+                            "router": f"http://{a100}:{env['ROUTER_METRICS_PORT']}"}}
+
+    if match:
+        # Prefills (script 51) and decoders (script 50) are long-lived; only the
+        # router changes with the layout
+        prefills = prefill_endpoints(num_prefills)
+        decodes = [f"{local}:{int(env['DECODE_BASE_PORT']) + i}" for i in range(num_decoders)]
+        prefill_args = " ".join(f"--prefill {url} {port}" for url, port in prefills)
+        decode_args = " ".join(f"--decode {url}" for url in decodes)
+        router = (f"{activate} nohup python3 -m sglang_router.launch_router "
+                  f"--pd-disaggregation {prefill_args} {decode_args} "
+                  f"--host 0.0.0.0 --port {env['ROUTER_PORT']} "
+                  f"--prometheus-port {env['ROUTER_METRICS_PORT']} > /tmp/router_extended.log 2>&1 &")
+        prefill_urls = [url for url, _ in prefills]
+        return {"key": mode, "launch": [], "backends": prefill_urls + decodes,
+                "router": router, "base_url": router_url, "pd": True,
+                "router_only": True, "knobs": False,
+                "metrics": {**prefill_roles(prefill_urls),
+                            **{f"decode{i}": url for i, url in enumerate(decodes)},
+                            "router": f"{local}:{env['ROUTER_METRICS_PORT']}"}}
+
+    raise SystemExit(f"Unknown mode: {mode}")
+
+
+def server_variants(sweep, mode):
+    """Distinct knob env vars for `mode` over the server_args grid, [{}] if none.
+
+    Role knobs of roles `mode` does not run (prefill./decode. for agg) are
+    dropped, so they do not repeat identical agg runs.
+    """
+    grid = sweep.get("server_args") or {}
+    roles = ["agg"] if mode == "agg" else ["prefill", "decode"]
+    variants = []
+    keys = list(grid)
+    for values in itertools.product(*(v if isinstance(v, list) else [v] for v in grid.values())):
+        env = {}
+        for key, value in zip(keys, values):
+            role, _, knob = key.rpartition(".")
+            if knob not in SERVER_KNOBS or (role and role not in KNOB_ROLES):
+                raise SystemExit(f"Unknown server knob: {key} "
+                                 f"([{'|'.join(KNOB_ROLES)}.]{'|'.join(SERVER_KNOBS)})")
+            if not role or role in roles:
+                env[f"{role}_{knob}".lstrip("_").upper()] = str(value)
+        if env not in variants:
+            variants.append(env)
+    return variants
+
+
+def server_suffix(env):
+    """Point suffix naming the knob settings of `env`, e.g. _srv-cp2048-dsplpm."""
+    if not env:
+        return ""
+    items = []
+    for role in [""] + KNOB_ROLES:
+        for knob, abbr in SERVER_KNOBS.items():
+            value = env.get(f"{role}_{knob}".lstrip("_").upper())
+            if value is not None:
+                items.append(f"{role[:1]}{abbr}{re.sub(r'[^A-Za-z0-9.]', '', value)}")
+    return "_srv-" + "-".join(items)
+
+
+def with_server_args(spec, env):
+    """`spec` launching its servers with the knob env vars `env`."""
+    if not env:
+        return spec
+    assign = " ".join(f"{k}={shlex.quote(v)}" for k, v in sorted(env.items()))
+    return {**spec, "key": spec["key"] + server_suffix(env),
+            "launch": [f"{assign} {cmd}" for cmd in spec["launch"]]}
+
+
+def prefill_roles(urls):
+    """metrics_sampler roles of the prefills; a single one stays 'prefill'."""
+    if len(urls) == 1:
+        return {"prefill": urls[0]}
+    return {f"prefill{i}": url for i, url in enumerate(urls)}
+
+
+def stop_servers(standin=False):
+    if standin:
+        sh(f"bash {SCRIPTS_DIR}/60_run_standin_servers.sh stop > /dev/null")
+        return
+    sh("docker stop sglang-agg sglang-prefill sglang-decode > /dev/null 2>&1; "
+       "docker rm sglang-agg sglang-prefill sglang-decode > /dev/null 2>&1; "
+       "pkill -f sglang_router 2>/dev/null")
+    sh(f"ssh {ENV['A100_HOST']} \"docker stop sglang-decode 2>/dev/null; "
+       f"docker rm sglang-decode 2>/dev/null; pkill -f sglang_router\" > /dev/null 2>&1")
+
+
+def is_warm(spec, timeout=2.0):
+    """True if every endpoint of `spec` already answers /health."""
+    urls = spec["backends"] + [spec["base_url"]]
+    return all(t is not None for t in wait_ready(urls, timeout).values())
+
+
+def start_servers(spec, standin, timeout):
+    """Launch a server config and wait until it serves. Returns seconds spent."""
+    start = time.monotonic()
+    if spec["router_only"]:
+        sh("pkill -f sglang_router 2>/dev/null")
+    else:
+        stop_servers(standin)
+
+    procs = [subprocess.Popen(cmd, shell=True, executable="/bin/bash") for cmd in spec["launch"]]
+    failed = [cmd for cmd, p in zip(spec["launch"], procs) if p.wait() != 0]
+    if failed:
+        raise RuntimeError(f"Launch failed: {failed}")
+
+    if spec["backends"]:
+        ready = wait_ready(spec["backends"], timeout)
+        for url, seconds in ready.items():
+            log(f"  {url}: " + (f"ready after {seconds:.1f}s" if seconds is not None else "NOT READY"))
+        if any(seconds is None for seconds in ready.values()):
+            raise RuntimeError("Backends not ready")
+    if spec["router"]:
+        sh(spec["router"])
+    ready = wait_ready([spec["base_url"]], timeout)
+    if ready[spec["base_url"]] is None:
+        raise RuntimeError(f"{spec['base_url']} not ready")
+    return time.monotonic() - start
+
+
+def flush_caches(spec):
+    """Reset the radix cache between points so runs do not share prefixes."""
+    for url in spec["backends"] or [spec["base_url"]]:
+        try:
+            urllib.request.urlopen(urllib.request.Request(url + "/flush_cache", method="POST"),
+                                   timeout=10).close()
+        except OSError:
+            pass
+
+
+# ===== Manifest =====
+
+def manifest_path(results_dir, name):
+    return pathlib.Path(results_dir) / MANIFEST_DIRNAME / f"{name}.json"
+
+
+def load_manifest(path):
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"points": {}, "servers": None}
+
+
+def save_manifest(path, manifest):
+    """Write atomically so an interrupted sweep never leaves a torn manifest."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n")
+    os.replace(tmp, path)
+
+
+# ===== Points =====
+
+def point_tag(mode, num_prompts, input_len, output_len, concurrency):
+    return f"{mode}_n{num_prompts}_in{input_len}_out{output_len}_c{concurrency}"
+
+
+def workload_tag(mode, num_prompts, concurrency, workload):
+    # Lengths vary per request; results_store reads their means from the record
+    return f"{mode}_n{num_prompts}_c{concurrency}_wl-{workload}"
+
+
+def prefix_runs(sweep, runs):
+    """Expand runs over the shared-prefix dimensions, if any."""
+    if not sweep.get("prefix_ratios"):
+        return runs
+    expanded = []
+    for run, r, plen, count in itertools.product(runs, sweep["prefix_ratios"],
+                                                 sweep["prefix_lens"], sweep["prefix_counts"]):
+        # The workload suffix stays last (results_store.WORKLOAD_RE)
+        head, sep, workload = run["point"].partition("_wl-")
+        point = f"{head}_px{plen}g{count}r{round(r * 100)}{sep}{workload}"
+        expanded.append({**run, "prefix_ratio": r, "prefix_len": plen,
+                         "num_prefixes": count, "point": point})
+    return expanded
+
+
+def interference_runs(sweep, mode):
+    """One interference.py run per concurrency, with the sweep's options."""
+    import interference
+    options = sweep["interference"]
+    runs = []
+    for c in sweep["concurrency"]:
+        argv = ["run", "--mode", mode, "--bg-concurrency", str(c)]
+        for key, value in options.items():
+            argv += [f"--{key.replace('_', '-')}", str(value)]
+        tag = interference.run_tag(interference.build_parser().parse_args(argv))
+        runs.append(dict(concurrency=c, interference=argv, point=tag))
+    return runs
+
+
+def trial_suffixes(sweep):
+    """Tag suffixes of the runs of one point, warmups first."""
+    trials, warmups = sweep.get("trials", 1), sweep.get("warmup_trials", 0)
+    if trials == 1 and warmups == 0:
+        return [""]
+    return [f"_w{k}" for k in range(warmups)] + [f"_t{k}" for k in range(trials)]
+
+
+def sweep_points(sweep):
+    """Expand the sweep into runs (one per trial), grouped by server config."""
+    points = []
+    for mode in sweep["modes"]:
+        if sweep.get("interference") is not None:
+            runs = interference_runs(sweep, mode)
+        elif sweep.get("workloads"):
+            runs = [dict(num_prompts=n, workload=w, concurrency=c,
+                         point=workload_tag(mode, n, c, w))
+                    for w, n, c in itertools.product(sweep["workloads"], sweep["num_prompts"],
+                                                     sweep["concurrency"])]
+        else:
+            runs = [dict(num_prompts=n, input_len=i, output_len=o, concurrency=c,
+                         point=point_tag(mode, n, i, o, c))
+                    for n, i, o, c in itertools.product(sweep["num_prompts"], sweep["input_lens"],
+                                                        sweep["output_lens"], sweep["concurrency"])]
+        for env in server_variants(sweep, mode):
+            for run in prefix_runs(sweep, runs):
+                # The workload suffix stays last (results_store.WORKLOAD_RE)
+                head, sep, workload = run["point"].partition("_wl-")
+                point = f"{head}{server_suffix(env)}{sep}{workload}"
+                for suffix in trial_suffixes(sweep):
+                    points.append({"mode": mode, **run, "point": point, "server_env": env,
+                                   "tag": point + suffix})
+    return points
+
+
+def sampler_cmd(spec, tag, results_dir, command):
+    """metrics_sampler.py command line sampling the servers of `spec`."""
+    cmd = [sys.executable, str(ROOT / "benchmarks" / "metrics_sampler.py"),
+           "--results-dir", str(results_dir), command, "--tag", tag,
+           "--interval", ENV["METRICS_INTERVAL"]]
+    for role, url in spec["metrics"].items():
+        cmd += ["--target", f"{role}={url}"]
+    return cmd
+
+
+def start_sampler(spec, tag, results_dir, timeout=SAMPLER_READY_S):
+    """Start metrics_sampler.py record and wait for its first scrape.
+
+    A SIGINT sent before the sampler handles signals (it is still importing)
+    would kill it without writing a series.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        ready = pathlib.Path(tmp) / "ready"
+        proc = subprocess.Popen(sampler_cmd(spec, tag, results_dir, "record")
+                                + ["--ready-file", str(ready)])
+        deadline = time.monotonic() + timeout
+        while not ready.exists():
+            if proc.poll() is not None:
+                log(f"WARNING: metrics sampler exited ({proc.returncode}); no series for {tag}")
+                return None
+            if time.monotonic() > deadline:
+                log(f"WARNING: metrics sampler not ready after {timeout:.0f}s")
+                break
+            time.sleep(0.05)
+    return proc
+
+
+def run_point(point, spec, client, results_dir, metrics=True):
+    """Benchmark one point. Returns True on success."""
+    if "interference" in point:
+        import interference
+        # Summary, trace and server metrics go to results/interference/
+        results_dir = interference.runs_dir(results_dir)
+    output_file = pathlib.Path(results_dir) / f"{point['point']}.jsonl"
+    # bench_serving cannot replay a workload, control prefix sharing or mix streams
+    if (client == "load_generator" or point.get("workload") or "prefix_ratio" in point
+            or "interference" in point):
+        # The client runs in-process, so the sampler records until stopped
+        sampler = start_sampler(spec, point["tag"], results_dir) if metrics else None
+        try:
+            if "interference" in point:
+                return _run_interference(point, spec, output_file)
+            return _run_load_generator(point, spec, output_file)
+        finally:
+            if sampler:
+                sampler.send_signal(signal.SIGINT)
+                sampler.wait()
+
+    cmd = [sys.executable, "-m", "sglang.bench_serving",
+           "--backend", "sglang",
+           "--dataset-name", "random",
+           "--num-prompts", str(point["num_prompts"]),
+           "--random-input", str(point["input_len"]),
+           "--random-output", str(point["output_len"]),
+           "--request-rate", "inf",
+           "--max-concurrency", str(point["concurrency"]),
+           "--base-url", spec["base_url"],
+           "--output-file", str(output_file),
+           "--tag", point["tag"],
+           "--output-details"]
+    if spec["pd"]:
+        cmd.append("--pd-separated")
+    if metrics:
+        cmd = sampler_cmd(spec, point["tag"], results_dir, "run") + ["--"] + cmd
+    return subprocess.run(cmd).returncode == 0 and output_file.exists()
+
+
+def _run_load_generator(point, spec, output_file):
+    import load_generator
+    if point.get("workload"):
+        request_args = ["--workload", point["workload"]]
+    else:
+        request_args = ["--random-input-len", str(point["input_len"]),
+                        "--random-output-len", str(point["output_len"])]
+    if "prefix_ratio" in point:
+        request_args += ["--prefix-ratio", str(point["prefix_ratio"]),
+                         "--prefix-len", str(point["prefix_len"]),
+                         "--num-prefixes", str(point["num_prefixes"])]
+    lg_args = load_generator.build_parser().parse_args([
+        "--base-url", spec["base_url"],
+        "--num-prompts", str(point["num_prompts"]),
+        *request_args,
+        "--max-concurrency", str(point["concurrency"]),
+        "--tag", point["tag"],
+        "--output-file", str(output_file),
+    ])
+    record, _, _ = load_generator.run(lg_args)
+    return record.get("completed", 0) > 0
+
+
+def _run_interference(point, spec, output_file):
+    import interference
+    args = interference.build_parser().parse_args(point["interference"] + [
+        "--base-url", spec["base_url"],
+        "--tag", point["tag"],
+        "--output-file", str(output_file),
+    ])
+    record = interference.run(args)
+    return record.get("completed", 0) > 0
+
+
+def run_sweep(sweep, args):
+    results_dir = pathlib.Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    path = manifest_path(results_dir, sweep["name"])
+    manifest = {"points": {}, "servers": None} if args.fresh else load_manifest(path)
+    manifest["sweep"] = sweep
+    done = {tag for tag, p in manifest["points"].items() if p["status"] == "done"}
+
+    points = sweep_points(sweep)
+    pending = [p for p in points if p["tag"] not in done]
+    log(f"Sweep '{sweep['name']}': {len(points)} runs, {len(points) - len(pending)} done, "
+        f"{len(pending)} to run (manifest {path})")
+
+    configs = []
+    for p in points:
+        config = (p["mode"], server_suffix(p["server_env"]))
+        if config not in configs:
+            configs.append(config)
+    specs = {}
+    for mode, suffix in configs:
+        env = next(p["server_env"] for p in points
+                   if p["mode"] == mode and server_suffix(p["server_env"]) == suffix)
+        spec = server_spec(mode, args.standin)
+        if env and not spec["knobs"]:
+            raise SystemExit(f"{mode}: --server-args only reaches servers this sweep "
+                             "launches (agg, pd_intra, --standin); start the pd_inter "
+                             "(scripts 40/41) or xPyD (50/51) servers with the knob "
+                             "env vars instead")
+        specs[mode, suffix] = with_server_args(spec, env)
+
+    active = manifest.get("servers")
+    launch_s = bench_s = 0.0
+    for mode, suffix in configs:
+        group = [p for p in pending
+                 if p["mode"] == mode and server_suffix(p["server_env"]) == suffix]
+        if not group:
+            continue
+        spec = specs[mode, suffix]
+        log("")
+        log(f"===== {mode}{suffix} ({len(group)} points) =====")
+        if active == spec["key"] and is_warm(spec):
+            log(f"Reusing running servers ({spec['key']})")
+        else:
+            try:
+                seconds = start_servers(spec, args.standin, args.ready_timeout)
+            except RuntimeError as e:
+                log(f"ERROR: {e}; skipping {mode}{suffix}")
+                # Backends that did come up must not outlive the failed config
+                stop_servers(args.standin)
+                manifest["servers"] = active = None
+                finished_at = datetime.datetime.now().isoformat(timespec="seconds")
+                for point in group:
+                    manifest["points"][point["tag"]] = {
+                        "status": "failed", "reason": "launch",
+                        "server": spec["key"], "finished_at": finished_at,
+                    }
+                save_manifest(path, manifest)
+                continue
+            launch_s += seconds
+            log(f"Servers ready in {seconds:.1f}s")
+            manifest["servers"] = active = spec["key"]
+            save_manifest(path, manifest)
+
+        for i, point in enumerate(group):
+            log(f"--- {point['tag']} ---")
+            if i:
+                flush_caches(spec)
+            start = time.monotonic()
+            ok = run_point(point, spec, args.client, results_dir, not args.no_metrics)
+            elapsed = time.monotonic() - start
+            bench_s += elapsed
+            if not ok:
+                log(f"WARNING: Benchmark failed for {point['tag']}, continuing...")
+            manifest["points"][point["tag"]] = {
+                "status": "done" if ok else "failed",
+                "server": spec["key"],
+                "bench_s": round(elapsed, 3),
+                "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            save_manifest(path, manifest)
+
+    if not args.keep_servers and active:
+        log("Stopping servers...")
+        stop_servers(args.standin)
+        manifest["servers"] = None
+        save_manifest(path, manifest)
+
+    failed = sorted(t for t, p in manifest["points"].items() if p["status"] != "done")
+    log("")
+    log(f"Sweep complete: server startup {launch_s:.1f}s, benchmarks {bench_s:.1f}s, "
+        f"{len(failed)} failed point(s)")
+    for tag in failed:
+        reason = manifest["points"][tag].get("reason")
+        log(f"  failed: {tag}" + (f" ({reason})" if reason else ""))
+
+    if not args.no_post:
+        # Move per-request --output-details lists into results/traces and, if
+        # asked, deduplicate server_info into results/server_configs (this
+        # rewrites the result files in place)
+        post = [("request_traces.py", "extract")]
+        if args.compact:
+            post.append(("server_configs.py", "compact"))
+        for script, sub in post:
+            subprocess.run([sys.executable, str(ROOT / "benchmarks" / script),
+                            "--results-dir", str(results_dir), sub])
+    return failed
+
+
+def print_status(sweep, results_dir):
+    path = manifest_path(results_dir, sweep["name"])
+    manifest = load_manifest(path)
+    points = sweep_points(manifest.get("sweep", sweep))
+    recorded = manifest["points"]
+    counts = {}
+    for p in points:
+        status = recorded.get(p["tag"], {}).get("status", "pending")
+        counts[status] = counts.get(status, 0) + 1
+    print(f"Manifest: {path}")
+    print(f"Servers left running: {manifest.get('servers') or '-'}")
+    for status in ["done", "failed", "pending"]:
+        print(f"  {status:<8} {counts.get(status, 0)}")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def build_sweep(args):
+    """Defaults, then the sweep file, then explicit flags."""
+    sweep = dict(DEFAULTS)
+    if args.sweep_file:
+        sweep.update(json.loads(pathlib.Path(args.sweep_file).read_text()))
+    for key in DEFAULTS:
+        value = getattr(args, key)
+        if value is not None:
+            sweep[key] = value
+    return sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable benchmark sweep")
+    parser.add_argument("--sweep-file", help="JSON sweep definition")
+    parser.add_argument("--name", help="Sweep name (manifest file name)")
+    parser.add_argument("--modes", type=lambda v: v.split(","),
+                        help="agg,pd_intra,pd_inter,pd_inter_<P>p<D>d")
+    parser.add_argument("--num-prompts", type=int_list)
+    parser.add_argument("--input-lens", type=int_list)
+    parser.add_argument("--output-lens", type=int_list)
+    parser.add_argument("--concurrency", type=int_list)
+    parser.add_argument("--trials", type=int, help="Measured trials per point (default: 1)")
+    parser.add_argument("--warmup-trials", type=int,
+                        help="Discarded warmup trials per point (default: 0)")
+    parser.add_argument("--workloads", type=lambda v: v.split(","),
+                        help="Replay these workloads instead of --input-lens/--output-lens")
+    parser.add_argument("--prefix-ratios", type=lambda v: [float(x) for x in v.split(",")],
+                        help="Shared-prefix request fractions, e.g. 0,0.5,0.9")
+    parser.add_argument("--prefix-lens", type=int_list, help="Shared prefix lengths (default: 1024)")
+    parser.add_argument("--prefix-counts", type=int_list,
+                        help="Numbers of distinct prefixes (default: 1)")
+    parser.add_argument("--interference", nargs="?", const={}, type=json.loads,
+                        help="Run interference.py per mode and concurrency; optional JSON "
+                             "object of its run options")
+    parser.add_argument("--server-args", type=json.loads,
+                        help="JSON object of server knob values to sweep, e.g. "
+                             "'{\"decode.page_size\": [1, 16]}'")
+    parser.add_argument("--client", choices=["bench_serving", "load_generator"],
+                        default="bench_serving")
+    parser.add_argument("--standin", action="store_true",
+                        help="Use GPU-free stand-in servers (scripts/60)")
+    parser.add_argument("--keep-servers", action="store_true",
+                        help="Leave the last config running for the next invocation")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the manifest")
+    parser.add_argument("--ready-timeout", type=float, default=600,
+                        help="Seconds to wait for servers to become healthy")
+    parser.add_argument("--no-metrics", action="store_true",
+                        help="Do not sample server /metrics during runs")
+    parser.add_argument("--no-post", action="store_true",
+                        help="Skip trace extraction (and --compact)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Deduplicate server_info into results/server_configs afterwards "
+                             "(rewrites the result files in place)")
+    parser.add_argument("--status", action="store_true", help="Show manifest progress and exit")
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    args = parser.parse_args()
+
+    sweep = build_sweep(args)
+    if args.status:
+        print_status(sweep, args.results_dir)
+        return
+    if run_sweep(sweep, args):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
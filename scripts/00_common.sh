@@ -38,6 +38,36 @@ INTER_NODE_TRANSFER_BACKEND="${INTER_NODE_TRANSFER_BACKEND:-nixl}"
 # ===== Memory Configuration =====
 MEM_FRACTION="${MEM_FRACTION:-0.45}"  # Lower for running both on same GPU
 
+# ===== Server knobs =====
+# Scheduler settings swept by experiment/sweep.py (server_args). Unset knobs
+# keep SGLang's defaults (mem-fraction-static: the launch script's own).
+# A knob applies to every server (PAGE_SIZE=16) or to one role
+# (AGG_PAGE_SIZE, PREFILL_PAGE_SIZE, DECODE_PAGE_SIZE); the role variable wins.
+SERVER_KNOBS="CHUNKED_PREFILL_SIZE MAX_PREFILL_TOKENS SCHEDULE_POLICY PAGE_SIZE MEM_FRACTION_STATIC"
+
+# Launch flags for the knobs of one role: server_knob_args ROLE [MEM_FRACTION]
+server_knob_args() {
+  local role knob var value
+  role="$(echo "$1" | tr '[:lower:]' '[:upper:]')"
+  for knob in ${SERVER_KNOBS}; do
+    var="${role}_${knob}"
+    value="${!var:-${!knob:-}}"
+    if [ "${knob}" = "MEM_FRACTION_STATIC" ]; then
+      value="${value:-${2:-}}"
+    fi
+    if [ -n "${value}" ]; then
+      printf -- '--%s %s ' "$(echo "${knob}" | tr 'A-Z_' 'a-z-')" "${value}"
+    fi
+  done
+}
+
+# ===== Server metrics =====
+# Servers expose Prometheus /metrics for benchmarks/metrics_sampler.py
+# (METRICS_ARGS="" launches without it)
+METRICS_ARGS="${METRICS_ARGS---enable-metrics}"
+ROUTER_METRICS_PORT="${ROUTER_METRICS_PORT:-29000}"  # sgl-router Prometheus exporter
+METRICS_INTERVAL="${METRICS_INTERVAL:-0.5}"
+
 # ===== Host venv for router + bench =====
 VENV_DIR="${VENV_DIR:-$HOME/venv_sglang}"
 
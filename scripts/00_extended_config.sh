@@ -1,7 +1,7 @@
 #!/usr/bin/env bash
 # ============================================================
 # Extended Configuration for Maximum Parameter Benchmarks
-# Includes settings for 1PxD (1 Prefill, x Decoders) experiments
+# Includes settings for xPyD (x Prefills, y Decoders) experiments
 # ============================================================
 
 set -euo pipefail
@@ -23,16 +23,13 @@ MODEL_CONTEXT_LENGTH=32768  # Qwen2.5 native context
 # GH200: 96GB HBM3
 # A100: 80GB HBM2e per GPU
 #
-# Memory breakdown (approximate):
-#   - Model weights (3B @ fp16): ~6GB
-#   - KV Cache per token: ~0.05MB (varies by model)
-#   - CUDA graphs: ~1GB
-#   - Overhead: ~2-3GB
-#
-# For Qwen2.5-3B on A100 80GB with 0.9 mem_fraction:
-#   Available for KV: ~80 * 0.9 - 6 - 1 - 2 = ~63GB
-#   Max tokens: ~63GB / 0.05MB ≈ 1.26M tokens
-#   Per-request with 4K context: ~315 concurrent requests
+# KV capacity comes from benchmarks/capacity_planner.py, not hand math:
+#   python3 benchmarks/capacity_planner.py plan --input-len 4096 --output-len 1024
+#   (recorded server_info: A100 decoders hold ~1.89M tokens at 36 KiB/token
+#    for Qwen2.5-3B: ~370 concurrent fixed 4K+1K requests, ~740 with
+#    bench_serving's default random lengths, which average half)
+#   python3 benchmarks/capacity_planner.py estimate --gpu-mem-gb 80 --weights-gb 6 \
+#       --seq-len 4096          # a server that has not been run yet
 
 # ===== MAXIMUM BENCHMARK PARAMETERS =====
 # Extended parameter ranges for comprehensive testing
@@ -51,8 +48,8 @@ MAX_OUTPUT_LEN=(128 256 512 1024)
 # Higher concurrency = better batching = higher throughput
 MAX_CONCURRENCY=(32 64 128 256)
 
-# ===== 1PxD CONFIGURATION =====
-# Multi-decoder setup: 1 Prefill (GH200) + x Decoders (A100)
+# ===== xPyD CONFIGURATION =====
+# Multi-server setup: x Prefills (GH200) + y Decoders (A100)
 
 # A100 GPU count for decode
 A100_GPU_COUNT=8
@@ -61,9 +58,13 @@ A100_GPU_COUNT=8
 # Each decode server runs on a different GPU and port
 DECODE_BASE_PORT=30000  # First decoder on 30000, second on 30001, etc.
 
-# Prefill server (always on GH200)
+# Prefill servers (GH200 nodes). Prefill i runs on host i % (number of
+# PREFILL_HOSTS) in slot i / (number of hosts): port PREFILL_PORT + slot,
+# bootstrap port PREFILL_BOOTSTRAP_PORT + slot, GPU slot
 PREFILL_HOST="${PREFILL_HOST:-172.16.40.79}"
+PREFILL_HOSTS="${PREFILL_HOSTS:-${PREFILL_HOST}}"
 PREFILL_PORT=30000
+PREFILL_BOOTSTRAP_PORT="${PREFILL_BOOTSTRAP_PORT:-8998}"
 
 # A100 node for decoders
 A100_HOST="${A100_HOST:-172.16.40.99}"
@@ -85,6 +86,67 @@ get_decode_endpoints() {
     echo "${endpoints[@]}"
 }
 
+# Prefill endpoints for x prefills, one "url bootstrap_port" per line
+# Usage: get_prefill_endpoints 2
+get_prefill_endpoints() {
+    local num_prefills=$1
+    local hosts
+    IFS=', ' read -ra hosts <<< "${PREFILL_HOSTS}"
+    for ((i=0; i<num_prefills; i++)); do
+        local slot=$((i / ${#hosts[@]}))
+        echo "http://${hosts[i % ${#hosts[@]}]}:$((PREFILL_PORT + slot)) $((PREFILL_BOOTSTRAP_PORT + slot))"
+    done
+}
+
+# Index of this host in PREFILL_HOSTS: PREFILL_HOST_INDEX if set, else the
+# entry matching one of this host's addresses or names (0 if none does)
+# Usage: prefill_host_index
+prefill_host_index() {
+    local hosts names i
+    if [ -n "${PREFILL_HOST_INDEX:-}" ]; then
+        echo "${PREFILL_HOST_INDEX}"
+        return
+    fi
+    IFS=', ' read -ra hosts <<< "${PREFILL_HOSTS}"
+    names=" $(hostname -I 2>/dev/null || true) $(hostname 2>/dev/null || true) $(hostname -f 2>/dev/null || true) "
+    for ((i=0; i<${#hosts[@]}; i++)); do
+        if [[ "${names}" == *" ${hosts[i]} "* ]]; then
+            echo "$i"
+            return
+        fi
+    done
+    if [ "${#hosts[@]}" -gt 1 ]; then
+        echo "WARNING: this host is not in PREFILL_HOSTS=${PREFILL_HOSTS}; set PREFILL_HOST_INDEX" >&2
+    fi
+    echo 0
+}
+
+# Prefill servers started on this host when x prefills are spread over
+# PREFILL_HOSTS: prefill i runs on host i % hosts, so host k gets the i < x
+# with i % hosts == k (get_prefill_endpoints)
+# Usage: prefills_per_host 3 [HOST_INDEX]  # 2 on the first of two hosts, 1 on the second
+prefills_per_host() {
+    local num_prefills=$1
+    local index=${2:-$(prefill_host_index)}
+    local hosts
+    IFS=', ' read -ra hosts <<< "${PREFILL_HOSTS}"
+    if [ "${index}" -ge "${num_prefills}" ]; then
+        echo 0
+    else
+        echo $(( (num_prefills - index + ${#hosts[@]} - 1) / ${#hosts[@]} ))
+    fi
+}
+
+# sglang_router arguments for x prefills
+# Usage: get_prefill_router_args 2  # "--prefill http://...:30000 8998 --prefill ..."
+get_prefill_router_args() {
+    local args=""
+    while read -r url bootstrap; do
+        args="${args} --prefill ${url} ${bootstrap}"
+    done < <(get_prefill_endpoints "$1")
+    echo "${args# }"
+}
+
 # Generate GPU list for x decoders
 # Usage: get_gpu_list 4  # Returns "0,1,2,3"
 get_gpu_list() {
@@ -106,20 +168,10 @@ estimate_max_concurrency() {
     local mem_fraction=${3:-0.9}
     local avg_seq_len=${4:-2048} # Average total sequence length
     
-    # KV cache per token (approximate for 3B model)
-    local kv_per_token_mb=0.05
-    
-    # Available memory for KV cache
-    local available_gb=$(echo "$gpu_mem_gb * $mem_fraction - $model_size_gb - 2" | bc)
-    local available_mb=$(echo "$available_gb * 1024" | bc)
-    
-    # Max tokens in KV cache
-    local max_tokens=$(echo "$available_mb / $kv_per_token_mb" | bc)
-    
-    # Max concurrent requests
-    local max_concurrent=$(echo "$max_tokens / $avg_seq_len" | bc)
-    
-    echo "$max_concurrent"
+    # KV bytes per token come from the model config (see capacity_planner.py)
+    python3 "${REPO_ROOT}/benchmarks/capacity_planner.py" estimate \
+        --model "${MODEL_PATH}" --gpu-mem-gb "$gpu_mem_gb" --mem-fraction "$mem_fraction" \
+        --weights-gb "$model_size_gb" --seq-len "$avg_seq_len" --quiet
 }
 
 # Print configuration summary
@@ -131,7 +183,7 @@ print_extended_config() {
     echo "Context Length: ${MODEL_CONTEXT_LENGTH}"
     echo ""
     echo "Hardware:"
-    echo "  Prefill: GH200 @ ${PREFILL_HOST}:${PREFILL_PORT}"
+    echo "  Prefill: GH200 @ ${PREFILL_HOSTS}:${PREFILL_PORT}+"
     echo "  Decode: A100 x${A100_GPU_COUNT} @ ${A100_HOST}:${DECODE_BASE_PORT}+"
     echo ""
     echo "Max Parameters:"
@@ -149,7 +201,8 @@ print_extended_config() {
 # Export all variables
 export MODEL_PATH MODEL_CONTEXT_LENGTH
 export MAX_NUM_PROMPTS MAX_INPUT_LEN MAX_OUTPUT_LEN MAX_CONCURRENCY
-export A100_GPU_COUNT DECODE_BASE_PORT PREFILL_HOST PREFILL_PORT
+export A100_GPU_COUNT DECODE_BASE_PORT PREFILL_HOST PREFILL_HOSTS PREFILL_PORT
+export PREFILL_BOOTSTRAP_PORT
 export A100_HOST ROUTER_PORT
 
 
@@ -10,6 +10,6 @@ source "${VENV_DIR}/bin/activate"
 pip install --upgrade pip
 
 # Core tools: sglang client, router, triton, plotting libs
-pip install   "sglang>=0.5.5"   "sglang-router"   "triton"   "matplotlib"   "pandas"
+pip install   "sglang>=0.5.5"   "sglang-router"   "triton"   "matplotlib"   "pandas"   "aiohttp"
 
-echo "Host venv ready at ${VENV_DIR} (sglang, sglang-router, triton, matplotlib, pandas installed)"
+echo "Host venv ready at ${VENV_DIR} (sglang, sglang-router, triton, matplotlib, pandas, aiohttp installed)"
@@ -28,6 +28,7 @@ docker run -d \
     --mem-fraction-static 0.8 \
     --disaggregation-mode prefill \
     --disaggregation-ib-device mlx5_0 \
-    --disaggregation-bootstrap-port 8998
+    --disaggregation-bootstrap-port 8998 \
+    ${METRICS_ARGS}
 
 echo "Prefill server started on port 30000"
@@ -26,6 +26,7 @@ docker run -d \
     --host 0.0.0.0 \
     --port 30001 \
     --mem-fraction-static 0.8 \
+    ${METRICS_ARGS} \
     --disaggregation-mode decode \
     --disaggregation-ib-device mlx5_0
 
@@ -7,6 +7,9 @@ source "$(dirname "$0")/00_common.sh"
 # Runs both prefill and decode servers on the same node
 # ============================================================
 
+PREFILL_KNOB_ARGS="$(server_knob_args prefill "${MEM_FRACTION}")"
+DECODE_KNOB_ARGS="$(server_knob_args decode "${MEM_FRACTION}")"
+
 echo "=============================================="
 echo "Intra-Node PD Disaggregation Setup"
 echo "=============================================="
@@ -16,6 +19,8 @@ echo "IB Device: ${IB_DEVICE}"
 echo "Prefill Port: ${PREFILL_PORT}"
 echo "Decode Port: ${DECODE_PORT}"
 echo "Router Port: ${ROUTER_PORT}"
+echo "Prefill knobs: ${PREFILL_KNOB_ARGS}"
+echo "Decode knobs: ${DECODE_KNOB_ARGS}"
 echo "=============================================="
 
 # Stop any existing containers
@@ -39,7 +44,8 @@ docker run -d \
     --model-path "${MODEL_PATH}" \
     --host 0.0.0.0 \
     --port "${PREFILL_PORT}" \
-    --mem-fraction-static "${MEM_FRACTION}" \
+    ${PREFILL_KNOB_ARGS} \
+    ${METRICS_ARGS} \
     --disaggregation-mode prefill \
     --disaggregation-ib-device "${IB_DEVICE}" \
     --disaggregation-bootstrap-port 8998
@@ -60,13 +66,21 @@ docker run -d \
     --model-path "${MODEL_PATH}" \
     --host 0.0.0.0 \
     --port "${DECODE_PORT}" \
-    --mem-fraction-static "${MEM_FRACTION}" \
+    ${DECODE_KNOB_ARGS} \
+    ${METRICS_ARGS} \
     --disaggregation-mode decode \
     --disaggregation-ib-device "${IB_DEVICE}"
 
-# Wait for servers to be ready
-echo "[4/4] Waiting for servers to initialize (60 seconds)..."
-sleep 60
+# Wait for servers to be ready (STARTUP_WAIT=0 when the caller polls /health itself,
+# e.g. experiment/sweep.py)
+STARTUP_WAIT="${STARTUP_WAIT:-60}"
+if [ "${STARTUP_WAIT}" -gt 0 ]; then
+  echo "[4/4] Waiting for servers to initialize (${STARTUP_WAIT} seconds)..."
+  sleep "${STARTUP_WAIT}"
+else
+  echo "[4/4] Containers started; not waiting (STARTUP_WAIT=0)"
+  exit 0
+fi
 
 # Check server status
 echo ""
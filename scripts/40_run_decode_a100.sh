@@ -13,6 +13,13 @@ HF_CACHE_DIR="${HF_CACHE_DIR:-$HOME/.cache/huggingface}"
 DECODE_PORT="${DECODE_PORT:-30000}"
 GPU_ID="${GPU_ID:-0}"
 TRANSFER_BACKEND="${TRANSFER_BACKEND:-nixl}"  # NIXL for cross-fabric support
+METRICS_ARGS="${METRICS_ARGS---enable-metrics}"  # Prometheus /metrics
+
+# Shared config (the settings above win) for server_knob_args
+source "$(dirname "$0")/00_common.sh"
+# --mem-fraction-static 0.9 and the other scheduler knobs, from the
+# DECODE_<KNOB> / <KNOB> env vars (see server_knob_args in 00_common.sh)
+KNOB_ARGS="$(server_knob_args decode 0.9)"
 
 CONTAINER_NAME="sglang-decode"
 
@@ -23,6 +30,7 @@ echo "Model: ${MODEL_PATH}"
 echo "Image: ${SGLANG_IMAGE}"
 echo "Port: ${DECODE_PORT}"
 echo "Transfer Backend: ${TRANSFER_BACKEND}"
+echo "Server knobs: ${KNOB_ARGS}"
 echo "GPU: ${GPU_ID}"
 echo "=============================================="
 
@@ -45,7 +53,8 @@ docker run -d \
     --model-path "${MODEL_PATH}" \
     --host 0.0.0.0 \
     --port "${DECODE_PORT}" \
-    --mem-fraction-static 0.9 \
+    ${KNOB_ARGS} \
+    ${METRICS_ARGS} \
     --disaggregation-mode decode \
     --disaggregation-transfer-backend "${TRANSFER_BACKEND}"
 
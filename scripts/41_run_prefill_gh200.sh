@@ -12,6 +12,13 @@ SGLANG_IMAGE="${SGLANG_IMAGE:-lmsysorg/sglang:dev-arm64}"
 HF_CACHE_DIR="${HF_CACHE_DIR:-$HOME/.cache/huggingface}"
 PREFILL_PORT="${PREFILL_PORT:-30000}"
 TRANSFER_BACKEND="${TRANSFER_BACKEND:-nixl}"  # NIXL for cross-fabric support
+METRICS_ARGS="${METRICS_ARGS---enable-metrics}"  # Prometheus /metrics
+
+# Shared config (the settings above win) for server_knob_args
+source "$(dirname "$0")/00_common.sh"
+# --mem-fraction-static 0.9 and the other scheduler knobs, from the
+# PREFILL_<KNOB> / <KNOB> env vars (see server_knob_args in 00_common.sh)
+KNOB_ARGS="$(server_knob_args prefill 0.9)"
 
 CONTAINER_NAME="sglang-prefill"
 
@@ -22,6 +29,7 @@ echo "Model: ${MODEL_PATH}"
 echo "Image: ${SGLANG_IMAGE}"
 echo "Port: ${PREFILL_PORT}"
 echo "Transfer Backend: ${TRANSFER_BACKEND}"
+echo "Server knobs: ${KNOB_ARGS}"
 echo "=============================================="
 
 # Stop existing containers
@@ -43,7 +51,8 @@ docker run -d \
     --model-path "${MODEL_PATH}" \
     --host 0.0.0.0 \
     --port "${PREFILL_PORT}" \
-    --mem-fraction-static 0.9 \
+    ${KNOB_ARGS} \
+    ${METRICS_ARGS} \
     --disaggregation-mode prefill \
     --disaggregation-transfer-backend "${TRANSFER_BACKEND}"
 
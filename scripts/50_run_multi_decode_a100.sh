@@ -2,7 +2,7 @@
 set -euo pipefail
 
 # ============================================================
-# Multi-Decode Server Setup for A100 Cluster (1PxD)
+# Multi-Decode Server Setup for A100 Cluster (xPyD)
 # Run this on the A100 node (172.16.40.99)
 # Starts x decode servers on x GPUs (x = 1 to 8)
 # ============================================================
@@ -24,6 +24,8 @@ SGLANG_IMAGE="${SGLANG_IMAGE_X86:-lmsysorg/sglang:latest}"
 HF_CACHE_DIR="${HF_CACHE_DIR:-$HOME/.cache/huggingface}"
 # For inter-node PD, always use NIXL (cross-fabric RDMA support)
 TRANSFER_BACKEND="${INTER_NODE_TRANSFER_BACKEND:-nixl}"
+# DECODE_<KNOB> / <KNOB> env vars (see server_knob_args in 00_common.sh)
+KNOB_ARGS="$(server_knob_args decode 0.9)"
 
 echo "=============================================="
 echo "Starting ${NUM_DECODERS} Decode Server(s) on A100"
@@ -31,6 +33,7 @@ echo "=============================================="
 echo "Model: ${MODEL_PATH}"
 echo "Image: ${SGLANG_IMAGE}"
 echo "Transfer Backend: ${TRANSFER_BACKEND}"
+echo "Server knobs: ${KNOB_ARGS}"
 echo "=============================================="
 
 # Stop any existing decode containers
@@ -64,7 +67,8 @@ for ((i=0; i<NUM_DECODERS; i++)); do
             --model-path "${MODEL_PATH}" \
             --host 0.0.0.0 \
             --port "${PORT}" \
-            --mem-fraction-static 0.9 \
+            ${KNOB_ARGS} \
+            ${METRICS_ARGS} \
             --disaggregation-mode decode \
             --disaggregation-transfer-backend "${TRANSFER_BACKEND}"
     
@@ -2,9 +2,14 @@
 set -euo pipefail
 
 # ============================================================
-# Prefill Server for GH200 (1PxD Inter-Node Configuration)
-# Run this on cg1n1 (172.16.40.79)
+# Prefill Server(s) for GH200 (xPyD Inter-Node Configuration)
+# Run this on every host in PREFILL_HOSTS (default: cg1n1, 172.16.40.79)
 # Configured to work with multiple decode servers on A100
+#
+# NUM_PREFILLS prefill servers are spread over PREFILL_HOSTS; this host
+# (found in PREFILL_HOSTS by address or name, or PREFILL_HOST_INDEX) starts
+# its share on ports PREFILL_PORT+slot (GPU slot, bootstrap port
+# PREFILL_BOOTSTRAP_PORT+slot). One prefill keeps the whole node.
 # ============================================================
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
@@ -14,51 +19,84 @@ SGLANG_IMAGE="${SGLANG_IMAGE:-lmsysorg/sglang:dev-arm64}"
 HF_CACHE_DIR="${HF_CACHE_DIR:-$HOME/.cache/huggingface}"
 # For inter-node PD, always use NIXL (cross-fabric RDMA support)
 TRANSFER_BACKEND="${INTER_NODE_TRANSFER_BACKEND:-nixl}"
+# PREFILL_<KNOB> / <KNOB> env vars (see server_knob_args in 00_common.sh)
+KNOB_ARGS="$(server_knob_args prefill 0.9)"
 
-CONTAINER_NAME="sglang-prefill"
+# Total prefill servers across PREFILL_HOSTS
+NUM_PREFILLS="${NUM_PREFILLS:-1}"
+LOCAL_PREFILLS="$(prefills_per_host "${NUM_PREFILLS}")"
+
+# Slot 0 keeps the single-prefill container name other scripts stop
+container_name() {
+    if [ "$1" -eq 0 ]; then
+        echo "sglang-prefill"
+    else
+        echo "sglang-prefill-$1"
+    fi
+}
 
 echo "=============================================="
-echo "Starting Prefill Server on GH200 (1PxD Mode)"
+echo "Starting ${LOCAL_PREFILLS} Prefill Server(s) on GH200 (${NUM_PREFILLS}P total)"
 echo "=============================================="
 echo "Model: ${MODEL_PATH}"
 echo "Image: ${SGLANG_IMAGE}"
-echo "Port: ${PREFILL_PORT}"
+echo "Ports: ${PREFILL_PORT}+"
 echo "Transfer Backend: ${TRANSFER_BACKEND}"
+echo "Server knobs: ${KNOB_ARGS}"
 echo "=============================================="
 
 # Stop existing containers
 echo "Stopping existing containers..."
-docker stop sglang-prefill sglang-decode sglang-agg 2>/dev/null || true
-docker rm sglang-prefill sglang-decode sglang-agg 2>/dev/null || true
+docker stop sglang-decode sglang-agg 2>/dev/null || true
+docker rm sglang-decode sglang-agg 2>/dev/null || true
+for i in $(seq 0 7); do
+    docker stop "$(container_name "${i}")" 2>/dev/null || true
+    docker rm "$(container_name "${i}")" 2>/dev/null || true
+done
+
+if [ "${LOCAL_PREFILLS}" -eq 0 ]; then
+    echo "No prefill of ${NUM_PREFILLS} is assigned to this host"
+    exit 0
+fi
 
-# Start prefill server with NIXL backend
-echo "Starting prefill server..."
-docker run -d \
-    --name "${CONTAINER_NAME}" \
-    --gpus all \
-    --ipc=host \
-    --shm-size=32g \
-    --privileged \
-    --network=host \
-    -v "${HF_CACHE_DIR}:/root/.cache/huggingface" \
-    -e HF_HOME=/root/.cache/huggingface \
-    "${SGLANG_IMAGE}" \
-    python3 -m sglang.launch_server \
-        --model-path "${MODEL_PATH}" \
-        --host 0.0.0.0 \
-        --port "${PREFILL_PORT}" \
-        --mem-fraction-static 0.9 \
-        --disaggregation-mode prefill \
-        --disaggregation-transfer-backend "${TRANSFER_BACKEND}"
+# Start prefill servers with NIXL backend
+for ((i=0; i<LOCAL_PREFILLS; i++)); do
+    PORT=$((PREFILL_PORT + i))
+    BOOTSTRAP=$((PREFILL_BOOTSTRAP_PORT + i))
+    GPUS="all"
+    if [ "${LOCAL_PREFILLS}" -gt 1 ]; then
+        GPUS="device=${i}"
+    fi
+    echo "Starting prefill server ${i}: GPU=${GPUS}, Port=${PORT}, Bootstrap=${BOOTSTRAP}"
+    docker run -d \
+        --name "$(container_name "${i}")" \
+        --gpus "${GPUS}" \
+        --ipc=host \
+        --shm-size=32g \
+        --privileged \
+        --network=host \
+        -v "${HF_CACHE_DIR}:/root/.cache/huggingface" \
+        -e HF_HOME=/root/.cache/huggingface \
+        "${SGLANG_IMAGE}" \
+        python3 -m sglang.launch_server \
+            --model-path "${MODEL_PATH}" \
+            --host 0.0.0.0 \
+            --port "${PORT}" \
+            ${KNOB_ARGS} \
+            ${METRICS_ARGS} \
+            --disaggregation-mode prefill \
+            --disaggregation-bootstrap-port "${BOOTSTRAP}" \
+            --disaggregation-transfer-backend "${TRANSFER_BACKEND}"
+done
 
 echo ""
 echo "=============================================="
-echo "Prefill server starting on port ${PREFILL_PORT}"
-echo "Check logs: docker logs -f ${CONTAINER_NAME}"
+echo "Prefill server(s) starting on ports ${PREFILL_PORT}-$((PREFILL_PORT + LOCAL_PREFILLS - 1))"
+echo "Check logs: docker logs -f $(container_name 0)"
 echo ""
 echo "Next steps:"
-echo "1. Wait for this server to be ready"
-echo "2. On A100 node, run: NUM_DECODERS=x bash scripts/50_run_multi_decode_a100.sh"
-echo "3. On A100 node, run: NUM_DECODERS=x bash scripts/52_run_router_1pxd.sh"
+echo "1. Wait for the servers to be ready (on every host in PREFILL_HOSTS)"
+echo "2. On A100 node, run: NUM_DECODERS=y bash scripts/50_run_multi_decode_a100.sh"
+echo "3. On A100 node, run: NUM_PREFILLS=${NUM_PREFILLS} NUM_DECODERS=y bash scripts/52_run_router_1pxd.sh"
 echo "=============================================="
 
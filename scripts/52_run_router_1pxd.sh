@@ -2,19 +2,20 @@
 set -euo pipefail
 
 # ============================================================
-# Router for 1PxD Configuration
+# Router for xPyD Configuration
 # Run this on the A100 node after decode servers are ready
-# Routes requests to 1 Prefill + x Decode servers
+# Routes requests to x Prefill + y Decode servers
 # ============================================================
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 source "${SCRIPT_DIR}/00_extended_config.sh"
 
-# Number of decode servers (must match what was started)
+# Number of prefill and decode servers (must match what was started)
+NUM_PREFILLS="${NUM_PREFILLS:-1}"
 NUM_DECODERS="${NUM_DECODERS:-1}"
 
-# Prefill URL (GH200 node)
-PREFILL_URL="http://${PREFILL_HOST}:${PREFILL_PORT}"
+# Prefill URLs and bootstrap ports (GH200 nodes)
+mapfile -t PREFILL_ENDPOINTS < <(get_prefill_endpoints "${NUM_PREFILLS}")
 
 # Build decode URL list
 DECODE_URLS=""
@@ -27,9 +28,9 @@ for ((i=0; i<NUM_DECODERS; i++)); do
 done
 
 echo "=============================================="
-echo "Starting Router for 1P${NUM_DECODERS}D Configuration"
+echo "Starting Router for ${NUM_PREFILLS}P${NUM_DECODERS}D Configuration"
 echo "=============================================="
-echo "Prefill: ${PREFILL_URL}"
+echo "Prefill endpoints: ${PREFILL_ENDPOINTS[*]%% *}"
 echo "Decode endpoints: ${DECODE_URLS}"
 echo "Router port: ${ROUTER_PORT}"
 echo "=============================================="
@@ -44,12 +45,17 @@ if [ -d "${VENV_DIR}" ]; then
     source "${VENV_DIR}/bin/activate"
 fi
 
-# Check if prefill server is reachable
-echo "Checking prefill server..."
-if ! curl -s --max-time 10 "${PREFILL_URL}/health" > /dev/null 2>&1; then
-    echo "WARNING: Prefill server at ${PREFILL_URL} not responding"
-    echo "Make sure the prefill server is running on GH200"
-fi
+# Check if prefill servers are reachable
+echo "Checking prefill servers..."
+for endpoint in "${PREFILL_ENDPOINTS[@]}"; do
+    url="${endpoint%% *}"
+    if ! curl -s --max-time 10 "${url}/health" > /dev/null 2>&1; then
+        echo "WARNING: Prefill server at ${url} not responding"
+        echo "Make sure the prefill servers are running on GH200"
+    else
+        echo "  Prefill server ${url}: OK"
+    fi
+done
 
 # Check decode servers
 echo "Checking decode servers..."
@@ -63,10 +69,11 @@ for ((i=0; i<NUM_DECODERS; i++)); do
 done
 
 # Build router command
-# Note: sglang_router supports multiple decode endpoints
+# Note: sglang_router supports multiple prefill and decode endpoints; each
+# prefill is given with its bootstrap port
 ROUTER_CMD="python3 -m sglang_router.launch_router \
     --pd-disaggregation \
-    --prefill ${PREFILL_URL}"
+    $(get_prefill_router_args "${NUM_PREFILLS}")"
 
 # Add decode endpoints
 for ((i=0; i<NUM_DECODERS; i++)); do
@@ -74,7 +81,7 @@ for ((i=0; i<NUM_DECODERS; i++)); do
     ROUTER_CMD="${ROUTER_CMD} --decode http://127.0.0.1:${PORT}"
 done
 
-ROUTER_CMD="${ROUTER_CMD} --host 0.0.0.0 --port ${ROUTER_PORT}"
+ROUTER_CMD="${ROUTER_CMD} --host 0.0.0.0 --port ${ROUTER_PORT} --prometheus-port ${ROUTER_METRICS_PORT}"
 
 echo ""
 echo "Starting router..."
@@ -82,7 +89,7 @@ echo "Command: ${ROUTER_CMD}"
 echo ""
 
 # Run router in foreground (Ctrl+C to stop)
-# For background, use: nohup ... > /tmp/router_1pxd.log 2>&1 &
+# For background, use: nohup ... > /tmp/router_xpyd.log 2>&1 &
 eval "${ROUTER_CMD}"
 
 
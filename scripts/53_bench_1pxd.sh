@@ -2,7 +2,7 @@
 set -euo pipefail
 
 # ============================================================
-# Benchmark 1PxD Inter-Node PD Disaggregation
+# Benchmark xPyD Inter-Node PD Disaggregation
 # Run from the A100 node where router is running
 # ============================================================
 
@@ -13,19 +13,21 @@ VENV_DIR="${VENV_DIR:-$HOME/venv_sglang}"
 RESULTS_DIR="${RESULTS_DIR:-${SCRIPT_DIR}/../benchmarks/results}"
 mkdir -p "${RESULTS_DIR}"
 
-# Number of decoders (for tagging)
+# Number of prefills and decoders (for tagging)
+NUM_PREFILLS="${NUM_PREFILLS:-1}"
 NUM_DECODERS="${NUM_DECODERS:-1}"
 
-# Tag format: pd_1pXd_nN_inI_outO_cC
-TAG="${TAG:-pd_1p${NUM_DECODERS}d_n${BENCH_NUM_PROMPTS}_in${BENCH_INPUT_LEN}_out${BENCH_OUTPUT_LEN}_c${BENCH_MAX_CONCURRENCY}}"
+# Tag format: pd_XpYd_nN_inI_outO_cC
+TAG="${TAG:-pd_${NUM_PREFILLS}p${NUM_DECODERS}d_n${BENCH_NUM_PROMPTS}_in${BENCH_INPUT_LEN}_out${BENCH_OUTPUT_LEN}_c${BENCH_MAX_CONCURRENCY}}"
 
 ROUTER_URL="http://127.0.0.1:${ROUTER_PORT}"
 OUTPUT_FILE="${RESULTS_DIR}/${TAG}.jsonl"
 
 echo "=============================================="
-echo "Benchmarking 1P${NUM_DECODERS}D Inter-Node PD"
+echo "Benchmarking ${NUM_PREFILLS}P${NUM_DECODERS}D Inter-Node PD"
 echo "=============================================="
 echo "Router URL: ${ROUTER_URL}"
+echo "Num Prefills: ${NUM_PREFILLS}"
 echo "Num Decoders: ${NUM_DECODERS}"
 echo "Prompts: ${BENCH_NUM_PROMPTS}"
 echo "Input Length: ${BENCH_INPUT_LEN}"
@@ -37,7 +39,7 @@ echo "=============================================="
 # Check if router is running
 if ! curl -s --max-time 5 "${ROUTER_URL}/get_model_info" > /dev/null 2>&1; then
     echo "ERROR: Router not responding at ${ROUTER_URL}"
-    echo "Please start the router first with: NUM_DECODERS=${NUM_DECODERS} bash scripts/52_run_router_1pxd.sh"
+    echo "Please start the router first with: NUM_PREFILLS=${NUM_PREFILLS} NUM_DECODERS=${NUM_DECODERS} bash scripts/52_run_router_1pxd.sh"
     exit 1
 fi
 
@@ -62,7 +64,7 @@ python3 -m sglang.bench_serving \
 
 echo ""
 echo "=============================================="
-echo "1P${NUM_DECODERS}D benchmark finished"
+echo "${NUM_PREFILLS}P${NUM_DECODERS}D benchmark finished"
 echo "Results: ${OUTPUT_FILE}"
 echo "=============================================="
 
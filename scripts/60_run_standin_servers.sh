@@ -0,0 +1,161 @@
+#!/usr/bin/env bash
+set -euo pipefail
+source "$(dirname "$0")/00_common.sh"
+
+# ============================================================
+# GPU-free stand-in servers for local testing
+# Starts benchmarks/standin_server.py (+ router for PD) on the
+# same ports as the real deployments, so bench scripts, sweeps
+# and the analysis pipeline run end to end on a laptop.
+#
+# Usage:
+#   bash scripts/60_run_standin_servers.sh agg
+#   bash scripts/60_run_standin_servers.sh pd_intra
+#   bash scripts/60_run_standin_servers.sh pd_inter
+#   bash scripts/60_run_standin_servers.sh 1pxd 4
+#   bash scripts/60_run_standin_servers.sh xpyd 2 4     # 2 prefills, 4 decoders
+#   bash scripts/60_run_standin_servers.sh stop
+#
+# Extra latency-model flags for every server go in STANDIN_ARGS, e.g.
+#   STANDIN_ARGS="--decode-step-ms 10 --time-scale 0.5" bash scripts/60_run_standin_servers.sh agg
+# Server knobs come from the same env vars as the real launch scripts
+# (server_knob_args in 00_common.sh), e.g.
+#   PREFILL_CHUNKED_PREFILL_SIZE=2048 bash scripts/60_run_standin_servers.sh pd_intra
+# ============================================================
+
+MODE="${1:-agg}"
+if [ "${MODE}" = "xpyd" ]; then
+    NUM_PREFILLS="${2:-1}"
+    NUM_DECODERS="${3:-1}"
+else
+    NUM_PREFILLS=1
+    NUM_DECODERS="${2:-1}"
+fi
+
+STANDIN="${REPO_ROOT}/benchmarks/standin_server.py"
+PID_FILE="${PID_FILE:-/tmp/sglang_standin.pids}"
+STANDIN_ARGS="${STANDIN_ARGS:-}"
+BOOTSTRAP_PORT="${BOOTSTRAP_PORT:-8998}"
+
+# KV transfer over the inter-node link is slower than NVLink/IB on one node
+INTER_KV_ARGS="${INTER_KV_ARGS:---kv-transfer-base-ms 5 --kv-transfer-ms-per-token 0.01}"
+
+# xPyD decoders take DECODE_BASE_PORT.. on one host, so the prefills move
+# below it: prefill i on STANDIN_PREFILL_PORT - i, bootstrap BOOTSTRAP_PORT + i
+STANDIN_PREFILL_PORT="${STANDIN_PREFILL_PORT:-29999}"
+DECODE_BASE_PORT="${DECODE_BASE_PORT:-30000}"
+
+if [ -d "${VENV_DIR}" ]; then
+    source "${VENV_DIR}/bin/activate"
+fi
+
+stop_standins() {
+    if [ -f "${PID_FILE}" ]; then
+        xargs kill 2>/dev/null < "${PID_FILE}" || true
+        rm -f "${PID_FILE}"
+    fi
+    pkill -f sglang_router 2>/dev/null || true
+}
+
+# The role (agg, prefill, decode) is the name without its index
+start_standin() {
+    local name="$1"
+    shift
+    # shellcheck disable=SC2086
+    nohup python3 "${STANDIN}" --model-path "${MODEL_PATH}" "$@" \
+        $(server_knob_args "${name%%[0-9]*}") ${METRICS_ARGS} ${STANDIN_ARGS} \
+        > "/tmp/standin_${name}.log" 2>&1 &
+    echo $! >> "${PID_FILE}"
+    echo "  ${name}: pid $! (log /tmp/standin_${name}.log)"
+}
+
+wait_ready() {
+    local url="$1"
+    for _ in $(seq 1 100); do
+        if curl -s --max-time 1 "${url}/health" > /dev/null 2>&1; then
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: ${url} not ready"
+    return 1
+}
+
+# Routes PREFILL_URLS (bootstrap ports from BOOTSTRAP_PORT up) to the decode URLs given
+start_router() {
+    local prefill_args=()
+    for i in "${!PREFILL_URLS[@]}"; do
+        prefill_args+=(--prefill "${PREFILL_URLS[i]}" "$((BOOTSTRAP_PORT + i))")
+    done
+    local decode_args=()
+    for url in "$@"; do
+        decode_args+=(--decode "${url}")
+    done
+    nohup python3 -m sglang_router.launch_router \
+        --mini-lb --pd-disaggregation \
+        "${prefill_args[@]}" \
+        "${decode_args[@]}" \
+        --host 0.0.0.0 --port "${ROUTER_PORT}" \
+        > /tmp/standin_router.log 2>&1 &
+    echo $! >> "${PID_FILE}"
+    echo "  router: pid $! (log /tmp/standin_router.log)"
+    wait_ready "http://127.0.0.1:${ROUTER_PORT}"
+}
+
+stop_standins
+if [ "${MODE}" = "stop" ]; then
+    echo "Stand-in servers stopped"
+    exit 0
+fi
+
+echo "Starting stand-in servers (${MODE})..."
+case "${MODE}" in
+    agg)
+        start_standin agg --port "${PREFILL_PORT}"
+        wait_ready "http://127.0.0.1:${PREFILL_PORT}"
+        ;;
+    pd_intra|pd_inter)
+        KV_ARGS=""
+        if [ "${MODE}" = "pd_inter" ]; then
+            KV_ARGS="${INTER_KV_ARGS}"
+        fi
+        start_standin prefill --port "${PREFILL_PORT}" \
+            --disaggregation-mode prefill --disaggregation-bootstrap-port "${BOOTSTRAP_PORT}"
+        # shellcheck disable=SC2086
+        start_standin decode --port "${DECODE_PORT}" --disaggregation-mode decode ${KV_ARGS}
+        wait_ready "http://127.0.0.1:${PREFILL_PORT}"
+        wait_ready "http://127.0.0.1:${DECODE_PORT}"
+        PREFILL_URLS=("http://127.0.0.1:${PREFILL_PORT}")
+        start_router "http://127.0.0.1:${DECODE_PORT}"
+        ;;
+    1pxd|xpyd)
+        PREFILL_URLS=()
+        for ((i=0; i<NUM_PREFILLS; i++)); do
+            PORT=$((STANDIN_PREFILL_PORT - i))
+            NAME="prefill"
+            if [ "${NUM_PREFILLS}" -gt 1 ]; then
+                NAME="prefill${i}"
+            fi
+            start_standin "${NAME}" --port "${PORT}" --disaggregation-mode prefill \
+                --disaggregation-bootstrap-port "$((BOOTSTRAP_PORT + i))"
+            PREFILL_URLS+=("http://127.0.0.1:${PORT}")
+        done
+        DECODE_URLS=()
+        for ((i=0; i<NUM_DECODERS; i++)); do
+            PORT=$((DECODE_BASE_PORT + i))
+            # shellcheck disable=SC2086
+            start_standin "decode${i}" --port "${PORT}" --disaggregation-mode decode ${INTER_KV_ARGS}
+            DECODE_URLS+=("http://127.0.0.1:${PORT}")
+        done
+        for url in "${PREFILL_URLS[@]}" "${DECODE_URLS[@]}"; do
+            wait_ready "${url}"
+        done
+        start_router "${DECODE_URLS[@]}"
+        ;;
+    *)
+        echo "Unknown mode: ${MODE} (agg, pd_intra, pd_inter, 1pxd N, xpyd P D, stop)"
+        exit 1
+        ;;
+esac
+
+echo "Stand-in servers ready. Stop with: bash $0 stop"